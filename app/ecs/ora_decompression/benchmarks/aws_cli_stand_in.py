@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+"""
+A stand-in for the aws cli, for local benchmarks of the container entrypoint without the aws cli installed.
+
+Only the command the entrypoint uses (to upload the output metadata) is supported
+  aws s3 cp [--sse=<algorithm>] <local path or -> <s3 uri>
+and is run with boto3, so honours AWS_ENDPOINT_URL / AWS_ENDPOINT_URL_S3 (i.e. a local S3 stand-in).
+
+Usage:
+  python3 aws_cli_stand_in.py s3 cp --sse=AES256 output.json s3://bucket/key.json
+"""
+
+# Standard library imports
+import argparse
+import sys
+from urllib.parse import urlparse
+
+# Boto3 imports
+import boto3
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=["s3"])
+    parser.add_argument("command", choices=["cp"])
+    parser.add_argument("--sse", default=None)
+    parser.add_argument("source", help="A local path, or - for stdin")
+    parser.add_argument("destination", help="An s3 uri")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    destination_obj = urlparse(args.destination)
+    if destination_obj.scheme != "s3":
+        print("Error! The aws cli stand-in only uploads to s3 uris", file=sys.stderr)
+        sys.exit(1)
+
+    if args.source == "-":
+        body = sys.stdin.buffer.read()
+    else:
+        with open(args.source, "rb") as source_h:
+            body = source_h.read()
+
+    boto3.client("s3").put_object(
+        Bucket=destination_obj.netloc,
+        Key=destination_obj.path.lstrip("/"),
+        Body=body,
+        **({"ServerSideEncryption": args.sse} if args.sse is not None else {})
+    )
+    print(f"upload: {args.source} to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
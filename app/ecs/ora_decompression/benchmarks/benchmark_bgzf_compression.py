@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the BGZF writer (scripts/compress_bgzf.py) against 'pigz --fast' and check its indexes.
+
+For pigz and each --threads value we report
+  * compression throughput and the compressed size
+  * whether the output decompresses (with the standard gzip module) back to the input
+
+For the BGZF outputs we also check, as a downstream consumer would use them,
+  * every .gzi entry points at the start of a BGZF member with the matching uncompressed offset
+  * every read offset index entry, when seeked to by its virtual offset, starts with the expected read
+  * decompressing all members in parallel (from the .gzi offsets) reproduces the input, and how long that takes
+
+pigz is skipped if it is not on the PATH.
+
+Usage:
+  python3 benchmark_bgzf_compression.py --num-reads 500000 --threads 1 4
+"""
+
+# Standard library imports
+import argparse
+import gzip
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Local imports
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+BGZF_SCRIPT = SCRIPTS_DIR / "compress_bgzf.py"
+BGZF_HEADER_SIZE = 18
+FASTQ_LINES_PER_READ = 4
+
+
+def read_gzi_index(gzi_index_path: Path) -> List[Tuple[int, int]]:
+    gzi_bytes = gzi_index_path.read_bytes()
+    entry_count, = struct.unpack_from("<Q", gzi_bytes)
+    return [struct.unpack_from("<QQ", gzi_bytes, 8 + 16 * entry_index) for entry_index in range(entry_count)]
+
+
+def decompress_member(bgzf_bytes: bytes, compressed_offset: int) -> bytes:
+    """
+    Decompress the single BGZF member at the compressed offset
+    """
+    member_size = struct.unpack_from("<H", bgzf_bytes, compressed_offset + 16)[0] + 1
+    return zlib.decompress(
+        bgzf_bytes[compressed_offset + BGZF_HEADER_SIZE:compressed_offset + member_size - 8],
+        -zlib.MAX_WBITS
+    )
+
+
+def check_indexes(input_bytes: bytes, bgzf_bytes: bytes, gzi_index_path: Path, read_index_path: Path) -> Dict[str, str]:
+    # The gzi entries are the ends of each data block, so the member starts are (0, 0) followed by all but the last entry
+    block_ends = read_gzi_index(gzi_index_path)
+    block_starts = [(0, 0)] + block_ends[:-1]
+    gzi_ok = all(
+        input_bytes[uncompressed_offset:uncompressed_offset + 100] ==
+        decompress_member(bgzf_bytes, compressed_offset)[:100]
+        for compressed_offset, uncompressed_offset in block_starts
+    ) and block_ends[-1][1] == len(input_bytes)
+
+    # Expected read start offsets, from the raw input
+    header_offsets = []
+    offset = 0
+    for line_index, line in enumerate(input_bytes.splitlines(keepends=True)):
+        if line_index % FASTQ_LINES_PER_READ == 0:
+            header_offsets.append(offset)
+        offset += len(line)
+
+    read_index_rows = [
+        tuple(map(int, line.split("\t")))
+        for line in read_index_path.read_text().splitlines()[1:]
+    ]
+    read_index_ok = len(read_index_rows) > 0
+    for read_number, uncompressed_offset, virtual_offset in read_index_rows:
+        compressed_offset, offset_in_block = virtual_offset >> 16, virtual_offset & 0xffff
+        block_data = decompress_member(bgzf_bytes, compressed_offset)
+        read_index_ok = read_index_ok and (
+            header_offsets[read_number] == uncompressed_offset and
+            block_data[offset_in_block:offset_in_block + 1] == b"@"
+        )
+
+    # Decompress all members in parallel from the gzi offsets
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor() as executor:
+        parallel_bytes = b"".join(executor.map(
+            lambda block_start: decompress_member(bgzf_bytes, block_start[0]),
+            block_starts
+        ))
+    parallel_seconds = time.perf_counter() - start_time
+
+    return {
+        "gziIndexOk": str(gzi_ok),
+        "readIndexOk": f"{read_index_ok} ({len(read_index_rows)} rows)",
+        "parallelDecompressionOk": f"{parallel_bytes == input_bytes} ({parallel_seconds:.2f}s)",
+    }
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(dict.fromkeys(header for row in rows for header in row))
+    widths = {header: max(len(header), *(len(row.get(header, "n/a")) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row.get(header, "n/a").ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=500_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--read-index-interval", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path, _ = write_synthetic_fastq_pair(Path(tmp_dir) / "synthetic", args.num_reads)
+        input_bytes = input_path.read_bytes()
+
+        commands = []
+        if shutil.which("pigz") is not None:
+            commands.append(("pigz --fast", ["pigz", "--stdout", "--fast", "--processes", str(max(args.threads))], None))
+        for threads in args.threads:
+            gzi_index_path = Path(tmp_dir) / f"bgzf_{threads}.gzi"
+            read_index_path = Path(tmp_dir) / f"bgzf_{threads}.ridx"
+            commands.append((
+                f"bgzf (threads={threads})",
+                [
+                    sys.executable, str(BGZF_SCRIPT),
+                    "--threads", str(threads),
+                    "--read-index-interval", str(args.read_index_interval),
+                    "--gzi-index", str(gzi_index_path),
+                    "--read-index", str(read_index_path),
+                ],
+                (gzi_index_path, read_index_path)
+            ))
+
+        for method, command, index_paths in commands:
+            start_time = time.perf_counter()
+            with open(input_path, "rb") as input_h:
+                compressed_bytes = subprocess.run(command, stdin=input_h, stdout=subprocess.PIPE, check=True).stdout
+            elapsed = time.perf_counter() - start_time
+
+            row = {
+                "method": method,
+                "compressedBytes": f"{len(compressed_bytes):,}",
+                "mibPerSecond": f"{len(input_bytes) / elapsed / 1024 / 1024:,.1f}",
+                "roundTripOk": str(gzip.decompress(compressed_bytes) == input_bytes),
+            }
+            if index_paths is not None:
+                row.update(check_indexes(input_bytes, compressed_bytes, *index_paths))
+            rows.append(row)
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
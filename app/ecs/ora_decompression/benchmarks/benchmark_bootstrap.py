@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the container bootstrap (scripts/bootstrap.py) against local stand-ins of SSM, Secrets Manager and the file manager.
+
+We compare
+  * serial processes: each lookup in its own python process, one after another
+    (as the entrypoint used to, with an aws cli / curl / python call per lookup)
+  * bootstrap (serial): the bootstrap with --max-workers 1, a single interpreter but one lookup at a time
+  * bootstrap (concurrent): the bootstrap with the default --max-workers
+
+Every request to the stand-in is delayed by --latency seconds to emulate the round trip to each service.
+
+For each method we report the wall clock time, the number of requests made,
+and whether the exported values and configuration files match the stand-in's contents.
+The per-step timings of the concurrent bootstrap are printed afterwards.
+
+Usage:
+  python3 benchmark_bootstrap.py --latency 0.05 --paired
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Local imports
+from local_bootstrap_server import LocalBootstrapStore, start_local_bootstrap_server
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+BOOTSTRAP_SCRIPT = SCRIPTS_DIR / "bootstrap.py"
+PARAMETER_PREFIXES = {
+    "storage-configuration": "/icav2/storage-configuration/",
+    "project-to-storage-configuration-mapping": "/icav2/project-to-storage-configuration-mapping/",
+    "storage-credential": "/icav2/storage-credential/",
+}
+LIST_FILE_NAMES = {
+    "storage-configuration": "project_configuration_list.yaml",
+    "project-to-storage-configuration-mapping": "project_to_storage_configuration_mapping_list.yaml",
+    "storage-credential": "storage_credential_list.yaml",
+}
+ORA_URIS = {
+    "INPUT_ORA_PRESIGNED_URL": "s3://ora-bucket/run/sample_R1_001.fastq.ora",
+    "INPUT_R2_ORA_PRESIGNED_URL": "s3://ora-bucket/run/sample_R2_001.fastq.ora",
+}
+
+
+def seed_store(store: LocalBootstrapStore, parameters_per_prefix: int):
+    store.parameters["/orcabus/hostname"] = "dev.example.org"
+    store.secrets["orcabus/token"] = json.dumps({"id_token": "local-orcabus-token"})
+    store.secrets["icav2/token"] = "local-icav2-token"
+    for prefix in PARAMETER_PREFIXES.values():
+        for parameter_index in range(parameters_per_prefix):
+            store.parameters[f"{prefix}{parameter_index:03d}"] = json.dumps({"id": parameter_index, "prefix": prefix})
+    for object_index, ora_uri in enumerate(ORA_URIS.values()):
+        bucket, key = ora_uri.removeprefix("s3://").split("/", 1)
+        store.s3_objects[(bucket, key)] = f"s3-object-{object_index}"
+
+
+def get_bootstrap_command(work_dir: Path, file_manager_url: str, ora_names: List[str]) -> List[str]:
+    command = [
+        sys.executable, str(BOOTSTRAP_SCRIPT),
+        "--hostname-ssm-parameter-name", "/orcabus/hostname",
+        "--orcabus-token-secret-id", "orcabus/token",
+        "--icav2-access-token-secret-id", "icav2/token",
+        "--file-manager-url", file_manager_url,
+    ]
+    for name, prefix in PARAMETER_PREFIXES.items():
+        command += [f"--{name}-prefix", prefix, f"--{name}-list-file", str(work_dir / LIST_FILE_NAMES[name])]
+    for ora_name in ora_names:
+        command += ["--ora-uri", f"{ora_name}={ORA_URIS[ora_name]}"]
+    return command
+
+
+def run_serial_processes(work_dir: Path, file_manager_url: str, ora_names: List[str], env: Dict[str, str]):
+    """
+    Run each lookup in its own interpreter, one after another
+    """
+    snippets = [
+        "print(bootstrap.get_ssm_parameter(bootstrap.get_client('ssm'), '/orcabus/hostname'))",
+        "print(json.loads(bootstrap.get_secret_string(bootstrap.get_client('secretsmanager'), 'orcabus/token'))['id_token'])",
+        "print(bootstrap.get_secret_string(bootstrap.get_client('secretsmanager'), 'icav2/token'))",
+    ] + [
+        "print(bootstrap.write_parameter_prefix_to_yaml("
+        f"bootstrap.get_client('ssm'), '{prefix}', Path('{work_dir / LIST_FILE_NAMES[name]}')))"
+        for name, prefix in PARAMETER_PREFIXES.items()
+    ]
+    for ora_name in ora_names:
+        # The entrypoint parsed the bucket and key with separate interpreters, then made two file manager calls
+        snippets += [
+            f"print(urlparse('{ORA_URIS[ora_name]}').netloc)",
+            f"print(urlparse('{ORA_URIS[ora_name]}').path)",
+            f"print(bootstrap.get_presigned_url_from_ora_uri('{ORA_URIS[ora_name]}', '{file_manager_url}', 'token'))",
+        ]
+    for snippet in snippets:
+        subprocess.run(
+            [
+                sys.executable, "-c",
+                "import json, sys; from pathlib import Path; from urllib.parse import urlparse; "
+                f"sys.path.insert(0, '{SCRIPTS_DIR}'); import bootstrap; {snippet}"
+            ],
+            check=True, stdout=subprocess.DEVNULL, env=env
+        )
+
+
+def check_outputs(store: LocalBootstrapStore, work_dir: Path, exports: Dict[str, str], ora_names: List[str]) -> bool:
+    files_ok = all(
+        json.loads((work_dir / LIST_FILE_NAMES[name]).read_text()) == [
+            json.loads(store.parameters[parameter_name])
+            for parameter_name in sorted(store.parameters)
+            if parameter_name.startswith(prefix)
+        ]
+        for name, prefix in PARAMETER_PREFIXES.items()
+    )
+    if not exports:
+        return files_ok
+    return files_ok and (
+        exports["HOSTNAME"] == "dev.example.org" and
+        exports["ORCABUS_TOKEN"] == "local-orcabus-token" and
+        exports["ICAV2_ACCESS_TOKEN"] == "local-icav2-token" and
+        all(exports[ora_name].endswith(ORA_URIS[ora_name].split("/", 3)[-1] + "?X-Amz-Signature=local") for ora_name in ora_names)
+    )
+
+
+def parse_exports(stdout: str) -> Dict[str, str]:
+    exports = {}
+    for line in stdout.splitlines():
+        name, _, value = line.removeprefix("export ").partition("=")
+        exports[name] = shlex.split(value)[0] if value else ""
+    return exports
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--parameters-per-prefix", type=int, default=25)
+    parser.add_argument("--paired", action="store_true", help="Also presign the R2 ora file")
+    args = parser.parse_args()
+
+    store = LocalBootstrapStore()
+    seed_store(store, args.parameters_per_prefix)
+    server = start_local_bootstrap_server(store, latency=args.latency)
+    local_url = f"http://127.0.0.1:{server.server_port}"
+    env = {
+        **os.environ,
+        "AWS_ENDPOINT_URL": local_url,
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_REGION": "ap-southeast-2",
+    }
+    ora_names = list(ORA_URIS.keys()) if args.paired else list(ORA_URIS.keys())[:1]
+
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            timings_path = work_dir / "timings.json"
+            methods = [
+                ("serial processes", None),
+                ("bootstrap (serial)", ["--max-workers", "1"]),
+                ("bootstrap (concurrent)", ["--timings-json", str(timings_path)]),
+            ]
+            for method, extra_args in methods:
+                store.request_count = 0
+                start_time = time.perf_counter()
+                if extra_args is None:
+                    run_serial_processes(work_dir, local_url, ora_names, env)
+                    exports = {}
+                else:
+                    process = subprocess.run(
+                        get_bootstrap_command(work_dir, local_url, ora_names) + extra_args,
+                        check=True, capture_output=True, text=True, env=env
+                    )
+                    exports = parse_exports(process.stdout)
+                elapsed = time.perf_counter() - start_time
+                rows.append({
+                    "method": method,
+                    "seconds": f"{elapsed:.2f}",
+                    "requests": str(store.request_count),
+                    "outputsOk": str(check_outputs(store, work_dir, exports, ora_names)),
+                })
+
+            print_table(rows)
+            print()
+            print("Concurrent bootstrap step timings (seconds):")
+            for step_name, seconds in json.loads(timings_path.read_text()).items():
+                print(f"  {step_name}: {seconds:.3f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark each compression engine (scripts/compress_stream.py) over synthetic fastq,
+to pick the cheapest engine / level / thread count for archive and hot path jobs.
+
+For each engine, level and thread count we report
+  * throughput (MiB of raw fastq per wall clock second)
+  * the compression ratio (raw bytes / compressed bytes)
+  * the CPU seconds (user + system) used by the compression process,
+    and the raw MiB compressed per CPU second (the cost on a shared Fargate task)
+  * whether the output decompresses (with the standard gzip module) back to the input
+
+With --output-format BGZF, each engine is instead run through scripts/compress_bgzf.py.
+
+Engines that are not available (pigz not on the PATH, python-isal or python-zlib-ng not installed) are skipped.
+
+Usage:
+  python3 benchmark_compression_engines.py --num-reads 500000 --threads 1 4
+  python3 benchmark_compression_engines.py --engines IGZIP --levels 0 1 2 3
+"""
+
+# Standard library imports
+import argparse
+import gzip
+import importlib.util
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Local imports
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+COMPRESS_STREAM_SCRIPT = SCRIPTS_DIR / "compress_stream.py"
+COMPRESS_BGZF_SCRIPT = SCRIPTS_DIR / "compress_bgzf.py"
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+from compress_stream import COMPRESSION_ENGINES  # noqa: E402
+
+
+def is_engine_available(engine_name: str) -> bool:
+    if engine_name == "PIGZ":
+        return shutil.which("pigz") is not None
+    if engine_name == "IGZIP":
+        return importlib.util.find_spec("isal") is not None
+    if engine_name == "ZLIB_NG":
+        return importlib.util.find_spec("zlib_ng") is not None
+    return False
+
+
+def get_children_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_engine(
+        input_path: Path,
+        output_path: Path,
+        engine_name: str,
+        level: int,
+        threads: int,
+        output_format: str
+) -> Dict[str, float]:
+    if output_format == "BGZF":
+        command = [
+            sys.executable, str(COMPRESS_BGZF_SCRIPT),
+            "--engine", engine_name,
+            "--compression-level", str(level),
+            "--threads", str(threads),
+            "--gzi-index", str(output_path.with_suffix(".gzi")),
+            "--read-index", str(output_path.with_suffix(".ridx")),
+        ]
+    else:
+        command = [
+            sys.executable, str(COMPRESS_STREAM_SCRIPT),
+            "--engine", engine_name,
+            "--level", str(level),
+            "--threads", str(threads),
+        ]
+
+    start_cpu_seconds = get_children_cpu_seconds()
+    start_time = time.perf_counter()
+    with open(input_path, "rb") as input_h, open(output_path, "wb") as output_h:
+        subprocess.run(command, stdin=input_h, stdout=output_h, check=True)
+    return {
+        "seconds": time.perf_counter() - start_time,
+        "cpuSeconds": get_children_cpu_seconds() - start_cpu_seconds,
+    }
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=500_000)
+    parser.add_argument("--engines", nargs="+", choices=list(COMPRESSION_ENGINES.keys()), default=list(COMPRESSION_ENGINES.keys()))
+    parser.add_argument(
+        "--levels", type=int, nargs="+", default=None,
+        help="Levels to run for each engine (skipped if unsupported by the engine), defaults to each engine's default level and the level above"
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--output-format", choices=["GZIP", "BGZF"], default="GZIP")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path, _ = write_synthetic_fastq_pair(Path(tmp_dir) / "synthetic", args.num_reads)
+        input_bytes = input_path.read_bytes()
+        raw_mib = len(input_bytes) / 1024 / 1024
+        output_path = Path(tmp_dir) / "output.gz"
+
+        for engine_name in args.engines:
+            if not is_engine_available(engine_name):
+                print(f"Skipping {engine_name}, it is not available in this environment", file=sys.stderr)
+                continue
+
+            engine = COMPRESSION_ENGINES[engine_name]
+            levels: List[Optional[int]] = args.levels or [
+                engine.default_level, min(engine.default_level + 1, engine.max_level)
+            ]
+            for level in dict.fromkeys(levels):
+                if not engine.min_level <= level <= engine.max_level:
+                    continue
+                for threads in args.threads:
+                    timings = run_engine(input_path, output_path, engine_name, level, threads, args.output_format)
+                    compressed_bytes = output_path.read_bytes()
+                    rows.append({
+                        "engine": engine_name,
+                        "level": str(level),
+                        "threads": str(threads),
+                        "mibPerSecond": f"{raw_mib / timings['seconds']:,.1f}",
+                        "ratio": f"{len(input_bytes) / len(compressed_bytes):.3f}",
+                        "cpuSeconds": f"{timings['cpuSeconds']:.2f}",
+                        "mibPerCpuSecond": f"{raw_mib / max(timings['cpuSeconds'], 1e-9):,.1f}",
+                        "roundTripOk": str(gzip.decompress(compressed_bytes) == input_bytes),
+                    })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
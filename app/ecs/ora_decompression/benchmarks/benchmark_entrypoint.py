@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the container entrypoint (docker-entrypoint.sh) end to end for each JOB_TYPE
+(and each OUTPUT_LAYOUT of ORA_DECOMPRESSION jobs), offline.
+The entrypoint and its scripts are run as is (from a job directory with a scripts symlink, as in the container),
+with local stand-ins of everything outside the container
+  * the input ora files: synthetic fastq files (synthetic_fastq.py) written in the stand-in .ora format,
+    decompressed by the orad stand-in (orad_stand_in.py, set as ORAD_PATH)
+  * the presigned urls of the ora files: served by local_presigned_url_server.py
+  * SSM, Secrets Manager and the file manager: local_bootstrap_server.py
+  * S3 (the output gzip files, checkpoints and metadata): local_s3_server.py
+  * the aws cli: aws_cli_stand_in.py (uploads the metadata to the S3 stand-in with boto3)
+  * uv: 'uv run python3 <script>' runs the script with this interpreter (which needs the container's python packages)
+jq and pigz are expected on the PATH, as in the container.
+
+Each job is run in its own directory, single ended by default (--paired runs R1 and R2, except read count jobs).
+ORA_DECOMPRESSION jobs are run once for each of --output-layouts, in --output-format, without sampling,
+binning the quality scores with --quality-binning (the output gzip files are then checked against the binned md5sum)
+  * SINGLE: an output gzip file for each read
+  * CHUNKED: chunks of --chunk-read-count reads for each read (GZIP only, skipped for the BGZF --output-format),
+    the chunks of each read are checked in order, as if they were a single output gzip file
+  * INTERLEAVED: a single output gzip file of the interleaved R1 and R2 reads (always paired),
+    checked against the interleaved input fastq files (or, with quality binning, its read count)
+
+While each job runs, every process started by the entrypoint is sampled from /proc every --sample-interval seconds.
+Processes are grouped in to stages, a pipeline stage (with any processes it starts) or a single command
+(i.e. the bootstrap), named by their script (i.e. download_presigned_url, pipeline_probe (orad)) or command (i.e. pigz).
+
+For each job we report
+  * the wall clock time, and the MiB / second of the (uncompressed) fastq
+  * the peak resident set size of the largest stage
+  * whether the output metadata (and, for ORA_DECOMPRESSION, the output gzip files) match the input fastq files
+and for each stage of each job
+  * the seconds the stage ran for (to the --sample-interval), the MiB read (rchar) and MiB / second read
+  * the peak resident set size (the summed peak of the stage's processes)
+
+Stages shorter than --sample-interval may be missed, and their resident set sizes are as of the last sample.
+
+With --output-json the results are written as json, and with --baseline-json the MiB / second of each job
+(and output layout) is compared to a previous --output-json, failing (exit code 1) if any job is more than --max-slowdown slower.
+
+Usage:
+  python3 benchmark_entrypoint.py --num-reads 1000000 --output-json results.json
+  python3 benchmark_entrypoint.py --num-reads 1000000 --job-types ORA_DECOMPRESSION FASTQ_STATS --baseline-json results.json
+  python3 benchmark_entrypoint.py --num-reads 1000000 --job-types ORA_DECOMPRESSION --output-layouts CHUNKED INTERLEAVED
+"""
+
+# Standard library imports
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Local imports
+from benchmark_bootstrap import ORA_URIS, PARAMETER_PREFIXES, print_table, seed_store
+from local_bootstrap_server import LocalBootstrapStore, start_local_bootstrap_server
+from local_presigned_url_server import start_local_presigned_url_server
+from local_s3_server import LocalS3Store, start_local_s3_server
+from orad_stand_in import write_stand_in_ora
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+BENCHMARKS_DIR = Path(__file__).absolute().parent
+SCRIPTS_DIR = BENCHMARKS_DIR.parent / "scripts"
+ENTRYPOINT = BENCHMARKS_DIR.parent / "docker-entrypoint.sh"
+ORAD_STAND_IN = BENCHMARKS_DIR / "orad_stand_in.py"
+AWS_CLI_STAND_IN = BENCHMARKS_DIR / "aws_cli_stand_in.py"
+JOB_TYPES = [
+    "ORA_DECOMPRESSION",
+    "GZIP_FILESIZE_CALCULATION",
+    "RAW_MD5SUM_CALCULATION",
+    "READ_COUNT_CALCULATION",
+    "MULTI_STATS_CALCULATION",
+    "FASTQ_STATS",
+]
+OUTPUT_LAYOUTS = ["SINGLE", "CHUNKED", "INTERLEAVED"]
+DECOMPRESSION_BUCKET = "decompression-bucket"
+FASTQ_ID = "fqr.LOCAL"
+# Stand-in scripts are named after the command they stand in for
+STAND_IN_STAGE_NAMES = {"orad_stand_in": "orad", "aws_cli_stand_in": "aws"}
+# Commands that run a script, named by the script they run
+INTERPRETER_COMMANDS = ("python", "uv")
+# The entrypoint and its subshells
+SKIPPED_COMMANDS = ["bash"]
+KIB = 1024
+MIB = 1024 * 1024
+FASTQ_LINES_PER_READ = 4
+
+
+@dataclass
+class ProcessMetrics:
+    stage: str
+    # The leader of the stage's session (for pipeline stages), otherwise the process itself
+    group_pid: int
+    first_seen: float
+    last_seen: float
+    peak_rss_kib: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+
+
+@dataclass
+class InputRead:
+    name: str
+    fastq_path: Path
+    ora_uri: str
+    fastq_md5sum: str
+    read_count: int
+
+
+@dataclass
+class JobResult:
+    job_type: str
+    output_layout: str
+    exit_code: int
+    seconds: float
+    fastq_bytes: int
+    checks_ok: bool
+    stages: List[Dict] = field(default_factory=list)
+
+    def get_mib_per_second(self) -> float:
+        return self.fastq_bytes / MIB / self.seconds
+
+
+def get_stage_name(argv: List[str]) -> str:
+    """
+    Name a stage by its script (and the stage a probe sits on), or by its command
+    """
+    command = Path(argv[0]).name
+    if not command.startswith(INTERPRETER_COMMANDS):
+        return command
+    for arg in argv:
+        if arg.endswith(".py"):
+            stage = STAND_IN_STAGE_NAMES.get(Path(arg).stem, Path(arg).stem)
+            if "--stage" in argv[:-1]:
+                stage += f" ({argv[argv.index('--stage') + 1]})"
+            return stage
+    return command
+
+
+def get_argv(pid: int) -> List[str]:
+    with open(f"/proc/{pid}/cmdline", "rb") as cmdline_h:
+        return [arg.decode(errors="replace") for arg in cmdline_h.read().split(b"\0") if arg]
+
+
+class ProcessSampler(threading.Thread):
+    """
+    Sample the resident set size and bytes read and written of every process descended from the root process
+    The root process must be the leader of its own session, so the pipeline stages (each started in their own session
+    by scripts/supervise_pipeline.py) can be told apart from the commands the entrypoint runs itself
+    """
+    def __init__(self, root_pid: int, interval: float):
+        super().__init__(daemon=True)
+        self.root_pid = root_pid
+        self.interval = interval
+        self.stop_event = threading.Event()
+        # Keyed by (pid, start time), as pids are reused
+        self.process_metrics: Dict[Tuple[int, int], ProcessMetrics] = {}
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    def sample(self):
+        now = time.monotonic()
+
+        # pid to (parent pid, session id, start time)
+        process_stats: Dict[int, Tuple[int, int, int]] = {}
+        for pid in map(int, filter(str.isdigit, os.listdir("/proc"))):
+            try:
+                with open(f"/proc/{pid}/stat") as stat_h:
+                    # The fields after the command name (which may contain spaces) are state, ppid, pgrp, session, ...
+                    stat_fields = stat_h.read().rsplit(")", 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            process_stats[pid] = (int(stat_fields[1]), int(stat_fields[3]), int(stat_fields[19]))
+
+        children: Dict[int, List[int]] = {}
+        for pid, (parent_pid, _, _) in process_stats.items():
+            children.setdefault(parent_pid, []).append(pid)
+        descendant_pids, pending_pids = set(), [self.root_pid]
+        while pending_pids:
+            pid = pending_pids.pop()
+            descendant_pids.add(pid)
+            pending_pids.extend(children.get(pid, []))
+
+        for pid in descendant_pids:
+            if pid not in process_stats:
+                continue
+            _, session_id, start_time = process_stats[pid]
+            group_pid = session_id if session_id != self.root_pid and session_id in descendant_pids else pid
+            try:
+                argv = get_argv(pid)
+                group_argv = get_argv(group_pid)
+                with open(f"/proc/{pid}/status") as status_h:
+                    status = dict(line.split(":", 1) for line in status_h.read().splitlines() if ":" in line)
+                with open(f"/proc/{pid}/io") as io_h:
+                    io_counts = dict(line.split(": ") for line in io_h.read().splitlines())
+            except (OSError, ValueError):
+                # The process has exited
+                continue
+            if not argv or not group_argv or Path(argv[0]).name in SKIPPED_COMMANDS:
+                continue
+
+            metrics = self.process_metrics.setdefault(
+                (pid, start_time),
+                ProcessMetrics(stage="", group_pid=group_pid, first_seen=now, last_seen=now)
+            )
+            # A process is named by its latest command, as it may not have exec'd its command when first seen
+            metrics.stage = get_stage_name(group_argv)
+            metrics.group_pid = group_pid
+            metrics.last_seen = now
+            metrics.peak_rss_kib = max(metrics.peak_rss_kib, int(status.get("VmHWM", "0 kB").split()[0]))
+            metrics.read_bytes = int(io_counts.get("rchar", 0))
+            metrics.write_bytes = int(io_counts.get("wchar", 0))
+
+    def get_stage_summaries(self) -> List[Dict]:
+        """
+        Summarise each stage (over every run of it, i.e. R1 and R2), in the order the stages started
+        """
+        groups: Dict[Tuple[str, int], List[ProcessMetrics]] = {}
+        for metrics in self.process_metrics.values():
+            groups.setdefault((metrics.stage, metrics.group_pid), []).append(metrics)
+
+        stage_summaries: Dict[str, Dict] = {}
+        for (stage, _), group_metrics in sorted(
+            groups.items(), key=lambda item: min(metrics.first_seen for metrics in item[1])
+        ):
+            stage_summary = stage_summaries.setdefault(stage, {
+                "stage": stage,
+                "runs": 0,
+                "firstSeen": min(metrics.first_seen for metrics in group_metrics),
+                "lastSeen": 0.0,
+                "readBytes": 0,
+                "writeBytes": 0,
+                "peakRssKib": 0,
+            })
+            stage_summary["runs"] += 1
+            stage_summary["lastSeen"] = max(stage_summary["lastSeen"], *(metrics.last_seen for metrics in group_metrics))
+            stage_summary["readBytes"] += sum(metrics.read_bytes for metrics in group_metrics)
+            stage_summary["writeBytes"] += sum(metrics.write_bytes for metrics in group_metrics)
+            stage_summary["peakRssKib"] = max(
+                stage_summary["peakRssKib"], sum(metrics.peak_rss_kib for metrics in group_metrics)
+            )
+
+        return [
+            {
+                "stage": stage_summary["stage"],
+                "runs": stage_summary["runs"],
+                "seconds": round(stage_summary["lastSeen"] - stage_summary["firstSeen"] + self.interval, 3),
+                "readBytes": stage_summary["readBytes"],
+                "writeBytes": stage_summary["writeBytes"],
+                "peakRssKib": stage_summary["peakRssKib"],
+            }
+            for stage_summary in stage_summaries.values()
+        ]
+
+
+def write_stand_in_bin(bin_dir: Path):
+    """
+    Write the commands the entrypoint expects on the PATH (uv and aws), and the orad stand-in
+    """
+    bin_dir.mkdir()
+    commands = {
+        # uv run python3 <script> [<args>...]
+        "uv": f'exec "{sys.executable}" "${{@:3}}"',
+        "aws": f'exec "{sys.executable}" "{AWS_CLI_STAND_IN}" "$@"',
+        "orad": f'exec "{sys.executable}" "{ORAD_STAND_IN}" "$@"',
+    }
+    for command_name, command in commands.items():
+        command_path = bin_dir / command_name
+        command_path.write_text(f"#!/usr/bin/env bash\n{command}\n")
+        command_path.chmod(0o755)
+
+
+def write_input_reads(work_dir: Path, serve_dir: Path, num_reads: int) -> List[InputRead]:
+    """
+    Write the synthetic fastq pair, and serve each read as a stand-in .ora file at the path of its ora uri
+    """
+    fastq_paths = write_synthetic_fastq_pair(work_dir / "synthetic", num_reads)
+    input_reads = []
+    for name, fastq_path, ora_uri in zip(["R1", "R2"], fastq_paths, ORA_URIS.values()):
+        ora_path = serve_dir / ora_uri.removeprefix("s3://")
+        ora_path.parent.mkdir(parents=True, exist_ok=True)
+        write_stand_in_ora(fastq_path, ora_path)
+        md5 = hashlib.md5()
+        with open(fastq_path, "rb") as fastq_h:
+            while chunk := fastq_h.read(MIB):
+                md5.update(chunk)
+        input_reads.append(InputRead(name, fastq_path, ora_uri, md5.hexdigest(), num_reads))
+    return input_reads
+
+
+def get_job_dir_name(job_type: str, output_layout: str) -> str:
+    """
+    The job directory (and output s3 prefix) of a job, the output layout is only named if it is not SINGLE
+    """
+    return job_type.lower() if output_layout == "SINGLE" else f"{job_type.lower()}_{output_layout.lower()}"
+
+
+def get_interleaved_md5sum(input_reads: List[InputRead]) -> str:
+    """
+    The md5sum of the input fastq files interleaved, each R1 read followed by its R2 mate
+    """
+    md5 = hashlib.md5()
+    with open(input_reads[0].fastq_path, "rb") as r1_h, open(input_reads[1].fastq_path, "rb") as r2_h:
+        while r1_read := b"".join(islice(r1_h, FASTQ_LINES_PER_READ)):
+            md5.update(r1_read)
+            md5.update(b"".join(islice(r2_h, FASTQ_LINES_PER_READ)))
+    return md5.hexdigest()
+
+
+def get_job_env(
+        job_type: str,
+        output_layout: str,
+        input_reads: List[InputRead],
+        bootstrap_url: str,
+        s3_url: str,
+        bin_dir: Path,
+        ora_reference_dir: Path,
+        output_format: str,
+        quality_binning: str,
+        thread_budget: int,
+        chunk_read_count: int
+) -> Dict[str, str]:
+    job_dir_name = get_job_dir_name(job_type, output_layout)
+    env = {
+        **os.environ,
+        "PATH": f"{bin_dir}:{os.environ['PATH']}",
+        "AWS_ENDPOINT_URL_SSM": bootstrap_url,
+        "AWS_ENDPOINT_URL_SECRETS_MANAGER": bootstrap_url,
+        "AWS_ENDPOINT_URL_S3": s3_url,
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_REGION": "ap-southeast-2",
+        "FILE_MANAGER_URL": bootstrap_url,
+        "ORAD_PATH": str(bin_dir / "orad"),
+        "ORADATA_PATH": str(ora_reference_dir),
+        "S3_DECOMPRESSION_BUCKET": DECOMPRESSION_BUCKET,
+        "HOSTNAME_SSM_PARAMETER_NAME": "/orcabus/hostname",
+        "ORCABUS_TOKEN_SECRET_ID": "orcabus/token",
+        "ICAV2_ACCESS_TOKEN_SECRET_ID": "icav2/token",
+        "ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX": PARAMETER_PREFIXES["storage-configuration"],
+        "ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX": (
+            PARAMETER_PREFIXES["project-to-storage-configuration-mapping"]
+        ),
+        "ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX": PARAMETER_PREFIXES["storage-credential"],
+        "JOB_TYPE": job_type,
+        "OUTPUT_FORMAT": output_format,
+        "OUTPUT_LAYOUT": output_layout,
+        "CHUNK_READ_COUNT": str(chunk_read_count),
+        "QUALITY_BINNING": quality_binning,
+        "THREAD_BUDGET": str(thread_budget),
+        "SAMPLING": "false",
+        "MAX_READS": "-1",
+        "TOTAL_READ_COUNT": str(input_reads[0].read_count),
+        "FASTQ_ID": FASTQ_ID,
+        "OUTPUT_METADATA_URI": f"s3://{DECOMPRESSION_BUCKET}/metadata/{job_dir_name}.json",
+        "INPUT_ORA_URI": input_reads[0].ora_uri,
+        "ORA_INGEST_ID": "ingest-r1",
+        "OUTPUT_GZIP_URI": f"s3://{DECOMPRESSION_BUCKET}/{job_dir_name}/{input_reads[0].fastq_path.name}.gz",
+    }
+    if len(input_reads) > 1:
+        env.update({
+            "INPUT_R2_ORA_URI": input_reads[1].ora_uri,
+            "R2_ORA_INGEST_ID": "ingest-r2",
+            "R2_OUTPUT_GZIP_URI": f"s3://{DECOMPRESSION_BUCKET}/{job_dir_name}/{input_reads[1].fastq_path.name}.gz",
+        })
+    if output_layout == "INTERLEAVED":
+        env["INTERLEAVED_OUTPUT_GZIP_URI"] = f"s3://{DECOMPRESSION_BUCKET}/{job_dir_name}/{FASTQ_ID}_interleaved.fastq.gz"
+    return env
+
+
+def get_s3_object(s3_store: LocalS3Store, s3_uri: str) -> Optional[bytes]:
+    bucket, key = s3_uri.removeprefix("s3://").split("/", 1)
+    with s3_store.lock:
+        return s3_store.objects.get((bucket, key))
+
+
+def get_gzip_output(s3_store: LocalS3Store, output_layout: str, output_item: Dict) -> Optional[bytes]:
+    """
+    Get the output gzip file of a read, in the CHUNKED layout its chunks concatenated in order
+    (a concatenation of gzip members is a valid gzip file)
+    """
+    if output_layout != "CHUNKED":
+        return get_s3_object(s3_store, output_item["gzipFileUri"])
+    chunk_bytes_list = [get_s3_object(s3_store, chunk["gzipFileUri"]) for chunk in output_item["chunks"]]
+    if (
+        not chunk_bytes_list or
+        output_item["chunks"][0]["gzipFileUri"] != output_item["gzipFileUri"] or
+        any(chunk_bytes is None for chunk_bytes in chunk_bytes_list) or
+        sum(chunk["readCount"] for chunk in output_item["chunks"]) != output_item["readCount"]
+    ):
+        return None
+    return b"".join(chunk_bytes_list)
+
+
+def check_outputs(
+        job_type: str,
+        output_layout: str,
+        s3_store: LocalS3Store,
+        metadata_uri: str,
+        input_reads: List[InputRead]
+) -> bool:
+    """
+    Check the metadata of each read against its input fastq
+    (and that the output gzip file of ORA_DECOMPRESSION jobs decompresses to the input fastq, or its binned md5sum,
+    or in the INTERLEAVED layout to the interleaved input fastq files)
+    """
+    metadata_bytes = get_s3_object(s3_store, metadata_uri)
+    if metadata_bytes is None:
+        return False
+    metadata = json.loads(metadata_bytes)
+    output_items = metadata if isinstance(metadata, list) else [metadata]
+    if len(output_items) != len(input_reads):
+        return False
+
+    # The interleaved output file is checked once, as it is shared by both reads
+    interleaved_ok = None
+    for output_item, input_read in zip(output_items, input_reads):
+        if job_type == "ORA_DECOMPRESSION":
+            gzip_bytes = get_gzip_output(s3_store, output_layout, output_item)
+            input_ok = (
+                gzip_bytes is not None and
+                output_item["outputLayout"] == output_layout and
+                output_item["rawMd5sum"] == input_read.fastq_md5sum and
+                output_item["readCount"] == input_read.read_count and
+                output_item["gzipFileSizeInBytes"] == len(gzip_bytes)
+            )
+            if input_ok and output_layout == "INTERLEAVED":
+                if interleaved_ok is None:
+                    fastq_bytes = gzip.decompress(gzip_bytes)
+                    interleaved_ok = (
+                        hashlib.md5(fastq_bytes).hexdigest() == get_interleaved_md5sum(input_reads)
+                        if output_item.get("qualityBinning", "NONE") == "NONE"
+                        else fastq_bytes.count(b"\n") == FASTQ_LINES_PER_READ * sum(
+                            input_read_iter_.read_count for input_read_iter_ in input_reads
+                        )
+                    )
+                input_ok = interleaved_ok
+            elif input_ok:
+                expected_md5sum = (
+                    output_item["qualityBinningSummary"]["binnedMd5sum"]
+                    if output_item.get("qualityBinning", "NONE") != "NONE" else input_read.fastq_md5sum
+                )
+                input_ok = hashlib.md5(gzip.decompress(gzip_bytes)).hexdigest() == expected_md5sum
+        elif job_type == "GZIP_FILESIZE_CALCULATION":
+            input_ok = output_item["gzipFileSizeInBytes"] > 0
+        elif job_type == "RAW_MD5SUM_CALCULATION":
+            input_ok = output_item["rawMd5sum"] == input_read.fastq_md5sum
+        elif job_type == "READ_COUNT_CALCULATION":
+            input_ok = output_item["readCount"] == input_read.read_count and output_item["fastqId"] == FASTQ_ID
+        elif job_type == "MULTI_STATS_CALCULATION":
+            input_ok = (
+                output_item["rawMd5sum"] == input_read.fastq_md5sum and
+                output_item["readCount"] == input_read.read_count and
+                output_item["gzipFileSizeInBytes"] > 0
+            )
+        else:
+            input_ok = output_item["readCount"] == input_read.read_count
+        if not input_ok:
+            return False
+    return True
+
+
+def run_job(
+        job_type: str,
+        output_layout: str,
+        job_dir: Path,
+        env: Dict[str, str],
+        s3_store: LocalS3Store,
+        input_reads: List[InputRead],
+        sample_interval: float
+) -> JobResult:
+    """
+    Run the entrypoint in the job directory (with a scripts symlink, as in the container), sampling its processes
+    """
+    job_dir.mkdir()
+    (job_dir / "scripts").symlink_to(SCRIPTS_DIR)
+
+    start_time = time.perf_counter()
+    with open(job_dir / "entrypoint.log", "w") as log_h:
+        process = subprocess.Popen(
+            ["bash", str(ENTRYPOINT)],
+            cwd=job_dir, env=env, stdout=log_h, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        sampler = ProcessSampler(process.pid, sample_interval)
+        sampler.start()
+        exit_code = process.wait()
+        sampler.stop()
+    elapsed = time.perf_counter() - start_time
+
+    if exit_code != 0:
+        print(f"Error! {job_type} ({output_layout}) failed, the last lines of the entrypoint log:", file=sys.stderr)
+        print("\n".join((job_dir / "entrypoint.log").read_text().splitlines()[-20:]), file=sys.stderr)
+
+    return JobResult(
+        job_type=job_type,
+        output_layout=output_layout,
+        exit_code=exit_code,
+        seconds=elapsed,
+        fastq_bytes=sum(input_read.fastq_path.stat().st_size for input_read in input_reads),
+        checks_ok=exit_code == 0 and check_outputs(
+            job_type, output_layout, s3_store, env["OUTPUT_METADATA_URI"], input_reads
+        ),
+        stages=sampler.get_stage_summaries(),
+    )
+
+
+def load_baseline(baseline_json: Path, run_parameters: Dict) -> Dict[Tuple[str, str], Dict]:
+    """
+    Load the jobs of a previous --output-json by job type and output layout
+    The fixed costs of each job (i.e. the bootstrap) weigh more on smaller inputs,
+    so the baseline must have been run with the same parameters
+    """
+    baseline_json_obj = json.loads(baseline_json.read_text())
+    for parameter_name, parameter_value in run_parameters.items():
+        if baseline_json_obj.get(parameter_name) != parameter_value:
+            raise ValueError(
+                f"The baseline was run with {parameter_name} {baseline_json_obj.get(parameter_name)}, not {parameter_value}"
+            )
+    return {(job["jobType"], job.get("outputLayout", "SINGLE")): job for job in baseline_json_obj["jobs"]}
+
+
+def get_regressions(
+        results: List[JobResult],
+        baseline: Dict[Tuple[str, str], Dict],
+        max_slowdown: float
+) -> Dict[Tuple[str, str], str]:
+    """
+    Compare the MiB / second of each job to the baseline, returning the regression (or ok) of each job
+    """
+    regressions = {}
+    for result in results:
+        job_key = (result.job_type, result.output_layout)
+        if job_key not in baseline:
+            regressions[job_key] = "-"
+            continue
+        slowdown = 1 - result.get_mib_per_second() / baseline[job_key]["mibPerSecond"]
+        regressions[job_key] = f"{slowdown:.0%} slower" if slowdown > max_slowdown else "ok"
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=1_000_000)
+    parser.add_argument("--job-types", nargs="+", choices=JOB_TYPES, default=JOB_TYPES)
+    parser.add_argument("--paired", action="store_true", help="Run R1 and R2 (read count jobs only ever run R1)")
+    parser.add_argument("--output-format", choices=["GZIP", "BGZF"], default="GZIP")
+    parser.add_argument(
+        "--output-layouts", nargs="+", choices=OUTPUT_LAYOUTS, default=OUTPUT_LAYOUTS,
+        help="The output layouts to run ORA_DECOMPRESSION jobs in"
+    )
+    parser.add_argument(
+        "--chunk-read-count", type=int, default=None,
+        help="The reads in each chunk of the CHUNKED output layout, a quarter of --num-reads by default"
+    )
+    parser.add_argument("--quality-binning", choices=["NONE", "ILLUMINA_8_BIN", "ILLUMINA_4_BIN"], default="NONE")
+    parser.add_argument("--thread-budget", type=int, default=os.cpu_count())
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay each request to the stand-ins by this many seconds")
+    parser.add_argument("--sample-interval", type=float, default=0.05)
+    parser.add_argument("--output-json", type=Path, default=None)
+    parser.add_argument("--baseline-json", type=Path, default=None)
+    parser.add_argument("--max-slowdown", type=float, default=0.2)
+    args = parser.parse_args()
+
+    run_parameters = {
+        "numReads": args.num_reads,
+        "paired": args.paired,
+        "outputFormat": args.output_format,
+        "qualityBinning": args.quality_binning,
+    }
+    baseline = load_baseline(args.baseline_json, run_parameters) if args.baseline_json is not None else None
+    chunk_read_count = args.chunk_read_count if args.chunk_read_count is not None else max(1, args.num_reads // 4)
+
+    # The CHUNKED output layout is only available for the GZIP output format
+    output_layouts = [
+        output_layout
+        for output_layout in args.output_layouts
+        if output_layout != "CHUNKED" or args.output_format == "GZIP"
+    ]
+    if "ORA_DECOMPRESSION" in args.job_types and output_layouts != args.output_layouts:
+        print(f"Skipping the CHUNKED output layout for the {args.output_format} output format", file=sys.stderr)
+    jobs = [
+        (job_type, output_layout)
+        for job_type in args.job_types
+        for output_layout in (output_layouts if job_type == "ORA_DECOMPRESSION" else ["SINGLE"])
+    ]
+
+    bootstrap_store = LocalBootstrapStore()
+    seed_store(bootstrap_store, parameters_per_prefix=5)
+    bootstrap_server = start_local_bootstrap_server(bootstrap_store, latency=args.latency)
+    s3_server, s3_store = start_local_s3_server(latency=args.latency)
+
+    results: List[JobResult] = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            serve_dir = work_dir / "presigned"
+            presigned_url_server = start_local_presigned_url_server(serve_dir, latency=args.latency)
+            bootstrap_store.presigned_url_template = (
+                f"http://127.0.0.1:{presigned_url_server.server_port}/{{bucket}}/{{key}}?X-Amz-Signature=local"
+            )
+            bin_dir = work_dir / "bin"
+            write_stand_in_bin(bin_dir)
+            ora_reference_dir = work_dir / "oradata"
+            ora_reference_dir.mkdir()
+
+            input_reads = write_input_reads(work_dir, serve_dir, args.num_reads)
+
+            try:
+                for job_type, output_layout in jobs:
+                    # The INTERLEAVED output layout is always paired
+                    job_input_reads = (
+                        input_reads
+                        if (
+                            (args.paired or output_layout == "INTERLEAVED") and
+                            job_type != "READ_COUNT_CALCULATION"
+                        )
+                        else input_reads[:1]
+                    )
+                    env = get_job_env(
+                        job_type, output_layout, job_input_reads,
+                        f"http://127.0.0.1:{bootstrap_server.server_port}",
+                        f"http://127.0.0.1:{s3_server.server_port}",
+                        bin_dir, ora_reference_dir, args.output_format, args.quality_binning, args.thread_budget,
+                        chunk_read_count
+                    )
+                    results.append(run_job(
+                        job_type, output_layout, work_dir / get_job_dir_name(job_type, output_layout), env,
+                        s3_store, job_input_reads, args.sample_interval
+                    ))
+            finally:
+                presigned_url_server.shutdown()
+    finally:
+        bootstrap_server.shutdown()
+        s3_server.shutdown()
+
+    regressions = get_regressions(results, baseline, args.max_slowdown) if baseline is not None else {}
+
+    print_table([
+        {
+            "jobType": result.job_type,
+            "outputLayout": result.output_layout,
+            "exitCode": str(result.exit_code),
+            "seconds": f"{result.seconds:.2f}",
+            "fastqMiB": f"{result.fastq_bytes / MIB:.1f}",
+            "mibPerSecond": f"{result.get_mib_per_second():.1f}",
+            "peakRssMiB": f"{max((stage['peakRssKib'] for stage in result.stages), default=0) / KIB:.1f}",
+            "checksOk": str(result.checks_ok),
+            **({"regression": regressions[(result.job_type, result.output_layout)]} if regressions else {}),
+        }
+        for result in results
+    ])
+    for result in filter(lambda result: result.stages, results):
+        print(f"\n{result.job_type} ({result.output_layout}) stages")
+        print_table([
+            {
+                "stage": stage["stage"],
+                "runs": str(stage["runs"]),
+                "seconds": f"{stage['seconds']:.2f}",
+                "readMiB": f"{stage['readBytes'] / MIB:.1f}",
+                "mibPerSecond": f"{stage['readBytes'] / MIB / stage['seconds']:.1f}",
+                "peakRssMiB": f"{stage['peakRssKib'] / KIB:.1f}",
+            }
+            for stage in result.stages
+        ])
+
+    if args.output_json is not None:
+        with open(args.output_json, "w") as output_h:
+            json.dump(
+                {
+                    **run_parameters,
+                    "jobs": [
+                        {
+                            "jobType": result.job_type,
+                            "outputLayout": result.output_layout,
+                            "exitCode": result.exit_code,
+                            "seconds": round(result.seconds, 3),
+                            "fastqBytes": result.fastq_bytes,
+                            "mibPerSecond": round(result.get_mib_per_second(), 3),
+                            "checksOk": result.checks_ok,
+                            "stages": result.stages,
+                        }
+                        for result in results
+                    ],
+                },
+                output_h,
+                indent=2
+            )
+
+    if any(
+        result.exit_code != 0 or not result.checks_ok for result in results
+    ) or any(regression.endswith("slower") for regression in regressions.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
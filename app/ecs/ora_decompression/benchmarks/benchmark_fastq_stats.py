@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the vectorised fastq QC statistics (scripts/calculate_fastq_stats.py)
+against a per read python loop over the same fastq, on synthetic data.
+
+For each method we report
+  * throughput (reads / second and MiB / second)
+  * whether the statistics match the per read loop (read count, read length histogram, base composition,
+    gc content histogram, mean quality, q20 and q30 fractions and the per position summaries)
+
+The per read loop is only run on the first --loop-reads reads (it is slow), the vectorised statistics
+are checked against it over the same reads, then timed over the whole file.
+
+Usage:
+  python3 benchmark_fastq_stats.py --num-reads 1000000 --loop-reads 100000
+"""
+
+# Standard library imports
+import argparse
+import io
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+# Local imports
+from benchmark_bootstrap import print_table
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+FASTQ_STATS_SCRIPT = SCRIPTS_DIR / "calculate_fastq_stats.py"
+PHRED_OFFSET = 33
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+from calculate_fastq_stats import FASTQ_LINES_PER_READ, FastqStats, calculate_fastq_stats  # noqa: E402
+
+
+def calculate_fastq_stats_per_read(fastq_bytes: bytes) -> Dict:
+    """
+    The per read python loop the vectorised statistics replace
+    """
+    read_count = 0
+    read_length_counts = Counter()
+    base_counts = Counter()
+    gc_percent_counts = Counter()
+    quality_sum = q20_count = q30_count = 0
+    position_base_counts = Counter()
+    position_quality_sums = Counter()
+    position_q30_counts = Counter()
+
+    lines = fastq_bytes.split(b"\n")
+    for line_index in range(0, len(lines) - 3, FASTQ_LINES_PER_READ):
+        sequence = lines[line_index + 1].decode().upper()
+        quality = lines[line_index + 3]
+        read_count += 1
+        read_length_counts[len(sequence)] += 1
+        gc_count = 0
+        for position, (base, quality_char) in enumerate(zip(sequence, quality)):
+            base = base.lower() if base in "ACGT" else "n"
+            quality_score = quality_char - PHRED_OFFSET
+            base_counts[base] += 1
+            gc_count += base in "gc"
+            quality_sum += quality_score
+            q20_count += quality_score >= 20
+            q30_count += quality_score >= 30
+            position_base_counts[(position, base)] += 1
+            position_quality_sums[position] += quality_score
+            position_q30_counts[position] += quality_score >= 30
+        if sequence:
+            gc_percent_counts[round(100 * gc_count / len(sequence))] += 1
+
+    base_count = sum(base_counts.values())
+    return {
+        "readCount": read_count,
+        "readLengthHistogram": sorted(read_length_counts.items()),
+        "baseCount": base_count,
+        "baseComposition": {base: base_counts[base] / base_count for base in "acgtn"},
+        "gcContentHistogram": sorted(gc_percent_counts.items()),
+        "meanQuality": quality_sum / base_count,
+        "q20Fraction": q20_count / base_count,
+        "q30Fraction": q30_count / base_count,
+        "positionMeanQuality": [
+            position_quality_sums[position] / sum(position_base_counts[(position, base)] for base in "acgtn")
+            for position in sorted(position_quality_sums)
+        ],
+        "positionQ30Count": [position_q30_counts[position] for position in sorted(position_q30_counts)],
+    }
+
+
+def stats_match(vectorised: Dict, per_read: Dict) -> bool:
+    def close(a, b) -> bool:
+        return abs(a - b) < 1e-5
+
+    return all([
+        vectorised["readCount"] == per_read["readCount"],
+        vectorised["baseCount"] == per_read["baseCount"],
+        [
+            (item["readLength"], item["readCount"]) for item in vectorised["readLengthHistogram"]
+        ] == per_read["readLengthHistogram"],
+        [
+            (item["gcPercent"], item["readCount"]) for item in vectorised["gcContentHistogram"]
+        ] == per_read["gcContentHistogram"],
+        all(
+            close(vectorised["baseComposition"][base], per_read["baseComposition"][base])
+            for base in "acgtn"
+        ),
+        close(vectorised["meanQuality"], per_read["meanQuality"]),
+        close(vectorised["q20Fraction"], per_read["q20Fraction"]),
+        close(vectorised["q30Fraction"], per_read["q30Fraction"]),
+        all(
+            close(position_summary["meanQuality"], mean_quality)
+            for position_summary, mean_quality in zip(
+                vectorised["perPositionSummaryList"], per_read["positionMeanQuality"]
+            )
+        ),
+        [
+            round(position_summary["q30Fraction"] * position_summary["baseCount"])
+            for position_summary in vectorised["perPositionSummaryList"]
+        ] == per_read["positionQ30Count"],
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=1_000_000)
+    parser.add_argument("--loop-reads", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        r1_path, _ = write_synthetic_fastq_pair(Path(tmp_dir) / "synthetic", args.num_reads)
+        fastq_bytes = r1_path.read_bytes()
+        loop_lines = fastq_bytes.split(b"\n", FASTQ_LINES_PER_READ * args.loop_reads)
+        loop_bytes = b"\n".join(loop_lines[:FASTQ_LINES_PER_READ * args.loop_reads]) + b"\n"
+
+        # Per read python loop, over the first --loop-reads reads
+        start_time = time.perf_counter()
+        per_read_stats = calculate_fastq_stats_per_read(loop_bytes)
+        elapsed = time.perf_counter() - start_time
+        rows.append({
+            "method": "per read loop",
+            "reads": str(per_read_stats["readCount"]),
+            "readsPerSecond": f"{per_read_stats['readCount'] / elapsed:,.0f}",
+            "mibPerSecond": f"{len(loop_bytes) / elapsed / 2 ** 20:.1f}",
+            "matchesLoop": "-",
+        })
+
+        # Vectorised, checked against the per read loop over the same reads
+        vectorised_stats = calculate_fastq_stats(io.BytesIO(loop_bytes), FastqStats()).to_dict()
+        matches_loop = stats_match(vectorised_stats, per_read_stats)
+
+        # Vectorised, over the whole file (as run in the container, reading stdin)
+        output_json = Path(tmp_dir) / "fastq_stats.json"
+        start_time = time.perf_counter()
+        with open(r1_path, "rb") as input_h:
+            subprocess.run(
+                [sys.executable, str(FASTQ_STATS_SCRIPT), "--output-json", str(output_json)],
+                stdin=input_h, check=True
+            )
+        elapsed = time.perf_counter() - start_time
+        rows.append({
+            "method": "vectorised",
+            "reads": str(args.num_reads),
+            "readsPerSecond": f"{args.num_reads / elapsed:,.0f}",
+            "mibPerSecond": f"{len(fastq_bytes) / elapsed / 2 ** 20:.1f}",
+            "matchesLoop": str(matches_loop),
+        })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
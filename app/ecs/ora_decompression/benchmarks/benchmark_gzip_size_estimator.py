@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the gzip file size estimator (scripts/estimate_gzip_file_size.py)
+against the exact compressed size, and the previous 'compress the first N reads and extrapolate' method.
+
+The synthetic fastq quality drifts along the run (see synthetic_fastq.py), as it does on real runs,
+so the prefix method is expected to underestimate the compressed size.
+
+For each method we report
+  * the estimated gzip file size and its error relative to the exact size
+  * the confidence interval (estimator only) and whether it covers the exact size,
+    an estimator run that compresses every block measures the size (of the stream compressed in blocks, as pigz does)
+    rather than estimating it, so has no interval
+  * the runtime
+
+Usage:
+  python3 benchmark_gzip_size_estimator.py --num-reads 1000000 --prefix-fraction 0.1
+"""
+
+# Standard library imports
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+# Local imports
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+ESTIMATOR_SCRIPT = SCRIPTS_DIR / "estimate_gzip_file_size.py"
+READ_SIZE = 4 * 1024 * 1024  # 4 MiB
+FASTQ_LINES_PER_READ = 4
+PIGZ_FAST_COMPRESSION_LEVEL = 1
+
+
+def get_exact_gzip_file_size(input_path: Path, max_lines: int = -1) -> int:
+    """
+    Gzip the file (or its first max_lines lines) and return the compressed size
+    """
+    compressor = zlib.compressobj(PIGZ_FAST_COMPRESSION_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    compressed_size = 0
+    with open(input_path, "rb") as input_h:
+        if max_lines >= 0:
+            for line_index, line in enumerate(input_h):
+                if line_index >= max_lines:
+                    break
+                compressed_size += len(compressor.compress(line))
+        else:
+            while data := input_h.read(READ_SIZE):
+                compressed_size += len(compressor.compress(data))
+    return compressed_size + len(compressor.flush())
+
+
+def summarise(
+        method: str,
+        estimate: int,
+        exact: int,
+        elapsed: float,
+        lower_bound: int = None,
+        upper_bound: int = None,
+        sampled: str = "n/a"
+) -> Dict[str, str]:
+    return {
+        "method": method,
+        "gzipFileSizeInBytes": f"{estimate:,}",
+        "errorPercent": f"{100 * (estimate - exact) / exact:+.3f}",
+        "confidenceInterval": f"{lower_bound:,} - {upper_bound:,}" if lower_bound is not None else "n/a",
+        "intervalCoversExact": str(lower_bound <= exact <= upper_bound) if lower_bound is not None else "n/a",
+        "sampledBlocks": sampled,
+        "seconds": f"{elapsed:.2f}",
+    }
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=1_000_000)
+    parser.add_argument("--prefix-fraction", type=float, default=0.1)
+    parser.add_argument("--relative-precision", type=float, nargs="+", default=[0.01, 0.005, 0.001])
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path, _ = write_synthetic_fastq_pair(Path(tmp_dir) / "synthetic", args.num_reads)
+
+        start_time = time.perf_counter()
+        exact_gzip_file_size = get_exact_gzip_file_size(input_path)
+        rows.append(summarise("exact", exact_gzip_file_size, exact_gzip_file_size, time.perf_counter() - start_time))
+
+        # The previous method, compress the first N reads and scale up by the read count
+        prefix_read_count = max(int(args.num_reads * args.prefix_fraction), 1)
+        start_time = time.perf_counter()
+        prefix_gzip_file_size = get_exact_gzip_file_size(input_path, prefix_read_count * FASTQ_LINES_PER_READ)
+        rows.append(summarise(
+            f"prefix ({prefix_read_count:,} reads)",
+            prefix_gzip_file_size * args.num_reads // prefix_read_count,
+            exact_gzip_file_size,
+            time.perf_counter() - start_time
+        ))
+
+        for relative_precision in args.relative_precision:
+            output_json = Path(tmp_dir) / "estimate.json"
+            start_time = time.perf_counter()
+            with open(input_path, "rb") as input_h:
+                subprocess.run(
+                    [
+                        sys.executable, str(ESTIMATOR_SCRIPT),
+                        "--total-read-count", str(args.num_reads),
+                        "--relative-precision", str(relative_precision),
+                        "--threads", str(args.threads),
+                        "--output-json", str(output_json),
+                    ],
+                    stdin=input_h, check=True
+                )
+            elapsed = time.perf_counter() - start_time
+            estimate = json.loads(output_json.read_text())
+            is_measured = estimate["sampledBlockCount"] == estimate["blockCount"]
+            rows.append(summarise(
+                f"estimator (+/- {100 * relative_precision:g}%)",
+                estimate["gzipFileSizeInBytes"],
+                exact_gzip_file_size,
+                elapsed,
+                estimate["gzipFileSizeInBytesLowerBound"] if not is_measured else None,
+                estimate["gzipFileSizeInBytesUpperBound"] if not is_measured else None,
+                f"{estimate['sampledBlockCount']} / {estimate['blockCount']}" + (" (measured)" if is_measured else ""),
+            ))
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
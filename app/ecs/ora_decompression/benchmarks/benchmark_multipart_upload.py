@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the streaming multipart uploader (scripts/upload_stream_multipart.py) against a local S3 stand-in.
+
+For each --concurrency value we pipe --stream-size random bytes through the uploader and report
+  * throughput
+  * whether the stored object matches the input stream
+  * whether the md5sum and etag the uploader reports (--output-json) match the md5 and etag of the stored object
+  * the number (and sizes) of the parts used
+  * the number of aborted uploads (should be zero)
+
+Every request to the stand-in is delayed by --latency seconds to emulate the round trip to S3,
+and every Nth part upload can fail (--fail-every) to check botocore retries transient failures.
+
+We also check the part size schedule can reach the S3 maximum object size (5 TiB) inside 10,000 parts
+without any gzip size estimate.
+
+Usage:
+  python3 benchmark_multipart_upload.py --stream-size 268435456 --latency 0.2 --concurrency 1 4 8
+"""
+
+# Standard library imports
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Local imports
+from local_s3_server import start_local_s3_server
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+UPLOADER_SCRIPT = SCRIPTS_DIR / "upload_stream_multipart.py"
+S3_MAX_OBJECT_SIZE = 5 * 1024 ** 4  # 5 TiB
+WRITE_SIZE = 1024 * 1024  # 1 MiB
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+from upload_stream_multipart import MAX_PARTS, get_part_size  # noqa: E402
+
+
+def check_part_size_schedule():
+    total_size = 0
+    for part_number in range(1, MAX_PARTS + 1):
+        total_size += get_part_size(part_number)
+    print(
+        f"Part size schedule covers {total_size / 1024 ** 4:,.2f} TiB in {MAX_PARTS} parts "
+        f"(S3 maximum object size is {S3_MAX_OBJECT_SIZE / 1024 ** 4:,.0f} TiB): "
+        f"{'OK' if total_size >= S3_MAX_OBJECT_SIZE else 'TOO SMALL'}"
+    )
+
+
+def summarise_part_sizes(part_sizes: List[int]) -> str:
+    if len(part_sizes) == 1:
+        return f"1 x {part_sizes[0] / 1024 / 1024:,.1f} MiB"
+    return (
+        f"{len(part_sizes)} x {part_sizes[0] / 1024 / 1024:,.0f} MiB "
+        f"(last {part_sizes[-1] / 1024 / 1024:,.1f} MiB)"
+    )
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stream-size", type=int, default=256 * 1024 * 1024)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    check_part_size_schedule()
+
+    server, store = start_local_s3_server(latency=args.latency, fail_every=args.fail_every)
+    endpoint_url = f"http://127.0.0.1:{server.server_port}"
+    uploader_env = {
+        **os.environ,
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_REGION": "ap-southeast-2",
+    }
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = Path(tmp_dir) / "stream.bin"
+        input_md5sum = hashlib.md5()
+        with open(input_path, "wb") as input_h:
+            for offset in range(0, args.stream_size, WRITE_SIZE):
+                data = os.urandom(min(WRITE_SIZE, args.stream_size - offset))
+                input_md5sum.update(data)
+                input_h.write(data)
+
+        try:
+            for concurrency in args.concurrency:
+                key = f"benchmark/concurrency_{concurrency}.bin"
+                output_json_path = Path(tmp_dir) / f"concurrency_{concurrency}.json"
+                start_time = time.perf_counter()
+                with open(input_path, "rb") as input_h:
+                    process = subprocess.run(
+                        [
+                            sys.executable, str(UPLOADER_SCRIPT),
+                            "--concurrency", str(concurrency),
+                            "--endpoint-url", endpoint_url,
+                            "--output-json", str(output_json_path),
+                            f"s3://benchmark-bucket/{key}"
+                        ],
+                        stdin=input_h, stderr=subprocess.PIPE, env=uploader_env
+                    )
+                elapsed = time.perf_counter() - start_time
+
+                stored_object = store.objects.get(("benchmark-bucket", key), b"")
+                upload_summary = json.loads(output_json_path.read_text()) if output_json_path.exists() else {}
+                rows.append({
+                    "concurrency": str(concurrency),
+                    "exitCode": str(process.returncode),
+                    "objectMatches": str(hashlib.md5(stored_object).hexdigest() == input_md5sum.hexdigest()),
+                    "checksumsMatch": str(
+                        upload_summary.get("md5sum") == input_md5sum.hexdigest() and
+                        f'"{upload_summary.get("etag")}"' == store.object_etags.get(("benchmark-bucket", key))
+                    ),
+                    "parts": summarise_part_sizes(store.object_part_sizes.get(("benchmark-bucket", key), [0])),
+                    "abortedUploads": str(store.aborted_upload_count),
+                    "mibPerSecond": f"{args.stream_size / elapsed / 1024 / 1024:,.1f}",
+                    "seconds": f"{elapsed:.2f}",
+                })
+                if process.returncode != 0:
+                    print(process.stderr.decode(), file=sys.stderr)
+        finally:
+            server.shutdown()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
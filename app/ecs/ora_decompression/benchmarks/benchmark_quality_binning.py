@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the quality binning output mode (scripts/bin_quality_scores.py) against the current pigz --fast path.
+
+The synthetic fastq of synthetic_fastq.py already has binned (four level) quality strings,
+so this benchmark writes its own synthetic fastq with full resolution quality scores
+(a per read quality profile that decays along the read, with per base noise, between Q2 and Q41),
+as orad returns for runs without on-instrument binning.
+
+For each binning scheme (NONE being the current path) and pigz thread count, the fastq is run through
+  [bin_quality_scores.py |] pigz --fast -p <threads>
+and we report
+  * throughput (MiB of raw fastq per wall clock second) and the gain over the NONE path
+  * the compression ratio (raw bytes / compressed bytes), and the gzip size reduction over the NONE path
+  * the gzip size reduction estimated by the binning stage (from its sampled blocks)
+  * whether the output decompresses to the binned md5sum of the binning stage,
+    with the headers and sequences of the input untouched
+
+pigz must be on the PATH.
+
+Usage:
+  python3 benchmark_quality_binning.py --num-reads 500000 --threads 1 4
+"""
+
+# Standard library imports
+import argparse
+import gzip
+import hashlib
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+# Numpy imports
+import numpy as np
+
+# Local imports
+from benchmark_bootstrap import print_table
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+BIN_QUALITY_SCORES_SCRIPT = SCRIPTS_DIR / "bin_quality_scores.py"
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+from bin_quality_scores import QUALITY_BINNING_SCHEMES  # noqa: E402
+
+DEFAULT_READ_LENGTH = 151
+DEFAULT_SEED = 42
+PHRED_OFFSET = 33
+MIN_QUALITY_SCORE = 2
+MAX_QUALITY_SCORE = 41
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+READS_PER_WRITE = 100_000
+
+
+def write_full_resolution_fastq(
+        output_path: Path,
+        num_reads: int,
+        read_length: int = DEFAULT_READ_LENGTH,
+        seed: int = DEFAULT_SEED
+) -> Path:
+    """
+    Write a synthetic fastq with full resolution quality scores
+    """
+    rng = np.random.default_rng(seed)
+    positions = np.arange(read_length)
+
+    with open(output_path, "wb") as output_h:
+        for batch_start in range(0, num_reads, READS_PER_WRITE):
+            batch_size = min(READS_PER_WRITE, num_reads - batch_start)
+
+            # Each read starts between Q30 and Q40 and loses up to 12 points by its last base
+            read_start_scores = rng.uniform(30, 40, size=(batch_size, 1))
+            read_decays = rng.uniform(0, 12, size=(batch_size, 1)) * (positions / read_length) ** 2
+            scores = np.rint(read_start_scores - read_decays + rng.normal(0, 3, size=(batch_size, read_length)))
+            quality_chars = (np.clip(scores, MIN_QUALITY_SCORE, MAX_QUALITY_SCORE) + PHRED_OFFSET).astype(np.uint8)
+            bases = BASES[rng.integers(0, len(BASES), size=(batch_size, read_length))]
+
+            records = []
+            for read_index in range(batch_size):
+                read_number = batch_start + read_index
+                records.append(
+                    f"@A00001:1:HSYNTHETIC:1:{1101 + read_number % 100}:{read_number % 32000}:{read_number} "
+                    f"1:N:0:ACGTACGT+TGCATGCA\n".encode()
+                )
+                records.append(bases[read_index].tobytes())
+                records.append(b"\n+\n")
+                records.append(quality_chars[read_index].tobytes())
+                records.append(b"\n")
+            output_h.write(b"".join(records))
+
+    return output_path
+
+
+def run_binned_compression(
+        input_path: Path,
+        output_path: Path,
+        stats_path: Path,
+        scheme: str,
+        threads: int
+) -> float:
+    """
+    Run the (binning and) compression pipeline, return the wall clock seconds
+    """
+    pigz_command = ["pigz", "--fast", "--processes", str(threads), "--stdout"]
+
+    start_time = time.perf_counter()
+    with open(input_path, "rb") as input_h, open(output_path, "wb") as output_h:
+        if scheme == "NONE":
+            subprocess.run(pigz_command, stdin=input_h, stdout=output_h, check=True)
+        else:
+            bin_proc = subprocess.Popen(
+                [
+                    sys.executable, str(BIN_QUALITY_SCORES_SCRIPT),
+                    "--scheme", scheme,
+                    "--output-json", str(stats_path),
+                ],
+                stdin=input_h, stdout=subprocess.PIPE
+            )
+            pigz_proc = subprocess.Popen(pigz_command, stdin=bin_proc.stdout, stdout=output_h)
+            bin_proc.stdout.close()
+            if pigz_proc.wait() != 0 or bin_proc.wait() != 0:
+                raise RuntimeError(f"The {scheme} binning pipeline failed")
+    return time.perf_counter() - start_time
+
+
+def is_binned_output_ok(input_bytes: bytes, output_bytes: bytes, stats: Dict) -> bool:
+    """
+    The output matches the binned md5sum, and only the quality lines (of the same lengths) differ from the input
+    """
+    if hashlib.md5(output_bytes).hexdigest() != stats["binnedMd5sum"]:
+        return False
+    input_lines = input_bytes.split(b"\n")
+    output_lines = output_bytes.split(b"\n")
+    if len(input_lines) != len(output_lines):
+        return False
+    for line_index, (input_line, output_line) in enumerate(zip(input_lines, output_lines)):
+        if line_index % 4 == 3:
+            if len(input_line) != len(output_line):
+                return False
+        elif input_line != output_line:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=500_000)
+    parser.add_argument(
+        "--schemes", nargs="+", choices=list(QUALITY_BINNING_SCHEMES.keys()),
+        default=list(QUALITY_BINNING_SCHEMES.keys())
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    if shutil.which("pigz") is None:
+        print("Error! pigz must be on the PATH to benchmark the pigz --fast path", file=sys.stderr)
+        sys.exit(1)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = write_full_resolution_fastq(Path(tmp_dir) / "full_resolution.fastq", args.num_reads)
+        input_bytes = input_path.read_bytes()
+        raw_mib = len(input_bytes) / 1024 / 1024
+        output_path = Path(tmp_dir) / "output.fastq.gz"
+        stats_path = Path(tmp_dir) / "binning_stats.json"
+
+        for threads in args.threads:
+            baseline_seconds = baseline_gzip_byte_count = None
+            for scheme in ["NONE"] + args.schemes:
+                seconds = run_binned_compression(input_path, output_path, stats_path, scheme, threads)
+                compressed_bytes = output_path.read_bytes()
+                output_bytes = gzip.decompress(compressed_bytes)
+                if scheme == "NONE":
+                    baseline_seconds, baseline_gzip_byte_count = seconds, len(compressed_bytes)
+                    estimated_reduction = "-"
+                    output_ok = output_bytes == input_bytes
+                else:
+                    stats = json.loads(stats_path.read_text())
+                    estimated_reduction = f"{stats['gzipSizeReduction']:.3f}"
+                    output_ok = is_binned_output_ok(input_bytes, output_bytes, stats)
+                rows.append({
+                    "scheme": scheme,
+                    "threads": str(threads),
+                    "mibPerSecond": f"{raw_mib / seconds:,.1f}",
+                    "throughputGain": f"{baseline_seconds / seconds:.2f}x",
+                    "ratio": f"{len(input_bytes) / len(compressed_bytes):.3f}",
+                    "gzipMiB": f"{len(compressed_bytes) / 1024 / 1024:,.1f}",
+                    "gzipSizeReduction": f"{1 - len(compressed_bytes) / baseline_gzip_byte_count:.3f}",
+                    "estimatedReduction": estimated_reduction,
+                    "outputOk": str(output_ok),
+                })
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the parallel range downloader (scripts/download_presigned_url.py)
+against a single 'wget --output-document /dev/stdout' stream.
+
+We serve a large random file from a local HTTP server that supports range requests.
+Presigned S3 urls are limited per connection rather than per client,
+so the server throttles each connection to --connection-bandwidth bytes per second.
+The server can also drop a connection part way through every Nth response (--fail-every)
+to check the downloader recovers from failed ranges.
+
+For each downloader we report the throughput and whether the output md5sum matches the served file.
+
+wget is skipped if it is not on the PATH.
+
+Usage:
+  python3 benchmark_range_downloader.py --file-size 268435456 --connection-bandwidth 33554432 --connections 1 4 8
+"""
+
+# Standard library imports
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+DOWNLOADER_SCRIPT = SCRIPTS_DIR / "download_presigned_url.py"
+RANGE_HEADER_REGEX = re.compile(r"bytes=(\d+)-(\d*)")
+SEND_SIZE = 64 * 1024  # 64 KiB
+
+
+def get_range_request_handler(file_path: Path, connection_bandwidth: int, fail_every: int):
+    """
+    Build a request handler class serving file_path with range support, per connection throttling
+    and failure injection
+    """
+    file_size = file_path.stat().st_size
+    request_counter = {"count": 0}
+    request_counter_lock = threading.Lock()
+
+    class RangeRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            start, end, status = 0, file_size - 1, 200
+            range_match = RANGE_HEADER_REGEX.match(self.headers.get("Range", ""))
+            if range_match is not None:
+                start = int(range_match.group(1))
+                end = min(int(range_match.group(2)) if range_match.group(2) else file_size - 1, file_size - 1)
+                status = 206
+                if start >= file_size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{file_size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+            with request_counter_lock:
+                request_counter["count"] += 1
+                should_fail = fail_every > 0 and request_counter["count"] % fail_every == 0
+
+            content_length = end - start + 1
+            self.send_response(status)
+            self.send_header("Content-Length", str(content_length))
+            self.send_header("Accept-Ranges", "bytes")
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+            self.end_headers()
+
+            # Fail half way through the response
+            bytes_to_send = content_length // 2 if should_fail and content_length > 1 else content_length
+            start_time = time.perf_counter()
+            bytes_sent = 0
+            with open(file_path, "rb") as file_h:
+                file_h.seek(start)
+                while bytes_sent < bytes_to_send:
+                    data = file_h.read(min(SEND_SIZE, bytes_to_send - bytes_sent))
+                    self.wfile.write(data)
+                    bytes_sent += len(data)
+                    if connection_bandwidth > 0:
+                        # Sleep until we're back under the connection bandwidth
+                        ahead_by = bytes_sent / connection_bandwidth - (time.perf_counter() - start_time)
+                        if ahead_by > 0:
+                            time.sleep(ahead_by)
+            if should_fail:
+                self.close_connection = True
+
+    return RangeRequestHandler
+
+
+def get_md5sum(file_path: Path) -> str:
+    md5sum = hashlib.md5()
+    with open(file_path, "rb") as file_h:
+        while data := file_h.read(SEND_SIZE * 16):
+            md5sum.update(data)
+    return md5sum.hexdigest()
+
+
+def run_downloader(name: str, command: List[str], file_size: int, expected_md5sum: str) -> Dict[str, str]:
+    start_time = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "downloader": name,
+        "exitCode": str(process.returncode),
+        "md5sumMatches": str(hashlib.md5(process.stdout).hexdigest() == expected_md5sum),
+        "retries": str(process.stderr.count(b"retrying from byte")),
+        "mibPerSecond": f"{file_size / elapsed / 1024 / 1024:,.1f}",
+        "seconds": f"{elapsed:.2f}",
+    }
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file-size", type=int, default=256 * 1024 * 1024)
+    parser.add_argument("--connection-bandwidth", type=int, default=32 * 1024 * 1024)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--range-size", type=int, default=16 * 1024 * 1024)
+    args = parser.parse_args()
+
+    has_wget = shutil.which("wget") is not None
+    if not has_wget:
+        print("wget not found on PATH, skipping the wget comparison", file=sys.stderr)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "large_file.bin"
+        with open(file_path, "wb") as file_h:
+            for _ in range(0, args.file_size, SEND_SIZE * 16):
+                file_h.write(os.urandom(SEND_SIZE * 16))
+            file_h.truncate(args.file_size)
+        expected_md5sum = get_md5sum(file_path)
+
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            get_range_request_handler(file_path, args.connection_bandwidth, args.fail_every)
+        )
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/large_file.bin"
+
+        try:
+            if has_wget:
+                rows.append(run_downloader(
+                    "wget",
+                    ["wget", "--quiet", "--output-document", "/dev/stdout", url],
+                    args.file_size, expected_md5sum
+                ))
+            for connections in args.connections:
+                rows.append(run_downloader(
+                    f"rangeDownloader x{connections}",
+                    [
+                        sys.executable, str(DOWNLOADER_SCRIPT),
+                        "--connections", str(connections),
+                        "--range-size", str(args.range_size),
+                        url
+                    ],
+                    args.file_size, expected_md5sum
+                ))
+        finally:
+            server.shutdown()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the read name hash sampler (scripts/sample_fastq_reads.py)
+against the previous 'seqtk sample <proportion> | head' sampling path.
+
+For each --max-reads value we report
+  * throughput (reads in / second)
+  * the number of reads returned (should be exactly max reads)
+  * whether R1 and R2 returned identical read names
+  * positional bias, the mean position of the returned reads in the file (0.5 is unbiased)
+
+seqtk is skipped if it is not on the PATH.
+
+Usage:
+  python3 benchmark_read_sampler.py --num-reads 2000000 --max-reads 1000 100000 1000000
+"""
+
+# Standard library imports
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Local imports
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+SAMPLER_SCRIPT = SCRIPTS_DIR / "sample_fastq_reads.py"
+RANDOM_SAMPLING_SEED = 11
+
+
+def get_read_names(fastq_bytes: bytes) -> List[bytes]:
+    return [
+        header_line.split(maxsplit=1)[0]
+        for header_line in fastq_bytes.split(b"\n")[0::4]
+        if header_line
+    ]
+
+
+def normalise_read_name(read_name: bytes) -> bytes:
+    return read_name[:-2] if read_name[-2:] in (b"/1", b"/2") else read_name
+
+
+def run_sampler(input_path: Path, command: str) -> (bytes, float):
+    start_time = time.perf_counter()
+    with open(input_path, "rb") as input_h:
+        output = subprocess.run(
+            command, shell=True, stdin=input_h, stdout=subprocess.PIPE, check=True
+        ).stdout
+    return output, time.perf_counter() - start_time
+
+
+def get_hash_sampler_command(max_reads: int, processes: int) -> str:
+    return " ".join([
+        sys.executable, str(SAMPLER_SCRIPT),
+        "--seed", str(RANDOM_SAMPLING_SEED),
+        "--processes", str(processes),
+        "--max-reads", str(max_reads),
+    ])
+
+
+def get_seqtk_command(max_reads: int, num_reads: int) -> str:
+    # Mirrors the previous docker-entrypoint.sh logic, proportion rounded to two decimal places
+    sampling_proportion = round(100 * max_reads / num_reads) / 100
+    return f"seqtk sample -s {RANDOM_SAMPLING_SEED} - {sampling_proportion} | head -n {max_reads * 4}"
+
+
+def summarise(
+        name: str,
+        max_reads: int,
+        num_reads: int,
+        name_index: Dict[bytes, int],
+        r1_output: bytes,
+        r2_output: bytes,
+        elapsed: float
+) -> Dict[str, str]:
+    r1_names = get_read_names(r1_output)
+    r2_names = get_read_names(r2_output)
+    mean_position: Optional[float] = (
+        sum(name_index[read_name] for read_name in r1_names) / len(r1_names) / num_reads
+        if r1_names else None
+    )
+    return {
+        "sampler": name,
+        "maxReads": str(max_reads),
+        "readsReturned": str(len(r1_names)),
+        "exact": str(len(r1_names) == min(max_reads, num_reads)),
+        "pairConsistent": str(
+            list(map(normalise_read_name, r1_names)) == list(map(normalise_read_name, r2_names))
+        ),
+        "meanPosition": f"{mean_position:.3f}" if mean_position is not None else "n/a",
+        "readsPerSecond": f"{num_reads / elapsed:,.0f}",
+        "seconds": f"{elapsed:.2f}",
+    }
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=2_000_000)
+    parser.add_argument("--max-reads", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    has_seqtk = shutil.which("seqtk") is not None
+    if not has_seqtk:
+        print("seqtk not found on PATH, skipping the seqtk comparison", file=sys.stderr)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        r1_path, r2_path = write_synthetic_fastq_pair(Path(tmp_dir) / "synthetic", args.num_reads)
+        name_index = {
+            read_name: read_index
+            for read_index, read_name in enumerate(get_read_names(r1_path.read_bytes()))
+        }
+
+        for max_reads in args.max_reads:
+            commands = {"readNameHash": get_hash_sampler_command(max_reads, args.processes)}
+            if has_seqtk:
+                commands["seqtkProportionHead"] = get_seqtk_command(max_reads, args.num_reads)
+
+            for name, command in commands.items():
+                r1_output, r1_elapsed = run_sampler(r1_path, command)
+                r2_output, _ = run_sampler(r2_path, command)
+                rows.append(summarise(
+                    name, max_reads, args.num_reads, name_index, r1_output, r2_output, r1_elapsed
+                ))
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Failure injection test for the resumable compress and upload script (scripts/compress_upload_resumable.py),
+run against a local S3 stand-in.
+
+  1. Upload a synthetic fastq file without interruption (the reference object)
+  2. Upload the same file to a second key, killing the script (SIGKILL, as per a Fargate task being stopped)
+     once --kill-after-parts parts have been uploaded
+  3. Re-run the script with the same checkpoint uri, which should resume from the checkpoint
+
+We then check
+  * the resumed object is byte-identical to the reference object, and decompresses back to the input
+  * the checkpoint has been deleted, and no multipart uploads are left in progress
+  * the md5sum and etag reported by each completed run match the md5 and the (multipart) etag of the stored object
+    (a resumed run only reports the etag)
+  * how many parts the resumed run skipped, and how long it took compared to the reference run
+
+We also check a checkpoint that does not match the stream (a different input file) is discarded rather than resumed.
+
+Usage:
+  python3 benchmark_resumable_upload.py --num-reads 500000 --kill-after-parts 3
+"""
+
+# Standard library imports
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Local imports
+from local_s3_server import LocalS3Store, start_local_s3_server
+from synthetic_fastq import write_synthetic_fastq_pair
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+RESUMABLE_UPLOAD_SCRIPT = SCRIPTS_DIR / "compress_upload_resumable.py"
+BUCKET = "benchmark-bucket"
+POLL_INTERVAL = 0.01
+
+
+def run_upload(
+        input_path: Path,
+        key: str,
+        endpoint_url: str,
+        env: Dict[str, str],
+        engine: str,
+        threads: int,
+        store: Optional[LocalS3Store] = None,
+        kill_after_parts: int = 0
+) -> Dict:
+    """
+    Run the script, optionally killing it once the store holds kill_after_parts parts of an in progress upload
+    """
+    output_json_path = Path(tempfile.mkdtemp()) / "output.json"
+    command = [
+        sys.executable, str(RESUMABLE_UPLOAD_SCRIPT),
+        "--output-json", str(output_json_path),
+        "--engine", engine,
+        "--threads", str(threads),
+        "--endpoint-url", endpoint_url,
+        "--checkpoint-uri", f"s3://{BUCKET}/checkpoints/{key}.json",
+        f"s3://{BUCKET}/{key}",
+    ]
+    # Only count the parts of uploads started by this run
+    existing_upload_ids = set(store.multipart_uploads) if store is not None else set()
+    start_time = time.perf_counter()
+    with open(input_path, "rb") as input_h, tempfile.TemporaryFile() as stderr_h:
+        process = subprocess.Popen(command, stdin=input_h, stderr=stderr_h, env=env)
+        killed = False
+        while process.poll() is None:
+            if kill_after_parts > 0 and store is not None:
+                with store.lock:
+                    uploaded_parts = max((
+                        len(parts)
+                        for upload_id, parts in store.multipart_uploads.items()
+                        if upload_id not in existing_upload_ids
+                    ), default=0)
+                if uploaded_parts >= kill_after_parts:
+                    process.send_signal(signal.SIGKILL)
+                    killed = True
+            time.sleep(POLL_INTERVAL)
+        stderr_h.seek(0)
+        stderr = stderr_h.read().decode()
+
+    return {
+        "returnCode": process.returncode,
+        "killed": killed,
+        "seconds": time.perf_counter() - start_time,
+        "stderr": stderr,
+        "output": json.loads(output_json_path.read_text()) if output_json_path.exists() else None,
+    }
+
+
+def print_table(rows: List[Dict[str, str]]):
+    headers = list(rows[0].keys())
+    widths = {header: max(len(header), *(len(row[header]) for row in rows)) for header in headers}
+    print("  ".join(header.ljust(widths[header]) for header in headers))
+    for row in rows:
+        print("  ".join(row[header].ljust(widths[header]) for header in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, default=500_000)
+    parser.add_argument("--kill-after-parts", type=int, default=3)
+    parser.add_argument("--engine", default="PIGZ")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, store = start_local_s3_server(latency=args.latency)
+    endpoint_url = f"http://127.0.0.1:{server.server_port}"
+    env = {
+        **os.environ,
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_REGION": "ap-southeast-2",
+    }
+
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path, other_input_path = write_synthetic_fastq_pair(Path(tmp_dir) / "synthetic", args.num_reads)
+            input_bytes = input_path.read_bytes()
+
+            def add_row(step: str, result: Dict, key: str):
+                stored_object = store.objects.get((BUCKET, key), b"")
+                rows.append({
+                    "step": step,
+                    "returnCode": str(result["returnCode"]),
+                    "killed": str(result["killed"]),
+                    "seconds": f"{result['seconds']:.2f}",
+                    "storedBytes": f"{len(stored_object):,}",
+                    "matchesReference": str(stored_object == store.objects.get((BUCKET, "reference.fastq.gz"))),
+                    "checksumsMatch": str(
+                        result["output"] is not None and
+                        # A resumed upload only has the etag
+                        result["output"]["md5sum"] in [hashlib.md5(stored_object).hexdigest(), None] and
+                        f'"{result["output"]["etag"]}"' == store.object_etags.get((BUCKET, key))
+                    ) if result["returnCode"] == 0 else "-",
+                })
+                if result["returnCode"] not in [0, -signal.SIGKILL]:
+                    print(result["stderr"], file=sys.stderr)
+
+            # Reference
+            reference_result = run_upload(input_path, "reference.fastq.gz", endpoint_url, env, args.engine, args.threads)
+            add_row("reference", reference_result, "reference.fastq.gz")
+            reference_object = store.objects[(BUCKET, "reference.fastq.gz")]
+            print(f"Reference object decompresses to the input: {gzip.decompress(reference_object) == input_bytes}")
+            print(f"Reference object parts: {len(store.object_part_sizes[(BUCKET, 'reference.fastq.gz')])}")
+
+            # Interrupted, then resumed
+            killed_result = run_upload(
+                input_path, "resumed.fastq.gz", endpoint_url, env, args.engine, args.threads,
+                store=store, kill_after_parts=args.kill_after_parts
+            )
+            add_row("killed", killed_result, "resumed.fastq.gz")
+            checkpoint = json.loads(store.objects.get((BUCKET, "checkpoints/resumed.fastq.gz.json"), b"{}") or b"{}")
+            print(f"Checkpointed parts after the kill: {len(checkpoint.get('parts', []))}")
+
+            resumed_result = run_upload(input_path, "resumed.fastq.gz", endpoint_url, env, args.engine, args.threads)
+            add_row("resumed", resumed_result, "resumed.fastq.gz")
+            print(f"Resumed run log: {resumed_result['stderr'].strip().splitlines()[:1]}")
+
+            # A checkpoint for a different stream must not be resumed
+            mismatched_result = run_upload(
+                input_path, "mismatched.fastq.gz", endpoint_url, env, args.engine, args.threads,
+                store=store, kill_after_parts=args.kill_after_parts
+            )
+            add_row("mismatched (killed)", mismatched_result, "mismatched.fastq.gz")
+            failed_result = run_upload(other_input_path, "mismatched.fastq.gz", endpoint_url, env, args.engine, args.threads)
+            add_row("mismatched (other input)", failed_result, "mismatched.fastq.gz")
+            retried_result = run_upload(other_input_path, "mismatched.fastq.gz", endpoint_url, env, args.engine, args.threads)
+            add_row("mismatched (retried)", retried_result, "mismatched.fastq.gz")
+            print(
+                "Mismatched checkpoint retried object decompresses to the other input: "
+                f"{gzip.decompress(store.objects.get((BUCKET, 'mismatched.fastq.gz'), b'')) == other_input_path.read_bytes()}"
+            )
+
+            print(f"Checkpoints left: {sorted(key for _, key in store.objects if key.startswith('checkpoints/'))}")
+            print(f"Multipart uploads left in progress: {len(store.multipart_uploads)}")
+    finally:
+        server.shutdown()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
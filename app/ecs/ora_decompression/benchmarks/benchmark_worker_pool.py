@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the per-job overhead of the decompression worker (scripts/run_worker.py)
+against starting a fresh container for every job, with local stand-ins of SSM, Secrets Manager, the file manager,
+SQS and Step Functions.
+
+Each job runs a stand-in entrypoint that only bootstraps (as the entrypoint does before any data moves),
+then writes its presigned url to the job's directory. We compare
+  * task per job: every job bootstraps from scratch (as a fresh ECS task does),
+    after --task-startup-seconds (to emulate the provisioning and image pull of a fresh task, 0 by default)
+  * worker pool: the jobs are sent to the work queue, and a single worker runs them one after another,
+    each job reusing the worker's warm bootstrap and only collecting its presigned url
+
+Every request to the bootstrap stand-in is delayed by --latency seconds to emulate the round trip to each service.
+
+For each method we report the wall clock time, the seconds per job, and the number of bootstrap requests made.
+For the worker pool we also check every task token succeeded, and that a job whose task token had already timed out
+was skipped.
+
+Usage:
+  python3 benchmark_worker_pool.py --jobs 20 --latency 0.05
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Local imports
+from benchmark_bootstrap import ORA_URIS, PARAMETER_PREFIXES, print_table, seed_store
+from local_bootstrap_server import LocalBootstrapStore, start_local_bootstrap_server
+from local_work_queue_server import LocalWorkQueueStore, start_local_work_queue_server
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent.parent / "scripts"
+WORKER_SCRIPT = SCRIPTS_DIR / "run_worker.py"
+QUEUE_URL = "https://sqs.ap-southeast-2.amazonaws.com/123456789012/decompression-work-queue"
+# The bootstrap section of the entrypoint, run in the job's directory (with a scripts symlink)
+JOB_ENTRYPOINT = """#!/usr/bin/env bash
+set -euo pipefail
+bootstrap_args=( --ora-uri "INPUT_ORA_PRESIGNED_URL=${INPUT_ORA_URI}" --file-manager-url "${FILE_MANAGER_URL}" )
+if [[ -n "${WARM_BOOTSTRAP_ENV_FILE:-}" ]]; then
+  bootstrap_args+=( --warm-env-file "${WARM_BOOTSTRAP_ENV_FILE}" )
+fi
+bootstrap_env="$( \\
+  "${BENCHMARK_PYTHON}" scripts/bootstrap.py \\
+    --hostname-ssm-parameter-name "${HOSTNAME_SSM_PARAMETER_NAME}" \\
+    --orcabus-token-secret-id "${ORCABUS_TOKEN_SECRET_ID}" \\
+    --icav2-access-token-secret-id "${ICAV2_ACCESS_TOKEN_SECRET_ID}" \\
+    --storage-configuration-prefix "${ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX}" \\
+    --storage-configuration-list-file "project_configuration_list.yaml" \\
+    --project-to-storage-configuration-mapping-prefix "${ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX}" \\
+    --project-to-storage-configuration-mapping-list-file "project_to_storage_configuration_mapping_list.yaml" \\
+    --storage-credential-prefix "${ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX}" \\
+    --storage-credential-list-file "storage_credential_list.yaml" \\
+    "${bootstrap_args[@]}" \\
+)"
+eval "${bootstrap_env}"
+test -s "${ICAV2_STORAGE_CREDENTIAL_LIST_FILE}"
+echo "${INPUT_ORA_PRESIGNED_URL}" > presigned_url.txt
+"""
+
+
+def get_worker_env(bootstrap_url: str, work_queue_url: str, python_path: str) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "AWS_ENDPOINT_URL": bootstrap_url,
+        "AWS_ENDPOINT_URL_SQS": work_queue_url,
+        "AWS_ENDPOINT_URL_SFN": work_queue_url,
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_REGION": "ap-southeast-2",
+        "FILE_MANAGER_URL": bootstrap_url,
+        "BENCHMARK_PYTHON": python_path,
+        "HOSTNAME_SSM_PARAMETER_NAME": "/orcabus/hostname",
+        "ORCABUS_TOKEN_SECRET_ID": "orcabus/token",
+        "ICAV2_ACCESS_TOKEN_SECRET_ID": "icav2/token",
+        "ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX": PARAMETER_PREFIXES["storage-configuration"],
+        "ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX": (
+            PARAMETER_PREFIXES["project-to-storage-configuration-mapping"]
+        ),
+        "ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX": PARAMETER_PREFIXES["storage-credential"],
+    }
+
+
+def get_job_environment() -> List[Dict[str, str]]:
+    return [
+        {"Name": "JOB_TYPE", "Value": "ORA_DECOMPRESSION"},
+        {"Name": "INPUT_ORA_URI", "Value": ORA_URIS["INPUT_ORA_PRESIGNED_URL"]},
+    ]
+
+
+def run_task_per_job(entrypoint: Path, work_dir: Path, job_count: int, task_startup_seconds: float, env: Dict[str, str]):
+    """
+    Run every job from scratch, one after another
+    """
+    for job_number in range(job_count):
+        job_dir = work_dir / f"task_{job_number}"
+        job_dir.mkdir()
+        (job_dir / "scripts").symlink_to(SCRIPTS_DIR)
+        time.sleep(task_startup_seconds)
+        subprocess.run(
+            ["bash", str(entrypoint)],
+            check=True, cwd=job_dir, stderr=subprocess.DEVNULL,
+            env={
+                **env,
+                **{env_var["Name"]: env_var["Value"] for env_var in get_job_environment()},
+            }
+        )
+
+
+def run_worker_pool(
+        store: LocalWorkQueueStore,
+        entrypoint: Path,
+        work_dir: Path,
+        job_count: int,
+        env: Dict[str, str]
+) -> Dict[str, bool]:
+    """
+    Send every job to the work queue (after a job whose task token has already timed out),
+    and run a single worker until it has taken every job
+    """
+    expired_task_token = store.add_task_token()
+    store.expire_task_token(expired_task_token)
+    task_tokens = [store.add_task_token() for _ in range(job_count)]
+    for task_token in [expired_task_token] + task_tokens:
+        store.send_message(QUEUE_URL, json.dumps({"taskToken": task_token, "environment": get_job_environment()}))
+
+    subprocess.run(
+        [
+            sys.executable, str(WORKER_SCRIPT),
+            "--queue-url", QUEUE_URL,
+            "--entrypoint", str(entrypoint),
+            "--work-dir", str(work_dir / "worker"),
+            "--heartbeat-interval-seconds", "1",
+            "--wait-time-seconds", "1",
+            "--max-jobs", str(job_count + 1),
+        ],
+        check=True, stderr=subprocess.DEVNULL, env=env
+    )
+    return {
+        "tasksOk": all(store.tasks[task_token].status == "SUCCEEDED" for task_token in task_tokens),
+        "expiredSkipped": store.tasks[expired_task_token].heartbeat_count == 0 and not store.queues[QUEUE_URL],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--parameters-per-prefix", type=int, default=25)
+    parser.add_argument("--task-startup-seconds", type=float, default=0.0)
+    args = parser.parse_args()
+
+    bootstrap_store = LocalBootstrapStore()
+    seed_store(bootstrap_store, args.parameters_per_prefix)
+    bootstrap_server = start_local_bootstrap_server(bootstrap_store, latency=args.latency)
+    work_queue_store = LocalWorkQueueStore()
+    work_queue_server = start_local_work_queue_server(work_queue_store)
+    env = get_worker_env(
+        f"http://127.0.0.1:{bootstrap_server.server_port}",
+        f"http://127.0.0.1:{work_queue_server.server_port}",
+        sys.executable
+    )
+
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            entrypoint = work_dir / "entrypoint" / "docker-entrypoint.sh"
+            entrypoint.parent.mkdir()
+            entrypoint.write_text(JOB_ENTRYPOINT)
+            (entrypoint.parent / "scripts").symlink_to(SCRIPTS_DIR)
+
+            for method in ["task per job", "worker pool"]:
+                bootstrap_store.request_count = 0
+                start_time = time.perf_counter()
+                if method == "task per job":
+                    run_task_per_job(entrypoint, work_dir, args.jobs, args.task_startup_seconds, env)
+                    checks = {}
+                else:
+                    checks = run_worker_pool(work_queue_store, entrypoint, work_dir, args.jobs, env)
+                elapsed = time.perf_counter() - start_time
+                rows.append({
+                    "method": method,
+                    "seconds": f"{elapsed:.2f}",
+                    "secondsPerJob": f"{elapsed / args.jobs:.3f}",
+                    "bootstrapRequests": str(bootstrap_store.request_count),
+                    **{check_name: str(check_ok) for check_name, check_ok in checks.items()},
+                })
+
+        for row in rows:
+            row.setdefault("tasksOk", "-")
+            row.setdefault("expiredSkipped", "-")
+        print_table(rows)
+    finally:
+        bootstrap_server.shutdown()
+        work_queue_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+A minimal in-memory stand-in for the services the container bootstrap (scripts/bootstrap.py) talks to.
+
+Supports
+  * SSM GetParameter / GetParametersByPath (paginated by --page-size)
+  * Secrets Manager GetSecretValue
+  * The file manager s3 object lookup (GET /api/v1/s3?bucket=&key=) and presign (GET /api/v1/s3/presign/<id>)
+
+SSM and Secrets Manager requests are the AWS JSON protocol (a POST with an X-Amz-Target header),
+so point boto3 at the server with AWS_ENDPOINT_URL, and the bootstrap at --file-manager-url.
+
+Authentication is not checked.
+
+Each request can be delayed by --latency seconds (to emulate the round trip to each service).
+
+The contents of the stand-in can be loaded from --seed-json, a json document with the (optional) keys
+  * parameters: {<parameter name>: <value>}
+  * secrets: {<secret id>: <secret string>}
+  * s3Objects: [{"bucket": ..., "key": ..., "s3ObjectId": ...}]
+  * presignedUrlTemplate: i.e. "http://127.0.0.1:8000/{key}", formatted with the bucket and key of the presigned object
+
+Usage:
+  python3 local_bootstrap_server.py --port 9200 --seed-json seed.json
+"""
+
+# Standard library imports
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Globals
+DEFAULT_PAGE_SIZE = 10
+
+
+@dataclass
+class LocalBootstrapStore:
+    parameters: Dict[str, str] = field(default_factory=dict)
+    secrets: Dict[str, str] = field(default_factory=dict)
+    # (bucket, key) to s3 object id
+    s3_objects: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    # Formatted with the bucket and key of the presigned object
+    presigned_url_template: str = "https://{bucket}.s3.amazonaws.com/{key}?X-Amz-Signature=local"
+    request_count: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def get_request_handler(store: LocalBootstrapStore, latency: float, page_size: int):
+    class LocalBootstrapRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body, content_type: str = "application/json"):
+            body_bytes = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body_bytes)))
+            self.end_headers()
+            self.wfile.write(body_bytes)
+
+        def _send_aws_error(self, error_type: str):
+            return self._send_json(400, {"__type": error_type, "message": error_type}, "application/x-amz-json-1.1")
+
+        def do_POST(self):
+            time.sleep(latency)
+            with store.lock:
+                store.request_count += 1
+            target = self.headers.get("X-Amz-Target", "")
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            if target == "AmazonSSM.GetParameter":
+                if request["Name"] not in store.parameters:
+                    return self._send_aws_error("ParameterNotFound")
+                return self._send_json(200, {
+                    "Parameter": {"Name": request["Name"], "Value": store.parameters[request["Name"]]}
+                }, "application/x-amz-json-1.1")
+
+            if target == "AmazonSSM.GetParametersByPath":
+                path = request["Path"].rstrip("/") + "/"
+                names = sorted(name for name in store.parameters if name.startswith(path))
+                start = int(request.get("NextToken", 0))
+                response = {
+                    "Parameters": [
+                        {"Name": name, "Value": store.parameters[name]}
+                        for name in names[start:start + page_size]
+                    ]
+                }
+                if start + page_size < len(names):
+                    response["NextToken"] = str(start + page_size)
+                return self._send_json(200, response, "application/x-amz-json-1.1")
+
+            if target == "secretsmanager.GetSecretValue":
+                if request["SecretId"] not in store.secrets:
+                    return self._send_aws_error("ResourceNotFoundException")
+                return self._send_json(200, {
+                    "Name": request["SecretId"], "SecretString": store.secrets[request["SecretId"]]
+                }, "application/x-amz-json-1.1")
+
+            return self._send_aws_error("UnknownOperationException")
+
+        def do_GET(self):
+            time.sleep(latency)
+            with store.lock:
+                store.request_count += 1
+            url_obj = urlparse(self.path)
+
+            if url_obj.path == "/api/v1/s3":
+                query = parse_qs(url_obj.query)
+                s3_object_id: Optional[str] = store.s3_objects.get((query["bucket"][0], query["key"][0]))
+                return self._send_json(200, {
+                    "results": [{"s3ObjectId": s3_object_id}] if s3_object_id is not None else []
+                })
+
+            if url_obj.path.startswith("/api/v1/s3/presign/"):
+                s3_object_id = url_obj.path.rsplit("/", 1)[-1]
+                bucket, key = next(
+                    bucket_key for bucket_key, object_id in store.s3_objects.items() if object_id == s3_object_id
+                )
+                return self._send_json(200, store.presigned_url_template.format(bucket=bucket, key=key))
+
+            return self._send_json(404, {"detail": "Not found"})
+
+    return LocalBootstrapRequestHandler
+
+
+def start_local_bootstrap_server(
+        store: LocalBootstrapStore,
+        port: int = 0,
+        latency: float = 0.0,
+        page_size: int = DEFAULT_PAGE_SIZE
+) -> ThreadingHTTPServer:
+    """
+    Start the server in a background thread
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), get_request_handler(store, latency, page_size))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load_seed_json(seed_json_path: Path) -> LocalBootstrapStore:
+    seed = json.loads(seed_json_path.read_text())
+    store = LocalBootstrapStore(
+        parameters=seed.get("parameters", {}),
+        secrets=seed.get("secrets", {}),
+        s3_objects={
+            (s3_object["bucket"], s3_object["key"]): s3_object["s3ObjectId"]
+            for s3_object in seed.get("s3Objects", [])
+        },
+    )
+    if "presignedUrlTemplate" in seed:
+        store.presigned_url_template = seed["presignedUrlTemplate"]
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--seed-json", type=Path, default=None)
+    args = parser.parse_args()
+
+    store = load_seed_json(args.seed_json) if args.seed_json is not None else LocalBootstrapStore()
+    server = start_local_bootstrap_server(store, args.port, args.latency, args.page_size)
+    print(f"Serving a local bootstrap stand-in at http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
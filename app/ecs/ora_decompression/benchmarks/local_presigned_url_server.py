@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+A minimal stand-in for the presigned urls of the input ora files, serving the files of a local directory over HTTP.
+
+GET /<bucket>/<key> serves <directory>/<bucket>/<key>, ignoring any query string (i.e. the signature),
+with single range requests (Range: bytes=<start>-[<end>]) as used by scripts/download_presigned_url.py.
+
+Point the file manager stand-in (see local_bootstrap_server.py) at the server with a presigned url template of
+  http://127.0.0.1:<port>/{bucket}/{key}?X-Amz-Signature=local
+
+Each request can be delayed by --latency seconds (to emulate the round trip to S3).
+
+Usage:
+  python3 local_presigned_url_server.py --port 9300 --directory /tmp/ora-files
+"""
+
+# Standard library imports
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Tuple
+from urllib.parse import unquote, urlparse
+
+# Globals
+RANGE_HEADER_REGEX = re.compile(r"bytes=(\d+)-(\d*)")
+SEND_SIZE = 1024 * 1024  # 1 MiB
+
+
+def get_request_handler(directory: Path, latency: float):
+    class LocalPresignedUrlRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_error(self, status: int, headers: Tuple[Tuple[str, str], ...] = ()):
+            self.send_response(status)
+            for header_name, header_value in headers:
+                self.send_header(header_name, header_value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+
+            file_path = (directory / unquote(urlparse(self.path).path).lstrip("/")).resolve()
+            if directory not in file_path.parents or not file_path.is_file():
+                return self._send_error(404)
+            file_size = file_path.stat().st_size
+
+            start, end = 0, file_size - 1
+            range_match = RANGE_HEADER_REGEX.match(self.headers.get("Range", ""))
+            if range_match is not None:
+                start = int(range_match.group(1))
+                if range_match.group(2):
+                    end = min(int(range_match.group(2)), file_size - 1)
+                if start >= file_size or start > end:
+                    return self._send_error(416, (("Content-Range", f"bytes */{file_size}"),))
+
+            self.send_response(206 if range_match is not None else 200)
+            self.send_header("Accept-Ranges", "bytes")
+            if range_match is not None:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+
+            with open(file_path, "rb") as file_h:
+                file_h.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    data = file_h.read(min(SEND_SIZE, remaining))
+                    if not data:
+                        break
+                    self.wfile.write(data)
+                    remaining -= len(data)
+
+    return LocalPresignedUrlRequestHandler
+
+
+def start_local_presigned_url_server(directory: Path, port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Start the server in a background thread
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), get_request_handler(directory.resolve(), latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--directory", type=Path, required=True)
+    args = parser.parse_args()
+
+    server = start_local_presigned_url_server(args.directory, args.port, args.latency)
+    print(f"Serving {args.directory} as presigned urls at http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+"""
+A minimal in-memory S3 stand-in for local benchmarks of the container upload scripts.
+
+Supports path style requests for
+  * PutObject / GetObject / HeadObject / DeleteObject
+  * CreateMultipartUpload / UploadPart / ListParts / CompleteMultipartUpload / AbortMultipartUpload
+
+Authentication is not checked.
+
+Objects have the ETag S3 would give them (the md5 of the object for PutObject,
+the md5 of the concatenated part md5s, a dash and the part count for CompleteMultipartUpload),
+and PutObject / UploadPart requests with a Content-MD5 that does not match the body fail with BadDigest.
+
+Each request can be delayed by --latency seconds (to emulate the round trip to S3),
+and every Nth UploadPart request can fail with a 500 (--fail-every) to emulate transient S3 errors.
+
+Usage:
+  python3 local_s3_server.py --port 9000
+  # Then point any boto3 client / script at --endpoint-url http://127.0.0.1:9000
+"""
+
+# Standard library imports
+import argparse
+import base64
+import hashlib
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.etree import ElementTree
+
+
+class LocalS3Store:
+    """
+    Objects and in progress multipart uploads, keyed by (bucket, key)
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.object_part_sizes: Dict[Tuple[str, str], List[int]] = {}
+        self.object_etags: Dict[Tuple[str, str], str] = {}
+        self.multipart_uploads: Dict[str, Dict[int, bytes]] = {}
+        self.upload_part_count = 0
+        self.aborted_upload_count = 0
+
+
+def get_request_handler(store: LocalS3Store, latency: float, fail_every: int):
+    class LocalS3RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _get_bucket_key_and_query(self) -> Tuple[str, str, Dict[str, List[str]]]:
+            url_obj = urlparse(self.path)
+            bucket, _, key = unquote(url_obj.path).lstrip("/").partition("/")
+            return bucket, key, parse_qs(url_obj.query, keep_blank_values=True)
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _send(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            for header_key, header_value in (headers or {}).items():
+                self.send_header(header_key, header_value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body and self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_PUT(self):
+            time.sleep(latency)
+            bucket, key, query = self._get_bucket_key_and_query()
+            body = self._read_body()
+            md5_digest = hashlib.md5(body).digest()
+            etag = f'"{md5_digest.hex()}"'
+
+            content_md5 = self.headers.get("Content-MD5")
+            if content_md5 is not None and base64.b64decode(content_md5) != md5_digest:
+                return self._send(400, b"<Error><Code>BadDigest</Code></Error>")
+
+            if "uploadId" in query:
+                upload_id = query["uploadId"][0]
+                with store.lock:
+                    store.upload_part_count += 1
+                    should_fail = fail_every > 0 and store.upload_part_count % fail_every == 0
+                    has_upload = upload_id in store.multipart_uploads
+                    if has_upload and not should_fail:
+                        store.multipart_uploads[upload_id][int(query["partNumber"][0])] = body
+                if should_fail:
+                    return self._send(500, b"<Error><Code>InternalError</Code></Error>")
+                if not has_upload:
+                    return self._send(404, b"<Error><Code>NoSuchUpload</Code></Error>")
+                return self._send(200, headers={"ETag": etag})
+
+            with store.lock:
+                store.objects[(bucket, key)] = body
+                store.object_part_sizes[(bucket, key)] = [len(body)]
+                store.object_etags[(bucket, key)] = etag
+            return self._send(200, headers={"ETag": etag})
+
+        def do_POST(self):
+            time.sleep(latency)
+            bucket, key, query = self._get_bucket_key_and_query()
+            body = self._read_body()
+
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                with store.lock:
+                    store.multipart_uploads[upload_id] = {}
+                return self._send(200, (
+                    "<InitiateMultipartUploadResult>"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                    "</InitiateMultipartUploadResult>"
+                ).encode())
+
+            if "uploadId" in query:
+                part_numbers = [
+                    int(element.text)
+                    for element in ElementTree.fromstring(body).iter()
+                    if element.tag.endswith("PartNumber")
+                ]
+                with store.lock:
+                    parts = store.multipart_uploads.pop(query["uploadId"][0])
+                    store.objects[(bucket, key)] = b"".join(parts[part_number] for part_number in part_numbers)
+                    store.object_part_sizes[(bucket, key)] = [len(parts[part_number]) for part_number in part_numbers]
+                    etag = '"{}-{}"'.format(
+                        hashlib.md5(b"".join(
+                            hashlib.md5(parts[part_number]).digest() for part_number in part_numbers
+                        )).hexdigest(),
+                        len(part_numbers)
+                    )
+                    store.object_etags[(bucket, key)] = etag
+                return self._send(200, (
+                    "<CompleteMultipartUploadResult>"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>{etag}</ETag>"
+                    "</CompleteMultipartUploadResult>"
+                ).encode())
+
+            return self._send(400)
+
+        def do_DELETE(self):
+            bucket, key, query = self._get_bucket_key_and_query()
+            with store.lock:
+                if "uploadId" in query:
+                    store.multipart_uploads.pop(query["uploadId"][0], None)
+                    store.aborted_upload_count += 1
+                else:
+                    store.objects.pop((bucket, key), None)
+            return self._send(204)
+
+        def do_GET(self):
+            bucket, key, query = self._get_bucket_key_and_query()
+
+            if "uploadId" in query:
+                with store.lock:
+                    parts = store.multipart_uploads.get(query["uploadId"][0])
+                    parts = dict(parts) if parts is not None else None
+                if parts is None:
+                    return self._send(404, b"<Error><Code>NoSuchUpload</Code></Error>")
+                return self._send(200, (
+                    "<ListPartsResult>"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{query['uploadId'][0]}</UploadId>"
+                    + "".join(
+                        f"<Part><PartNumber>{part_number}</PartNumber>"
+                        f"<ETag>\"{hashlib.md5(part_body).hexdigest()}\"</ETag><Size>{len(part_body)}</Size></Part>"
+                        for part_number, part_body in sorted(parts.items())
+                    ) +
+                    "<IsTruncated>false</IsTruncated>"
+                    "</ListPartsResult>"
+                ).encode())
+
+            with store.lock:
+                body = store.objects.get((bucket, key))
+                etag = store.object_etags.get((bucket, key))
+            if body is None:
+                return self._send(404, b"<Error><Code>NoSuchKey</Code></Error>")
+            return self._send(200, body, headers={"ETag": etag or f'"{hashlib.md5(body).hexdigest()}"'})
+
+        do_HEAD = do_GET
+
+    return LocalS3RequestHandler
+
+
+def start_local_s3_server(
+        port: int = 0,
+        latency: float = 0.0,
+        fail_every: int = 0
+) -> Tuple[ThreadingHTTPServer, LocalS3Store]:
+    """
+    Start the server in a background thread, and return the server and its store
+    """
+    store = LocalS3Store()
+    server = ThreadingHTTPServer(("127.0.0.1", port), get_request_handler(store, latency, fail_every))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server, _ = start_local_s3_server(args.port, args.latency, args.fail_every)
+    print(f"Serving a local S3 stand-in at http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
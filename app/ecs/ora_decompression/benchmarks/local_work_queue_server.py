@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+"""
+A minimal in-memory stand-in for the services the decompression worker (scripts/run_worker.py) talks to.
+
+Supports
+  * SQS SendMessage / ReceiveMessage (long polling and visibility timeouts) / DeleteMessage / ChangeMessageVisibility
+    (of any queue url, each queue is created on first use)
+  * Step Functions SendTaskSuccess / SendTaskFailure / SendTaskHeartbeat
+
+Both are the AWS JSON protocol (a POST with an X-Amz-Target header), so point boto3 at the server with AWS_ENDPOINT_URL.
+
+Task tokens are created with add_task_token (or on the first heartbeat of an unknown token when run standalone),
+the result of each task token (SUCCEEDED or FAILED, with its output or error and cause) is kept in the store.
+A task token can be expired with expire_task_token, after which every call with the token fails with TaskTimedOut.
+
+Every request is delayed by --latency seconds to emulate the round trip to each service
+(long polls wait on top of this).
+
+Authentication is not checked.
+
+Usage:
+  python3 local_work_queue_server.py --port 9300 --latency 0.02
+"""
+
+# Standard library imports
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Optional
+
+# Globals
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = 30
+
+
+@dataclass
+class LocalMessage:
+    message_id: str
+    body: str
+    receipt_handle: Optional[str] = None
+    visible_time: float = 0.0
+    receive_count: int = 0
+
+
+@dataclass
+class LocalTask:
+    status: str = "RUNNING"
+    heartbeat_count: int = 0
+    output: Optional[str] = None
+    error: Optional[str] = None
+    cause: Optional[str] = None
+    expired: bool = False
+
+
+@dataclass
+class LocalWorkQueueStore:
+    queues: Dict[str, Deque[LocalMessage]] = field(default_factory=dict)
+    tasks: Dict[str, LocalTask] = field(default_factory=dict)
+    # Heartbeats of unknown task tokens create the task (rather than failing with TaskDoesNotExist)
+    create_unknown_tasks: bool = False
+    request_count: int = 0
+    condition: threading.Condition = field(default_factory=threading.Condition)
+
+    def add_task_token(self) -> str:
+        task_token = uuid.uuid4().hex
+        with self.condition:
+            self.tasks[task_token] = LocalTask()
+        return task_token
+
+    def expire_task_token(self, task_token: str):
+        with self.condition:
+            self.tasks[task_token].expired = True
+            self.tasks[task_token].status = "TIMED_OUT"
+
+    def send_message(self, queue_url: str, body: str) -> str:
+        message = LocalMessage(message_id=uuid.uuid4().hex, body=body)
+        with self.condition:
+            self.queues.setdefault(queue_url, deque()).append(message)
+            self.condition.notify_all()
+        return message.message_id
+
+    def get_visible_message(self, queue_url: str) -> Optional[LocalMessage]:
+        now = time.monotonic()
+        return next(
+            (message for message in self.queues.get(queue_url, []) if message.visible_time <= now),
+            None
+        )
+
+    def find_message(self, queue_url: str, receipt_handle: str) -> Optional[LocalMessage]:
+        return next(
+            (message for message in self.queues.get(queue_url, []) if message.receipt_handle == receipt_handle),
+            None
+        )
+
+
+def get_request_handler(store: LocalWorkQueueStore, latency: float = 0.0):
+    class LocalWorkQueueRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # The headers and body are written separately, don't hold the body back for the client's ack
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body, content_type: str = "application/x-amz-json-1.0"):
+            body_bytes = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body_bytes)))
+            self.end_headers()
+            self.wfile.write(body_bytes)
+
+        def _send_aws_error(self, error_type: str):
+            return self._send_json(400, {"__type": error_type, "message": error_type})
+
+        def _receive_message(self, request: Dict):
+            queue_url = request["QueueUrl"]
+            deadline = time.monotonic() + request.get("WaitTimeSeconds", 0)
+            with store.condition:
+                while (message := store.get_visible_message(queue_url)) is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return self._send_json(200, {})
+                    # Wake up at least every second, as invisible messages become visible again
+                    store.condition.wait(timeout=min(remaining, 1))
+                message.receipt_handle = uuid.uuid4().hex
+                message.receive_count += 1
+                message.visible_time = time.monotonic() + request.get(
+                    "VisibilityTimeout", DEFAULT_VISIBILITY_TIMEOUT_SECONDS
+                )
+                return self._send_json(200, {
+                    "Messages": [{
+                        "MessageId": message.message_id,
+                        "ReceiptHandle": message.receipt_handle,
+                        "Body": message.body,
+                        "Attributes": {"ApproximateReceiveCount": str(message.receive_count)},
+                    }]
+                })
+
+        def _complete_task(self, task_token: str, status: str, **task_result):
+            with store.condition:
+                task = store.tasks.get(task_token)
+                if task is None and store.create_unknown_tasks:
+                    task = store.tasks.setdefault(task_token, LocalTask())
+                if task is None:
+                    return self._send_aws_error("TaskDoesNotExist")
+                if task.expired:
+                    return self._send_aws_error("TaskTimedOut")
+                if status == "HEARTBEAT":
+                    task.heartbeat_count += 1
+                else:
+                    task.status = status
+                    for task_result_name, task_result_value in task_result.items():
+                        setattr(task, task_result_name, task_result_value)
+            return self._send_json(200, {})
+
+        def do_POST(self):
+            time.sleep(latency)
+            with store.condition:
+                store.request_count += 1
+            target = self.headers.get("X-Amz-Target", "")
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            if target == "AmazonSQS.SendMessage":
+                return self._send_json(200, {
+                    "MessageId": store.send_message(request["QueueUrl"], request["MessageBody"])
+                })
+
+            if target == "AmazonSQS.ReceiveMessage":
+                return self._receive_message(request)
+
+            if target in ["AmazonSQS.DeleteMessage", "AmazonSQS.ChangeMessageVisibility"]:
+                with store.condition:
+                    message = store.find_message(request["QueueUrl"], request["ReceiptHandle"])
+                    if message is None:
+                        return self._send_aws_error("ReceiptHandleIsInvalid")
+                    if target == "AmazonSQS.DeleteMessage":
+                        store.queues[request["QueueUrl"]].remove(message)
+                    else:
+                        message.visible_time = time.monotonic() + request["VisibilityTimeout"]
+                        store.condition.notify_all()
+                return self._send_json(200, {})
+
+            if target == "AWSStepFunctions.SendTaskHeartbeat":
+                return self._complete_task(request["taskToken"], "HEARTBEAT")
+
+            if target == "AWSStepFunctions.SendTaskSuccess":
+                return self._complete_task(request["taskToken"], "SUCCEEDED", output=request["output"])
+
+            if target == "AWSStepFunctions.SendTaskFailure":
+                return self._complete_task(
+                    request["taskToken"], "FAILED", error=request.get("error"), cause=request.get("cause")
+                )
+
+            return self._send_aws_error("UnknownOperationException")
+
+    return LocalWorkQueueRequestHandler
+
+
+def start_local_work_queue_server(
+        store: LocalWorkQueueStore,
+        port: int = 0,
+        latency: float = 0.0
+) -> ThreadingHTTPServer:
+    """
+    Start the server in a background thread
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), get_request_handler(store, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    store = LocalWorkQueueStore(create_unknown_tasks=True)
+    server = start_local_work_queue_server(store, args.port, args.latency)
+    print(f"Serving a local work queue stand-in at http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+A stand-in for the orad binary, for local benchmarks of the container entrypoint without the proprietary decompressor.
+
+The stand-in .ora format is a header line (STAND_IN_ORA_MAGIC) followed by a gzip stream of the fastq.
+The stand-in takes the same arguments the entrypoint (and scripts/tune_pipeline.py) pass to orad,
+  orad --raw --stdout --ora-reference <reference directory> -
+and decompresses stdin to stdout. As with orad, the ora reference must exist,
+and nothing is written to stderr unless decompression fails (the entrypoint fails the job on any orad logs).
+
+Stand-in .ora files are written with --compress (or write_stand_in_ora).
+
+Usage:
+  python3 orad_stand_in.py --compress sample_R1_001.fastq sample_R1_001.fastq.ora
+  python3 orad_stand_in.py --raw --stdout --ora-reference /opt/oradata - < sample_R1_001.fastq.ora > sample_R1_001.fastq
+"""
+
+# Standard library imports
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import zlib
+from pathlib import Path
+
+# Globals
+STAND_IN_ORA_MAGIC = b"#ORA-STAND-IN v1\n"
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# The compression level of the stand-in .ora files, the level only changes how long they take to write
+COMPRESSION_LEVEL = 1
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--compress", nargs=2, type=Path, metavar=("FASTQ", "ORA"),
+        help="Write the fastq as a stand-in .ora file, rather than decompressing stdin"
+    )
+    parser.add_argument("--raw", action="store_true", help="Accepted for compatibility with orad")
+    parser.add_argument("--stdout", action="store_true", help="Accepted for compatibility with orad")
+    parser.add_argument("--ora-reference", type=Path, help="Path to the ora reference directory")
+    parser.add_argument("input", nargs="?", default="-", help="Only stdin (-) is supported")
+    return parser.parse_args()
+
+
+def write_stand_in_ora(fastq_path: Path, ora_path: Path):
+    """
+    Write the fastq as a stand-in .ora file
+    """
+    with open(fastq_path, "rb") as fastq_h, open(ora_path, "wb") as ora_h:
+        ora_h.write(STAND_IN_ORA_MAGIC)
+        with gzip.GzipFile(fileobj=ora_h, mode="wb", compresslevel=COMPRESSION_LEVEL, mtime=0) as gzip_h:
+            shutil.copyfileobj(fastq_h, gzip_h, CHUNK_SIZE)
+
+
+def decompress_stand_in_ora(input_stream, output_stream):
+    """
+    Decompress a stand-in .ora stream, chunk by chunk
+    """
+    magic = input_stream.read(len(STAND_IN_ORA_MAGIC))
+    if magic != STAND_IN_ORA_MAGIC:
+        raise ValueError("Input is not a stand-in .ora file")
+
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    while chunk := input_stream.read(CHUNK_SIZE):
+        output_stream.write(decompressor.decompress(chunk))
+    output_stream.write(decompressor.flush())
+    if not decompressor.eof:
+        raise ValueError("The stand-in .ora stream is truncated")
+    output_stream.flush()
+
+
+def main():
+    args = get_args()
+
+    if args.compress is not None:
+        write_stand_in_ora(*args.compress)
+        return
+
+    if args.ora_reference is None or not args.ora_reference.exists():
+        print(f"Error! Could not find the ora reference at {args.ora_reference}", file=sys.stderr)
+        sys.exit(1)
+    if args.input != "-":
+        print("Error! The orad stand-in only reads from stdin", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        decompress_stand_in_ora(sys.stdin.buffer, sys.stdout.buffer)
+    except BrokenPipeError:
+        # The downstream stage (i.e. head) has stopped reading, there is nothing left for us to do
+        os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
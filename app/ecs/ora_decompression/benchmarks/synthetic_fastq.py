@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""
+Generate synthetic paired fastq files for local benchmarking of the decompression container scripts.
+
+Read names follow the Illumina format so R1 and R2 share a name and differ only by the read number in the comment.
+Quality strings drift along the run (early reads are higher quality than later reads)
+so estimators that only look at the start of a file are penalised the same way they would be on real data.
+
+Usage:
+  python3 synthetic_fastq.py --num-reads 1000000 --output-prefix /tmp/synthetic
+  # Writes /tmp/synthetic_R1_001.fastq and /tmp/synthetic_R2_001.fastq
+"""
+
+# Standard library imports
+import argparse
+import random
+from pathlib import Path
+from typing import Iterator, Tuple
+
+# Globals
+DEFAULT_READ_LENGTH = 151
+DEFAULT_SEED = 42
+BASES = "ACGT"
+HIGH_QUALITY_CHARS = "FFFFFFFF:,"
+LOW_QUALITY_CHARS = "F:,#"
+RECORDS_PER_WRITE = 10_000
+
+
+def iter_read_pairs(num_reads: int, read_length: int = DEFAULT_READ_LENGTH, seed: int = DEFAULT_SEED) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (r1 record, r2 record) tuples
+    """
+    rng = random.Random(seed)
+    for read_index in range(num_reads):
+        tile = 1101 + (read_index * 100) // max(num_reads, 1)
+        x_pos = rng.randrange(1000, 32000)
+        y_pos = read_index % 40000
+        read_name = f"A00001:1:HSYNTHETIC:1:{tile}:{x_pos}:{y_pos}"
+
+        # Quality degrades as we move through the run
+        low_quality_fraction = 0.05 + 0.4 * (read_index / max(num_reads, 1))
+        quality_chars = LOW_QUALITY_CHARS if rng.random() < low_quality_fraction else HIGH_QUALITY_CHARS
+
+        records = []
+        for read_num in (1, 2):
+            sequence = "".join(rng.choices(BASES, k=read_length))
+            quality = "".join(rng.choices(quality_chars, k=read_length))
+            records.append(f"@{read_name} {read_num}:N:0:ACGTACGT+TGCATGCA\n{sequence}\n+\n{quality}\n")
+        yield records[0], records[1]
+
+
+def write_synthetic_fastq_pair(
+        output_prefix: Path,
+        num_reads: int,
+        read_length: int = DEFAULT_READ_LENGTH,
+        seed: int = DEFAULT_SEED
+) -> Tuple[Path, Path]:
+    """
+    Write a synthetic R1 / R2 fastq pair and return their paths
+    """
+    r1_path = Path(f"{output_prefix}_R1_001.fastq")
+    r2_path = Path(f"{output_prefix}_R2_001.fastq")
+    r1_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(r1_path, "w") as r1_h, open(r2_path, "w") as r2_h:
+        r1_buffer, r2_buffer = [], []
+        for r1_record, r2_record in iter_read_pairs(num_reads, read_length, seed):
+            r1_buffer.append(r1_record)
+            r2_buffer.append(r2_record)
+            if len(r1_buffer) >= RECORDS_PER_WRITE:
+                r1_h.write("".join(r1_buffer))
+                r2_h.write("".join(r2_buffer))
+                r1_buffer, r2_buffer = [], []
+        r1_h.write("".join(r1_buffer))
+        r2_h.write("".join(r2_buffer))
+
+    return r1_path, r2_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-reads", type=int, required=True)
+    parser.add_argument("--output-prefix", type=Path, required=True)
+    parser.add_argument("--read-length", type=int, default=DEFAULT_READ_LENGTH)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    for path in write_synthetic_fastq_pair(args.output_prefix, args.num_reads, args.read_length, args.seed):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
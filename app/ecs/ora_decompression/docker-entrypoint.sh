@@ -10,19 +10,14 @@ hash -p /usr/bin/python3.12 python3
 echo_stderr(){
   echo "$(date -Iseconds):" "$@" 1>&2
 }
-parameter_prefix_to_yaml(){
-  local parameter_prefix="${1}"
-  local yaml_path="${2}"
-  aws ssm get-parameters-by-path \
-	--path "${parameter_prefix}" \
-	--output json | \
-  jq --raw-output \
-	'
-	  .Parameters |
-	  map(.Value | fromjson)
-	' | \
-  yq --unwrapScalar --prettyPrint > "${yaml_path}"
-}
+
+# Worker mode
+# A long-lived worker (see scripts/run_worker.py) pulls jobs from WORK_QUEUE_URL,
+# and runs this entrypoint once per job (without WORKER_MODE set), reusing a warm bootstrap
+if [[ "${WORKER_MODE:-false}" == "true" ]]; then
+  echo_stderr "Starting the decompression worker"
+  exec uv run python3 scripts/run_worker.py
+fi
 
 # Globals
 # Inbuilt variables
@@ -42,30 +37,101 @@ if [[ ! -v ORCABUS_TOKEN_SECRET_ID ]]; then
   exit 1
 fi
 
-# Get the hostname ssm parameter
-HOSTNAME="$( \
-  aws ssm get-parameter \
-    --name "${HOSTNAME_SSM_PARAMETER_NAME}" \
-    --query Parameter.Value \
-    --output text \
-)"
-export HOSTNAME
-
-# Get the orcabus token secret id
-ORCABUS_TOKEN="$( \
-  aws secretsmanager get-secret-value \
-    --secret-id "${ORCABUS_TOKEN_SECRET_ID}" \
-    --output json \
-    --query SecretString | \
-  jq --raw-output 'fromjson | .id_token'
-)"
-export ORCABUS_TOKEN
-
-# Parameter to help calculate the gzipped file size
-# without needing to decompress the entire file
-MAX_READS_IF_TOTAL_READ_COUNT_IS_SET="10000000"  # 10 million reads
+# Above this read count, the gzipped file size is estimated (with a confidence interval)
+# from evenly spaced blocks of the file, rather than compressing the entire file
+MIN_READS_TO_ESTIMATE_GZIP_FILE_SIZE="10000000"  # 10 million reads
 RANDOM_SAMPLING_SEED="11"  # Must be a fixed value since we need to ensure R1 and R2 return the same reads
 ORA_LOGS_FILE="ora_logs.txt"
+RAW_STATS_FILE="raw_stats.json"
+GZIP_STATS_FILE="gzip_stats.json"
+QUALITY_BINNING_STATS_FILE="quality_binning_stats.json"
+
+# ICAv2 configuration files, written by the bootstrap
+ICAV2_STORAGE_CONFIGURATION_LIST_FILE="project_configuration_list.yaml"
+ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE="project_to_storage_configuration_mapping_list.yaml"
+ICAV2_STORAGE_CREDENTIAL_LIST_FILE="storage_credential_list.yaml"
+
+# Stage probes (see scripts/pipeline_probe.py) measure the bytes, records and blocked time at each stage boundary
+# of the decompression pipeline, logging progress to stderr every STAGE_PROGRESS_INTERVAL_SECONDS
+# The stage summaries are added to the output metadata
+STAGE_SUMMARY_FILE_PREFIX="stage_summary_"
+STAGE_PROGRESS_INTERVAL_SECONDS="60"
+
+# Every pipeline is run by the pipeline supervisor (see scripts/supervise_pipeline.py),
+# which fails the pipeline as soon as any stage fails, or once no stage has read or written any bytes
+# for STALL_TIMEOUT_SECONDS (rather than waiting on the task timeout)
+# The failed stage and its stderr are written to the pipeline failure file, then uploaded to the metadata uri
+DEFAULT_STALL_TIMEOUT_SECONDS="300"
+PIPELINE_FILE="pipeline.json"
+PIPELINE_FAILURE_FILE="pipeline_failure.json"
+FAILURE_METADATA_FILE="failure.json"
+
+# Path to the orad binary, may be overridden (i.e. for a local stand-in, see benchmarks/orad_stand_in.py)
+ORAD_PATH="${ORAD_PATH:-/usr/local/bin/orad}"
+
+# Cache of the underlying s3 uris and upload credentials of icav2 project folders (see scripts/resolve_icav2_output.py)
+# Shared by every output of the job, and by every job of a worker (which sets it to a path in its work dir)
+# The uploaders refresh the credentials through the cache before they expire
+ICAV2_OUTPUT_CACHE_FILE="${ICAV2_OUTPUT_CACHE_FILE:-icav2_output_cache.json}"
+
+# Number of concurrent range requests used to download each ora file
+# The download is network bound, so this is not taken from the thread budget
+DOWNLOAD_CONNECTIONS="4"
+
+# Number of parts uploaded concurrently for each output gzip file
+UPLOAD_CONCURRENCY="4"
+
+# Checkpoints of the resumable uploads (see scripts/compress_upload_resumable.py),
+# relative to the directory of the output metadata uri
+CHECKPOINTS_PREFIX="checkpoints/"
+
+# Output format of ORA_DECOMPRESSION jobs, one of
+# GZIP: A plain gzip file compressed with pigz --fast
+# BGZF: A blocked gzip file, along with a .gzi block index and a .ridx read offset index
+DEFAULT_OUTPUT_FORMAT="GZIP"
+GZI_INDEX_SUFFIX=".gzi"
+READ_INDEX_SUFFIX=".ridx"
+GZI_INDEX_FILE="output.gzi"
+READ_INDEX_FILE="output.ridx"
+
+# Output layout of ORA_DECOMPRESSION jobs, one of
+# SINGLE: A single output file for each read
+# CHUNKED: Chunk files of CHUNK_READ_COUNT reads for each read, in the Illumina chunked fastq naming scheme
+#          (_R1_001.fastq.gz, _R1_002.fastq.gz, ...), GZIP only (see scripts/write_fastq_chunks.py)
+# INTERLEAVED: A single output file of interleaved R1 and R2 reads at INTERLEAVED_OUTPUT_GZIP_URI,
+#              paired jobs only (see scripts/interleave_fastq.py)
+DEFAULT_OUTPUT_LAYOUT="SINGLE"
+DEFAULT_CHUNK_READ_COUNT="10000000"  # 10 million reads
+# In the interleaved layout, the R1 and R2 jobs write their selected reads to their interleave fifos,
+# which are interleaved, compressed and uploaded by the interleaved output job (see run_interleaved_output)
+INTERLEAVE_FIFO_FILE="interleave.fifo"
+INTERLEAVED_FILE_PREFIX="interleaved_"
+
+# Compression engine, level and thread count of ORA_DECOMPRESSION jobs (see scripts/compress_stream.py)
+# A level of -1 uses the default level of the engine
+# A thread count of -1 uses the compression share of the thread budget
+DEFAULT_COMPRESSION_ENGINE="PIGZ"
+DEFAULT_COMPRESSION_LEVEL="-1"
+DEFAULT_COMPRESSION_THREADS="-1"
+
+# Lossy quality score binning of ORA_DECOMPRESSION jobs (see scripts/bin_quality_scores.py), one of
+# NONE: The quality scores are kept as decompressed by orad
+# ILLUMINA_8_BIN: The Illumina 8 level binning
+# ILLUMINA_4_BIN: The Illumina 4 level binning
+# The raw md5sum and read count of the job are of the reads before binning
+DEFAULT_QUALITY_BINNING="NONE"
+
+# Number of threads available to the task (set to the nCpus of the task definition)
+# In paired mode this is split evenly between the R1 and R2 pipelines
+DEFAULT_THREAD_BUDGET="8"
+
+# Thread allocation of ORA_DECOMPRESSION jobs, one of
+# STATIC: The thread budget is split evenly between the read sampler and the compressor,
+#         with DOWNLOAD_CONNECTIONS download connections and UPLOAD_CONCURRENCY parts uploaded at once
+# ADAPTIVE: Each stage is measured on the head of the ora file (see scripts/tune_pipeline.py),
+#           then the download connections, sampler processes, compression threads and upload concurrency
+#           are chosen to keep up with orad within the thread budget
+DEFAULT_THREAD_ALLOCATION="STATIC"
 
 # Inputs
 if [[ ! -v INPUT_ORA_URI ]]; then
@@ -73,6 +139,74 @@ if [[ ! -v INPUT_ORA_URI ]]; then
   exit 1
 fi
 
+# Output format (optional)
+OUTPUT_FORMAT="${OUTPUT_FORMAT:-${DEFAULT_OUTPUT_FORMAT}}"
+if [[ ! "${OUTPUT_FORMAT}" =~ ^(GZIP|BGZF)$ ]]; then
+  echo_stderr "Error! Expected env var 'OUTPUT_FORMAT' to be one of GZIP or BGZF but got '${OUTPUT_FORMAT}'"
+  exit 1
+fi
+
+# Output layout (optional), a chunk read count of -1 uses the default chunk read count
+OUTPUT_LAYOUT="${OUTPUT_LAYOUT:-${DEFAULT_OUTPUT_LAYOUT}}"
+CHUNK_READ_COUNT="${CHUNK_READ_COUNT:-${DEFAULT_CHUNK_READ_COUNT}}"
+if [[ ! "${OUTPUT_LAYOUT}" =~ ^(SINGLE|CHUNKED|INTERLEAVED)$ ]]; then
+  echo_stderr "Error! Expected env var 'OUTPUT_LAYOUT' to be one of SINGLE, CHUNKED or INTERLEAVED but got '${OUTPUT_LAYOUT}'"
+  exit 1
+fi
+if [[ "${CHUNK_READ_COUNT}" -lt "1" ]]; then
+  CHUNK_READ_COUNT="${DEFAULT_CHUNK_READ_COUNT}"
+fi
+if [[ "${OUTPUT_LAYOUT}" == "CHUNKED" && "${OUTPUT_FORMAT}" != "GZIP" ]]; then
+  echo_stderr "Error! The CHUNKED output layout is only available for the GZIP output format"
+  exit 1
+fi
+
+# Compression parameters (optional)
+COMPRESSION_ENGINE="${COMPRESSION_ENGINE:-${DEFAULT_COMPRESSION_ENGINE}}"
+COMPRESSION_LEVEL="${COMPRESSION_LEVEL:-${DEFAULT_COMPRESSION_LEVEL}}"
+COMPRESSION_THREADS="${COMPRESSION_THREADS:-${DEFAULT_COMPRESSION_THREADS}}"
+THREAD_BUDGET="${THREAD_BUDGET:-${DEFAULT_THREAD_BUDGET}}"
+STALL_TIMEOUT_SECONDS="${STALL_TIMEOUT_SECONDS:-${DEFAULT_STALL_TIMEOUT_SECONDS}}"
+if [[ ! "${COMPRESSION_ENGINE}" =~ ^(PIGZ|IGZIP|ZLIB_NG)$ ]]; then
+  echo_stderr "Error! Expected env var 'COMPRESSION_ENGINE' to be one of PIGZ, IGZIP or ZLIB_NG but got '${COMPRESSION_ENGINE}'"
+  exit 1
+fi
+
+# Quality binning (optional)
+QUALITY_BINNING="${QUALITY_BINNING:-${DEFAULT_QUALITY_BINNING}}"
+if [[ ! "${QUALITY_BINNING}" =~ ^(NONE|ILLUMINA_8_BIN|ILLUMINA_4_BIN)$ ]]; then
+  echo_stderr "Error! Expected env var 'QUALITY_BINNING' to be one of NONE, ILLUMINA_8_BIN or ILLUMINA_4_BIN but got '${QUALITY_BINNING}'"
+  exit 1
+fi
+
+# Thread allocation (optional)
+THREAD_ALLOCATION="${THREAD_ALLOCATION:-${DEFAULT_THREAD_ALLOCATION}}"
+if [[ ! "${THREAD_ALLOCATION}" =~ ^(STATIC|ADAPTIVE)$ ]]; then
+  echo_stderr "Error! Expected env var 'THREAD_ALLOCATION' to be one of STATIC or ADAPTIVE but got '${THREAD_ALLOCATION}'"
+  exit 1
+fi
+
+# Paired inputs (optional), if INPUT_R2_ORA_URI is set we also require the R2 ingest id and output uri
+if [[ -n "${INPUT_R2_ORA_URI:-}" ]]; then
+  for r2_env_var in R2_ORA_INGEST_ID R2_OUTPUT_GZIP_URI; do
+    if [[ ! -v "${r2_env_var}" ]]; then
+      echo_stderr "Error! Expected env var '${r2_env_var}' when 'INPUT_R2_ORA_URI' is set but was not found"
+      exit 1
+    fi
+  done
+fi
+
+# The interleaved layout needs both reads, and the interleaved output uri
+if [[ "${OUTPUT_LAYOUT}" == "INTERLEAVED" ]]; then
+  if [[ -z "${INPUT_R2_ORA_URI:-}" ]]; then
+    echo_stderr "Warning! The INTERLEAVED output layout needs paired inputs, falling back to the SINGLE output layout"
+    OUTPUT_LAYOUT="SINGLE"
+  elif [[ ! -v INTERLEAVED_OUTPUT_GZIP_URI ]]; then
+    echo_stderr "Error! Expected env var 'INTERLEAVED_OUTPUT_GZIP_URI' for the INTERLEAVED output layout but was not found"
+    exit 1
+  fi
+fi
+
 # ICAV2 ENV VARS
 export ICAV2_BASE_URL="https://ica.illumina.com/ica/rest"
 
@@ -82,453 +216,1172 @@ if [[ ! -v ICAV2_ACCESS_TOKEN_SECRET_ID ]]; then
   exit 1
 fi
 
-echo_stderr "Collecting the ICAV2 access token"
-# Get the ICAV2 access token
-ICAV2_ACCESS_TOKEN="$( \
-  aws secretsmanager get-secret-value \
-    --secret-id "${ICAV2_ACCESS_TOKEN_SECRET_ID}" \
-    --output text \
-    --query SecretString
-)"
-export ICAV2_ACCESS_TOKEN
+# ICAV2 configuration ssm parameter path prefixes
+for icav2_env_var in \
+  ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX \
+  ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX \
+  ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX; do
+  if [[ ! -v "${icav2_env_var}" ]]; then
+    echo_stderr "Error! Expected env var '${icav2_env_var}' but was not found"
+    exit 1
+  fi
+done
 
-# Set ICAV2 Configurations
-# Icav2 Storage configuration files
-echo_stderr "Collecting configuration files"
+# Concurrency slot (optional)
+# Decompressions hold a concurrency slot (of the ECS task or the worker pool), acquired by the step function before the launch,
+# we renew the lease on the slot in the background while the job runs (see scripts/renew_concurrency_slot.py),
+# so a decompression that dies without releasing its slot has the slot reclaimed once the lease expires
+if [[ -n "${CONCURRENCY_SLOT_ID:-}" ]]; then
+  for slot_env_var in CONCURRENCY_SLOT_LEASE_ID CONCURRENCY_SLOT_LEASE_SECONDS CONCURRENCY_SLOT_TABLE_NAME; do
+    if [[ ! -v "${slot_env_var}" ]]; then
+      echo_stderr "Error! Expected env var '${slot_env_var}' when 'CONCURRENCY_SLOT_ID' is set but was not found"
+      exit 1
+    fi
+  done
+  echo_stderr "Renewing the lease on concurrency slot ${CONCURRENCY_SLOT_ID}"
+  uv run python3 scripts/renew_concurrency_slot.py \
+    --table-name "${CONCURRENCY_SLOT_TABLE_NAME}" \
+    --slot-id "${CONCURRENCY_SLOT_ID}" \
+    --lease-id "${CONCURRENCY_SLOT_LEASE_ID}" \
+    --lease-seconds "${CONCURRENCY_SLOT_LEASE_SECONDS}" \
+    --parent-pid "$$" &
+  concurrency_slot_renewer_pid="$!"
+  trap 'kill "${concurrency_slot_renewer_pid}" 2>/dev/null || true' EXIT
+fi
 
-# Storage configuration list file key prefix
-if [[ ! -v ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX ]]; then
-  echo_stderr "Error! Expected env var 'ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX' but was not found"
-  exit 1
+# Bootstrap
+# Collect the hostname, orcabus token, icav2 access token, icav2 configuration files
+# and the presigned urls of the input ora files concurrently (see scripts/bootstrap.py)
+# Exports HOSTNAME, ORCABUS_TOKEN, ICAV2_ACCESS_TOKEN, the ICAV2_*_LIST_FILE paths,
+# INPUT_ORA_PRESIGNED_URL and (in paired mode) INPUT_R2_ORA_PRESIGNED_URL
+echo_stderr "Bootstrapping the job"
+bootstrap_args=( --ora-uri "INPUT_ORA_PRESIGNED_URL=${INPUT_ORA_URI}" )
+if [[ -n "${INPUT_R2_ORA_URI:-}" && "${JOB_TYPE:-}" != "READ_COUNT_CALCULATION" ]]; then
+  bootstrap_args+=( --ora-uri "INPUT_R2_ORA_PRESIGNED_URL=${INPUT_R2_ORA_URI}" )
 fi
-ICAV2_STORAGE_CONFIGURATION_LIST_FILE="project_configuration_list.yaml"
-parameter_prefix_to_yaml \
-  "${ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX}" \
-  "${ICAV2_STORAGE_CONFIGURATION_LIST_FILE}"
-export ICAV2_STORAGE_CONFIGURATION_LIST_FILE
-
-# Project to Storage Configuration mapping
-if [[ ! -v ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX ]]; then
-  echo_stderr "Error! Expected env var 'ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX' but was not found"
-  exit 1
+# The file manager url may be overridden (i.e. for a local stand-in), defaults to https://file.${HOSTNAME}
+if [[ -n "${FILE_MANAGER_URL:-}" ]]; then
+  bootstrap_args+=( --file-manager-url "${FILE_MANAGER_URL}" )
 fi
-ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE="project_to_storage_configuration_mapping_list.yaml"
-parameter_prefix_to_yaml \
-  "${ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX}" \
-  "${ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE}"
-export ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE
-
-# Storage Credentials
-if [[ ! -v ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX ]]; then
-  echo_stderr "Error! Expected env var 'ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX' but was not found"
-  exit 1
+# Jobs run by the worker reuse the hostname, tokens and icav2 configuration files of the worker's bootstrap,
+# so only the presigned urls are collected
+if [[ -n "${WARM_BOOTSTRAP_ENV_FILE:-}" ]]; then
+  bootstrap_args+=( --warm-env-file "${WARM_BOOTSTRAP_ENV_FILE}" )
 fi
-ICAV2_STORAGE_CREDENTIAL_LIST_FILE="storage_credential_list.yaml"
-parameter_prefix_to_yaml \
-  "${ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX}" \
-  "${ICAV2_STORAGE_CREDENTIAL_LIST_FILE}"
-export ICAV2_STORAGE_CREDENTIAL_LIST_FILE
-
-# Get the bucket from the input ora uri
-ora_bucket="$( \
-  uv run python3 -c "from urllib.parse import urlparse; print(urlparse(\"${INPUT_ORA_URI}\").netloc)"
-)"
-ora_key="$( \
-  uv run python3 -c "from urllib.parse import urlparse; print(urlparse(\"${INPUT_ORA_URI}\").path.lstrip(\"/\"))"
+bootstrap_env="$( \
+  uv run python3 scripts/bootstrap.py \
+    --hostname-ssm-parameter-name "${HOSTNAME_SSM_PARAMETER_NAME}" \
+    --orcabus-token-secret-id "${ORCABUS_TOKEN_SECRET_ID}" \
+    --icav2-access-token-secret-id "${ICAV2_ACCESS_TOKEN_SECRET_ID}" \
+    --storage-configuration-prefix "${ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX}" \
+    --storage-configuration-list-file "${ICAV2_STORAGE_CONFIGURATION_LIST_FILE}" \
+    --project-to-storage-configuration-mapping-prefix "${ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX}" \
+    --project-to-storage-configuration-mapping-list-file "${ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE}" \
+    --storage-credential-prefix "${ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX}" \
+    --storage-credential-list-file "${ICAV2_STORAGE_CREDENTIAL_LIST_FILE}" \
+    "${bootstrap_args[@]}" \
 )"
-s3_object_id="$( \
-  curl \
-    --request GET \
-    --fail --silent --location --show-error \
-    --header "Accept: application/json " \
-    --header "Authorization: Bearer ${ORCABUS_TOKEN}" \
-    --url "https://file.${HOSTNAME}/api/v1/s3?bucket=${ora_bucket}&key=${ora_key}&currentState=true" | \
-  jq --raw-output \
+eval "${bootstrap_env}"
+unset bootstrap_env
+
+# Job functions
+get_presigned_url_from_ora_uri(){
+  # Get the presigned url of an ora file, as collected by the bootstrap
+  local ora_uri="${1}"
+
+  if [[ "${ora_uri}" == "${INPUT_ORA_URI}" ]]; then
+    echo "${INPUT_ORA_PRESIGNED_URL}"
+  elif [[ "${ora_uri}" == "${INPUT_R2_ORA_URI:-}" && -v INPUT_R2_ORA_PRESIGNED_URL ]]; then
+    echo "${INPUT_R2_ORA_PRESIGNED_URL}"
+  else
+    echo_stderr "Could not find the presigned url of ${ora_uri}, exiting"
+    return 1
+  fi
+}
+
+pipeline_stage(){
+  # Print a stage of a supervised pipeline (see run_pipeline) as a json object
+  # Usage: pipeline_stage <name> [--closes-input-early] [--stderr-file <path>] -- <command> [<args>...]
+  # --closes-input-early: The stage may stop reading before the end of the stream (i.e. head),
+  #                       so the stages upstream of it may be stopped by a broken pipe
+  # --stderr-file: Write the stderr of the stage to this file rather than to our stderr
+  local name="${1}"
+  shift 1
+  local closes_input_early="false"
+  local stderr_file=""
+  local command_json_str="[]"
+  local arg
+
+  while [[ "${1}" != "--" ]]; do
+    case "${1}" in
+      --closes-input-early)
+        closes_input_early="true"
+        shift 1
+        ;;
+      --stderr-file)
+        stderr_file="${2}"
+        shift 2
+        ;;
+      *)
+        echo_stderr "Error! Unknown pipeline stage option '${1}'"
+        return 1
+        ;;
+    esac
+  done
+  shift 1
+
+  # Add the command arguments one at a time, as jq would otherwise parse any options in the command as its own
+  for arg in "$@"; do
+    command_json_str="$( \
+      jq --compact-output \
+        --arg arg "${arg}" \
+        '. + [ $arg ]' <<< "${command_json_str}" \
+    )"
+  done
+
+  jq --null-input --compact-output \
+    --arg name "${name}" \
+    --argjson command "${command_json_str}" \
+    --argjson closes_input_early "${closes_input_early}" \
+    --arg stderr_file "${stderr_file}" \
     '
-      if .results | length == 0 then
-        error("No results found for the given bucket and key")
-      elif .results | length > 1 then
-        error("Multiple results found for the given bucket and key")
-      else
-        .results[0].s3ObjectId
-      end
-    ' \
-)"
+      {
+        "name": $name,
+        "command": $command,
+        "closesInputEarly": $closes_input_early
+      } +
+      if $stderr_file != "" then {"stderrFile": $stderr_file} else {} end
+    '
+}
 
-# Get the presigned url
-echo_stderr "Collecting the presigned URL for the input ora file"
-presigned_url="$(  \
-  curl \
-    --request GET \
-    --fail --silent --location --show-error \
-    --header "Accept: application/json " \
-    --header "Authorization: Bearer ${ORCABUS_TOKEN}" \
-    --url "https://file.${HOSTNAME}/api/v1/s3/presign/${s3_object_id}" | \
-  jq --raw-output
-)"
+download_stage(){
+  # The pipeline stage that downloads the ora file from the presigned url to stdout
+  local presigned_url="${1}"
+  local download_connections="${2}"
 
-# Confirm presigned url is not empty
-if [[ -v "${presigned_url}" ]]; then
-  echo_stderr "Could not generate presigned url of ${INPUT_ORA_URI}, exiting"
-  exit 1
-fi
+  pipeline_stage "download" -- \
+    uv run python3 scripts/download_presigned_url.py \
+      --connections "${download_connections}" \
+      "${presigned_url}"
+}
+
+orad_stage(){
+  # The pipeline stage that decompresses the ora stream from stdin to stdout, writing the orad logs to the logs file
+  local ora_logs_file="${1}"
+
+  pipeline_stage "orad" --stderr-file "${ora_logs_file}" -- \
+    "${ORAD_PATH}" \
+      --raw \
+      --stdout \
+      --ora-reference "${ORADATA_PATH}" \
+      -
+}
+
+probe_stage(){
+  # A pipeline stage that passes stdin through to stdout,
+  # writing the summary of the (upstream) stage to the stage summary file
+  # Any further arguments are passed to the probe (i.e. --fastq)
+  local stage="${1}"
+  local stage_summary_file="${2}"
+  shift 2
 
-# Download + Upload the ora file as a gzipped compressed file
-if [[ "${JOB_TYPE}" == "ORA_DECOMPRESSION" ]]; then
-  # Get the sampling parameter
-  if [[ "${SAMPLING}" == "true" ]]; then
-	# If sampling is 1, then seqtk will recognise as the number of reads to return
-	# and then only return only the first read
-	if [[ "${TOTAL_READ_COUNT}" -le "${MAX_READS}" ]]; then
-	  echo_stderr "Turning off sampling as total read count is less than the maximum reads"
-	  SAMPLING="false"
-	else
-	  SAMPLING_PROPORTION="$( \
-		jq --null-input --raw-output \
-		  --argjson maxReads "${MAX_READS}" \
-		  --argjson totalReadCount "${TOTAL_READ_COUNT}" \
-		  '
-			if ($maxReads > $totalReadCount or $maxReads < 1 ) then
-			  1.0
-			else
-			  # Calculate the sampling proportion as a percentage
-			  # This is the maximum reads divided by the total read count
-			  # rounded to 2 decimal places
-			  (
-				 (( 100 * $maxReads) / $totalReadCount ) | round
-			  ) / 100
-			end
-		  '
-	  )"
-	  echo_stderr "Sampling Proportion is ${SAMPLING_PROPORTION}"
-	fi
+  pipeline_stage "${stage}Probe" -- \
+    uv run python3 scripts/pipeline_probe.py \
+      --stage "${stage}" \
+      --interval "${STAGE_PROGRESS_INTERVAL_SECONDS}" \
+      --output-json "${stage_summary_file}" \
+      "$@"
+}
+
+run_pipeline(){
+  # Run the pipeline stages (see pipeline_stage) with the pipeline supervisor
+  # The first stage reads our stdin, and the last stage writes to our stdout
+  # If any stage fails (or the pipeline stalls), every stage is stopped,
+  # the failure is written to the pipeline failure file, and we return non-zero
+  local file_prefix="${1}"
+  shift 1
+  local pipeline_file="${file_prefix}${PIPELINE_FILE}"
+  local exit_code=0
+
+  printf '%s\n' "$@" | jq --slurp --compact-output '.' > "${pipeline_file}"
+
+  uv run python3 scripts/supervise_pipeline.py \
+    --pipeline-json "${pipeline_file}" \
+    --stall-timeout "${STALL_TIMEOUT_SECONDS}" \
+    --failure-json "${file_prefix}${PIPELINE_FAILURE_FILE}" || \
+  exit_code="$?"
+
+  # The pipeline file holds the presigned url
+  rm -f "${pipeline_file}"
+  return "${exit_code}"
+}
+
+upload_failure_metadata(){
+  # Upload the pipeline failures of each read to the metadata uri as {"failures": [...]},
+  # so the failed stage and its stderr are reported with the job
+  # Arguments are pairs of the ingest id and the file prefix of each read
+  # Nothing is uploaded if no pipeline failed (i.e. the job failed elsewhere)
+  local failures_json_str="[]"
+  local ingest_id
+  local file_prefix
+
+  while [[ "$#" -gt "0" ]]; do
+    ingest_id="${1}"
+    file_prefix="${2}"
+    shift 2
+    if [[ -f "${file_prefix}${PIPELINE_FAILURE_FILE}" ]]; then
+      failures_json_str="$( \
+        jq --compact-output \
+          --arg ingest_id "${ingest_id}" \
+          --argjson failures "${failures_json_str}" \
+          '$failures + [ {"ingestId": $ingest_id} + . ]' \
+          < "${file_prefix}${PIPELINE_FAILURE_FILE}" \
+      )"
+    fi
+  done
+
+  if [[ "$(jq 'length' <<< "${failures_json_str}")" -eq "0" ]]; then
+    return
   fi
 
-  # Get the linecount parameter
-  if [[ "${MAX_READS}" -gt "0" ]]; then
-	line_count="$( \
-	  jq --null-input --raw-output \
-		--argjson maxReads "${MAX_READS}" \
-		'
-		  $maxReads * 4
-		' \
-	)"
+  echo_stderr "Uploading the pipeline failures to the metadata uri"
+  jq --null-input --raw-output \
+    --argjson failures "${failures_json_str}" \
+    '{"failures": $failures}' > "${FAILURE_METADATA_FILE}"
+  aws s3 cp \
+    --sse=AES256 \
+    "${FAILURE_METADATA_FILE}" \
+    "${OUTPUT_METADATA_URI}"
+}
+
+combine_stage_summaries(){
+  # Combine the stage summary files of each stage (in order) in to a single json list, and remove the files
+  # Stages without a summary file (i.e. not part of this pipeline) are skipped
+  local stage_summary_file_prefix="${1}"
+  shift 1
+  local stage_summary_files=()
+
+  for stage in "$@"; do
+    if [[ -f "${stage_summary_file_prefix}${stage}.json" ]]; then
+      stage_summary_files+=( "${stage_summary_file_prefix}${stage}.json" )
+    fi
+  done
+
+  if [[ "${#stage_summary_files[@]}" -eq "0" ]]; then
+    echo "[]"
+    return
   fi
 
-  # Check if GZIP_COMPRESSION_SIZE_IN_BYTES is set
-  if [[ "${GZIP_COMPRESSION_SIZE_IN_BYTES}" -eq "-1" ]]; then
-    # GZIP COMPRESSION SIZE IN BYTES is not set, we must
-    # Use a quick 'rule-of-thumb' to calculate this value.
-    # Where we expect 1 Kb per read (compressed)
-    # Note that this is only applicable to short read data and
-    # We should consider using the baseCountEst / totalReadCount
-    # To help collect this 100 bytes per read
-    # The estimated file size does not need to be perfect but
-    # must be set over the value of 5 Gb, contrary to the documentation
-    # Which expects it to be set when used over the value of 50 Gb
-    GZIP_COMPRESSION_SIZE_IN_BYTES="$(
-		jq --raw-output --null-input \
-		  --argjson maxReads "${MAX_READS}" \
-		  --argjson totalReadCount "${TOTAL_READ_COUNT}" \
-		  '
-		    # If maxReads is not zero.
-		    # Use this value multiplied by 1024
-		    if $maxReads > 0 then
-		      $maxReads * 1024
-		    else
-		      $totalReadCount * 1024
-		    end
-		  '
+  jq --slurp --compact-output '.' "${stage_summary_files[@]}"
+  rm -f "${stage_summary_files[@]}"
+}
+
+get_upload_s3_uri(){
+  # Get the s3 uri to upload the output uri to
+  # If the aws s3 access credentials json string is set (the output is not in the S3_DECOMPRESSION_BUCKET),
+  # the output uri is resolved to its underlying s3 uri
+  local output_uri="${1}"
+  local aws_s3_access_creds_json_str="${2:-}"
+
+  if [[ -n "${aws_s3_access_creds_json_str}" ]]; then
+    echo "$( \
+      jq --raw-output '.ICAV2_PROJECT_FOLDER_S3_URI' <<< "${aws_s3_access_creds_json_str}" \
+    )$( \
+      basename "${output_uri}" \
     )"
-    echo_stderr "Calculated the estimated gzip compression size in bytes as ${GZIP_COMPRESSION_SIZE_IN_BYTES}"
+  else
+    echo "${output_uri}"
   fi
+}
+
+get_aws_s3_access_creds_json_str(){
+  # Get the icav2 aws credentials to upload to the output uri, along with the underlying s3 uri of its project folder
+  # (see scripts/resolve_icav2_output.py), from the icav2 output cache where they are still fresh
+  # Nothing is returned if the output uri is in the S3_DECOMPRESSION_BUCKET (uploaded with the task role credentials)
+  local output_uri="${1}"
 
-  # Get the icav2 accession credentials if required
-  if [[ ! "${OUTPUT_GZIP_URI}" =~ s3://${S3_DECOMPRESSION_BUCKET}/ ]]; then
-  # Set AWS credentials access for aws s3 cp
+  if [[ ! "${output_uri}" =~ s3://${S3_DECOMPRESSION_BUCKET}/ ]]; then
     echo_stderr "Collecting the AWS S3 Access credentials"
-    aws_s3_access_creds_json_str="$( \
-      uv run python3 scripts/get_icav2_aws_credentials_access.py \
-        "$(dirname "${OUTPUT_GZIP_URI}")/"
-    )";
+    uv run python3 scripts/resolve_icav2_output.py \
+      --cache-file "${ICAV2_OUTPUT_CACHE_FILE}" \
+      "$(dirname "${output_uri}")/"
   fi
+}
 
-  # Use a file descriptor to emulate the ora file
-  # Write the gzipped ora file to stdout
-  echo_stderr "Starting stream and decompression of the ora input file"
-  # Prefix with qemu-x86_64-static
-  # when using the orad x86_64 binary
-  # but we have the arm binary
-  # qemu-x86_64-static \  # Uncomment this line!
-  # When using qemu-x86_64-static, piping through
-  # wget may be difficult, and instead may need to use
-  # a <() redirection
-
-  # Steps involved in this massive pipeline (And we have 8 threads to play with)
-  # 1. Download the file using wget (1 thread)
-  # 2. Pipe the file to orad to decompress it (1 threads)
-  # 3. If sampling is enabled, sample the reads using the sampling proportion parameter (1 thread)
-  # 4. If max reads is set, limit the number of reads to the max reads (1 thread)
-  # 5. Pipe the output to pigz to compress it in to gzip format (4 threads)
-  # 6a. If the output gzip uri is not in the S3_DECOMPRESSION_BUCKET, upload to S3 using aws s3 cp icav2 credentials
-  # 6b. If the output gzip uri is in the S3_DECOMPRESSION_BUCKET, upload to S3 using aws s3 cp with task role credentials
-  ( \
-    (
-      wget \
-        --quiet \
-        --output-document /dev/stdout \
-      "${presigned_url}" | \
-      /usr/local/bin/orad \
-        --raw \
-        --stdout \
-        --ora-reference "${ORADATA_PATH}" \
-        - 2>"${ORA_LOGS_FILE}" | \
-      (
-        if [[ "${SAMPLING}" == "true" ]]; then
-          seqtk sample \
-          -s "${RANDOM_SAMPLING_SEED}" \
-          - \
-          "${SAMPLING_PROPORTION}"
-        else
-          cat
-        fi
-      ) \
-    ) || \
-    true
-  ) | \
-  (
-    if [[ "${MAX_READS}" -gt "0" ]]; then
-      head -n "${line_count}"
-	else
-	  cat
-	fi
-  ) | \
-  (
-    pigz \
-      --stdout \
-      --fast \
-      --processes 4
-  ) | \
-  (
-    if [[ ! "${OUTPUT_GZIP_URI}" =~ s3://${S3_DECOMPRESSION_BUCKET}/ ]]; then
-      AWS_ACCESS_KEY_ID="$( \
-        jq -r '.AWS_ACCESS_KEY_ID' <<< "${aws_s3_access_creds_json_str}"
-      )" \
-      AWS_SECRET_ACCESS_KEY="$( \
-        jq -r '.AWS_SECRET_ACCESS_KEY' <<< "${aws_s3_access_creds_json_str}"
-      )" \
-      AWS_SESSION_TOKEN="$( \
-        jq -r '.AWS_SESSION_TOKEN' <<< "${aws_s3_access_creds_json_str}"
-      )" \
-      AWS_REGION="$( \
-        jq -r '.AWS_REGION' <<< "${aws_s3_access_creds_json_str}"
-      )" \
-      aws s3 cp \
-        --expected-size="$( \
-        	jq --null-input --raw-output \
-        	  --argjson size "${GZIP_COMPRESSION_SIZE_IN_BYTES}" \
-        	  '(1.10 * $size) | round'
-        )" \
-        --sse=AES256 \
-        - \
-        "$( \
-          uv run python3 scripts/get_s3_uri.py \
-          "$(dirname "${OUTPUT_GZIP_URI}")/" \
-        )$( \
-          basename "${OUTPUT_GZIP_URI}" \
-        )"
-    else
-      aws s3 cp \
-        --expected-size="$( \
-        	jq --null-input --raw-output \
-        	  --argjson size "${GZIP_COMPRESSION_SIZE_IN_BYTES}" \
-        	  '(1.10 * $size) | round'
-        )" \
-        --sse=AES256 \
-        - \
-        "${OUTPUT_GZIP_URI}"
-    fi
+upload_stdin_to_s3_uri(){
+  # Upload stdin to an s3 uri with the streaming multipart uploader
+  # If the aws s3 access credentials json string is set (the output is not in the S3_DECOMPRESSION_BUCKET),
+  # we upload using the icav2 credentials, otherwise we use the task role credentials
+  local output_uri="${1}"
+  local aws_s3_access_creds_json_str="${2:-}"
+  local upload_concurrency="${3:-${UPLOAD_CONCURRENCY}}"
+  local upload_s3_uri
+
+  upload_s3_uri="$(get_upload_s3_uri "${output_uri}" "${aws_s3_access_creds_json_str}")"
+
+  UPLOAD_AWS_CREDENTIALS_JSON="${aws_s3_access_creds_json_str}" \
+  uv run python3 scripts/upload_stream_multipart.py \
+    --concurrency "${upload_concurrency}" \
+    --sse AES256 \
+    "${upload_s3_uri}"
+}
+
+add_output_stages(){
+  # Add the stages that compress the fastq stream (in the output format) and upload it to the output gzip uri
+  # (in the output layout) to the end of the pipeline stages array named by the first argument
+  # The gzip stats of the output (byte count, md5sum and s3 etag, calculated as it is uploaded)
+  # are written to the gzip stats file, and the BGZF indexes to the index files
+  local -n output_stages="${1}"
+  local output_gzip_uri="${2}"
+  local aws_s3_access_creds_json_str="${3}"
+  local compression_threads="${4}"
+  local upload_concurrency="${5}"
+  local checkpoint_uri="${6}"
+  local file_prefix="${7}"
+
+  local gzip_stats_file="${file_prefix}${GZIP_STATS_FILE}"
+  local gzi_index_file="${file_prefix}${GZI_INDEX_FILE}"
+  local read_index_file="${file_prefix}${READ_INDEX_FILE}"
+  local stage_summary_file_prefix="${file_prefix}${STAGE_SUMMARY_FILE_PREFIX}"
+  local upload_s3_uri
+
+  upload_s3_uri="$(get_upload_s3_uri "${output_gzip_uri}" "${aws_s3_access_creds_json_str}")"
+
+  if [[ "${OUTPUT_FORMAT}" == "BGZF" ]]; then
+    output_stages+=(
+      "$(pipeline_stage "compression" -- \
+        uv run python3 scripts/compress_bgzf.py \
+          --engine "${COMPRESSION_ENGINE}" \
+          --compression-level "${COMPRESSION_LEVEL}" \
+          --threads "${compression_threads}" \
+          --gzi-index "${gzi_index_file}" \
+          --read-index "${read_index_file}" \
+      )"
+      "$(probe_stage "compression" "${stage_summary_file_prefix}compression.json")"
+      "$(pipeline_stage "upload" -- \
+        uv run python3 scripts/upload_stream_multipart.py \
+          --concurrency "${upload_concurrency}" \
+          --sse AES256 \
+          --output-json "${gzip_stats_file}" \
+          "${upload_s3_uri}" \
+      )"
+    )
+  elif [[ "${OUTPUT_LAYOUT}" == "CHUNKED" ]]; then
+    # Chunks are uploaded as they are cut, so are not resumed if the task is retried
+    output_stages+=(
+      "$(pipeline_stage "chunkedCompressAndUpload" -- \
+        uv run python3 scripts/write_fastq_chunks.py \
+          --chunk-read-count "${CHUNK_READ_COUNT}" \
+          --engine "${COMPRESSION_ENGINE}" \
+          --level "${COMPRESSION_LEVEL}" \
+          --threads "${compression_threads}" \
+          --concurrency "${upload_concurrency}" \
+          --sse AES256 \
+          --output-json "${gzip_stats_file}" \
+          "${upload_s3_uri}" \
+      )"
+    )
+  else
+    output_stages+=(
+      "$(pipeline_stage "compressAndUpload" -- \
+        uv run python3 scripts/compress_upload_resumable.py \
+          --engine "${COMPRESSION_ENGINE}" \
+          --level "${COMPRESSION_LEVEL}" \
+          --threads "${compression_threads}" \
+          --concurrency "${upload_concurrency}" \
+          --sse AES256 \
+          --checkpoint-uri "${checkpoint_uri}" \
+          --output-json "${gzip_stats_file}" \
+          --stage-summary-json "${stage_summary_file_prefix}compressAndUpload.json" \
+          "${upload_s3_uri}" \
+      )"
+    )
+  fi
+}
+
+upload_bgzf_indexes(){
+  # Upload the BGZF indexes (written by the compression stage, see add_output_stages) alongside the output file
+  local output_gzip_uri="${1}"
+  local aws_s3_access_creds_json_str="${2}"
+  local file_prefix="${3}"
+
+  local gzi_index_file="${file_prefix}${GZI_INDEX_FILE}"
+  local read_index_file="${file_prefix}${READ_INDEX_FILE}"
+
+  echo_stderr "Uploading the block and read offset indexes of ${output_gzip_uri}"
+  upload_stdin_to_s3_uri \
+    "${output_gzip_uri}${GZI_INDEX_SUFFIX}" \
+    "${aws_s3_access_creds_json_str}" < "${gzi_index_file}"
+  upload_stdin_to_s3_uri \
+    "${output_gzip_uri}${READ_INDEX_SUFFIX}" \
+    "${aws_s3_access_creds_json_str}" < "${read_index_file}"
+  rm -f "${gzi_index_file}" "${read_index_file}"
+}
+
+run_interleaved_output(){
+  # Interleave the selected reads of R1 and R2 (from their interleave fifos, see run_ora_job),
+  # then compress and upload the interleaved reads to the output gzip uri
+  # Writes the gzip file size, md5sum and etag and the stage summaries of the interleaved output
+  # to the output json path, these are added to the metadata of both reads once all three jobs are complete
+  local r1_interleave_fifo="${1}"
+  local r2_interleave_fifo="${2}"
+  local output_gzip_uri="${3}"
+  local output_json_path="${4}"
+  local file_prefix="${5}"
+  local thread_budget="${6}"
+
+  local gzip_stats_file="${file_prefix}${GZIP_STATS_FILE}"
+  local checkpoint_uri="$(dirname "${OUTPUT_METADATA_URI}")/${CHECKPOINTS_PREFIX}${file_prefix}${ORA_INGEST_ID}.json"
+  local stage_summary_file_prefix="${file_prefix}${STAGE_SUMMARY_FILE_PREFIX}"
+  local stage_summaries_json_str
+  # The compression threads may be overridden by the job, but not beyond the thread budget
+  local compression_threads="$(( thread_budget > 1 ? thread_budget : 1 ))"
+  if [[ "${COMPRESSION_THREADS}" -gt "0" ]]; then
+    compression_threads="$(( COMPRESSION_THREADS < compression_threads ? COMPRESSION_THREADS : compression_threads ))"
+  fi
+  # Nothing is written to the interleave fifos while the reads are being sampled,
+  # so the interleaved output is only watched for stalls when the reads are not sampled
+  # A stall in either read job still fails the interleaved output, as that read then ends early
+  local stall_timeout_seconds="${STALL_TIMEOUT_SECONDS}"
+  if [[ "${SAMPLING}" == "true" && "${MAX_READS}" -gt "0" ]]; then
+    stall_timeout_seconds="0"
+  fi
+  local aws_s3_access_creds_json_str
+  local interleaved_pipeline_stages
+
+  aws_s3_access_creds_json_str="$(get_aws_s3_access_creds_json_str "${output_gzip_uri}")"
+
+  echo_stderr "Interleaving R1 and R2 in to ${output_gzip_uri}"
+  interleaved_pipeline_stages=(
+    "$(pipeline_stage "interleave" -- \
+      uv run python3 scripts/interleave_fastq.py \
+        --r1 "${r1_interleave_fifo}" \
+        --r2 "${r2_interleave_fifo}" \
+    )"
+    "$(probe_stage "interleave" "${stage_summary_file_prefix}interleave.json" --fastq)"
   )
-  echo_stderr "Stream and upload of decompression complete"
+  add_output_stages \
+    interleaved_pipeline_stages \
+    "${output_gzip_uri}" \
+    "${aws_s3_access_creds_json_str}" \
+    "${compression_threads}" \
+    "${UPLOAD_CONCURRENCY}" \
+    "${checkpoint_uri}" \
+    "${file_prefix}"
 
-  # Write the (linked ora ingest id and output uri location to a file
-  jq --null-input --raw-output \
-    --arg gzip_file_uri "${OUTPUT_GZIP_URI}" \
-    --arg ingest_id "${ORA_INGEST_ID}" \
+  STALL_TIMEOUT_SECONDS="${stall_timeout_seconds}" \
+  UPLOAD_AWS_CREDENTIALS_JSON="${aws_s3_access_creds_json_str}" \
+  run_pipeline "${file_prefix}" "${interleaved_pipeline_stages[@]}" < /dev/null
+  echo_stderr "Interleave and upload of ${output_gzip_uri} complete"
+
+  if [[ "${OUTPUT_FORMAT}" == "BGZF" ]]; then
+    upload_bgzf_indexes "${output_gzip_uri}" "${aws_s3_access_creds_json_str}" "${file_prefix}"
+  fi
+
+  stage_summaries_json_str="$( \
+    combine_stage_summaries \
+      "${stage_summary_file_prefix}" \
+      "interleave" "compression" "compressAndUpload" \
+  )"
+
+  jq --raw-output \
+    --argjson stage_summaries "${stage_summaries_json_str}" \
     '
       {
-        "ingestId": $ingest_id,
-        "gzipFileUri": $gzip_file_uri
-      }
-    ' > output.json
+        "gzipFileSizeInBytes": .byteCount,
+        "gzipFileEtag": .etag,
+        "stageSummaries": $stage_summaries
+      } +
+      # A resumed upload has no md5sum
+      if .md5sum != null then
+        {
+          "gzipMd5sum": .md5sum
+        }
+      else
+        {}
+      end
+    ' < "${gzip_stats_file}" > "${output_json_path}"
 
-  echo_stderr "Uploading metadata"
-  aws s3 cp \
-    --sse=AES256 \
-    output.json \
-    "${OUTPUT_METADATA_URI}"
-  echo_stderr "Metadata upload complete"
-
-  # Remove the output.json file
-  rm -f output.json
-
-elif [[ "${JOB_TYPE}" == "GZIP_FILESIZE_CALCULATION" ]]; then
-  # Download the file and pipe through orad
-  # to calculate the gzipped file size
-  echo_stderr "Calculating the gzipped file size"
-  gzip_file_size_in_bytes="$( \
-    ( \
-      wget \
-      --quiet \
-      --output-document /dev/stdout \
-      "${presigned_url}" || \
-      true
-    ) | \
-    (
-      /usr/local/bin/orad \
-        --raw \
-        --stdout \
-        --ora-reference "${ORADATA_PATH}" \
-        - 2>"${ORA_LOGS_FILE}" || \
-      true
-    ) | \
-    (
-        # If total read count is set we (and more than the max reads to downlaod)
-        # we can instead calculate the gzipped file size
-        # By only reading the first N reads
-        # Then calculating the gzipped file size from the ratio of the total read count
-        # And the gzipped file size
-      if [[ "${TOTAL_READ_COUNT}" -gt "${MAX_READS_IF_TOTAL_READ_COUNT_IS_SET}" ]]; then
-        head -n "$(( "${MAX_READS_IF_TOTAL_READ_COUNT_IS_SET}" * 4 ))"
+  rm -f "${gzip_stats_file}"
+}
+
+run_ora_job(){
+  # Run the job for a single ora file
+  # Writes the metadata for the ora file to the output json path
+  # In the interleaved layout, the selected reads are written to stdout (the interleave fifo of the read)
+  # rather than being compressed and uploaded (see run_interleaved_output)
+  local input_ora_uri="${1}"
+  local ora_ingest_id="${2}"
+  local output_gzip_uri="${3}"
+  local output_json_path="${4}"
+  # Prefix for any intermediate files, so that concurrent jobs do not overwrite each other
+  local file_prefix="${5}"
+  # Number of threads this job may use
+  local thread_budget="${6}"
+
+  local ora_logs_file="${file_prefix}${ORA_LOGS_FILE}"
+  local raw_stats_file="${file_prefix}${RAW_STATS_FILE}"
+  local gzip_stats_file="${file_prefix}${GZIP_STATS_FILE}"
+  local gzip_stats_json_str="null"
+  local quality_binning_stats_file="${file_prefix}${QUALITY_BINNING_STATS_FILE}"
+  local quality_binning_stats_json_str="null"
+  # Upload checkpoints sit alongside the job metadata (and are removed once the upload is complete)
+  local checkpoint_uri="$(dirname "${OUTPUT_METADATA_URI}")/${CHECKPOINTS_PREFIX}${ora_ingest_id}.json"
+  local stage_summary_file_prefix="${file_prefix}${STAGE_SUMMARY_FILE_PREFIX}"
+  local stage_summaries_json_str
+  # Split the thread budget between the sampler and pigz
+  # The stats calculation has no sampler, so pigz can take most of the budget
+  local sampler_processes="$(( thread_budget / 2 > 1 ? thread_budget / 2 : 1 ))"
+  local pigz_processes="$(( thread_budget / 2 > 1 ? thread_budget / 2 : 1 ))"
+  local stats_pigz_processes="$(( thread_budget * 3 / 4 > 1 ? thread_budget * 3 / 4 : 1 ))"
+  # The compression threads may be overridden by the job, but not beyond the thread budget
+  local compression_threads="${pigz_processes}"
+  if [[ "${COMPRESSION_THREADS}" -gt "0" ]]; then
+    compression_threads="$(( COMPRESSION_THREADS < thread_budget ? COMPRESSION_THREADS : thread_budget ))"
+  fi
+  local download_connections="${DOWNLOAD_CONNECTIONS}"
+  local upload_concurrency="${UPLOAD_CONCURRENCY}"
+  local thread_allocation_json_str
+  local sampling="${SAMPLING}"
+  local presigned_url
+  local line_count
+  local aws_s3_access_creds_json_str=""
+  local gzip_file_size_in_bytes
+  local md5sum_str
+  local read_count
+
+  presigned_url="$(get_presigned_url_from_ora_uri "${input_ora_uri}")"
+
+  # Download + Upload the ora file as a gzipped compressed file
+  if [[ "${JOB_TYPE}" == "ORA_DECOMPRESSION" ]]; then
+    # Get the sampling parameter
+    # The read sampler returns exactly MAX_READS reads, selected by a seeded hash of each read name
+    # So we don't need the total read count, but if we have it we can skip sampling
+    # when there are fewer reads than the maximum reads
+    # (the read count is 'null' or -1 when the fastq has no read count)
+    if [[ "${sampling}" == "true" ]]; then
+      if [[ "${MAX_READS}" -lt "1" ]]; then
+        echo_stderr "Turning off sampling as max reads is not set"
+        sampling="false"
+      elif [[ "${TOTAL_READ_COUNT:-}" =~ ^[0-9]+$ && "${TOTAL_READ_COUNT}" -le "${MAX_READS}" ]]; then
+        echo_stderr "Turning off sampling as total read count is less than the maximum reads"
+        sampling="false"
       else
-        cat
+        echo_stderr "Sampling exactly ${MAX_READS} reads"
       fi
-    ) | \
-    (
-      pigz \
-        --stdout \
-        --fast
-    ) | \
-    wc -c
-  )"
+    fi
 
-  # Now if the total read count is set, we can calculate the gzipped file size
-  # From the ratio of the total read count
-  if [[ "${TOTAL_READ_COUNT}" -gt "${MAX_READS_IF_TOTAL_READ_COUNT_IS_SET}" ]]; then
-    gzip_file_size_in_bytes="$(( gzip_file_size_in_bytes * TOTAL_READ_COUNT / MAX_READS_IF_TOTAL_READ_COUNT_IS_SET ))"
-  fi
-  echo_stderr "Gzipped file size is ${gzip_file_size_in_bytes} bytes"
+    # Measure each stage on the head of the ora file, then allocate the thread budget between them
+    # If the pilot fails for any reason, we keep the static allocation
+    if [[ "${THREAD_ALLOCATION}" == "ADAPTIVE" ]]; then
+      echo_stderr "Running the pilot of ${input_ora_uri} to allocate ${thread_budget} threads"
+      if thread_allocation_json_str="$( \
+        uv run python3 scripts/tune_pipeline.py \
+          --thread-budget "${thread_budget}" \
+          --ora-reference "${ORADATA_PATH}" \
+          --orad-path "${ORAD_PATH}" \
+          --engine "${COMPRESSION_ENGINE}" \
+          --level "${COMPRESSION_LEVEL}" \
+          --compression-threads "${COMPRESSION_THREADS}" \
+          --sampling-max-reads "$( if [[ "${sampling}" == "true" ]]; then echo "${MAX_READS}"; else echo "-1"; fi )" \
+          "${presigned_url}" \
+      )"; then
+        download_connections="$(jq --raw-output '.downloadConnections' <<< "${thread_allocation_json_str}")"
+        sampler_processes="$(jq --raw-output '.samplerProcesses' <<< "${thread_allocation_json_str}")"
+        compression_threads="$(jq --raw-output '.compressionThreads' <<< "${thread_allocation_json_str}")"
+        upload_concurrency="$(jq --raw-output '.uploadConcurrency' <<< "${thread_allocation_json_str}")"
+      else
+        echo_stderr "Warning! The pilot of ${input_ora_uri} failed, falling back to the static thread allocation"
+      fi
+    fi
+    echo_stderr "Using ${download_connections} download connections, ${sampler_processes} sampler processes, ${compression_threads} compression threads and ${upload_concurrency} concurrent uploads for ${input_ora_uri}"
 
-  jq --null-input --raw-output \
-    --argjson gzip_file_size_in_bytes "${gzip_file_size_in_bytes}" \
-    --arg ingest_id "${ORA_INGEST_ID}" \
-    '
-      {
-        "ingestId": $ingest_id,
-        "gzipFileSizeInBytes": $gzip_file_size_in_bytes
-      }
-    ' > output.json
+    # Get the linecount parameter
+    if [[ "${MAX_READS}" -gt "0" ]]; then
+      line_count="$( \
+        jq --null-input --raw-output \
+          --argjson maxReads "${MAX_READS}" \
+          '
+            $maxReads * 4
+          ' \
+      )"
+    fi
 
-  echo_stderr "Uploading metadata"
-  aws s3 cp \
-    --sse=AES256 \
-    output.json \
-    "${OUTPUT_METADATA_URI}"
-  echo_stderr "Metadata upload complete"
+    # Get the icav2 accession credentials if required
+    # In the interleaved layout, the interleaved output job uploads the output
+    if [[ "${OUTPUT_LAYOUT}" != "INTERLEAVED" ]]; then
+      aws_s3_access_creds_json_str="$(get_aws_s3_access_creds_json_str "${output_gzip_uri}")"
+    fi
 
-  # Remove the output.json file
-  rm -f output.json
+    # Use a file descriptor to emulate the ora file
+    # Write the gzipped ora file to stdout
+    echo_stderr "Starting stream and decompression of ${input_ora_uri}"
+    # Prefix with qemu-x86_64-static
+    # when using the orad x86_64 binary
+    # but we have the arm binary
+    # qemu-x86_64-static \  # Uncomment this line!
+    # When using qemu-x86_64-static, piping through
+    # the downloader may be difficult, and instead may need to use
+    # a <() redirection
 
-elif [[ "${JOB_TYPE}" == "RAW_MD5SUM_CALCULATION" ]]; then
+    # Steps involved in this massive pipeline (And we have the thread budget to play with, 8 threads for a single file)
+    # The counts below are the static allocation, the adaptive allocation sizes each stage from the pilot
+    # 1. Download the file using concurrent range requests (1 thread, download_connections connections)
+    # 2. Pipe the file to orad to decompress it (1 threads)
+    # 3. If sampling is enabled, sample exactly max reads using the read name hash sampler (half the thread budget)
+    # 4. If max reads is set, limit the number of reads to the max reads (1 thread)
+    # 5. Collect the raw md5sum and read count of the output as free by-products (1 thread)
+    #    If quality binning is set, bin the quality scores of the reads (1 thread),
+    #    measuring the gzip size reduction on a sample of the blocks
+    # 6. If the output format is GZIP, compress and upload with the resumable uploader
+    #    (half the thread budget for compression, unless set by the job, upload_concurrency parts at a time)
+    #    Each completed part is checkpointed to the checkpoint uri,
+    #    so if the task is retried, the upload resumes from the last checkpointed part
+    #    If the output layout is CHUNKED, the stream is instead cut in to chunks of CHUNK_READ_COUNT reads,
+    #    each compressed and uploaded as soon as it has all of its reads
+    # 7. If the output format is BGZF, compress with the BGZF writer, which also writes the .gzi and read offset indexes
+    #    Collect the gzip file size of the output as a free by-product
+    #    and upload to S3 with the streaming multipart uploader
+    # If the output layout is INTERLEAVED, steps 6 to 8 are run on the interleaved R1 and R2 reads instead
+    # (see run_interleaved_output), and the selected reads are written to stdout
+    # Part sizes grow as the upload progresses, so we don't need to know the gzip file size up front
+    # 8a. If the output gzip uri is not in the S3_DECOMPRESSION_BUCKET, upload using icav2 credentials
+    # 8b. If the output gzip uri is in the S3_DECOMPRESSION_BUCKET, upload using the task role credentials
+    # Each stage boundary is probed (see probe_stage), the resumable uploader measures its own stages
+    # Each stage is run (and watched) by the pipeline supervisor (see run_pipeline),
+    # the stages upstream of head may be stopped by a broken pipe once head has its reads
+    pipeline_stages=(
+      "$(download_stage "${presigned_url}" "${download_connections}")"
+      "$(probe_stage "download" "${stage_summary_file_prefix}download.json")"
+      "$(orad_stage "${ora_logs_file}")"
+      "$(probe_stage "orad" "${stage_summary_file_prefix}orad.json" --fastq)"
+    )
+    if [[ "${sampling}" == "true" ]]; then
+      pipeline_stages+=(
+        "$(pipeline_stage "sampling" -- \
+          uv run python3 scripts/sample_fastq_reads.py \
+            --seed "${RANDOM_SAMPLING_SEED}" \
+            --processes "${sampler_processes}" \
+            --max-reads "${MAX_READS}" \
+        )"
+      )
+    fi
+    if [[ "${MAX_READS}" -gt "0" ]]; then
+      pipeline_stages+=(
+        "$(pipeline_stage "maxReads" --closes-input-early -- \
+          head -n "${line_count}" \
+        )"
+      )
+    fi
+    pipeline_stages+=(
+      "$(probe_stage "readSelection" "${stage_summary_file_prefix}readSelection.json" --fastq)"
+      "$(pipeline_stage "rawStats" -- \
+        uv run python3 scripts/calculate_stream_stats.py \
+          --passthrough \
+          --output-json "${raw_stats_file}" \
+      )"
+    )
+    if [[ "${QUALITY_BINNING}" != "NONE" ]]; then
+      pipeline_stages+=(
+        "$(pipeline_stage "qualityBinning" -- \
+          uv run python3 scripts/bin_quality_scores.py \
+            --scheme "${QUALITY_BINNING}" \
+            --output-json "${quality_binning_stats_file}" \
+        )"
+        "$(probe_stage "qualityBinning" "${stage_summary_file_prefix}qualityBinning.json" --fastq)"
+      )
+    fi
+    if [[ "${OUTPUT_LAYOUT}" != "INTERLEAVED" ]]; then
+      add_output_stages \
+        pipeline_stages \
+        "${output_gzip_uri}" \
+        "${aws_s3_access_creds_json_str}" \
+        "${compression_threads}" \
+        "${upload_concurrency}" \
+        "${checkpoint_uri}" \
+        "${file_prefix}"
+    fi
 
-  # Download the file and pipe through orad
-  echo_stderr "Calculating the raw md5sum"
-  md5sum_str="$( \
-    wget \
-      --quiet \
-      --output-document /dev/stdout \
-      "${presigned_url}" | \
-    /usr/local/bin/orad \
-      --raw \
-      --stdout \
-      --ora-reference "${ORADATA_PATH}" \
-      - 2>"${ORA_LOGS_FILE}" | \
-    md5sum | \
-    cut -d' ' -f1
-  )"
+    UPLOAD_AWS_CREDENTIALS_JSON="${aws_s3_access_creds_json_str}" \
+    run_pipeline "${file_prefix}" "${pipeline_stages[@]}" < /dev/null
+    echo_stderr "Stream and upload of ${input_ora_uri} decompression complete"
 
-  # Write the md5sum (and linked ora ingest id) to a file
-  jq --null-input --raw-output \
-    --arg md5sum_str "${md5sum_str}" \
-    --arg ingest_id "${ORA_INGEST_ID}" \
-    '
-      {
-        "ingestId": $ingest_id,
-        "rawMd5sum": $md5sum_str
-      }
-    ' > output.json
+    # Upload the BGZF indexes alongside the output file
+    if [[ "${OUTPUT_FORMAT}" == "BGZF" && "${OUTPUT_LAYOUT}" != "INTERLEAVED" ]]; then
+      upload_bgzf_indexes "${output_gzip_uri}" "${aws_s3_access_creds_json_str}" "${file_prefix}"
+    fi
 
-  echo_stderr "Uploading metadata"
-  aws s3 cp \
-    --sse=AES256 \
-    output.json \
-    "${OUTPUT_METADATA_URI}"
-  echo_stderr "Metadata upload complete"
-
-  # Remove the output.json file
-  rm -f output.json
-
-elif [[ "${JOB_TYPE}" == "READ_COUNT_CALCULATION" ]]; then
-  # Download the file and pipe through orad
-  echo_stderr "Calculating the read count"
-  line_count="$( \
-    wget \
-      --quiet \
-      --output-document /dev/stdout \
-      "${presigned_url}" | \
-    /usr/local/bin/orad \
-      --raw \
-      --stdout \
-      --ora-reference "${ORADATA_PATH}" \
-      - 2>"${ORA_LOGS_FILE}" | \
-    wc -l
-  )"
+    # Collect the stage summaries
+    stage_summaries_json_str="$( \
+      combine_stage_summaries \
+        "${stage_summary_file_prefix}" \
+        "download" "orad" "readSelection" "qualityBinning" "compression" "compressAndUpload" \
+    )"
 
-  # Calculate the read count
-  read_count="$(( line_count / 4 ))"
+    # The interleaved output job writes the gzip stats of the interleaved output
+    if [[ -f "${gzip_stats_file}" ]]; then
+      gzip_stats_json_str="$(jq --compact-output '.' < "${gzip_stats_file}")"
+    fi
+    if [[ -f "${quality_binning_stats_file}" ]]; then
+      quality_binning_stats_json_str="$(jq --compact-output '.' < "${quality_binning_stats_file}")"
+    fi
 
-  # Write the read count (and linked ora ingest id) to a file
-  jq --null-input --raw-output \
-    --argjson read_count "${read_count}" \
-    --arg fastq_id "${FASTQ_ID}" \
+    # Write the (linked ora ingest id and output uri location to a file
+    # Along with the statistics of the output file that we collected for free along the way
+    # In the CHUNKED layout, the gzip file uri is the first chunk, and each chunk is listed with its reads
+    # If quality binning is set, the binning summary holds the gzip size reduction (measured on a sample of the blocks),
+    # and the estimated gzip file size had the reads not been binned
+    jq --null-input --raw-output \
+      --arg gzip_file_uri "${output_gzip_uri}" \
+      --arg gzip_file_uri_dir "$(dirname "${output_gzip_uri}")/" \
+      --arg ingest_id "${ora_ingest_id}" \
+      --arg output_format "${OUTPUT_FORMAT}" \
+      --arg output_layout "${OUTPUT_LAYOUT}" \
+      --arg gzi_index_suffix "${GZI_INDEX_SUFFIX}" \
+      --arg read_index_suffix "${READ_INDEX_SUFFIX}" \
+      --slurpfile raw_stats "${raw_stats_file}" \
+      --arg quality_binning "${QUALITY_BINNING}" \
+      --argjson gzip_stats "${gzip_stats_json_str}" \
+      --argjson quality_binning_stats "${quality_binning_stats_json_str}" \
+      --argjson stage_summaries "${stage_summaries_json_str}" \
+      '
+        {
+          "ingestId": $ingest_id,
+          "gzipFileUri": $gzip_file_uri,
+          "outputFormat": $output_format,
+          "outputLayout": $output_layout,
+          "qualityBinning": $quality_binning,
+          "rawMd5sum": $raw_stats[0].rawMd5sum,
+          "readCount": $raw_stats[0].readCount
+        } +
+        if $gzip_stats != null then
+          {
+            "gzipFileSizeInBytes": $gzip_stats.byteCount
+          }
+        else
+          {}
+        end +
+        if $gzip_stats.etag != null then
+          {
+            "gzipFileEtag": $gzip_stats.etag
+          }
+        else
+          {}
+        end +
+        # A resumed upload has no md5sum
+        if $gzip_stats.md5sum != null then
+          {
+            "gzipMd5sum": $gzip_stats.md5sum
+          }
+        else
+          {}
+        end +
+        if $output_layout == "CHUNKED" then
+          {
+            "chunkReadCount": $gzip_stats.chunkReadCount,
+            "chunks": [
+              $gzip_stats.chunks[] |
+              {
+                "chunkNumber": .chunkNumber,
+                "gzipFileUri": ($gzip_file_uri_dir + .fileName),
+                "firstReadNumber": .firstReadNumber,
+                "readCount": .readCount,
+                "gzipFileSizeInBytes": .gzipFileSizeInBytes,
+                "gzipMd5sum": .gzipMd5sum,
+                "gzipFileEtag": .gzipFileEtag
+              }
+            ]
+          }
+        else
+          {}
+        end +
+        if $output_format == "BGZF" then
+          {
+            "gziIndexUri": ($gzip_file_uri + $gzi_index_suffix),
+            "readIndexUri": ($gzip_file_uri + $read_index_suffix)
+          }
+        else
+          {}
+        end +
+        if $quality_binning_stats != null then
+          {
+            "qualityBinningSummary": (
+              {
+                "binnedMd5sum": $quality_binning_stats.binnedMd5sum,
+                "qualityValueCount": $quality_binning_stats.qualityValueCount,
+                "changedQualityValueCount": $quality_binning_stats.changedQualityValueCount,
+                "gzipSizeReduction": $quality_binning_stats.gzipSizeReduction
+              } +
+              if $gzip_stats != null and $quality_binning_stats.gzipSizeReduction != null then
+                {
+                  "unbinnedGzipFileSizeInBytesEstimate": (
+                    $gzip_stats.byteCount / (1 - $quality_binning_stats.gzipSizeReduction) | round
+                  )
+                }
+              else
+                {}
+              end
+            )
+          }
+        else
+          {}
+        end +
+        {
+          "stageSummaries": $stage_summaries
+        }
+      ' > "${output_json_path}"
+
+    # Remove the intermediate stats files
+    rm -f "${raw_stats_file}" "${gzip_stats_file}" "${quality_binning_stats_file}"
+
+  elif [[ "${JOB_TYPE}" == "GZIP_FILESIZE_CALCULATION" ]] && \
+       [[ "${TOTAL_READ_COUNT:-}" =~ ^[0-9]+$ && "${TOTAL_READ_COUNT}" -gt "${MIN_READS_TO_ESTIMATE_GZIP_FILE_SIZE}" ]]; then
+    # Download the file and pipe through orad
+    # to estimate the gzipped file size
+    # Rather than compressing the whole file, we compress evenly spaced blocks from across the entire file
+    # in parallel, and stop compressing early once the confidence interval of the estimate is tight enough
+    echo_stderr "Estimating the gzipped file size of ${input_ora_uri}"
+    run_pipeline \
+      "${file_prefix}" \
+      "$(download_stage "${presigned_url}" "${DOWNLOAD_CONNECTIONS}")" \
+      "$(orad_stage "${ora_logs_file}")" \
+      "$(pipeline_stage "estimateGzipFileSize" -- \
+        uv run python3 scripts/estimate_gzip_file_size.py \
+          --total-read-count "${TOTAL_READ_COUNT}" \
+          --threads "${thread_budget}" \
+          --output-json "${gzip_stats_file}" \
+      )" < /dev/null
+
+    echo_stderr "Estimated gzipped file size of ${input_ora_uri} is $( \
+      jq --raw-output \
+        '"\(.gzipFileSizeInBytes) bytes (\(.confidenceLevel * 100)% CI \(.gzipFileSizeInBytesLowerBound) - \(.gzipFileSizeInBytesUpperBound))"' \
+        < "${gzip_stats_file}" \
+    )"
+
+    jq --raw-output \
+      --arg ingest_id "${ora_ingest_id}" \
       '
         {
-          "fastqId": $fastq_id,
-          "readCount": $read_count
+          "ingestId": $ingest_id,
+          "gzipFileSizeInBytes": .gzipFileSizeInBytes,
+          "gzipFileSizeInBytesLowerBound": .gzipFileSizeInBytesLowerBound,
+          "gzipFileSizeInBytesUpperBound": .gzipFileSizeInBytesUpperBound,
+          "confidenceLevel": .confidenceLevel
         }
-      ' > output.json
+      ' < "${gzip_stats_file}" > "${output_json_path}"
 
-  echo_stderr "Uploading metadata"
-  aws s3 cp \
-    --sse=AES256 \
-    output.json \
-    "${OUTPUT_METADATA_URI}"
-  echo_stderr "Metadata upload complete"
+    # Remove the intermediate stats file
+    rm -f "${gzip_stats_file}"
+
+  elif [[ "${JOB_TYPE}" == "GZIP_FILESIZE_CALCULATION" ]]; then
+    # Download the file and pipe through orad
+    # to calculate the (exact) gzipped file size
+    echo_stderr "Calculating the gzipped file size of ${input_ora_uri}"
+    gzip_file_size_in_bytes="$( \
+      run_pipeline \
+        "${file_prefix}" \
+        "$(download_stage "${presigned_url}" "${DOWNLOAD_CONNECTIONS}")" \
+        "$(orad_stage "${ora_logs_file}")" \
+        "$(pipeline_stage "compression" -- \
+          pigz \
+            --stdout \
+            --fast \
+            --processes "${thread_budget}" \
+        )" \
+        "$(pipeline_stage "byteCount" -- wc -c)" < /dev/null \
+    )"
+    echo_stderr "Gzipped file size of ${input_ora_uri} is ${gzip_file_size_in_bytes} bytes"
+
+    jq --null-input --raw-output \
+      --argjson gzip_file_size_in_bytes "${gzip_file_size_in_bytes}" \
+      --arg ingest_id "${ora_ingest_id}" \
+      '
+        {
+          "ingestId": $ingest_id,
+          "gzipFileSizeInBytes": $gzip_file_size_in_bytes
+        }
+      ' > "${output_json_path}"
+
+  elif [[ "${JOB_TYPE}" == "RAW_MD5SUM_CALCULATION" ]]; then
+
+    # Download the file and pipe through orad
+    echo_stderr "Calculating the raw md5sum of ${input_ora_uri}"
+    md5sum_str="$( \
+      run_pipeline \
+        "${file_prefix}" \
+        "$(download_stage "${presigned_url}" "${DOWNLOAD_CONNECTIONS}")" \
+        "$(orad_stage "${ora_logs_file}")" \
+        "$(pipeline_stage "md5sum" -- md5sum)" < /dev/null | \
+      cut -d' ' -f1
+    )"
+
+    # Write the md5sum (and linked ora ingest id) to a file
+    jq --null-input --raw-output \
+      --arg md5sum_str "${md5sum_str}" \
+      --arg ingest_id "${ora_ingest_id}" \
+      '
+        {
+          "ingestId": $ingest_id,
+          "rawMd5sum": $md5sum_str
+        }
+      ' > "${output_json_path}"
+
+  elif [[ "${JOB_TYPE}" == "READ_COUNT_CALCULATION" ]]; then
+    # Download the file and pipe through orad
+    echo_stderr "Calculating the read count of ${input_ora_uri}"
+    line_count="$( \
+      run_pipeline \
+        "${file_prefix}" \
+        "$(download_stage "${presigned_url}" "${DOWNLOAD_CONNECTIONS}")" \
+        "$(orad_stage "${ora_logs_file}")" \
+        "$(pipeline_stage "lineCount" -- wc -l)" < /dev/null \
+    )"
+
+    # Calculate the read count
+    read_count="$(( line_count / 4 ))"
+
+    # Write the read count (and linked ora ingest id) to a file
+    jq --null-input --raw-output \
+      --argjson read_count "${read_count}" \
+      --arg fastq_id "${FASTQ_ID}" \
+        '
+          {
+            "fastqId": $fastq_id,
+            "readCount": $read_count
+          }
+        ' > "${output_json_path}"
+
+  elif [[ "${JOB_TYPE}" == "MULTI_STATS_CALCULATION" ]]; then
+    # Download the file and pipe through orad once
+    # Then calculate the raw md5sum, read count and gzip file size from the single stream
+    echo_stderr "Calculating the raw md5sum, read count and gzip file size of ${input_ora_uri}"
+    run_pipeline \
+      "${file_prefix}" \
+      "$(download_stage "${presigned_url}" "${DOWNLOAD_CONNECTIONS}")" \
+      "$(orad_stage "${ora_logs_file}")" \
+      "$(pipeline_stage "multiStats" -- \
+        uv run python3 scripts/calculate_stream_stats.py \
+          --gzip-size \
+          --pigz-processes "${stats_pigz_processes}" \
+          --output-json "${raw_stats_file}" \
+      )" < /dev/null
+
+    # Write the statistics (and linked ora ingest id) to a file
+    jq --raw-output \
+      --arg ingest_id "${ora_ingest_id}" \
+      '
+        {
+          "ingestId": $ingest_id,
+          "rawMd5sum": .rawMd5sum,
+          "readCount": .readCount,
+          "gzipFileSizeInBytes": .gzipFileSizeInBytes
+        }
+      ' < "${raw_stats_file}" > "${output_json_path}"
+
+    # Remove the intermediate stats file
+    rm -f "${raw_stats_file}"
+
+  elif [[ "${JOB_TYPE}" == "FASTQ_STATS" ]]; then
+    # Download the file and pipe through orad once
+    # Then calculate the read length histogram, base composition, gc content and quality statistics of the stream
+    echo_stderr "Calculating the fastq statistics of ${input_ora_uri}"
+    run_pipeline \
+      "${file_prefix}" \
+      "$(download_stage "${presigned_url}" "${DOWNLOAD_CONNECTIONS}")" \
+      "$(orad_stage "${ora_logs_file}")" \
+      "$(pipeline_stage "fastqStats" -- \
+        uv run python3 scripts/calculate_fastq_stats.py \
+          --output-json "${raw_stats_file}" \
+      )" < /dev/null
+
+    # Write the statistics (and linked ora ingest id) to a file
+    jq --raw-output \
+      --arg ingest_id "${ora_ingest_id}" \
+      '
+        {
+          "ingestId": $ingest_id
+        } + .
+      ' < "${raw_stats_file}" > "${output_json_path}"
+
+    # Remove the intermediate stats file
+    rm -f "${raw_stats_file}"
+
+  else
+    echo_stderr "Error! Unknown JOB_TYPE: ${JOB_TYPE}"
+    return 1
+
+  fi
+}
+
+# Run the job
+# In paired mode, R1 and R2 are run concurrently, splitting the thread budget between them,
+# and a single metadata document (a list with one item per read) is written for both reads.
+# Read count calculations only ever need R1, so are never run in paired mode.
+# Jobs are always run in the background (a function run as part of a condition would ignore set -e),
+# so that if a job fails, any pipeline failures can be uploaded to the metadata uri before we exit.
+if [[ -n "${INPUT_R2_ORA_URI:-}" && "${JOB_TYPE}" != "READ_COUNT_CALCULATION" ]]; then
+  echo_stderr "Running in paired mode, decompressing R1 and R2 concurrently"
+  ora_logs_file_list=( "r1_${ORA_LOGS_FILE}" "r2_${ORA_LOGS_FILE}" )
+
+  if [[ "${JOB_TYPE}" == "ORA_DECOMPRESSION" && "${OUTPUT_LAYOUT}" == "INTERLEAVED" ]]; then
+    # R1 and R2 write their selected reads to their interleave fifos, which are read by the interleaved output job
+    # R1 and R2 open their fifos as they start, and block until the interleaved output job opens the other end
+    # The interleaved output job takes the compression share of the thread budget
+    r1_interleave_fifo="r1_${INTERLEAVE_FIFO_FILE}"
+    r2_interleave_fifo="r2_${INTERLEAVE_FIFO_FILE}"
+    rm -f "${r1_interleave_fifo}" "${r2_interleave_fifo}"
+    mkfifo "${r1_interleave_fifo}" "${r2_interleave_fifo}"
+
+    run_interleaved_output \
+      "${r1_interleave_fifo}" \
+      "${r2_interleave_fifo}" \
+      "${INTERLEAVED_OUTPUT_GZIP_URI}" \
+      "${INTERLEAVED_FILE_PREFIX}output.json" \
+      "${INTERLEAVED_FILE_PREFIX}" \
+      "$(( THREAD_BUDGET / 2 ))" &
+    interleaved_pid="$!"
+
+    run_ora_job \
+      "${INPUT_ORA_URI}" \
+      "${ORA_INGEST_ID}" \
+      "${INTERLEAVED_OUTPUT_GZIP_URI}" \
+      "r1_output.json" \
+      "r1_" \
+      "$(( THREAD_BUDGET / 2 ))" > "${r1_interleave_fifo}" &
+    r1_pid="$!"
+
+    run_ora_job \
+      "${INPUT_R2_ORA_URI}" \
+      "${R2_ORA_INGEST_ID}" \
+      "${INTERLEAVED_OUTPUT_GZIP_URI}" \
+      "r2_output.json" \
+      "r2_" \
+      "$(( THREAD_BUDGET / 2 ))" > "${r2_interleave_fifo}" &
+    r2_pid="$!"
+  else
+    run_ora_job \
+      "${INPUT_ORA_URI}" \
+      "${ORA_INGEST_ID}" \
+      "${OUTPUT_GZIP_URI}" \
+      "r1_output.json" \
+      "r1_" \
+      "$(( THREAD_BUDGET / 2 ))" &
+    r1_pid="$!"
 
-  # Remove the output.json file
-  rm -f output.json
+    run_ora_job \
+      "${INPUT_R2_ORA_URI}" \
+      "${R2_ORA_INGEST_ID}" \
+      "${R2_OUTPUT_GZIP_URI}" \
+      "r2_output.json" \
+      "r2_" \
+      "$(( THREAD_BUDGET / 2 ))" &
+    r2_pid="$!"
+  fi
+
+  # If the interleaved output job fails before opening the interleave fifos, R1 and R2 are still waiting to open them,
+  # so we open and close the reading end of each fifo to release them, their next write then fails on a broken pipe
+  interleaved_exit_code=0
+  if [[ -v interleaved_pid ]]; then
+    wait "${interleaved_pid}" || interleaved_exit_code="$?"
+    if [[ "${interleaved_exit_code}" -ne "0" ]]; then
+      for interleave_fifo in "${r1_interleave_fifo}" "${r2_interleave_fifo}"; do
+        exec {interleave_fifo_fd}<>"${interleave_fifo}"
+        exec {interleave_fifo_fd}>&-
+      done
+    fi
+  fi
+
+  # Wait on both reads before checking either, so we never leave a job running in the background
+  r1_exit_code=0
+  wait "${r1_pid}" || r1_exit_code="$?"
+  r2_exit_code=0
+  wait "${r2_pid}" || r2_exit_code="$?"
 
+  if [[ "${r1_exit_code}" -ne "0" || "${r2_exit_code}" -ne "0" || "${interleaved_exit_code}" -ne "0" ]]; then
+    echo_stderr "Error! Paired job failed (R1 exit code: ${r1_exit_code}, R2 exit code: ${r2_exit_code}, interleaved output exit code: ${interleaved_exit_code})"
+    # Failures of the interleaved output job are reported against the R1 ingest id
+    upload_failure_metadata \
+      "${ORA_INGEST_ID}" "r1_" \
+      "${R2_ORA_INGEST_ID}" "r2_" \
+      "${ORA_INGEST_ID}" "${INTERLEAVED_FILE_PREFIX}"
+    exit 1
+  fi
+
+  # Combine the R1 and R2 metadata into a single document
+  # In the interleaved layout, each read also gets the gzip file size, md5sum and etag
+  # and the stage summaries of the interleaved output
+  if [[ -v interleaved_pid ]]; then
+    jq --slurp --raw-output \
+      --slurpfile interleaved_output "${INTERLEAVED_FILE_PREFIX}output.json" \
+      '
+        map(
+          . + {
+            "gzipFileSizeInBytes": $interleaved_output[0].gzipFileSizeInBytes,
+            "gzipFileEtag": $interleaved_output[0].gzipFileEtag,
+            "stageSummaries": (.stageSummaries + $interleaved_output[0].stageSummaries)
+          } +
+          if $interleaved_output[0].gzipMd5sum != null then
+            {
+              "gzipMd5sum": $interleaved_output[0].gzipMd5sum
+            }
+          else
+            {}
+          end
+        )
+      ' \
+      "r1_output.json" "r2_output.json" > output.json
+    rm -f "${INTERLEAVED_FILE_PREFIX}output.json" "${r1_interleave_fifo}" "${r2_interleave_fifo}"
+  else
+    jq --slurp --raw-output \
+      '.' \
+      "r1_output.json" "r2_output.json" > output.json
+  fi
+  rm -f "r1_output.json" "r2_output.json"
 else
-  echo_stderr "Error! Unknown JOB_TYPE: ${JOB_TYPE}"
-  exit 1
+  ora_logs_file_list=( "${ORA_LOGS_FILE}" )
+
+  run_ora_job \
+    "${INPUT_ORA_URI}" \
+    "${ORA_INGEST_ID}" \
+    "${OUTPUT_GZIP_URI}" \
+    "output.json" \
+    "" \
+    "${THREAD_BUDGET}" &
+  job_pid="$!"
 
+  job_exit_code=0
+  wait "${job_pid}" || job_exit_code="$?"
+
+  if [[ "${job_exit_code}" -ne "0" ]]; then
+    echo_stderr "Error! Job failed (exit code: ${job_exit_code})"
+    upload_failure_metadata \
+      "${ORA_INGEST_ID}" ""
+    exit 1
+  fi
 fi
 
-# Does the ora logs file exist?
+echo_stderr "Uploading metadata"
+aws s3 cp \
+  --sse=AES256 \
+  output.json \
+  "${OUTPUT_METADATA_URI}"
+echo_stderr "Metadata upload complete"
+
+# Remove the output.json file
+rm -f output.json
+
+# Do the ora logs files exist?
 # If so, print the logs to stderr, if not print that no logs were found
-if [[ -f "${ORA_LOGS_FILE}" && -s "${ORA_LOGS_FILE}" ]]; then
-  echo_stderr "Logs from orad (stderr)"
-  cat "${ORA_LOGS_FILE}" 1>&2
+has_ora_logs="false"
+for ora_logs_file in "${ora_logs_file_list[@]}"; do
+  if [[ -f "${ora_logs_file}" && -s "${ora_logs_file}" ]]; then
+    echo_stderr "Logs from orad (stderr) in ${ora_logs_file}"
+    cat "${ora_logs_file}" 1>&2
+    has_ora_logs="true"
+  fi
+done
+
+if [[ "${has_ora_logs}" == "true" ]]; then
   exit 1
 else
   echo_stderr "No logs from orad, we're good to go!"
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+"""
+Lossy quality score binning of the decompressed fastq stream, as a streaming stage between orad and the compressor.
+
+Reads stdin in blocks of whole records, replaces each quality score with the representative score of its bin
+(the quality lines of each block are joined and translated with a lookup table in a single call,
+rather than a python loop over each read), and writes the binned records to stdout.
+Headers, sequences and separator lines are passed through untouched.
+
+Binning schemes (--scheme)
+  * ILLUMINA_8_BIN: The Illumina 8 level binning (as applied by HiSeq X / HiSeq 4000 RTA)
+      2-9 -> 6, 10-19 -> 15, 20-24 -> 22, 25-29 -> 27, 30-34 -> 33, 35-39 -> 37, 40+ -> 40
+  * ILLUMINA_4_BIN: The Illumina 4 level binning (as applied by NovaSeq RTA3)
+      2 -> 2, 3-14 -> 12, 15-30 -> 23, 31+ -> 37
+Scores below 2 (i.e. the no-call score) are kept as is.
+
+Most of the gzip size of a decompressed fastq is its quality strings, binning leaves far fewer distinct
+quality characters, so the binned stream compresses much better.
+To report the size reduction without compressing the stream twice, one in every --sample-interval blocks
+is compressed both before and after binning (with zlib level 1, as pigz --fast),
+and the reduction of the sampled blocks is taken as the reduction of the whole stream.
+The binned md5sum and the sampled compression run in a worker thread (hashlib and zlib release the GIL),
+concurrently with the binning of the next block.
+
+Statistics are written as a json dictionary to the --output-json path once stdin is exhausted
+  * qualityBinning: The binning scheme
+  * readCount / qualityValueCount: The number of reads and quality scores binned
+  * changedQualityValueCount: The number of quality scores changed by binning
+  * binnedMd5sum: The md5sum of the binned stream (the raw md5sum of the job is of the reads before binning)
+  * sampledByteCount / sampledGzipByteCount / sampledBinnedGzipByteCount: The size of the sampled blocks,
+    and their compressed size before and after binning
+  * gzipSizeReduction: The fraction of the gzip size saved by binning (of the sampled blocks)
+"""
+
+# Standard library imports
+import argparse
+import hashlib
+import json
+import sys
+import zlib
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+from typing import Dict, List, Optional, Tuple
+
+# Numpy imports
+import numpy as np
+
+# Globals
+CHUNK_SIZE = 4 * 1024 * 1024  # 4 MiB
+QUEUE_MAX_BLOCKS = 8
+FASTQ_LINES_PER_READ = 4
+FASTQ_HEADER_PREFIX = b"@"
+DEFAULT_PHRED_OFFSET = 33
+MAX_QUALITY_SCORE = 93
+DEFAULT_SAMPLE_INTERVAL = 16
+# The compression level of the sampled blocks, as pigz --fast
+SAMPLE_COMPRESSION_LEVEL = 1
+
+# The (inclusive) lower bound of each bin and its representative score, in ascending order,
+# scores below the first bin are kept as is
+QUALITY_BINNING_SCHEMES: Dict[str, List[Tuple[int, int]]] = {
+    "ILLUMINA_8_BIN": [(2, 6), (10, 15), (20, 22), (25, 27), (30, 33), (35, 37), (40, 40)],
+    "ILLUMINA_4_BIN": [(2, 2), (3, 12), (15, 23), (31, 37)],
+}
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--scheme", required=True, choices=list(QUALITY_BINNING_SCHEMES.keys()),
+        help="The quality binning scheme"
+    )
+    parser.add_argument(
+        "--output-json", required=True, type=Path,
+        help="Path to write the binning statistics json to"
+    )
+    parser.add_argument(
+        "--phred-offset", type=int, default=DEFAULT_PHRED_OFFSET,
+        help="The ascii offset of the quality scores"
+    )
+    parser.add_argument(
+        "--sample-interval", type=int, default=DEFAULT_SAMPLE_INTERVAL,
+        help="Compress one in every sample interval blocks before and after binning to measure the size reduction, "
+             "0 to skip the measurement"
+    )
+    return parser.parse_args()
+
+
+def get_quality_lookup_table(scheme: str, phred_offset: int = DEFAULT_PHRED_OFFSET) -> bytes:
+    """
+    Get the translation table of every byte to its binned quality character (other bytes are mapped to themselves)
+    """
+    lookup_table = bytearray(range(256))
+    bins = QUALITY_BINNING_SCHEMES[scheme]
+    for bin_index, (lower_bound, representative_score) in enumerate(bins):
+        upper_bound = bins[bin_index + 1][0] if bin_index + 1 < len(bins) else MAX_QUALITY_SCORE + 1
+        for quality_score in range(lower_bound, upper_bound):
+            lookup_table[phred_offset + quality_score] = phred_offset + representative_score
+    return bytes(lookup_table)
+
+
+class QualityBinner:
+    """
+    Bins the quality lines of blocks of whole fastq records, and accumulates the binning statistics
+    """
+    def __init__(
+            self,
+            scheme: str,
+            phred_offset: int = DEFAULT_PHRED_OFFSET,
+            sample_interval: int = DEFAULT_SAMPLE_INTERVAL
+    ):
+        self.scheme = scheme
+        self.lookup_table = get_quality_lookup_table(scheme, phred_offset)
+        self.sample_interval = sample_interval
+
+        self.block_count = 0
+        self.read_count = 0
+        self.quality_value_count = 0
+        self.changed_quality_value_count = 0
+        self.binned_md5_obj = hashlib.md5()
+        self.sampled_byte_count = 0
+        self.sampled_gzip_byte_count = 0
+        self.sampled_binned_gzip_byte_count = 0
+
+    def bin_block(self, lines: List[bytes]) -> Tuple[bytes, Optional[bytes]]:
+        """
+        Bin a block of whole records, given as the lines of the block (without their newlines, a multiple of four)
+        Returns the binned block, and the block before binning if it is sampled
+        """
+        header_lines = lines[0::FASTQ_LINES_PER_READ]
+        if (b"\n" + b"\n".join(header_lines)).count(b"\n" + FASTQ_HEADER_PREFIX) != len(header_lines):
+            for read_index, header_line in enumerate(header_lines):
+                if not header_line.startswith(FASTQ_HEADER_PREFIX):
+                    raise ValueError(f"Fastq record {self.read_count + 1 + read_index} does not start with '@'")
+
+        # Translate the quality lines of the block at once
+        quality_bytes = b"\n".join(lines[3::FASTQ_LINES_PER_READ])
+        binned_quality_bytes = quality_bytes.translate(self.lookup_table)
+        binned_lines = list(lines)
+        binned_lines[3::FASTQ_LINES_PER_READ] = binned_quality_bytes.split(b"\n")
+        binned_block = b"\n".join(binned_lines) + b"\n"
+
+        self.read_count += len(header_lines)
+        self.quality_value_count += len(quality_bytes) - (len(header_lines) - 1)
+        self.changed_quality_value_count += int(np.count_nonzero(
+            np.frombuffer(quality_bytes, dtype=np.uint8) != np.frombuffer(binned_quality_bytes, dtype=np.uint8)
+        ))
+
+        sampled_block: Optional[bytes] = None
+        if self.sample_interval > 0 and self.block_count % self.sample_interval == 0:
+            sampled_block = b"\n".join(lines) + b"\n"
+        self.block_count += 1
+
+        return binned_block, sampled_block
+
+    def add_binned_block(self, binned_block: bytes, sampled_block: Optional[bytes]):
+        """
+        Add a binned block to the binned md5sum, and compress it (and the block before binning) if it is sampled
+        """
+        self.binned_md5_obj.update(binned_block)
+        if sampled_block is not None:
+            self.sampled_byte_count += len(sampled_block)
+            self.sampled_gzip_byte_count += len(zlib.compress(sampled_block, SAMPLE_COMPRESSION_LEVEL))
+            self.sampled_binned_gzip_byte_count += len(zlib.compress(binned_block, SAMPLE_COMPRESSION_LEVEL))
+
+    def to_dict(self) -> Dict:
+        gzip_size_reduction: Optional[float] = None
+        if self.sampled_gzip_byte_count:
+            gzip_size_reduction = round(1 - self.sampled_binned_gzip_byte_count / self.sampled_gzip_byte_count, 6)
+
+        return {
+            "qualityBinning": self.scheme,
+            "readCount": self.read_count,
+            "qualityValueCount": self.quality_value_count,
+            "changedQualityValueCount": self.changed_quality_value_count,
+            "binnedMd5sum": self.binned_md5_obj.hexdigest(),
+            "sampledByteCount": self.sampled_byte_count,
+            "sampledGzipByteCount": self.sampled_gzip_byte_count,
+            "sampledBinnedGzipByteCount": self.sampled_binned_gzip_byte_count,
+            "gzipSizeReduction": gzip_size_reduction,
+        }
+
+
+def binned_block_worker(block_queue: Queue, quality_binner: QualityBinner):
+    """
+    Add the binned blocks off the queue to the binned md5sum and the sampled compression
+    """
+    while (block_item := block_queue.get()) is not None:
+        quality_binner.add_binned_block(*block_item)
+
+
+def bin_quality_scores(input_stream, output_stream, quality_binner: QualityBinner, chunk_size: int = CHUNK_SIZE):
+    """
+    Read the stream in chunks, and bin and write the whole records of each chunk,
+    the trailing partial record is carried over to the next chunk
+    """
+    block_queue: Queue = Queue(maxsize=QUEUE_MAX_BLOCKS)
+    block_thread = Thread(target=binned_block_worker, args=(block_queue, quality_binner), daemon=True)
+    block_thread.start()
+
+    carry_over = b""
+    while True:
+        chunk = input_stream.read(chunk_size)
+        if not chunk:
+            # A final record without a trailing newline
+            if carry_over and not carry_over.endswith(b"\n"):
+                carry_over += b"\n"
+            chunk_is_last = True
+        else:
+            chunk_is_last = False
+
+        # The last line is the (partial) line after the last newline
+        lines = (carry_over + chunk).split(b"\n")
+        whole_line_count = (len(lines) - 1) - (len(lines) - 1) % FASTQ_LINES_PER_READ
+        if whole_line_count:
+            binned_block, sampled_block = quality_binner.bin_block(lines[:whole_line_count])
+            block_queue.put((binned_block, sampled_block))
+            output_stream.write(binned_block)
+        carry_over = b"\n".join(lines[whole_line_count:])
+
+        if chunk_is_last:
+            break
+
+    if carry_over.strip():
+        raise ValueError("The fastq stream ends with a truncated record")
+
+    block_queue.put(None)
+    block_thread.join()
+    output_stream.flush()
+    return quality_binner
+
+
+def main():
+    args = get_args()
+
+    quality_binner = bin_quality_scores(
+        sys.stdin.buffer,
+        sys.stdout.buffer,
+        QualityBinner(args.scheme, phred_offset=args.phred_offset, sample_interval=args.sample_interval)
+    )
+
+    with open(args.output_json, "w") as output_h:
+        json.dump(quality_binner.to_dict(), output_h, indent=2)
+
+
+if __name__ == "__main__":
+    main()
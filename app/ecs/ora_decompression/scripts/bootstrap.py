@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+
+"""
+Collect everything the container needs before any data moves, concurrently and in a single interpreter.
+
+Steps (each run in its own thread as soon as its inputs are ready):
+  * ssmClient / secretsManagerClient: A single (thread safe) client for each service, shared by the steps below
+  * hostname: The hostname ssm parameter
+  * orcabusToken: The orcabus id token (from the orcabus token secret)
+  * icav2AccessToken: The icav2 access token secret
+  * storageConfigurationList / projectToStorageConfigurationMappingList / storageCredentialList:
+    The icav2 configuration ssm parameters under each path prefix, written to a yaml file
+    (as a json document, which is also valid yaml)
+  * presignedUrl:<name>: For each --ora-uri, the s3 object id of the ora file from the file manager,
+    then its presigned url (requires the hostname and orcabus token)
+
+The results are written to stdout as shell 'export' statements for the entrypoint to eval, i.e.
+  export HOSTNAME=...
+  export ORCABUS_TOKEN=...
+  export ICAV2_ACCESS_TOKEN=...
+  export ICAV2_STORAGE_CONFIGURATION_LIST_FILE=...
+  export ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE=...
+  export ICAV2_STORAGE_CREDENTIAL_LIST_FILE=...
+  export <name>=<presigned url>  (for each --ora-uri <name>=<uri>)
+
+If --warm-env-file is set (the exports of an earlier bootstrap, i.e. written by the worker, see run_worker.py),
+the hostname, tokens and configuration files of the earlier bootstrap are reused (and exported again),
+and only the presigned urls are collected.
+
+The time taken by each step (and the bootstrap as a whole) is logged to stderr,
+and written to --timings-json if set.
+
+Any failed step fails the bootstrap.
+
+The ssm and secrets manager clients honour AWS_ENDPOINT_URL (or AWS_ENDPOINT_URL_SSM / AWS_ENDPOINT_URL_SECRETS_MANAGER),
+and --file-manager-url overrides the file manager url, so the bootstrap can be run against local stand-ins
+(see benchmarks/benchmark_bootstrap.py).
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import shlex
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+from urllib.request import Request, urlopen
+
+# Globals
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT_SECONDS = 30
+# The exports of a bootstrap that are reused by a warm bootstrap
+WARM_ENV_NAMES = [
+    "HOSTNAME",
+    "ORCABUS_TOKEN",
+    "ICAV2_ACCESS_TOKEN",
+    "ICAV2_STORAGE_CONFIGURATION_LIST_FILE",
+    "ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE",
+    "ICAV2_STORAGE_CREDENTIAL_LIST_FILE",
+]
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--hostname-ssm-parameter-name", required=True,
+        help="The ssm parameter holding the orcabus hostname"
+    )
+    parser.add_argument(
+        "--orcabus-token-secret-id", required=True,
+        help="The secret holding the orcabus token"
+    )
+    parser.add_argument(
+        "--icav2-access-token-secret-id", required=True,
+        help="The secret holding the icav2 access token"
+    )
+    parser.add_argument(
+        "--storage-configuration-prefix", required=True,
+        help="The ssm parameter path prefix of the icav2 storage configurations"
+    )
+    parser.add_argument(
+        "--storage-configuration-list-file", required=True, type=Path,
+        help="Path to write the icav2 storage configurations to"
+    )
+    parser.add_argument(
+        "--project-to-storage-configuration-mapping-prefix", required=True,
+        help="The ssm parameter path prefix of the icav2 project to storage configuration mappings"
+    )
+    parser.add_argument(
+        "--project-to-storage-configuration-mapping-list-file", required=True, type=Path,
+        help="Path to write the icav2 project to storage configuration mappings to"
+    )
+    parser.add_argument(
+        "--storage-credential-prefix", required=True,
+        help="The ssm parameter path prefix of the icav2 storage credentials"
+    )
+    parser.add_argument(
+        "--storage-credential-list-file", required=True, type=Path,
+        help="Path to write the icav2 storage credentials to"
+    )
+    parser.add_argument(
+        "--ora-uri", action="append", default=[],
+        help="A <name>=<ora uri> pair, the presigned url of the ora uri is exported as <name>, may be repeated"
+    )
+    parser.add_argument(
+        "--file-manager-url", default=None,
+        help="Override the file manager url (defaults to https://file.<hostname>)"
+    )
+    parser.add_argument(
+        "--warm-env-file", type=Path, default=None,
+        help="Reuse the exports of an earlier bootstrap, only collecting the presigned urls"
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+        help="Maximum number of steps run at once"
+    )
+    parser.add_argument(
+        "--timings-json", type=Path, default=None,
+        help="Path to write the time taken by each step to"
+    )
+    return parser.parse_args()
+
+
+def get_client(service_name: str, max_workers: int = 1):
+    """
+    Clients are thread safe, and creating one is expensive (relative to a lookup), so each service has a single client
+    """
+    # Boto3 imports
+    # Imported on first use, a warm bootstrap makes no aws calls (and importing boto3 outlasts a warm bootstrap)
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        service_name,
+        region_name=os.environ.get("AWS_REGION"),
+        config=Config(
+            max_pool_connections=max_workers,
+            retries={"max_attempts": 5, "mode": "standard"},
+        ),
+    )
+
+
+def get_ssm_parameter(ssm_client, parameter_name: str) -> str:
+    return ssm_client.get_parameter(Name=parameter_name)["Parameter"]["Value"]
+
+
+def get_secret_string(secretsmanager_client, secret_id: str) -> str:
+    return secretsmanager_client.get_secret_value(SecretId=secret_id)["SecretString"]
+
+
+def write_parameter_prefix_to_yaml(ssm_client, parameter_prefix: str, yaml_path: Path) -> str:
+    """
+    Write the (json) values of all parameters under the prefix as a list
+    """
+    parameter_values = [
+        json.loads(parameter["Value"])
+        for page in ssm_client.get_paginator("get_parameters_by_path").paginate(Path=parameter_prefix)
+        for parameter in page["Parameters"]
+    ]
+    with open(yaml_path, "w") as yaml_h:
+        json.dump(parameter_values, yaml_h, indent=2)
+        yaml_h.write("\n")
+    return str(yaml_path)
+
+
+def get_file_manager_json(url: str, orcabus_token: str):
+    request = Request(url, headers={
+        "Accept": "application/json",
+        "Authorization": f"Bearer {orcabus_token}",
+    })
+    with urlopen(request, timeout=DEFAULT_TIMEOUT_SECONDS) as response:
+        return json.load(response)
+
+
+def get_presigned_url_from_ora_uri(ora_uri: str, file_manager_url: str, orcabus_token: str) -> str:
+    """
+    Get the presigned url of an ora file via the file manager
+    """
+    ora_uri_obj = urlparse(ora_uri)
+    results = get_file_manager_json(
+        f"{file_manager_url}/api/v1/s3?" + urlencode({
+            "bucket": ora_uri_obj.netloc,
+            "key": ora_uri_obj.path.lstrip("/"),
+            "currentState": "true",
+        }),
+        orcabus_token
+    )["results"]
+    if len(results) == 0:
+        raise ValueError(f"No results found for the bucket and key of {ora_uri}")
+    if len(results) > 1:
+        raise ValueError(f"Multiple results found for the bucket and key of {ora_uri}")
+
+    presigned_url = get_file_manager_json(
+        f"{file_manager_url}/api/v1/s3/presign/{results[0]['s3ObjectId']}",
+        orcabus_token
+    )
+    if not presigned_url:
+        raise ValueError(f"Could not generate presigned url of {ora_uri}")
+    return presigned_url
+
+
+def read_warm_env_file(warm_env_file: Path) -> Dict[str, str]:
+    """
+    Read the exports of an earlier bootstrap that a warm bootstrap reuses
+    """
+    warm_env: Dict[str, str] = {}
+    for line in warm_env_file.read_text().splitlines():
+        if not line.startswith("export "):
+            continue
+        env_name, _, env_value = line.removeprefix("export ").partition("=")
+        warm_env[env_name] = "".join(shlex.split(env_value))
+
+    missing_env_names = [env_name for env_name in WARM_ENV_NAMES if env_name not in warm_env]
+    if missing_env_names:
+        raise ValueError(f"Expected {', '.join(missing_env_names)} in the warm env file {warm_env_file}")
+    return {env_name: warm_env[env_name] for env_name in WARM_ENV_NAMES}
+
+
+class Bootstrap:
+    """
+    Runs each step in the executor, timing each step from when it starts running
+    """
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+        self.timings: Dict[str, float] = {}
+
+    def submit(self, step_name: str, func: Callable, *args) -> Future:
+        def run_step():
+            start_time = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.timings[step_name] = time.perf_counter() - start_time
+                print(f"Bootstrap step {step_name} took {self.timings[step_name]:.3f}s", file=sys.stderr)
+        return self.executor.submit(run_step)
+
+
+def run_bootstrap(args: argparse.Namespace) -> Tuple[Dict[str, str], Dict[str, float]]:
+    """
+    Run all steps, and return the environment variables to export and the step timings
+    """
+    ora_uris: List[Tuple[str, str]] = []
+    for ora_uri_arg in args.ora_uri:
+        name, _, ora_uri = ora_uri_arg.partition("=")
+        if not name or not ora_uri.startswith("s3://"):
+            raise ValueError(f"Expected --ora-uri in the form <name>=s3://<bucket>/<key> but got '{ora_uri_arg}'")
+        ora_uris.append((name, ora_uri))
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        bootstrap = Bootstrap(executor)
+
+        if args.warm_env_file is not None:
+            env_futures = submit_warm_steps(bootstrap, args)
+        else:
+            env_futures = submit_cold_steps(bootstrap, args)
+
+        # The file manager lookups need the hostname and orcabus token
+        if ora_uris:
+            file_manager_url: Optional[str] = args.file_manager_url or f"https://file.{env_futures['HOSTNAME'].result()}"
+            orcabus_token = env_futures["ORCABUS_TOKEN"].result()
+            for name, ora_uri in ora_uris:
+                env_futures[name] = bootstrap.submit(
+                    f"presignedUrl:{name}", get_presigned_url_from_ora_uri,
+                    ora_uri, file_manager_url, orcabus_token
+                )
+
+        env = {env_name: env_future.result() for env_name, env_future in env_futures.items()}
+
+    bootstrap.timings["total"] = time.perf_counter() - start_time
+    return env, bootstrap.timings
+
+
+def submit_warm_steps(bootstrap: Bootstrap, args: argparse.Namespace) -> Dict[str, Future]:
+    """
+    Reuse the hostname, tokens and configuration files of an earlier bootstrap
+    """
+    warm_env = bootstrap.submit("warmEnv", read_warm_env_file, args.warm_env_file).result()
+    env_futures: Dict[str, Future] = {}
+    for env_name, env_value in warm_env.items():
+        env_futures[env_name] = Future()
+        env_futures[env_name].set_result(env_value)
+    return env_futures
+
+
+def submit_cold_steps(bootstrap: Bootstrap, args: argparse.Namespace) -> Dict[str, Future]:
+    """
+    Collect the hostname, tokens and configuration files
+    """
+    # Create both clients at once
+    ssm_client_future = bootstrap.submit("ssmClient", get_client, "ssm", args.max_workers)
+    secretsmanager_client_future = bootstrap.submit(
+        "secretsManagerClient", get_client, "secretsmanager", args.max_workers
+    )
+    ssm_client = ssm_client_future.result()
+    secretsmanager_client = secretsmanager_client_future.result()
+
+    return {
+        "HOSTNAME": bootstrap.submit(
+            "hostname", get_ssm_parameter, ssm_client, args.hostname_ssm_parameter_name
+        ),
+        "ORCABUS_TOKEN": bootstrap.submit(
+            "orcabusToken",
+            lambda secret_id: json.loads(get_secret_string(secretsmanager_client, secret_id))["id_token"],
+            args.orcabus_token_secret_id
+        ),
+        "ICAV2_ACCESS_TOKEN": bootstrap.submit(
+            "icav2AccessToken", get_secret_string, secretsmanager_client, args.icav2_access_token_secret_id
+        ),
+        "ICAV2_STORAGE_CONFIGURATION_LIST_FILE": bootstrap.submit(
+            "storageConfigurationList", write_parameter_prefix_to_yaml, ssm_client,
+            args.storage_configuration_prefix, args.storage_configuration_list_file
+        ),
+        "ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_LIST_FILE": bootstrap.submit(
+            "projectToStorageConfigurationMappingList", write_parameter_prefix_to_yaml, ssm_client,
+            args.project_to_storage_configuration_mapping_prefix,
+            args.project_to_storage_configuration_mapping_list_file
+        ),
+        "ICAV2_STORAGE_CREDENTIAL_LIST_FILE": bootstrap.submit(
+            "storageCredentialList", write_parameter_prefix_to_yaml, ssm_client,
+            args.storage_credential_prefix, args.storage_credential_list_file
+        ),
+    }
+
+
+def main():
+    args = get_args()
+
+    if args.max_workers < 1:
+        raise ValueError("--max-workers must be a positive integer")
+
+    env, timings = run_bootstrap(args)
+    print(f"Bootstrap complete in {timings['total']:.3f}s", file=sys.stderr)
+
+    if args.timings_json is not None:
+        with open(args.timings_json, "w") as timings_h:
+            json.dump(timings, timings_h, indent=2)
+
+    for env_name, env_value in env.items():
+        print(f"export {env_name}={shlex.quote(env_value)}")
+
+
+if __name__ == "__main__":
+    main()
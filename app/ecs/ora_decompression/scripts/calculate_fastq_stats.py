@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+"""
+Vectorised fastq QC statistics for the decompressed fastq stream.
+
+Reads stdin in blocks of whole records, gathers each block into (read, position) matrices of bases and qualities,
+and computes, with numpy operations over the matrices (rather than a python loop over each read)
+  * the read count, base count and read length histogram
+  * the base composition (A / C / G / T / N), overall and at each read position
+  * the gc content, overall (of the called bases) and as a histogram of the per read gc percentage
+  * the mean quality, q20 and q30 fractions, overall and at each read position
+
+Positions past --max-positions are counted in the overall statistics but not in the per position summaries.
+
+Statistics are written as a json dictionary to the --output-json path once stdin is exhausted.
+"""
+
+# Standard library imports
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Numpy imports
+import numpy as np
+
+# Globals
+CHUNK_SIZE = 4 * 1024 * 1024  # 4 MiB
+FASTQ_LINES_PER_READ = 4
+NEWLINE = ord("\n")
+FASTQ_HEADER_CHAR = ord("@")
+DEFAULT_PHRED_OFFSET = 33
+DEFAULT_MAX_POSITIONS = 1000
+
+# A, C, G, T and N (any other character is counted as an N)
+BASE_NAMES = ["a", "c", "g", "t", "n"]
+CALLED_BASE_CHARS = [ord(base_char) for base_char in "ACGT"]
+GC_BASE_INDEXES = [1, 2]
+PADDING_CHAR = 0
+LOWERCASE_A = ord("a")
+UPPERCASE = np.frombuffer(bytes(range(256)).upper(), dtype=np.uint8)
+GC_PERCENT_BINS = 101
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--output-json", required=True, type=Path,
+        help="Path to write the statistics json to"
+    )
+    parser.add_argument(
+        "--phred-offset", type=int, default=DEFAULT_PHRED_OFFSET,
+        help="The ascii offset of the quality scores"
+    )
+    parser.add_argument(
+        "--max-positions", type=int, default=DEFAULT_MAX_POSITIONS,
+        help="The number of read positions to keep per position summaries for"
+    )
+    return parser.parse_args()
+
+
+def grow(counts: np.ndarray, length: int) -> np.ndarray:
+    """
+    Pad the trailing axis of a counts array with zeros up to length
+    """
+    if counts.shape[-1] >= length:
+        return counts
+    return np.concatenate(
+        [counts, np.zeros(counts.shape[:-1] + (length - counts.shape[-1],), dtype=counts.dtype)],
+        axis=-1
+    )
+
+
+class FastqStats:
+    """
+    Accumulates the statistics of blocks of whole fastq records
+    """
+    def __init__(self, phred_offset: int = DEFAULT_PHRED_OFFSET, max_positions: int = DEFAULT_MAX_POSITIONS):
+        self.phred_offset = phred_offset
+        self.max_positions = max_positions
+
+        self.read_count = 0
+        self.read_length_counts = np.zeros(0, dtype=np.int64)
+        self.base_counts = np.zeros(len(BASE_NAMES), dtype=np.int64)
+        self.gc_percent_counts = np.zeros(GC_PERCENT_BINS, dtype=np.int64)
+        self.quality_sum = 0
+        self.q20_count = 0
+        self.q30_count = 0
+
+        # Per position counts, grown as longer reads are seen
+        self.position_base_counts = np.zeros((len(BASE_NAMES), 0), dtype=np.int64)
+        self.position_quality_sums = np.zeros(0, dtype=np.int64)
+        self.position_q30_counts = np.zeros(0, dtype=np.int64)
+
+    def add_block(self, block: np.ndarray, newline_positions: np.ndarray):
+        """
+        Add a block of whole records, newline_positions are the positions of every newline in the block
+        (a multiple of four, the last being the last byte of the block)
+        """
+        line_starts = np.concatenate([[0], newline_positions[:-1] + 1])
+        line_ends = newline_positions
+
+        header_starts = line_starts[0::FASTQ_LINES_PER_READ]
+        sequence_starts = line_starts[1::FASTQ_LINES_PER_READ]
+        sequence_lengths = line_ends[1::FASTQ_LINES_PER_READ] - sequence_starts
+        quality_starts = line_starts[3::FASTQ_LINES_PER_READ]
+        quality_lengths = line_ends[3::FASTQ_LINES_PER_READ] - quality_starts
+
+        is_header = block[header_starts] == FASTQ_HEADER_CHAR
+        if not np.all(is_header):
+            raise ValueError(
+                f"Fastq record {self.read_count + 1 + int(np.argmin(is_header))} does not start with '@'"
+            )
+        is_mismatched = sequence_lengths != quality_lengths
+        if np.any(is_mismatched):
+            raise ValueError(
+                f"Fastq record {self.read_count + 1 + int(np.argmax(is_mismatched))} "
+                f"has a sequence and quality of different lengths"
+            )
+
+        self.read_count += len(sequence_lengths)
+        max_read_length = int(sequence_lengths.max())
+        self.read_length_counts = grow(self.read_length_counts, max_read_length + 1)
+        self.read_length_counts[:max_read_length + 1] += np.bincount(sequence_lengths)
+
+        # Gather the block into (read, position) matrices of bases and quality characters,
+        # the positions past the end of each read are padding (only clipped and masked if the read lengths differ)
+        columns = np.arange(max_read_length)
+        sequence_offsets = sequence_starts[:, np.newaxis] + columns
+        quality_offsets = quality_starts[:, np.newaxis] + columns
+        is_padding: Optional[np.ndarray] = None
+        if int(sequence_lengths.min()) != max_read_length:
+            is_padding = columns[np.newaxis, :] >= sequence_lengths[:, np.newaxis]
+            np.minimum(sequence_offsets, len(block) - 1, out=sequence_offsets)
+            np.minimum(quality_offsets, len(block) - 1, out=quality_offsets)
+        bases = block[sequence_offsets]
+        quality_chars = block[quality_offsets]
+        if np.any(bases >= LOWERCASE_A):
+            bases = UPPERCASE[bases]
+        if is_padding is not None:
+            bases[is_padding] = PADDING_CHAR
+            quality_chars[is_padding] = PADDING_CHAR
+
+        # Base composition at each position (anything other than A, C, G or T is counted as an N)
+        is_base = {base_char: bases == base_char for base_char in CALLED_BASE_CHARS}
+        position_called_base_counts = np.stack([
+            np.count_nonzero(is_base[base_char], axis=0) for base_char in CALLED_BASE_CHARS
+        ])
+        position_read_counts = len(sequence_lengths) - np.searchsorted(
+            np.sort(sequence_lengths), columns, side="right"
+        )
+        position_base_counts = np.vstack([
+            position_called_base_counts,
+            position_read_counts - position_called_base_counts.sum(axis=0)
+        ])
+        self.base_counts += position_base_counts.sum(axis=1)
+
+        # Per read gc percentage
+        read_gc_counts = np.count_nonzero(is_base[ord("C")] | is_base[ord("G")], axis=1)
+        has_bases = sequence_lengths > 0
+        gc_percents = np.rint(100 * read_gc_counts[has_bases] / sequence_lengths[has_bases]).astype(np.int64)
+        self.gc_percent_counts += np.bincount(gc_percents, minlength=GC_PERCENT_BINS)
+
+        # Qualities at each position, compared and summed as quality characters
+        # to skip converting every quality to a score (the padding characters add nothing to the sums)
+        position_quality_sums = (
+            quality_chars.sum(axis=0, dtype=np.int64) - self.phred_offset * position_read_counts
+        )
+        position_q30_counts = np.count_nonzero(quality_chars >= self.phred_offset + 30, axis=0)
+        self.quality_sum += int(position_quality_sums.sum())
+        self.q20_count += int(np.count_nonzero(quality_chars >= self.phred_offset + 20))
+        self.q30_count += int(position_q30_counts.sum())
+
+        # Per position summaries
+        position_count = min(max_read_length, self.max_positions)
+        self.position_base_counts = grow(self.position_base_counts, position_count)
+        self.position_quality_sums = grow(self.position_quality_sums, position_count)
+        self.position_q30_counts = grow(self.position_q30_counts, position_count)
+        self.position_base_counts[:, :position_count] += position_base_counts[:, :position_count]
+        self.position_quality_sums[:position_count] += position_quality_sums[:position_count]
+        self.position_q30_counts[:position_count] += position_q30_counts[:position_count]
+
+    def to_dict(self) -> Dict:
+        base_count = int(self.base_counts.sum())
+        called_base_count = int(self.base_counts[:4].sum())
+        read_lengths = np.flatnonzero(self.read_length_counts)
+
+        def fraction(numerator, denominator) -> Optional[float]:
+            return round(float(numerator) / denominator, 6) if denominator else None
+
+        per_position_summary_list: List[Dict] = []
+        for position in range(self.position_base_counts.shape[1]):
+            position_base_count = int(self.position_base_counts[:, position].sum())
+            per_position_summary_list.append({
+                "position": position + 1,
+                "baseCount": position_base_count,
+                "baseComposition": dict(zip(
+                    BASE_NAMES,
+                    (
+                        fraction(position_base_count_by_base, position_base_count)
+                        for position_base_count_by_base in self.position_base_counts[:, position]
+                    )
+                )),
+                "meanQuality": fraction(self.position_quality_sums[position], position_base_count),
+                "q30Fraction": fraction(self.position_q30_counts[position], position_base_count),
+            })
+
+        return {
+            "readCount": self.read_count,
+            "baseCount": base_count,
+            "minReadLength": int(read_lengths.min()) if len(read_lengths) else None,
+            "maxReadLength": int(read_lengths.max()) if len(read_lengths) else None,
+            "meanReadLength": fraction(base_count, self.read_count),
+            "readLengthHistogram": [
+                {"readLength": int(read_length), "readCount": int(self.read_length_counts[read_length])}
+                for read_length in read_lengths
+            ],
+            "baseComposition": dict(zip(
+                BASE_NAMES, (fraction(base_count_by_base, base_count) for base_count_by_base in self.base_counts)
+            )),
+            "gcContent": fraction(self.base_counts[GC_BASE_INDEXES].sum(), called_base_count),
+            "gcContentHistogram": [
+                {"gcPercent": int(gc_percent), "readCount": int(self.gc_percent_counts[gc_percent])}
+                for gc_percent in np.flatnonzero(self.gc_percent_counts)
+            ],
+            "meanQuality": fraction(self.quality_sum, base_count),
+            "q20Fraction": fraction(self.q20_count, base_count),
+            "q30Fraction": fraction(self.q30_count, base_count),
+            "perPositionSummaryList": per_position_summary_list,
+        }
+
+
+def calculate_fastq_stats(input_stream, fastq_stats: FastqStats, chunk_size: int = CHUNK_SIZE) -> FastqStats:
+    """
+    Read the stream in chunks, and add the whole records of each chunk,
+    the trailing partial record is carried over to the next chunk
+    """
+    carry_over = b""
+    while True:
+        chunk = input_stream.read(chunk_size)
+        if not chunk:
+            # A final record without a trailing newline
+            if carry_over and not carry_over.endswith(b"\n"):
+                carry_over += b"\n"
+            chunk_is_last = True
+        else:
+            chunk_is_last = False
+
+        block = np.frombuffer(carry_over + chunk, dtype=np.uint8)
+        newline_positions = np.flatnonzero(block == NEWLINE)
+        whole_line_count = len(newline_positions) - len(newline_positions) % FASTQ_LINES_PER_READ
+        if whole_line_count:
+            block_end = int(newline_positions[whole_line_count - 1]) + 1
+            fastq_stats.add_block(block[:block_end], newline_positions[:whole_line_count])
+        else:
+            block_end = 0
+        carry_over = block[block_end:].tobytes()
+
+        if chunk_is_last:
+            break
+
+    if carry_over.strip():
+        raise ValueError("The fastq stream ends with a truncated record")
+
+    return fastq_stats
+
+
+def main():
+    args = get_args()
+
+    fastq_stats = calculate_fastq_stats(
+        sys.stdin.buffer,
+        FastqStats(phred_offset=args.phred_offset, max_positions=args.max_positions)
+    )
+
+    with open(args.output_json, "w") as output_h:
+        json.dump(fastq_stats.to_dict(), output_h, indent=2)
+
+
+if __name__ == "__main__":
+    main()
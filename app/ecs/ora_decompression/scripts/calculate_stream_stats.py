@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""
+Single pass streaming statistics engine for the decompressed fastq stream.
+
+Reads stdin once and concurrently computes
+  * the raw md5sum of the stream
+  * the line / read count of the stream
+  * the exact gzip byte count of the stream (by feeding a pigz subprocess)
+
+If --passthrough is set, the stream is also written to stdout so this stage can be
+placed anywhere inside an existing pipeline (stats are then 'free' by-products of the pipeline).
+
+Statistics are written as a json dictionary to the --output-json path once stdin is exhausted.
+"""
+
+# Standard library imports
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+from typing import Dict, Optional, Union
+
+# Globals
+CHUNK_SIZE = 4 * 1024 * 1024  # 4 MiB
+QUEUE_MAX_CHUNKS = 8
+FASTQ_LINES_PER_READ = 4
+DEFAULT_PIGZ_PROCESSES = 4
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--output-json", required=True, type=Path,
+        help="Path to write the statistics json to"
+    )
+    parser.add_argument(
+        "--passthrough", action="store_true",
+        help="Also write the input stream to stdout"
+    )
+    parser.add_argument(
+        "--gzip-size", action="store_true",
+        help="Calculate the exact gzip byte count of the stream with pigz --fast"
+    )
+    parser.add_argument(
+        "--bytes-only", action="store_true",
+        help="Only count the bytes of the stream (skip md5sum and line counting)"
+    )
+    parser.add_argument(
+        "--pigz-processes", type=int, default=DEFAULT_PIGZ_PROCESSES,
+        help="Number of pigz processes to use when calculating the gzip size"
+    )
+    return parser.parse_args()
+
+
+def md5_worker(chunk_queue: Queue, md5_obj: 'hashlib._Hash'):
+    """
+    Hash chunks off the queue, hashlib releases the GIL for large buffers
+    so this runs concurrently with the line counting and pigz feeding
+    """
+    while (chunk := chunk_queue.get()) is not None:
+        md5_obj.update(chunk)
+
+
+def byte_count_worker(stream, result: Dict[str, int]):
+    """
+    Count the bytes of a stream (used to count the pigz stdout)
+    """
+    byte_count = 0
+    while chunk := stream.read(CHUNK_SIZE):
+        byte_count += len(chunk)
+    result['byteCount'] = byte_count
+
+
+def main():
+    args = get_args()
+
+    input_stream = sys.stdin.buffer
+    output_stream = sys.stdout.buffer if args.passthrough else None
+
+    # Start the md5sum thread
+    md5_obj = hashlib.md5()
+    chunk_queue: Optional[Queue] = None
+    md5_thread: Optional[Thread] = None
+    if not args.bytes_only:
+        chunk_queue = Queue(maxsize=QUEUE_MAX_CHUNKS)
+        md5_thread = Thread(target=md5_worker, args=(chunk_queue, md5_obj), daemon=True)
+        md5_thread.start()
+
+    # Start the pigz subprocess
+    pigz_proc: Optional[subprocess.Popen] = None
+    gzip_result: Dict[str, int] = {}
+    gzip_count_thread: Optional[Thread] = None
+    if args.gzip_size:
+        pigz_proc = subprocess.Popen(
+            [
+                "pigz",
+                "--stdout",
+                "--fast",
+                "--processes", str(args.pigz_processes)
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        gzip_count_thread = Thread(
+            target=byte_count_worker, args=(pigz_proc.stdout, gzip_result), daemon=True
+        )
+        gzip_count_thread.start()
+
+    # Read through the stream once
+    byte_count = 0
+    line_count = 0
+    while chunk := input_stream.read(CHUNK_SIZE):
+        byte_count += len(chunk)
+        if chunk_queue is not None:
+            chunk_queue.put(chunk)
+            line_count += chunk.count(b"\n")
+        if pigz_proc is not None:
+            pigz_proc.stdin.write(chunk)
+        if output_stream is not None:
+            output_stream.write(chunk)
+
+    # Close off the workers
+    if output_stream is not None:
+        output_stream.flush()
+    if md5_thread is not None:
+        chunk_queue.put(None)
+        md5_thread.join()
+    if pigz_proc is not None:
+        pigz_proc.stdin.close()
+        gzip_count_thread.join()
+        if pigz_proc.wait() != 0:
+            raise ChildProcessError(f"pigz exited with return code {pigz_proc.returncode}")
+
+    # Collect the statistics
+    stats: Dict[str, Union[int, str]] = {
+        "byteCount": byte_count
+    }
+    if not args.bytes_only:
+        if line_count % FASTQ_LINES_PER_READ != 0:
+            print(
+                f"Warning, line count {line_count} is not a multiple of {FASTQ_LINES_PER_READ}",
+                file=sys.stderr
+            )
+        stats.update({
+            "rawMd5sum": md5_obj.hexdigest(),
+            "lineCount": line_count,
+            "readCount": line_count // FASTQ_LINES_PER_READ,
+        })
+    if args.gzip_size:
+        stats["gzipFileSizeInBytes"] = gzip_result['byteCount']
+
+    args.output_json.write_text(json.dumps(stats, indent=4) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+"""
+Compress a raw fastq stream (from stdin) to blocked gzip (BGZF) on stdout.
+
+BGZF is a series of concatenated gzip members of at most 64 KiB each (as written by htslib's bgzip),
+so any gzip reader can still decompress the output, but consumers that understand BGZF
+can decompress blocks in parallel, or seek to any block without decompressing the blocks before it.
+
+Blocks are compressed concurrently (the deflate implementations release the GIL) and written in order.
+The deflate implementation and level are selected with --engine and --compression-level (see compress_stream.py).
+
+Alongside the compressed stream, we write
+  * --gzi-index: The bgzip compatible .gzi index (as per 'bgzip --index'),
+    a little endian uint64 entry count followed by (compressed offset, uncompressed offset) uint64 pairs,
+    one for the end of each data block.
+  * --read-index: A tab separated read offset index, with a row for every --read-index-interval-th read
+    (starting from the first read), with the columns
+      - readNumber: The (0-based) read number
+      - uncompressedOffset: The offset of the start of the read in the decompressed stream
+      - virtualOffset: The BGZF virtual offset of the start of the read
+        (the compressed offset of its block << 16 | the offset of the read within the decompressed block),
+        as used by htslib's bgzf_seek
+"""
+
+# Standard library imports
+import argparse
+import struct
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import BinaryIO, Deque, List, TextIO, Tuple
+
+# Local imports
+from compress_stream import COMPRESSION_ENGINES, DEFAULT_ENGINE, get_compression_level, get_deflate_module
+
+# Globals
+# Matches BGZF_BLOCK_SIZE in htslib, leaves headroom for incompressible blocks to fit within a 64 KiB member
+BGZF_BLOCK_SIZE = 0xff00
+BGZF_MAX_MEMBER_SIZE = 0x10000
+BGZF_HEADER_SIZE = 18
+BGZF_FOOTER_SIZE = 8
+# The empty block htslib appends to mark the end of the file
+BGZF_EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+DEFAULT_THREADS = 4
+DEFAULT_READ_INDEX_INTERVAL = 10_000
+FASTQ_LINES_PER_READ = 4
+WRITE_BATCH_SIZE = 64  # Blocks per write call to stdout
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--gzi-index", required=True, type=Path,
+        help="Path to write the .gzi block index to"
+    )
+    parser.add_argument(
+        "--read-index", required=True, type=Path,
+        help="Path to write the read offset index to"
+    )
+    parser.add_argument(
+        "--read-index-interval", type=int, default=DEFAULT_READ_INDEX_INTERVAL,
+        help="Write an entry to the read offset index every N reads"
+    )
+    parser.add_argument(
+        "--engine", choices=list(COMPRESSION_ENGINES.keys()), default=DEFAULT_ENGINE,
+        help="The compression engine providing the deflate implementation for each block"
+    )
+    parser.add_argument(
+        "--compression-level", type=int, default=-1,
+        help="The compression level for each block, -1 for the default level of the engine"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=DEFAULT_THREADS,
+        help="Number of blocks compressed at once"
+    )
+    return parser.parse_args()
+
+
+def compress_block(block: bytes, compression_level: int, deflate_module: ModuleType) -> bytes:
+    """
+    Compress a block of at most BGZF_BLOCK_SIZE bytes into a single BGZF member
+    """
+    compressor = deflate_module.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed_data = compressor.compress(block) + compressor.flush()
+
+    # Incompressible data may still overflow the member, fall back to stored deflate blocks which always fit
+    if BGZF_HEADER_SIZE + len(compressed_data) + BGZF_FOOTER_SIZE > BGZF_MAX_MEMBER_SIZE:
+        compressor = zlib.compressobj(0, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed_data = compressor.compress(block) + compressor.flush()
+
+    member_size = BGZF_HEADER_SIZE + len(compressed_data) + BGZF_FOOTER_SIZE
+    return b"".join([
+        # ID1, ID2, CM (deflate), FLG (FEXTRA), MTIME, XFL, OS (unknown), XLEN
+        struct.pack("<4BIBBH", 0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6),
+        # The BGZF extra subfield, BSIZE is the total member size minus one
+        struct.pack("<2BHH", ord("B"), ord("C"), 2, member_size - 1),
+        compressed_data,
+        struct.pack("<II", deflate_module.crc32(block), len(block)),
+    ])
+
+
+class ReadIndexer:
+    """
+    Tracks the uncompressed offset of every read_index_interval-th read across the blocks of the stream
+    """
+    def __init__(self, read_index_interval: int):
+        self.line_interval = read_index_interval * FASTQ_LINES_PER_READ
+        self.line_count = 0
+        # The next (0-based) line number we need the start offset of
+        self.next_line_number = 0
+
+    def add_block(self, block: bytes, block_uncompressed_offset: int) -> List[Tuple[int, int]]:
+        """
+        Return the (read number, uncompressed offset) of any indexed reads starting in the block
+        """
+        read_offsets = []
+
+        # A line starts at the beginning of the block if the previous block ended on a newline
+        if self.next_line_number == self.line_count:
+            read_offsets.append((self.next_line_number // FASTQ_LINES_PER_READ, block_uncompressed_offset))
+            self.next_line_number += self.line_interval
+
+        block_line_count = block.count(b"\n")
+
+        # Line n starts after the n-th newline, find the indexed lines whose newline is in this block
+        # A newline at the very end of the block starts a line at the beginning of the next block (handled above)
+        newline_position = -1
+        newline_count = self.line_count
+        while self.next_line_number <= self.line_count + block_line_count:
+            while newline_count < self.next_line_number:
+                newline_position = block.index(b"\n", newline_position + 1)
+                newline_count += 1
+            if newline_position + 1 == len(block):
+                break
+            read_offsets.append((
+                self.next_line_number // FASTQ_LINES_PER_READ,
+                block_uncompressed_offset + newline_position + 1
+            ))
+            self.next_line_number += self.line_interval
+
+        self.line_count += block_line_count
+        return read_offsets
+
+
+def compress_stream(
+        input_stream: BinaryIO,
+        output_stream: BinaryIO,
+        read_index_interval: int,
+        compression_level: int,
+        deflate_module: ModuleType,
+        threads: int,
+        read_index_h: TextIO
+) -> List[Tuple[int, int]]:
+    """
+    Compress the stream, writing the read offset index as we go,
+    and return the (compressed offset, uncompressed offset) of the end of each block for the gzi index
+    """
+    read_indexer = ReadIndexer(read_index_interval)
+    # (compressed member future, uncompressed offset of the block, uncompressed block size, indexed reads in the block)
+    in_flight: Deque[Tuple[Future, int, int, List[Tuple[int, int]]]] = deque()
+    write_batch: List[bytes] = []
+    block_end_offsets: List[Tuple[int, int]] = []
+    compressed_offset = 0
+    uncompressed_offset = 0
+
+    read_index_h.write("readNumber\tuncompressedOffset\tvirtualOffset\n")
+
+    def write_next_block():
+        nonlocal compressed_offset
+        future, block_uncompressed_offset, block_size, read_offsets = in_flight.popleft()
+        for read_number, read_uncompressed_offset in read_offsets:
+            virtual_offset = (compressed_offset << 16) | (read_uncompressed_offset - block_uncompressed_offset)
+            read_index_h.write(f"{read_number}\t{read_uncompressed_offset}\t{virtual_offset}\n")
+        member = future.result()
+        compressed_offset += len(member)
+        block_end_offsets.append((compressed_offset, block_uncompressed_offset + block_size))
+        write_batch.append(member)
+        if len(write_batch) >= WRITE_BATCH_SIZE:
+            output_stream.write(b"".join(write_batch))
+            write_batch.clear()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            # Read whole blocks, a short read from a pipe does not mean we have reached the end of the stream
+            block = bytearray()
+            while len(block) < BGZF_BLOCK_SIZE and (data := input_stream.read(BGZF_BLOCK_SIZE - len(block))):
+                block += data
+            if not block:
+                break
+            block = bytes(block)
+
+            # Keep at most two blocks per thread in memory
+            if len(in_flight) >= 2 * threads:
+                write_next_block()
+            in_flight.append((
+                executor.submit(compress_block, block, compression_level, deflate_module),
+                uncompressed_offset,
+                len(block),
+                read_indexer.add_block(block, uncompressed_offset),
+            ))
+            uncompressed_offset += len(block)
+
+        while in_flight:
+            write_next_block()
+
+    output_stream.write(b"".join(write_batch) + BGZF_EOF_BLOCK)
+    output_stream.flush()
+
+    return block_end_offsets
+
+
+def write_gzi_index(gzi_index_path: Path, block_end_offsets: List[Tuple[int, int]]):
+    """
+    Write the bgzip compatible .gzi index
+    """
+    with open(gzi_index_path, "wb") as gzi_index_h:
+        gzi_index_h.write(struct.pack("<Q", len(block_end_offsets)))
+        for block_end_compressed_offset, block_end_uncompressed_offset in block_end_offsets:
+            gzi_index_h.write(struct.pack("<QQ", block_end_compressed_offset, block_end_uncompressed_offset))
+
+
+def main():
+    args = get_args()
+
+    if args.threads < 1:
+        raise ValueError("--threads must be a positive integer")
+    if args.read_index_interval < 1:
+        raise ValueError("--read-index-interval must be a positive integer")
+
+    with open(args.read_index, "w") as read_index_h:
+        block_end_offsets = compress_stream(
+            sys.stdin.buffer,
+            sys.stdout.buffer,
+            read_index_interval=args.read_index_interval,
+            compression_level=get_compression_level(args.engine, args.compression_level),
+            deflate_module=get_deflate_module(args.engine),
+            threads=args.threads,
+            read_index_h=read_index_h,
+        )
+
+    write_gzi_index(args.gzi_index, block_end_offsets)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+Compress stdin to a gzip stream on stdout with a selectable compression engine, level and thread count.
+
+Engines:
+  * PIGZ: pigz (zlib deflate), levels 1 - 9. Level 1 is 'pigz --fast', the default for all jobs.
+  * IGZIP: ISA-L igzip (via python-isal), levels 0 - 3.
+    SIMD deflate, several times faster than zlib at the cost of a slightly larger file.
+  * ZLIB_NG: zlib-ng (via python-zlib-ng), levels 1 - 9.
+    A SIMD optimised zlib replacement, faster than zlib at similar compression ratios.
+    Level 1 uses zlib-ng's 'quick' strategy, which compresses fastq far worse than zlib level 1,
+    so the default level is 2.
+
+All engines write a standard (single member) gzip stream.
+A level of -1 uses the default level of the engine.
+
+The engine registry is also used by compress_bgzf.py and compress_upload_resumable.py,
+where each engine provides the deflate implementation (pigz uses zlib),
+and by the benchmark harness in benchmarks/benchmark_compression_engines.py.
+"""
+
+# Standard library imports
+import argparse
+import os
+import shutil
+import sys
+import zlib
+from dataclasses import dataclass
+from types import ModuleType
+from typing import BinaryIO, Dict, List
+
+# Globals
+READ_SIZE = 1024 * 1024  # 1 MiB
+DEFAULT_ENGINE = "PIGZ"
+DEFAULT_THREADS = 4
+
+
+@dataclass(frozen=True)
+class CompressionEngine:
+    name: str
+    min_level: int
+    max_level: int
+    default_level: int
+
+
+COMPRESSION_ENGINES: Dict[str, CompressionEngine] = {
+    "PIGZ": CompressionEngine(name="PIGZ", min_level=1, max_level=9, default_level=1),
+    "IGZIP": CompressionEngine(name="IGZIP", min_level=0, max_level=3, default_level=1),
+    "ZLIB_NG": CompressionEngine(name="ZLIB_NG", min_level=1, max_level=9, default_level=2),
+}
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--engine", choices=list(COMPRESSION_ENGINES.keys()), default=DEFAULT_ENGINE,
+        help="The compression engine"
+    )
+    parser.add_argument(
+        "--level", type=int, default=-1,
+        help="The compression level, -1 for the default level of the engine"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=DEFAULT_THREADS,
+        help="Number of compression threads"
+    )
+    return parser.parse_args()
+
+
+def get_compression_level(engine_name: str, level: int) -> int:
+    """
+    Resolve a level of -1 to the engine default, and check the level is supported by the engine
+    """
+    engine = COMPRESSION_ENGINES[engine_name]
+    if level == -1:
+        return engine.default_level
+    if not engine.min_level <= level <= engine.max_level:
+        raise ValueError(
+            f"Compression level {level} is not supported by {engine_name}, "
+            f"expected a level between {engine.min_level} and {engine.max_level}"
+        )
+    return level
+
+
+def get_deflate_module(engine_name: str) -> ModuleType:
+    """
+    Get the zlib compatible module (compressobj / crc32) of the engine
+    """
+    if engine_name == "IGZIP":
+        from isal import isal_zlib
+        return isal_zlib
+    if engine_name == "ZLIB_NG":
+        from zlib_ng import zlib_ng
+        return zlib_ng
+    # pigz uses zlib
+    return zlib
+
+
+def get_pigz_command(level: int, threads: int) -> List[str]:
+    return ["pigz", "--stdout", f"-{level}", "--processes", str(threads)]
+
+
+def compress_stream(input_stream: BinaryIO, output_stream: BinaryIO, engine_name: str, level: int, threads: int):
+    """
+    Compress with one of the python engines (pigz is run directly, see main)
+    """
+    if engine_name == "IGZIP":
+        from isal import igzip_threaded as gzip_threaded
+    elif engine_name == "ZLIB_NG":
+        from zlib_ng import gzip_ng_threaded as gzip_threaded
+    else:
+        raise ValueError(f"{engine_name} is not a python compression engine")
+
+    with gzip_threaded.open(output_stream, "wb", compresslevel=level, threads=threads) as gzip_h:
+        shutil.copyfileobj(input_stream, gzip_h, READ_SIZE)
+    output_stream.flush()
+
+
+def main():
+    args = get_args()
+
+    if args.threads < 1:
+        raise ValueError("--threads must be a positive integer")
+
+    level = get_compression_level(args.engine, args.level)
+
+    if args.engine == "PIGZ":
+        # Replace this process with pigz, so there is no python in the data path
+        command = get_pigz_command(level, args.threads)
+        os.execvp(command[0], command)
+
+    compress_stream(sys.stdin.buffer, sys.stdout.buffer, args.engine, level, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+
+"""
+Compress stdin to gzip and upload it to an S3 uri as a multipart upload,
+checkpointing progress to --checkpoint-uri so that a restarted task resumes the upload rather than starting again.
+
+The compressed stream must be identical however many times the task is restarted,
+so rather than piping through pigz, we compress it ourselves the same way pigz does.
+The raw stream is cut into SEGMENT_SIZE segments, each compressed (concurrently) with the preceding 32 KiB of the raw stream
+as its dictionary and ended with a sync flush, so each segment's compressed bytes depend only on the raw stream.
+Parts are cut at segment boundaries, once the compressed bytes reach the part size (see upload_stream_multipart.py).
+
+Once a part (and every part before it) has been uploaded, we write a checkpoint with
+  * the multipart upload id and the completed parts (part number, etag, md5 and size)
+  * the raw offset and the crc32 of the raw stream up to the end of the part (the compressor state boundary)
+  * the compressed offset (the total size of the completed parts)
+
+On restart, if the checkpoint matches this upload (same output uri, engine and level) and its multipart upload still exists,
+we read the raw stream up to the checkpoint's raw offset, check its crc32 matches,
+then compress and upload the remaining parts.
+ORA files can only be decoded sequentially, so the ora file is still downloaded and decoded from the start,
+but the compression and upload of the completed parts are skipped.
+The md5 of the whole object cannot be rebuilt without recompressing the completed parts,
+so a resumed upload only records the ETag S3 gives the object (built from the md5 of each part, as uploaded).
+
+If the raw stream does not match the checkpoint (the crc32 differs, or the stream is too short),
+the checkpoint and its multipart upload are removed and we exit with an error, so the next attempt starts from scratch.
+
+The md5 of the whole object (null if the upload was resumed) and the ETag S3 gives the object
+(see upload_stream_multipart.py) are written to --output-json along with the byte count.
+
+The checkpoint is deleted once the upload is complete.
+Streams smaller than the first part are uploaded with a single put object call (and are never checkpointed).
+
+The checkpoint is always read and written with the default (task role) credentials,
+the upload uses UPLOAD_AWS_CREDENTIALS_JSON if set (see upload_stream_multipart.py).
+"""
+
+# Standard library imports
+import argparse
+import hashlib
+import json
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import BinaryIO, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Boto3 imports
+from botocore.exceptions import ClientError
+
+# Local imports
+from compress_stream import COMPRESSION_ENGINES, DEFAULT_ENGINE, get_compression_level, get_deflate_module
+from pipeline_probe import StageCounter
+from upload_stream_multipart import (
+    DEFAULT_CONCURRENCY, MAX_PARTS, UploadSummary, get_content_md5, get_multipart_etag, get_part_size,
+    get_s3_client, read_exactly, upload_part
+)
+
+# Globals
+SEGMENT_SIZE = 1024 * 1024  # 1 MiB
+DICTIONARY_SIZE = 32 * 1024  # 32 KiB, the deflate window
+# ID1, ID2, CM (deflate), FLG, MTIME (0, so the header is the same on every attempt), XFL, OS (unknown)
+GZIP_HEADER = struct.pack("<4BIBB", 0x1f, 0x8b, 8, 0, 0, 0, 0xff)
+CHECKPOINT_VERSION = 2
+DEFAULT_THREADS = 4
+
+
+@dataclass
+class Checkpoint:
+    output_uri: str
+    engine: str
+    level: int
+    upload_id: str
+    # The completed parts, as dictionaries with the PartNumber, ETag, Md5 and Size keys
+    parts: List[Dict] = field(default_factory=list)
+    raw_offset: int = 0
+    raw_crc32: int = 0
+    compressed_offset: int = 0
+    version: int = CHECKPOINT_VERSION
+
+
+@dataclass
+class PendingPart:
+    """
+    A part being built from the compressed segments
+    """
+    part_number: int
+    body: bytearray = field(default_factory=bytearray)
+    raw_offset: int = 0
+    raw_crc32: int = 0
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "s3_uri",
+        help="The destination s3 uri"
+    )
+    parser.add_argument(
+        "--checkpoint-uri", required=True,
+        help="The s3 uri of the checkpoint json"
+    )
+    parser.add_argument(
+        "--output-json", type=Path,
+        help="Path to write the byte count, md5sum and etag of the compressed object to"
+    )
+    parser.add_argument(
+        "--stage-summary-json", type=Path,
+        help="Path to write the summary of the compression and upload stages to (see pipeline_probe.py)"
+    )
+    parser.add_argument(
+        "--engine", choices=list(COMPRESSION_ENGINES.keys()), default=DEFAULT_ENGINE,
+        help="The compression engine providing the deflate implementation"
+    )
+    parser.add_argument(
+        "--level", type=int, default=-1,
+        help="The compression level, -1 for the default level of the engine"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=DEFAULT_THREADS,
+        help="Number of segments compressed at once"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="Maximum number of parts uploaded at once"
+    )
+    parser.add_argument(
+        "--sse", default="AES256",
+        help="Server side encryption to use for the object"
+    )
+    parser.add_argument(
+        "--endpoint-url", default=None,
+        help="Override the S3 endpoint (i.e. for a local S3 stand-in)"
+    )
+    return parser.parse_args()
+
+
+def split_s3_uri(s3_uri: str) -> Tuple[str, str]:
+    s3_uri_obj = urlparse(s3_uri)
+    if s3_uri_obj.scheme != "s3":
+        raise ValueError(f"Expected an s3 uri but got '{s3_uri}'")
+    return s3_uri_obj.netloc, s3_uri_obj.path.lstrip("/")
+
+
+def read_checkpoint(checkpoint_s3_client, checkpoint_uri: str) -> Optional[Checkpoint]:
+    bucket, key = split_s3_uri(checkpoint_uri)
+    try:
+        checkpoint_dict = json.loads(checkpoint_s3_client.get_object(Bucket=bucket, Key=key)["Body"].read())
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ["NoSuchKey", "404"]:
+            return None
+        raise
+    return Checkpoint(**checkpoint_dict)
+
+
+def write_checkpoint(checkpoint_s3_client, checkpoint_uri: str, checkpoint: Checkpoint):
+    bucket, key = split_s3_uri(checkpoint_uri)
+    checkpoint_s3_client.put_object(Bucket=bucket, Key=key, Body=json.dumps(asdict(checkpoint)).encode())
+
+
+def delete_checkpoint(checkpoint_s3_client, checkpoint_uri: str):
+    bucket, key = split_s3_uri(checkpoint_uri)
+    checkpoint_s3_client.delete_object(Bucket=bucket, Key=key)
+
+
+def is_checkpoint_resumable(s3_client, checkpoint: Checkpoint, output_uri: str, engine: str, level: int) -> bool:
+    """
+    The checkpoint must be for this upload, and its multipart upload must still hold the completed parts
+    """
+    if (
+            checkpoint.version != CHECKPOINT_VERSION or
+            checkpoint.output_uri != output_uri or
+            checkpoint.engine != engine or
+            checkpoint.level != level
+    ):
+        return False
+
+    bucket, key = split_s3_uri(output_uri)
+    try:
+        uploaded_etags = {
+            part["PartNumber"]: part["ETag"]
+            for page in s3_client.get_paginator("list_parts").paginate(
+                Bucket=bucket, Key=key, UploadId=checkpoint.upload_id
+            )
+            for part in page.get("Parts", [])
+        }
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ["NoSuchUpload", "404"]:
+            return False
+        raise
+
+    return all(
+        uploaded_etags.get(part["PartNumber"]) == part["ETag"]
+        for part in checkpoint.parts
+    )
+
+
+def compress_segment(segment: bytes, dictionary: bytes, level: int, deflate_module: ModuleType) -> bytes:
+    """
+    Compress the segment with the preceding raw bytes as the dictionary, ending on a byte aligned sync flush
+    """
+    if dictionary:
+        compressor = deflate_module.compressobj(
+            level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, dictionary
+        )
+    else:
+        compressor = deflate_module.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(segment) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def skip_completed_parts(input_stream: BinaryIO, checkpoint: Checkpoint) -> Tuple[int, bytes]:
+    """
+    Read the raw stream up to the checkpoint's raw offset, checking its crc32 matches the checkpoint
+    Returns the crc32 and the last DICTIONARY_SIZE bytes of the raw stream up to the offset
+    """
+    raw_crc32 = 0
+    dictionary = b""
+    bytes_read = 0
+    while bytes_read < checkpoint.raw_offset:
+        segment = read_exactly(input_stream, min(SEGMENT_SIZE, checkpoint.raw_offset - bytes_read))
+        if not segment:
+            break
+        raw_crc32 = zlib.crc32(segment, raw_crc32)
+        bytes_read += len(segment)
+        dictionary = (dictionary + segment)[-DICTIONARY_SIZE:]
+    if bytes_read != checkpoint.raw_offset:
+        raise ValueError(
+            f"Stream ended after {bytes_read} bytes, before the checkpoint raw offset {checkpoint.raw_offset}"
+        )
+    if raw_crc32 != checkpoint.raw_crc32:
+        raise ValueError("The raw stream does not match the checkpoint (crc32 mismatch)")
+    return raw_crc32, dictionary
+
+
+def get_gzip_trailer(level: int, deflate_module: ModuleType, raw_crc32: int, raw_size: int) -> bytes:
+    """
+    The final (empty) deflate block, the crc32 and the raw size modulo 2^32
+    """
+    final_block = deflate_module.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS).flush(zlib.Z_FINISH)
+    return final_block + struct.pack("<II", raw_crc32, raw_size & 0xffffffff)
+
+
+def compress_and_upload(
+        input_stream: BinaryIO,
+        s3_client,
+        checkpoint_s3_client,
+        output_uri: str,
+        checkpoint_uri: str,
+        engine: str,
+        level: int,
+        threads: int,
+        concurrency: int,
+        sse: str,
+        stage_counter: StageCounter
+) -> UploadSummary:
+    """
+    Compress and upload the stream, and return the byte count, md5sum and etag of the compressed object
+    The stage counter measures the time spent waiting on stdin, and on the compression and upload of the stream
+    """
+    bucket, key = split_s3_uri(output_uri)
+    deflate_module = get_deflate_module(engine)
+
+    # Resume from the checkpoint if we can
+    checkpoint = read_checkpoint(checkpoint_s3_client, checkpoint_uri)
+    if checkpoint is not None and not is_checkpoint_resumable(s3_client, checkpoint, output_uri, engine, level):
+        print(f"Ignoring the checkpoint at {checkpoint_uri}, it does not match this upload", file=sys.stderr)
+        if checkpoint.output_uri == output_uri:
+            try:
+                s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=checkpoint.upload_id)
+            except ClientError:
+                pass
+        checkpoint = None
+
+    if checkpoint is not None:
+        print(
+            f"Resuming upload {checkpoint.upload_id} from part {len(checkpoint.parts) + 1} "
+            f"(raw offset {checkpoint.raw_offset})",
+            file=sys.stderr
+        )
+        try:
+            raw_crc32, dictionary = skip_completed_parts(input_stream, checkpoint)
+        except ValueError:
+            # Start from scratch on the next attempt
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=checkpoint.upload_id)
+            delete_checkpoint(checkpoint_s3_client, checkpoint_uri)
+            raise
+        raw_offset = checkpoint.raw_offset
+        stage_counter.add(raw_offset)
+        # We do not have the md5 of the completed parts
+        md5_obj = None
+        pending_part = PendingPart(part_number=len(checkpoint.parts) + 1, raw_offset=raw_offset, raw_crc32=raw_crc32)
+    else:
+        raw_crc32, dictionary, raw_offset = 0, b"", 0
+        md5_obj = hashlib.md5(GZIP_HEADER)
+        pending_part = PendingPart(part_number=1, body=bytearray(GZIP_HEADER))
+
+    upload_id: Optional[str] = checkpoint.upload_id if checkpoint is not None else None
+    # The parts that follow the last checkpoint, in order, as (future, part size, raw offset, raw crc32)
+    in_flight_parts: Deque[Tuple[Future, int, int, int]] = deque()
+    in_flight_segments: Deque[Tuple[Future, int, int]] = deque()
+
+    upload_executor = ThreadPoolExecutor(max_workers=concurrency)
+    compress_executor = ThreadPoolExecutor(max_workers=threads)
+
+    def complete_next_part():
+        # Parts complete in order, so every completed part extends the checkpoint
+        future, part_size, part_raw_offset, part_raw_crc32 = in_flight_parts.popleft()
+        start_time = time.monotonic()
+        part = future.result()
+        stage_counter.add_downstream_wait("upload", time.monotonic() - start_time)
+        checkpoint.parts.append({**part, "Size": part_size})
+        checkpoint.raw_offset = part_raw_offset
+        checkpoint.raw_crc32 = part_raw_crc32
+        checkpoint.compressed_offset += part_size
+        write_checkpoint(checkpoint_s3_client, checkpoint_uri, checkpoint)
+
+    def submit_pending_part():
+        nonlocal upload_id, checkpoint, pending_part
+        if upload_id is None:
+            upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ServerSideEncryption=sse)["UploadId"]
+            checkpoint = Checkpoint(output_uri=output_uri, engine=engine, level=level, upload_id=upload_id)
+        if pending_part.part_number > MAX_PARTS:
+            raise ValueError(f"Stream is larger than the {MAX_PARTS} parts supported by a multipart upload")
+        # Wait for a free slot before we hold any more of the stream
+        if len(in_flight_parts) >= concurrency:
+            complete_next_part()
+        part_body = bytes(pending_part.body)
+        in_flight_parts.append((
+            upload_executor.submit(upload_part, s3_client, bucket, key, upload_id, pending_part.part_number, part_body),
+            len(part_body),
+            pending_part.raw_offset,
+            pending_part.raw_crc32,
+        ))
+        pending_part = PendingPart(
+            part_number=pending_part.part_number + 1,
+            raw_offset=pending_part.raw_offset,
+            raw_crc32=pending_part.raw_crc32
+        )
+        # Checkpoint any parts that have already completed
+        while in_flight_parts and in_flight_parts[0][0].done():
+            complete_next_part()
+
+    def add_next_segment():
+        future, segment_raw_end, segment_raw_crc32 = in_flight_segments.popleft()
+        start_time = time.monotonic()
+        compressed_segment = future.result()
+        stage_counter.add_downstream_wait("compression", time.monotonic() - start_time)
+        if md5_obj is not None:
+            md5_obj.update(compressed_segment)
+        pending_part.body += compressed_segment
+        pending_part.raw_offset = segment_raw_end
+        pending_part.raw_crc32 = segment_raw_crc32
+        if len(pending_part.body) >= get_part_size(pending_part.part_number):
+            submit_pending_part()
+
+    def read_segment() -> bytes:
+        start_time = time.monotonic()
+        segment = read_exactly(input_stream, SEGMENT_SIZE)
+        stage_counter.waiting_on_upstream_seconds += time.monotonic() - start_time
+        stage_counter.add(len(segment))
+        stage_counter.maybe_report()
+        return segment
+
+    try:
+        while segment := read_segment():
+            raw_offset += len(segment)
+            raw_crc32 = zlib.crc32(segment, raw_crc32)
+            # Keep at most two segments per thread in memory
+            if len(in_flight_segments) >= 2 * threads:
+                add_next_segment()
+            in_flight_segments.append((
+                compress_executor.submit(compress_segment, segment, dictionary, level, deflate_module),
+                raw_offset,
+                raw_crc32
+            ))
+            dictionary = (dictionary + segment)[-DICTIONARY_SIZE:]
+        while in_flight_segments:
+            add_next_segment()
+
+        gzip_trailer = get_gzip_trailer(level, deflate_module, raw_crc32, raw_offset)
+        if md5_obj is not None:
+            md5_obj.update(gzip_trailer)
+        pending_part.body += gzip_trailer
+
+        # Small streams don't need a multipart upload
+        if upload_id is None:
+            s3_client.put_object(
+                Bucket=bucket, Key=key, Body=bytes(pending_part.body), ServerSideEncryption=sse,
+                ContentMD5=get_content_md5(md5_obj.digest())
+            )
+            return UploadSummary(
+                byte_count=len(pending_part.body), md5sum=md5_obj.hexdigest(), etag=md5_obj.hexdigest()
+            )
+
+        submit_pending_part()
+        while in_flight_parts:
+            complete_next_part()
+
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": part["PartNumber"], "ETag": part["ETag"]}
+                for part in checkpoint.parts
+            ]},
+        )
+    except BaseException:
+        compress_executor.shutdown(wait=True, cancel_futures=True)
+        upload_executor.shutdown(wait=True, cancel_futures=True)
+        # Keep the multipart upload for the next attempt, unless there is no checkpoint to resume it from
+        if upload_id is not None and not checkpoint.parts:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    compress_executor.shutdown(wait=True)
+    upload_executor.shutdown(wait=True)
+
+    delete_checkpoint(checkpoint_s3_client, checkpoint_uri)
+    return UploadSummary(
+        byte_count=checkpoint.compressed_offset,
+        md5sum=md5_obj.hexdigest() if md5_obj is not None else None,
+        etag=get_multipart_etag([part["Md5"] for part in checkpoint.parts]),
+    )
+
+
+def main():
+    args = get_args()
+
+    if args.threads < 1:
+        raise ValueError("--threads must be a positive integer")
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be a positive integer")
+
+    stage_counter = StageCounter(stage="compressAndUpload")
+    upload_summary = compress_and_upload(
+        sys.stdin.buffer,
+        s3_client=get_s3_client(args.endpoint_url, args.concurrency),
+        checkpoint_s3_client=get_s3_client(args.endpoint_url, 1, use_upload_credentials=False),
+        output_uri=args.s3_uri,
+        checkpoint_uri=args.checkpoint_uri,
+        engine=args.engine,
+        level=get_compression_level(args.engine, args.level),
+        threads=args.threads,
+        concurrency=args.concurrency,
+        sse=args.sse,
+        stage_counter=stage_counter,
+    )
+    print(f"Uploaded {upload_summary.byte_count} bytes to {args.s3_uri} (etag {upload_summary.etag})", file=sys.stderr)
+
+    if args.output_json is not None:
+        with open(args.output_json, "w") as output_json_h:
+            json.dump(upload_summary.to_dict(), output_json_h)
+
+    if args.stage_summary_json is not None:
+        stage_counter.write_summary(args.stage_summary_json)
+
+
+if __name__ == "__main__":
+    main()
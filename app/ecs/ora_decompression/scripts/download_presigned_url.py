@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+Download a (presigned) url to stdout using several concurrent HTTP range requests.
+
+A single HTTP connection is often the bottleneck when streaming large ora files into orad,
+so we split the object into fixed size ranges and fetch them concurrently.
+Ranges are written to stdout strictly in order, and only a bounded number of ranges are held in memory
+(--max-buffer-size), so a slow consumer will stall the downloader rather than grow its memory.
+
+A failed or truncated range is retried (resuming from the last byte received)
+rather than aborting the whole pipeline.
+
+If the server does not support range requests, we fall back to streaming the object over a single connection.
+
+Presigned urls are signed for GET only, so the object size is collected with a single byte ranged GET rather than a HEAD.
+"""
+
+# Standard library imports
+import argparse
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Deque, Iterator, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+# Globals
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024  # 16 MiB
+DEFAULT_MAX_BUFFER_SIZE = 256 * 1024 * 1024  # 256 MiB
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_TIMEOUT_SECONDS = 60
+READ_SIZE = 1024 * 1024  # 1 MiB
+RETRY_BACKOFF_SECONDS = 1
+CONTENT_RANGE_REGEX = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "url",
+        help="The (presigned) url to download"
+    )
+    parser.add_argument(
+        "--connections", type=int, default=DEFAULT_CONNECTIONS,
+        help="Number of concurrent range requests"
+    )
+    parser.add_argument(
+        "--range-size", type=int, default=DEFAULT_RANGE_SIZE,
+        help="Size of each range request in bytes"
+    )
+    parser.add_argument(
+        "--max-buffer-size", type=int, default=DEFAULT_MAX_BUFFER_SIZE,
+        help="Maximum number of bytes held in memory waiting to be written to stdout"
+    )
+    parser.add_argument(
+        "--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+        help="Maximum number of attempts for each range before giving up"
+    )
+    parser.add_argument(
+        "--timeout", type=int, default=DEFAULT_TIMEOUT_SECONDS,
+        help="Socket timeout (in seconds) for each request"
+    )
+    return parser.parse_args()
+
+
+def echo_stderr(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def get_object_size(url: str, timeout: int) -> Optional[int]:
+    """
+    Get the size of the object, or None if the server does not support range requests
+    """
+    try:
+        response = urlopen(Request(url, headers={"Range": "bytes=0-0"}), timeout=timeout)
+    except HTTPError as error:
+        # An empty object has no satisfiable range
+        if error.code == 416:
+            return 0
+        raise
+    with response:
+        if response.status != 206:
+            return None
+        content_range_match = CONTENT_RANGE_REGEX.match(response.headers.get("Content-Range", ""))
+        if content_range_match is None or content_range_match.group(3) == "*":
+            return None
+        return int(content_range_match.group(3))
+
+
+def fetch_range(url: str, start: int, end: int, max_retries: int, timeout: int) -> bytes:
+    """
+    Fetch the bytes from start to end (inclusive).
+    On failure we retry, resuming from the last byte we received
+    """
+    expected_size = end - start + 1
+    buffer = bytearray()
+    attempt = 0
+    while True:
+        try:
+            with urlopen(
+                Request(url, headers={"Range": f"bytes={start + len(buffer)}-{end}"}),
+                timeout=timeout
+            ) as response:
+                if response.status != 206:
+                    raise ValueError(f"Expected a partial content response but got status {response.status}")
+                while len(buffer) < expected_size:
+                    data = response.read(min(READ_SIZE, expected_size - len(buffer)))
+                    if not data:
+                        break
+                    buffer += data
+            if len(buffer) == expected_size:
+                return bytes(buffer)
+            raise ConnectionError(f"Range {start}-{end} was truncated at {start + len(buffer)}")
+        except (HTTPError, URLError, ConnectionError, TimeoutError, ValueError, OSError) as error:
+            attempt += 1
+            if attempt >= max_retries:
+                raise
+            echo_stderr(
+                f"Warning: range {start}-{end} failed on attempt {attempt} ({error}), "
+                f"retrying from byte {start + len(buffer)}"
+            )
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+
+def iter_ranges(object_size: int, range_size: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, object_size, range_size):
+        yield start, min(start + range_size, object_size) - 1
+
+
+def stream_single_connection(url: str, output_stream: BinaryIO, timeout: int):
+    """
+    Fallback for servers that do not support range requests
+    """
+    with urlopen(Request(url), timeout=timeout) as response:
+        while data := response.read(READ_SIZE):
+            output_stream.write(data)
+
+
+def stream_ranges(
+        url: str,
+        output_stream: BinaryIO,
+        object_size: int,
+        connections: int,
+        range_size: int,
+        max_buffer_size: int,
+        max_retries: int,
+        timeout: int
+):
+    """
+    Fetch ranges concurrently and write them to the output stream in order.
+    At most max_buffer_size bytes of ranges are in flight or waiting to be written at any time
+    """
+    max_ranges_in_flight = max(connections, max_buffer_size // range_size)
+    in_flight: Deque[Future] = deque()
+
+    executor = ThreadPoolExecutor(max_workers=connections)
+    try:
+        for start, end in iter_ranges(object_size, range_size):
+            if len(in_flight) >= max_ranges_in_flight:
+                output_stream.write(in_flight.popleft().result())
+            in_flight.append(executor.submit(fetch_range, url, start, end, max_retries, timeout))
+        while in_flight:
+            output_stream.write(in_flight.popleft().result())
+    finally:
+        # Don't wait on any outstanding ranges if we failed (or the consumer closed the pipe)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    args = get_args()
+
+    if args.connections < 1:
+        raise ValueError("--connections must be a positive integer")
+    if args.range_size < 1:
+        raise ValueError("--range-size must be a positive integer")
+
+    output_stream = sys.stdout.buffer
+    try:
+        object_size = get_object_size(args.url, args.timeout)
+        if object_size is None:
+            echo_stderr("Server does not support range requests, falling back to a single connection")
+            stream_single_connection(args.url, output_stream, args.timeout)
+        else:
+            stream_ranges(
+                args.url, output_stream, object_size,
+                args.connections, args.range_size, args.max_buffer_size, args.max_retries, args.timeout
+            )
+        output_stream.flush()
+    except BrokenPipeError:
+        # The consumer (i.e. head) has stopped reading, there is nothing left for us to do
+        # Exit immediately rather than waiting on any ranges still being fetched
+        os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+
+"""
+Estimate the 'pigz --fast' compressed size of a raw fastq stream (from stdin)
+by compressing evenly spaced blocks from across the entire stream.
+
+Compressing only the first N reads and extrapolating is biased,
+since the quality profile (and so the compressibility) of reads drifts across a run.
+Instead, the stream is cut into fixed size blocks and we compress every `stride`-th block (systematic sampling),
+so the sampled blocks span the whole file. Each block is compressed with the preceding 32 KiB as its dictionary,
+as pigz does, so a sampled block compresses to the same size it would as part of the complete stream.
+Sampled blocks are compressed concurrently (zlib releases the GIL).
+
+We know the raw size of every block (sampled or not), so the total compressed size is estimated with a ratio estimator
+    gzip size ~= total raw bytes * (sum of sampled compressed bytes / sum of sampled raw bytes)
+along with a confidence interval.
+The interval covers the sampling error only, pigz block boundaries differ slightly from ours
+(a bias of a few thousandths of a percent on synthetic data, well inside the interval).
+
+Ora files can only be decompressed sequentially, so the whole stream is always read,
+but once the confidence interval is tight enough (--relative-precision) we stop early,
+doubling the stride so far fewer of the remaining blocks are compressed.
+Each stride is treated as a stratum (a stratified, combined ratio estimator)
+so blocks sampled at a lower rate are weighted accordingly.
+If the interval widens again, we stop doubling the stride.
+
+If --total-read-count is given, the initial stride is chosen so roughly --target-sampled-blocks blocks are compressed.
+
+If every block is compressed (i.e. a small stream), the size is measured rather than estimated,
+and the measured size is reported as the point estimate and both bounds of the interval.
+
+Writes the following JSON to --output-json:
+  * gzipFileSizeInBytes: The point estimate
+  * gzipFileSizeInBytesLowerBound / gzipFileSizeInBytesUpperBound: The confidence interval
+  * confidenceLevel: The confidence level of the interval
+  * rawFileSizeInBytes: The size of the raw stream
+  * blockCount / sampledBlockCount: The number of blocks in the stream and the number that were compressed
+"""
+
+# Standard library imports
+import argparse
+import json
+import math
+import random
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+from typing import BinaryIO, Deque, Dict, List, Optional, Tuple, Union
+
+# Globals
+DEFAULT_BLOCK_SIZE = 1024 * 1024  # 1 MiB
+DEFAULT_TARGET_SAMPLED_BLOCKS = 512
+DEFAULT_MIN_SAMPLED_BLOCKS = 32
+DEFAULT_RELATIVE_PRECISION = 0.005  # +/- 0.5%
+DEFAULT_CONFIDENCE_LEVEL = 0.95
+DEFAULT_THREADS = 4
+DEFAULT_SEED = 11
+PIGZ_FAST_COMPRESSION_LEVEL = 1
+DEFLATE_WINDOW_SIZE = 32 * 1024  # 32 KiB
+GZIP_HEADER_AND_TRAILER_SIZE = 18
+FASTQ_LINES_PER_READ = 4
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--output-json", required=True, type=Path,
+        help="Path to write the estimate to"
+    )
+    parser.add_argument(
+        "--total-read-count", type=int, default=-1,
+        help="The total number of reads in the stream (if known), used to pick the initial stride"
+    )
+    parser.add_argument(
+        "--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+        help="Size of each block in bytes"
+    )
+    parser.add_argument(
+        "--target-sampled-blocks", type=int, default=DEFAULT_TARGET_SAMPLED_BLOCKS,
+        help="Number of blocks we aim to compress when --total-read-count is given"
+    )
+    parser.add_argument(
+        "--min-sampled-blocks", type=int, default=DEFAULT_MIN_SAMPLED_BLOCKS,
+        help="Minimum number of blocks compressed before we may stop early"
+    )
+    parser.add_argument(
+        "--relative-precision", type=float, default=DEFAULT_RELATIVE_PRECISION,
+        help="Stop early once the confidence interval half width is within this fraction of the estimate"
+    )
+    parser.add_argument(
+        "--confidence-level", type=float, default=DEFAULT_CONFIDENCE_LEVEL,
+        help="Confidence level of the reported interval"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=DEFAULT_THREADS,
+        help="Number of threads used to compress sampled blocks"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=DEFAULT_SEED,
+        help="Seed for the offset of the first sampled block"
+    )
+    return parser.parse_args()
+
+
+def get_compressed_block_size(block: bytes, dictionary: bytes) -> int:
+    """
+    Size of the block once deflated as part of a continuous stream (primed with the preceding window)
+    """
+    compressor = (
+        zlib.compressobj(PIGZ_FAST_COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+        if dictionary else
+        zlib.compressobj(PIGZ_FAST_COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    )
+    return len(compressor.compress(block)) + len(compressor.flush(zlib.Z_SYNC_FLUSH))
+
+
+@dataclass
+class Stratum:
+    """
+    A contiguous run of blocks sampled with the same stride.
+    We only keep running (Welford) moments of the sampled (raw bytes, compressed bytes) pairs,
+    which are all we need for the ratio and its variance
+    """
+    stride: int
+    block_count: int = 0
+    raw_bytes: int = 0
+    sample_count: int = 0
+    mean_raw: float = 0.0
+    mean_compressed: float = 0.0
+    m2_raw: float = 0.0
+    m2_compressed: float = 0.0
+    co_moment: float = 0.0
+
+    @property
+    def sum_raw(self) -> float:
+        return self.mean_raw * self.sample_count
+
+    @property
+    def sum_compressed(self) -> float:
+        return self.mean_compressed * self.sample_count
+
+    def add_sample(self, raw: int, compressed: int):
+        self.sample_count += 1
+        delta_raw = raw - self.mean_raw
+        delta_compressed = compressed - self.mean_compressed
+        self.mean_raw += delta_raw / self.sample_count
+        self.mean_compressed += delta_compressed / self.sample_count
+        self.m2_raw += delta_raw * (raw - self.mean_raw)
+        self.m2_compressed += delta_compressed * (compressed - self.mean_compressed)
+        self.co_moment += delta_raw * (compressed - self.mean_compressed)
+
+    def merge(self, other: 'Stratum') -> 'Stratum':
+        sample_count = self.sample_count + other.sample_count
+        if sample_count == 0:
+            return Stratum(
+                stride=self.stride,
+                block_count=self.block_count + other.block_count,
+                raw_bytes=self.raw_bytes + other.raw_bytes,
+            )
+        delta_raw = other.mean_raw - self.mean_raw
+        delta_compressed = other.mean_compressed - self.mean_compressed
+        weight = self.sample_count * other.sample_count / sample_count
+        return Stratum(
+            stride=self.stride,
+            block_count=self.block_count + other.block_count,
+            raw_bytes=self.raw_bytes + other.raw_bytes,
+            sample_count=sample_count,
+            mean_raw=self.mean_raw + delta_raw * other.sample_count / sample_count,
+            mean_compressed=self.mean_compressed + delta_compressed * other.sample_count / sample_count,
+            m2_raw=self.m2_raw + other.m2_raw + delta_raw ** 2 * weight,
+            m2_compressed=self.m2_compressed + other.m2_compressed + delta_compressed ** 2 * weight,
+            co_moment=self.co_moment + other.co_moment + delta_raw * delta_compressed * weight,
+        )
+
+    def get_residual_variance(self, ratio: float) -> float:
+        """
+        Sample variance of the residuals (compressed - ratio * raw)
+        """
+        return max(
+            (self.m2_compressed - 2 * ratio * self.co_moment + ratio ** 2 * self.m2_raw) / (self.sample_count - 1),
+            0.0
+        )
+
+
+class GzipSizeEstimator:
+    """
+    Stratified combined ratio estimator of the compressed size of the stream
+    """
+    def __init__(self, z_score: float):
+        self.z_score = z_score
+        self.strata: List[Stratum] = []
+        self.sampled_block_count = 0
+        self.sampled_compressed_bytes = 0
+        self.block_count = 0
+        self.raw_bytes = 0
+
+    def add_block(self, stride: int, raw_bytes: int):
+        if not self.strata or self.strata[-1].stride != stride:
+            self.strata.append(Stratum(stride=stride))
+        self.strata[-1].block_count += 1
+        self.strata[-1].raw_bytes += raw_bytes
+        self.block_count += 1
+        self.raw_bytes += raw_bytes
+
+    def add_sample(self, stratum: Stratum, raw: int, compressed: int):
+        stratum.add_sample(raw, compressed)
+        self.sampled_block_count += 1
+        self.sampled_compressed_bytes += compressed
+
+    def _get_pooled_strata(self) -> List[Stratum]:
+        """
+        A stratum needs at least two samples for a variance, so pool any stratum with fewer into its predecessor
+        """
+        pooled_strata: List[Stratum] = []
+        for stratum in self.strata:
+            if pooled_strata and stratum.sample_count < 2:
+                pooled_strata[-1] = pooled_strata[-1].merge(stratum)
+            else:
+                pooled_strata.append(stratum)
+        return list(filter(lambda stratum_iter_: stratum_iter_.sample_count > 0, pooled_strata))
+
+    def get_estimate(self, finite_population_correction: bool = True) -> Tuple[float, float]:
+        """
+        Return the (estimated compressed size, standard error)
+        Strata still being sampled do not know their final block count,
+        so the finite population correction can be turned off (which is conservative)
+        """
+        pooled_strata = self._get_pooled_strata()
+        if not pooled_strata:
+            return 0.0, math.inf
+
+        # Combined ratio, each stratum weighted by its (blocks / samples)
+        weighted_raw_bytes = sum(
+            stratum.block_count / stratum.sample_count * stratum.sum_raw
+            for stratum in pooled_strata
+        )
+        weighted_compressed_bytes = sum(
+            stratum.block_count / stratum.sample_count * stratum.sum_compressed
+            for stratum in pooled_strata
+        )
+        if weighted_raw_bytes == 0:
+            return 0.0, 0.0
+        ratio = weighted_compressed_bytes / weighted_raw_bytes
+        estimate = ratio * self.raw_bytes
+
+        # Variance of the estimated total from the residuals of each stratum
+        variance = 0.0
+        for stratum in pooled_strata:
+            if stratum.sample_count < 2:
+                # A single stratum holding a single sample, we can't say anything about the variance
+                if stratum.block_count > stratum.sample_count:
+                    return estimate, math.inf
+                continue
+            sampling_fraction = (
+                stratum.sample_count / stratum.block_count
+                if finite_population_correction else
+                0.0
+            )
+            variance += (
+                stratum.block_count ** 2 * max(1 - sampling_fraction, 0.0) *
+                stratum.get_residual_variance(ratio) / stratum.sample_count
+            )
+
+        return estimate, math.sqrt(variance)
+
+    def is_precise_enough(self, relative_precision: float) -> bool:
+        estimate, standard_error = self.get_estimate(finite_population_correction=False)
+        return estimate > 0 and self.z_score * standard_error / estimate <= relative_precision
+
+
+def get_initial_stride(first_block: bytes, total_read_count: int, block_size: int, target_sampled_blocks: int) -> int:
+    """
+    Use the reads per block of the first block to estimate how many blocks are in the stream,
+    then pick a stride that samples roughly target_sampled_blocks blocks
+    """
+    reads_in_first_block = first_block.count(b"\n") / FASTQ_LINES_PER_READ
+    if total_read_count <= 0 or reads_in_first_block == 0:
+        return 1
+    estimated_block_count = total_read_count / reads_in_first_block * len(first_block) / block_size
+    return max(1, int(estimated_block_count // target_sampled_blocks))
+
+
+def estimate_gzip_file_size(
+        input_stream: BinaryIO,
+        total_read_count: int,
+        block_size: int,
+        target_sampled_blocks: int,
+        min_sampled_blocks: int,
+        relative_precision: float,
+        confidence_level: float,
+        threads: int,
+        seed: int
+) -> Dict[str, Union[int, float]]:
+    z_score = NormalDist().inv_cdf(0.5 + confidence_level / 2)
+    estimator = GzipSizeEstimator(z_score)
+    rng = random.Random(seed)
+
+    stride: Optional[int] = None
+    offset = 0
+    dictionary = b""
+    # (stratum, future of (raw bytes, compressed bytes))
+    in_flight: Deque[Tuple[Stratum, Future]] = deque()
+
+    def collect_result():
+        stratum, future = in_flight.popleft()
+        estimator.add_sample(stratum, *future.result())
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        block_index = 0
+        while block := input_stream.read(block_size):
+            if stride is None:
+                stride = get_initial_stride(block, total_read_count, block_size, target_sampled_blocks)
+                offset = rng.randrange(stride)
+
+            estimator.add_block(stride, len(block))
+            if block_index % stride == offset:
+                if len(in_flight) >= 2 * threads:
+                    collect_result()
+                in_flight.append((
+                    estimator.strata[-1],
+                    executor.submit(
+                        lambda block_, dictionary_: (len(block_), get_compressed_block_size(block_, dictionary_)),
+                        block, dictionary
+                    )
+                ))
+
+                # Stop early, the interval is tight enough so we thin out the remaining samples
+                # Doubling the stride keeps the offset valid, so sampled blocks remain evenly spaced
+                if (
+                    estimator.sampled_block_count >= min_sampled_blocks and
+                    estimator.strata[-1].sample_count >= 2 and
+                    estimator.is_precise_enough(relative_precision)
+                ):
+                    stride *= 2
+
+            dictionary = block[-DEFLATE_WINDOW_SIZE:]
+            block_index += 1
+
+        while in_flight:
+            collect_result()
+
+    estimate, standard_error = estimator.get_estimate()
+    if estimator.raw_bytes == 0:
+        # An empty gzip file is still a header and trailer (and an empty final block)
+        estimate, standard_error = 2.0, 0.0
+    elif estimator.sampled_block_count == estimator.block_count:
+        # Every block was compressed, so there is no sampling error, report the measured size
+        # rather than an interval (the float error of the ratio estimator could otherwise exclude it)
+        estimate, standard_error = float(estimator.sampled_compressed_bytes), 0.0
+
+    return {
+        "gzipFileSizeInBytes": round(estimate) + GZIP_HEADER_AND_TRAILER_SIZE,
+        "gzipFileSizeInBytesLowerBound": max(
+            math.floor(estimate - z_score * standard_error), 0
+        ) + GZIP_HEADER_AND_TRAILER_SIZE,
+        "gzipFileSizeInBytesUpperBound": math.ceil(estimate + z_score * standard_error) + GZIP_HEADER_AND_TRAILER_SIZE,
+        "confidenceLevel": confidence_level,
+        "rawFileSizeInBytes": estimator.raw_bytes,
+        "blockCount": estimator.block_count,
+        "sampledBlockCount": estimator.sampled_block_count,
+    }
+
+
+def main():
+    args = get_args()
+
+    if not 0 < args.confidence_level < 1:
+        raise ValueError("--confidence-level must be between 0 and 1")
+
+    estimate = estimate_gzip_file_size(
+        sys.stdin.buffer,
+        total_read_count=args.total_read_count,
+        block_size=args.block_size,
+        target_sampled_blocks=args.target_sampled_blocks,
+        min_sampled_blocks=args.min_sampled_blocks,
+        relative_precision=args.relative_precision,
+        confidence_level=args.confidence_level,
+        threads=args.threads,
+        seed=args.seed,
+    )
+
+    with open(args.output_json, "w") as output_h:
+        json.dump(estimate, output_h, indent=2)
+        output_h.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""
+Interleave the R1 and R2 fastq streams (--r1 and --r2, usually fifos) in to a single fastq stream on stdout,
+writing each R1 read followed by its R2 mate.
+
+The R1 and R2 streams are read a batch of BATCH_READ_COUNT reads at a time.
+The read names of each pair (up to the first whitespace, ignoring any /1 /2 suffix) must match,
+and both streams must have the same number of reads, otherwise we fail
+(i.e. if the R1 or R2 pipeline failed part way through its stream).
+"""
+
+# Standard library imports
+import argparse
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, List
+
+# Globals
+READ_SIZE = 1024 * 1024  # 1 MiB
+LINES_PER_READ = 4
+BATCH_READ_COUNT = 10_000
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--r1", required=True, type=Path,
+        help="Path to the R1 fastq stream"
+    )
+    parser.add_argument(
+        "--r2", required=True, type=Path,
+        help="Path to the R2 fastq stream"
+    )
+    return parser.parse_args()
+
+
+def read_batch(input_stream: BinaryIO) -> List[bytes]:
+    """
+    The lines of the next batch of reads, fewer only at the end of the stream
+    """
+    return list(islice(input_stream, BATCH_READ_COUNT * LINES_PER_READ))
+
+
+def get_read_name(header_line: bytes) -> bytes:
+    read_name = header_line.split(maxsplit=1)[0]
+    if read_name[-2:] in (b"/1", b"/2"):
+        return read_name[:-2]
+    return read_name
+
+
+def interleave_streams(r1_stream: BinaryIO, r2_stream: BinaryIO, output_stream: BinaryIO) -> int:
+    """
+    Interleave the R1 and R2 streams, and return the number of read pairs
+    """
+    pair_count = 0
+    while True:
+        r1_lines = read_batch(r1_stream)
+        r2_lines = read_batch(r2_stream)
+        if len(r1_lines) != len(r2_lines) or len(r1_lines) % LINES_PER_READ != 0:
+            raise ValueError(
+                f"R1 and R2 have a different number of reads, "
+                f"after {pair_count} read pairs R1 has {len(r1_lines)} lines left and R2 has {len(r2_lines)} lines left"
+            )
+        if not r1_lines:
+            return pair_count
+
+        interleaved_lines = []
+        for line_index in range(0, len(r1_lines), LINES_PER_READ):
+            if get_read_name(r1_lines[line_index]) != get_read_name(r2_lines[line_index]):
+                raise ValueError(
+                    f"Read pair {pair_count + line_index // LINES_PER_READ} does not match, "
+                    f"R1 read is {r1_lines[line_index].rstrip().decode(errors='replace')} "
+                    f"but R2 read is {r2_lines[line_index].rstrip().decode(errors='replace')}"
+                )
+            interleaved_lines.extend(r1_lines[line_index:line_index + LINES_PER_READ])
+            interleaved_lines.extend(r2_lines[line_index:line_index + LINES_PER_READ])
+        output_stream.write(b"".join(interleaved_lines))
+        pair_count += len(r1_lines) // LINES_PER_READ
+
+
+def main():
+    args = get_args()
+
+    # R1 is opened first, the R1 and R2 pipelines open their ends of the fifos before they start
+    with open(args.r1, "rb", buffering=READ_SIZE) as r1_h, open(args.r2, "rb", buffering=READ_SIZE) as r2_h:
+        pair_count = interleave_streams(r1_h, r2_h, sys.stdout.buffer)
+    sys.stdout.buffer.flush()
+
+    print(f"Interleaved {pair_count} read pairs", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
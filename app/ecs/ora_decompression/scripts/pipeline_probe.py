@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+"""
+Pass stdin through to stdout, measuring the stage boundary the probe sits on.
+
+The decompression pipeline is a chain of anonymous pipes, so a slow stage is otherwise invisible.
+A probe between two stages counts
+  * the bytes (and, with --fastq, the fastq records) passing through
+  * the seconds spent waiting on the upstream stage (blocked reading stdin)
+  * the seconds spent waiting on the downstream stage (blocked writing stdout)
+A stage that is mostly waiting on its upstream is starved, a stage that is mostly waiting on its downstream is
+being throttled, so the bottleneck is the stage with a starved probe downstream of it and a throttled probe upstream.
+
+Every --interval seconds a progress line is written to stderr as a json document (prefixed with 'STAGE_PROGRESS '),
+and once the stream ends the summary is written to --output-json, with the keys
+  * stage: The name of the stage upstream of the probe
+  * byteCount / recordCount (null without --fastq)
+  * elapsedSeconds / mibPerSecond
+  * waitingOnUpstreamSeconds / waitingOnDownstreamSeconds
+  * downstreamClosed: true if the downstream stage closed the pipe before the end of the stream (i.e. head)
+  * waitingOnDownstreamSecondsByStage: Only for scripts that run several downstream stages themselves
+
+The StageCounter class is also used by the scripts that measure their own stages (i.e. compress_upload_resumable.py).
+"""
+
+# Standard library imports
+import argparse
+import fcntl
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+# Globals
+READ_SIZE = 1024 * 1024  # 1 MiB
+PIPE_SIZE = 1024 * 1024  # 1 MiB, so each read / write moves more than the default 64 KiB
+DEFAULT_INTERVAL_SECONDS = 60
+FASTQ_LINES_PER_RECORD = 4
+STAGE_PROGRESS_PREFIX = "STAGE_PROGRESS"
+
+
+@dataclass
+class StageCounter:
+    stage: str
+    count_records: bool = False
+    interval_seconds: float = DEFAULT_INTERVAL_SECONDS
+    byte_count: int = 0
+    line_count: int = 0
+    waiting_on_upstream_seconds: float = 0.0
+    waiting_on_downstream_seconds: float = 0.0
+    downstream_closed: bool = False
+    # The downstream wait broken down by stage, for scripts that run several stages themselves
+    waiting_on_downstream_seconds_by_stage: Dict[str, float] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.monotonic)
+    last_report_time: float = field(default_factory=time.monotonic)
+    last_report_byte_count: int = 0
+
+    def add(self, byte_count: int, line_count: int = 0):
+        self.byte_count += byte_count
+        self.line_count += line_count
+
+    def add_downstream_wait(self, stage: str, seconds: float):
+        self.waiting_on_downstream_seconds += seconds
+        self.waiting_on_downstream_seconds_by_stage[stage] = (
+            self.waiting_on_downstream_seconds_by_stage.get(stage, 0.0) + seconds
+        )
+
+    def maybe_report(self):
+        """
+        Write a progress line to stderr if the interval has passed since the last one
+        """
+        now = time.monotonic()
+        if now - self.last_report_time < self.interval_seconds:
+            return
+        progress = self.get_summary(now)
+        progress["intervalMibPerSecond"] = round(
+            (self.byte_count - self.last_report_byte_count) / 1024 / 1024 / (now - self.last_report_time), 3
+        )
+        print(f"{STAGE_PROGRESS_PREFIX} {json.dumps(progress)}", file=sys.stderr, flush=True)
+        self.last_report_time = now
+        self.last_report_byte_count = self.byte_count
+
+    def get_summary(self, now: Optional[float] = None) -> Dict:
+        elapsed_seconds = (now or time.monotonic()) - self.start_time
+        summary = {
+            "stage": self.stage,
+            "byteCount": self.byte_count,
+            "recordCount": self.line_count // FASTQ_LINES_PER_RECORD if self.count_records else None,
+            "elapsedSeconds": round(elapsed_seconds, 3),
+            "mibPerSecond": round(self.byte_count / 1024 / 1024 / max(elapsed_seconds, 1e-9), 3),
+            "waitingOnUpstreamSeconds": round(self.waiting_on_upstream_seconds, 3),
+            "waitingOnDownstreamSeconds": round(self.waiting_on_downstream_seconds, 3),
+            "downstreamClosed": self.downstream_closed,
+        }
+        if self.waiting_on_downstream_seconds_by_stage:
+            summary["waitingOnDownstreamSecondsByStage"] = {
+                stage: round(seconds, 3) for stage, seconds in self.waiting_on_downstream_seconds_by_stage.items()
+            }
+        return summary
+
+    def write_summary(self, output_json: Path):
+        with open(output_json, "w") as output_json_h:
+            json.dump(self.get_summary(), output_json_h)
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--stage", required=True,
+        help="The name of the stage upstream of the probe"
+    )
+    parser.add_argument(
+        "--output-json", required=True, type=Path,
+        help="Path to write the stage summary to"
+    )
+    parser.add_argument(
+        "--fastq", action="store_true",
+        help="The stream is uncompressed fastq, count the records passing through"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=DEFAULT_INTERVAL_SECONDS,
+        help="Seconds between progress lines on stderr"
+    )
+    return parser.parse_args()
+
+
+def set_pipe_size(fd: int):
+    """
+    Grow the pipe buffer (linux only, best effort, the pipe may not be a pipe)
+    """
+    try:
+        fcntl.fcntl(fd, getattr(fcntl, "F_SETPIPE_SZ", 1031), PIPE_SIZE)
+    except OSError:
+        pass
+
+
+def probe_stream(input_fd: int, output_fd: int, stage_counter: StageCounter):
+    buffer = bytearray(READ_SIZE)
+    buffer_view = memoryview(buffer)
+
+    while True:
+        start_time = time.monotonic()
+        bytes_read = os.readv(input_fd, [buffer])
+        stage_counter.waiting_on_upstream_seconds += time.monotonic() - start_time
+        if bytes_read == 0:
+            break
+
+        stage_counter.add(
+            bytes_read,
+            buffer.count(b"\n", 0, bytes_read) if stage_counter.count_records else 0
+        )
+
+        chunk = buffer_view[:bytes_read]
+
+        start_time = time.monotonic()
+        try:
+            while chunk:
+                chunk = chunk[os.write(output_fd, chunk):]
+        except BrokenPipeError:
+            stage_counter.downstream_closed = True
+            break
+        finally:
+            stage_counter.waiting_on_downstream_seconds += time.monotonic() - start_time
+
+        stage_counter.maybe_report()
+
+
+def main():
+    args = get_args()
+
+    if args.interval <= 0:
+        raise ValueError("--interval must be a positive number")
+
+    input_fd, output_fd = sys.stdin.fileno(), sys.stdout.fileno()
+    set_pipe_size(input_fd)
+    set_pipe_size(output_fd)
+
+    stage_counter = StageCounter(stage=args.stage, count_records=args.fastq, interval_seconds=args.interval)
+    probe_stream(input_fd, output_fd, stage_counter)
+    stage_counter.write_summary(args.output_json)
+
+
+if __name__ == "__main__":
+    main()
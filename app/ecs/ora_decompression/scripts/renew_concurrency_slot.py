@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""
+Renew the lease on the concurrency slot held by this decompression, until the decompression exits.
+
+Decompressions (run as their own ECS task or on the worker pool) first acquire a concurrency slot
+(see the acquire concurrency slot lambda),
+a lease that expires after --lease-seconds unless it is renewed.
+We extend the lease every third of the lease (while the lease id of the slot is still ours),
+so the slot is held for as long as the task runs, and is reclaimed shortly after the task dies
+without releasing it (i.e. the task is stopped, or the execution is aborted).
+
+The renewal stops once the --parent-pid exits, or if the slot is no longer ours
+(the lease expired and the slot was acquired by another execution).
+Failed renewals are logged and retried at the next renewal, they never fail the job.
+
+Usage:
+  python3 renew_concurrency_slot.py --table-name <table> --slot-id slot-007 --lease-id <uuid> --parent-pid 1
+"""
+
+# Standard library imports
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+# Boto3 imports
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Globals
+DEFAULT_LEASE_SECONDS = 15 * 60  # 15 minutes
+PARENT_POLL_INTERVAL_SECONDS = 5
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table-name", required=True, help="The concurrency slot table name")
+    parser.add_argument("--slot-id", required=True, help="The id of the slot held by this task")
+    parser.add_argument("--lease-id", required=True, help="The id of the lease on the slot")
+    parser.add_argument(
+        "--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS,
+        help="The length of the lease, each renewal extends the lease to this many seconds from now"
+    )
+    parser.add_argument(
+        "--parent-pid", type=int, required=True,
+        help="Stop renewing once this process has exited"
+    )
+    return parser.parse_args()
+
+
+def echo_stderr(message: str):
+    print(f"{datetime.now(timezone.utc).isoformat(timespec='seconds')}: {message}", file=sys.stderr, flush=True)
+
+
+def is_process_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def renew_lease(dynamodb_client, table_name: str, slot_id: str, lease_id: str, lease_seconds: int) -> bool:
+    """
+    Extend the lease on the slot, return False if the slot is no longer ours
+    """
+    expires_at = int(time.time()) + lease_seconds
+    try:
+        dynamodb_client.update_item(
+            TableName=table_name,
+            Key={"id": {"S": slot_id}},
+            UpdateExpression="SET expires_at = :expires_at, #ttl = :expires_at",
+            ConditionExpression="lease_id = :lease_id",
+            ExpressionAttributeNames={"#ttl": "ttl"},
+            ExpressionAttributeValues={
+                ":expires_at": {"N": str(expires_at)},
+                ":lease_id": {"S": lease_id},
+            },
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def main():
+    args = get_args()
+
+    dynamodb_client = boto3.client("dynamodb")
+    renew_interval_seconds = max(args.lease_seconds // 3, PARENT_POLL_INTERVAL_SECONDS)
+    next_renewal = time.monotonic()
+
+    while is_process_running(args.parent_pid):
+        if time.monotonic() >= next_renewal:
+            try:
+                if not renew_lease(dynamodb_client, args.table_name, args.slot_id, args.lease_id, args.lease_seconds):
+                    echo_stderr(
+                        f"Warning! The lease on concurrency slot {args.slot_id} has been reclaimed, no longer renewing"
+                    )
+                    return
+            except (BotoCoreError, ClientError) as e:
+                echo_stderr(f"Warning! Could not renew the lease on concurrency slot {args.slot_id}: {e}")
+            next_renewal = time.monotonic() + renew_interval_seconds
+        time.sleep(PARENT_POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
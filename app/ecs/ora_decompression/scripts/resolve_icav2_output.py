@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""
+Resolve an ICAv2 project folder (an output uri that is not in the S3_DECOMPRESSION_BUCKET)
+to its underlying s3 uri and the temporary AWS credentials to upload to it, through a cache shared by the task.
+
+Each resolution otherwise imports wrapica and makes several ICAv2 calls, and is repeated for R1, R2 (and the
+interleaved output) of every job, even though they are almost always written to the same project folder.
+Instead, resolutions are written to --cache-file (a json document keyed by project folder uri), and reused while
+  * the s3 uri is younger than S3_URI_TTL_SECONDS (a folder does not move, so this is long)
+  * the credentials have more than REFRESH_MARGIN_SECONDS left before they expire
+The cache file is locked while it is read, resolved and written, so concurrent jobs (i.e. R1 and R2) resolve
+a folder once between them. wrapica is only imported on a cache miss.
+
+The credentials expire at the expiration_time ICAv2 returns with them,
+if it is missing they are treated as expiring CREDENTIALS_TTL_SECONDS after they are issued.
+
+The upload credentials are written to stdout as a json dictionary with the keys
+  * AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY / AWS_SESSION_TOKEN / AWS_REGION
+  * AWS_CREDENTIALS_EXPIRATION: The expiry of the credentials, in ISO 8601
+  * ICAV2_PROJECT_FOLDER_URI / ICAV2_PROJECT_FOLDER_S3_URI: The project folder, and its underlying s3 uri
+  * ICAV2_OUTPUT_CACHE_FILE: The absolute path of the cache file
+so the uploaders (see upload_stream_multipart.py) can refresh the credentials through the cache
+before they expire, rather than failing part way through a long upload.
+
+Usage:
+  python3 resolve_icav2_output.py --cache-file icav2_output_cache.json icav2://project/path/to/folder/
+"""
+
+# Standard library imports
+import argparse
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+# Globals
+DEFAULT_CACHE_FILE = Path("icav2_output_cache.json")
+S3_URI_TTL_SECONDS = 24 * 60 * 60  # 1 day
+# The assumed lifetime of credentials returned without an expiration time
+CREDENTIALS_TTL_SECONDS = 60 * 60  # 1 hour
+# Must be longer than the 15 minute advisory refresh of botocore's refreshable credentials,
+# so a refresh always returns credentials botocore considers fresh
+REFRESH_MARGIN_SECONDS = 20 * 60  # 20 minutes
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--cache-file", type=Path, default=DEFAULT_CACHE_FILE,
+        help="Path to the cache of resolved project folders, shared by every job of the task"
+    )
+    parser.add_argument(
+        "project_folder_uri",
+        help="The project folder uri (i.e. the directory of the output uri, with a trailing slash)"
+    )
+    return parser.parse_args()
+
+
+@contextmanager
+def locked_cache(cache_file: Path) -> Iterator[Dict[str, Dict]]:
+    """
+    Hold the cache lock, yielding the cache entries, which are written back (only readable by us) on exit
+    """
+    with open(cache_file.with_name(cache_file.name + ".lock"), "a") as lock_h:
+        fcntl.flock(lock_h, fcntl.LOCK_EX)
+        try:
+            cache_entries = json.loads(cache_file.read_text()) if cache_file.is_file() else {}
+            yield cache_entries
+            cache_tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+            with open(os.open(cache_tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cache_tmp_h:
+                json.dump(cache_entries, cache_tmp_h, indent=2)
+            os.replace(cache_tmp_file, cache_file)
+        finally:
+            fcntl.flock(lock_h, fcntl.LOCK_UN)
+
+
+def get_project_folder(project_folder_uri: str) -> Tuple[str, str, str]:
+    """
+    Get the project id, folder id and underlying s3 uri of the project folder (creating the folder if needed)
+    """
+    # Wrapica imports
+    from wrapica.project_data import convert_project_data_obj_to_uri, convert_uri_to_project_data_obj
+    from wrapica.utils.globals import S3_URI_SCHEME
+
+    project_data_obj = convert_uri_to_project_data_obj(project_folder_uri, create_data_if_not_found=True)
+    return (
+        project_data_obj.project_id,
+        project_data_obj.data.id,
+        convert_project_data_obj_to_uri(project_data_obj, uri_type=S3_URI_SCHEME),
+    )
+
+
+def get_expiration_timestamp(expiration_time: Optional[Union[datetime, str]]) -> Optional[float]:
+    """
+    Get the epoch timestamp of the expiration time of the credentials (a datetime or an ISO 8601 string, UTC if naive)
+    """
+    if expiration_time is None:
+        return None
+    if isinstance(expiration_time, str):
+        expiration_time = datetime.fromisoformat(expiration_time.replace("Z", "+00:00"))
+    if expiration_time.tzinfo is None:
+        expiration_time = expiration_time.replace(tzinfo=timezone.utc)
+    return expiration_time.timestamp()
+
+
+def get_project_folder_credentials(project_id: str, folder_id: str) -> Tuple[Dict[str, str], Optional[float]]:
+    """
+    Get temporary AWS credentials to upload to the project folder, and the time they expire at (if given)
+    """
+    # Wrapica imports
+    from wrapica.project_data import get_aws_credentials_access_for_project_folder
+
+    aws_temp_credentials = get_aws_credentials_access_for_project_folder(project_id=project_id, folder_id=folder_id)
+    return (
+        {
+            "AWS_ACCESS_KEY_ID": aws_temp_credentials.access_key,
+            "AWS_SECRET_ACCESS_KEY": aws_temp_credentials.secret_key,
+            "AWS_SESSION_TOKEN": aws_temp_credentials.session_token,
+            "AWS_REGION": aws_temp_credentials.region,
+        },
+        get_expiration_timestamp(getattr(aws_temp_credentials, "expiration_time", None)),
+    )
+
+
+def resolve_icav2_output(
+        project_folder_uri: str,
+        cache_file: Path,
+        s3_uri_ttl_seconds: int = S3_URI_TTL_SECONDS,
+        credentials_ttl_seconds: int = CREDENTIALS_TTL_SECONDS,
+        refresh_margin_seconds: int = REFRESH_MARGIN_SECONDS
+) -> Dict[str, str]:
+    """
+    Get the upload credentials of the project folder, from the cache where they are still fresh
+    """
+    cache_file = cache_file.absolute()
+    with locked_cache(cache_file) as cache_entries:
+        cache_entry = cache_entries.setdefault(project_folder_uri, {})
+        now = time.time()
+
+        if cache_entry.get("s3UriResolvedAt", 0) + s3_uri_ttl_seconds <= now:
+            cache_entry["projectId"], cache_entry["folderId"], cache_entry["s3Uri"] = get_project_folder(
+                project_folder_uri
+            )
+            cache_entry["s3UriResolvedAt"] = now
+
+        if cache_entry.get("credentialsExpireAt", 0) - refresh_margin_seconds <= now:
+            cache_entry["credentials"], credentials_expire_at = get_project_folder_credentials(
+                cache_entry["projectId"], cache_entry["folderId"]
+            )
+            cache_entry["credentialsExpireAt"] = (
+                credentials_expire_at if credentials_expire_at is not None else now + credentials_ttl_seconds
+            )
+
+    return {
+        **cache_entry["credentials"],
+        "AWS_CREDENTIALS_EXPIRATION": datetime.fromtimestamp(
+            cache_entry["credentialsExpireAt"], tz=timezone.utc
+        ).isoformat(),
+        "ICAV2_PROJECT_FOLDER_URI": project_folder_uri,
+        "ICAV2_PROJECT_FOLDER_S3_URI": cache_entry["s3Uri"],
+        "ICAV2_OUTPUT_CACHE_FILE": str(cache_file),
+    }
+
+
+def refresh_upload_credentials(upload_credentials: Dict[str, str]) -> Dict[str, str]:
+    """
+    Get fresh upload credentials for the project folder of the upload credentials (through its cache)
+    """
+    return resolve_icav2_output(
+        upload_credentials["ICAV2_PROJECT_FOLDER_URI"],
+        Path(upload_credentials["ICAV2_OUTPUT_CACHE_FILE"])
+    )
+
+
+def main():
+    args = get_args()
+
+    print(
+        json.dumps(
+            resolve_icav2_output(args.project_folder_uri, args.cache_file),
+            indent=4
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+
+"""
+A long-lived decompression worker, pulling jobs from an SQS work queue rather than starting an ECS task per job.
+
+Each message on the queue (sent by the run decompression job step function,
+with the sqs:sendMessage.waitForTaskToken integration) is a json document with the keys
+  * taskToken: The task token of the step function state waiting on the job
+  * environment: The container environment of the job, as a list of {"Name": ..., "Value": ...}
+    (the same environment the step function would otherwise pass as the container overrides of an ECS task)
+
+Once started, the worker
+  * bootstraps once (see bootstrap.py), writing the hostname, tokens and icav2 configuration files to a warm env file,
+    bootstrapping again once the warm env file is older than --bootstrap-refresh-seconds (the tokens expire).
+  * reads every file of the ora reference (--ora-reference-path) once, so each orad process of each job
+    reads the reference from the page cache rather than from disk.
+Then, for each message
+  * sends a task heartbeat, skipping (and deleting) the message if the task token has already timed out.
+  * runs the entrypoint (--entrypoint) in its own directory with the job's environment,
+    and WARM_BOOTSTRAP_ENV_FILE set, so the job only collects the presigned urls of its ora files,
+    and ICAV2_OUTPUT_CACHE_FILE set, so the jobs share their resolved icav2 output folders and credentials.
+    The job writes the same output and metadata uris as it would in its own ECS task.
+  * every --heartbeat-interval-seconds, sends a task heartbeat and extends the visibility timeout of the message.
+    If the task token has timed out (i.e. the execution was stopped), the job is stopped.
+  * sends the task success (exit code 0) or failure (any other exit code), then deletes the message.
+While a job runs, the ECS task is protected from scale in (if the ECS agent endpoint is available).
+
+On SIGTERM (i.e. the service is scaled in, or the task is stopped), the running job is stopped,
+and its message is returned to the queue (visibility timeout of 0) to be picked up by another worker,
+the resumable uploads of the job pick up from their checkpoints.
+
+The sqs and step functions clients honour AWS_ENDPOINT_URL (or AWS_ENDPOINT_URL_SQS / AWS_ENDPOINT_URL_SFN),
+so the worker can be run against a local stand-in (see benchmarks/local_work_queue_server.py).
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.request import Request, urlopen
+
+# Boto3 imports
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Globals
+SCRIPTS_DIR = Path(__file__).absolute().parent
+BOOTSTRAP_SCRIPT = SCRIPTS_DIR / "bootstrap.py"
+DEFAULT_ENTRYPOINT = SCRIPTS_DIR.parent / "docker-entrypoint.sh"
+DEFAULT_WORK_DIR = Path("/tmp/decompression-worker")
+DEFAULT_BOOTSTRAP_REFRESH_SECONDS = 1800
+DEFAULT_HEARTBEAT_INTERVAL_SECONDS = 60
+DEFAULT_WAIT_TIME_SECONDS = 20
+# The message stays invisible for this many heartbeat intervals after each heartbeat
+VISIBILITY_TIMEOUT_HEARTBEAT_INTERVALS = 3
+TERMINATE_GRACE_SECONDS = 10
+READ_SIZE = 1024 * 1024  # 1 MiB
+# The step function errors of a task token that can no longer be completed
+EXPIRED_TASK_TOKEN_ERROR_CODES = ["TaskTimedOut", "TaskDoesNotExist", "InvalidToken"]
+TASK_FAILURE_ERROR = "DecompressionTaskFailed"
+# The icav2 output cache shared by every job (see resolve_icav2_output.py), relative to the work dir
+ICAV2_OUTPUT_CACHE_FILE_NAME = "icav2_output_cache.json"
+# Environment variables of the worker that are not passed on to each job
+WORKER_ENV_NAMES = ["WORKER_MODE", "WORK_QUEUE_URL"]
+# The ICAv2 configuration files of the warm bootstrap, relative to the work dir
+LIST_FILE_NAMES = {
+    "storage-configuration": "project_configuration_list.yaml",
+    "project-to-storage-configuration-mapping": "project_to_storage_configuration_mapping_list.yaml",
+    "storage-credential": "storage_credential_list.yaml",
+}
+# The ssm parameter path prefix env var of each ICAv2 configuration file
+PREFIX_ENV_NAMES = {
+    "storage-configuration": "ICAV2_STORAGE_CONFIGURATION_SSM_PARAMETER_PATH_PREFIX",
+    "project-to-storage-configuration-mapping": "ICAV2_PROJECT_TO_STORAGE_CONFIGURATION_MAPPING_SSM_PARAMETER_PATH_PREFIX",
+    "storage-credential": "ICAV2_STORAGE_CREDENTIAL_LIST_FILE_SSM_PARAMETER_PATH_PREFIX",
+}
+
+
+@dataclass
+class WorkItem:
+    receipt_handle: str
+    task_token: str
+    environment: Dict[str, str]
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--queue-url", default=os.environ.get("WORK_QUEUE_URL"),
+        help="The url of the work queue (defaults to WORK_QUEUE_URL)"
+    )
+    parser.add_argument(
+        "--entrypoint", type=Path, default=DEFAULT_ENTRYPOINT,
+        help="The entrypoint run for each job"
+    )
+    parser.add_argument(
+        "--work-dir", type=Path, default=DEFAULT_WORK_DIR,
+        help="The directory holding the warm bootstrap and the directory of each job"
+    )
+    parser.add_argument(
+        "--ora-reference-path", type=Path, default=os.environ.get("ORADATA_PATH"),
+        help="The ora reference to read in to the page cache (defaults to ORADATA_PATH)"
+    )
+    parser.add_argument(
+        "--bootstrap-refresh-seconds", type=int, default=DEFAULT_BOOTSTRAP_REFRESH_SECONDS,
+        help="Bootstrap again once the warm bootstrap is older than this"
+    )
+    parser.add_argument(
+        "--heartbeat-interval-seconds", type=int, default=DEFAULT_HEARTBEAT_INTERVAL_SECONDS,
+        help="Seconds between task heartbeats while a job runs"
+    )
+    parser.add_argument(
+        "--wait-time-seconds", type=int, default=DEFAULT_WAIT_TIME_SECONDS,
+        help="Seconds to long poll the work queue for"
+    )
+    parser.add_argument(
+        "--max-jobs", type=int, default=-1,
+        help="Exit once this many jobs have run, -1 to run until stopped"
+    )
+    return parser.parse_args()
+
+
+def get_client(service_name: str):
+    return boto3.client(
+        service_name,
+        region_name=os.environ.get("AWS_REGION"),
+        config=Config(retries={"max_attempts": 5, "mode": "standard"}),
+    )
+
+
+def run_warm_bootstrap(work_dir: Path) -> Path:
+    """
+    Bootstrap once for every job, writing the exports to the warm env file
+    """
+    warm_env_file = work_dir / "warm_bootstrap.env"
+    command = [
+        sys.executable, str(BOOTSTRAP_SCRIPT),
+        "--hostname-ssm-parameter-name", os.environ["HOSTNAME_SSM_PARAMETER_NAME"],
+        "--orcabus-token-secret-id", os.environ["ORCABUS_TOKEN_SECRET_ID"],
+        "--icav2-access-token-secret-id", os.environ["ICAV2_ACCESS_TOKEN_SECRET_ID"],
+    ]
+    for name, file_name in LIST_FILE_NAMES.items():
+        command += [
+            f"--{name}-prefix", os.environ[PREFIX_ENV_NAMES[name]],
+            f"--{name}-list-file", str(work_dir / file_name),
+        ]
+    if os.environ.get("FILE_MANAGER_URL"):
+        command += ["--file-manager-url", os.environ["FILE_MANAGER_URL"]]
+
+    bootstrap_env = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+
+    # Jobs may read the warm env file at any time, so replace it atomically
+    warm_env_tmp_file = warm_env_file.with_suffix(".tmp")
+    warm_env_tmp_file.write_text(bootstrap_env)
+    os.replace(warm_env_tmp_file, warm_env_file)
+    return warm_env_file
+
+
+def warm_ora_reference(ora_reference_path: Path):
+    """
+    Read every file of the ora reference once, so it is in the page cache for every orad process
+    """
+    start_time = time.perf_counter()
+    byte_count = 0
+    file_paths = [ora_reference_path] if ora_reference_path.is_file() else sorted(
+        file_path for file_path in ora_reference_path.rglob("*") if file_path.is_file()
+    )
+    for file_path in file_paths:
+        with open(file_path, "rb") as file_h:
+            while data := file_h.read(READ_SIZE):
+                byte_count += len(data)
+    print(
+        f"Read {byte_count} bytes of the ora reference {ora_reference_path} "
+        f"in {time.perf_counter() - start_time:.1f}s",
+        file=sys.stderr
+    )
+
+
+def set_task_protection(protection_enabled: bool, expires_in_minutes: int = 60):
+    """
+    Protect the ECS task from scale in while a job runs, a no-op outside of ECS
+    """
+    ecs_agent_uri = os.environ.get("ECS_AGENT_URI")
+    if not ecs_agent_uri:
+        return
+    request = Request(
+        f"{ecs_agent_uri}/task-protection/v1/state",
+        data=json.dumps({
+            "ProtectionEnabled": protection_enabled,
+            **({"ExpiresInMinutes": expires_in_minutes} if protection_enabled else {}),
+        }).encode(),
+        headers={"Content-Type": "application/json"},
+        method="PUT"
+    )
+    try:
+        with urlopen(request, timeout=10):
+            pass
+    except OSError as error:
+        # Scale in protection is best effort, a stopped worker returns its job to the queue
+        print(f"Warning! Could not set the task protection to {protection_enabled}: {error}", file=sys.stderr)
+
+
+def parse_message(message: Dict) -> WorkItem:
+    body = json.loads(message["Body"])
+    return WorkItem(
+        receipt_handle=message["ReceiptHandle"],
+        task_token=body["taskToken"],
+        environment={
+            env_var["Name"]: env_var["Value"]
+            for env_var in body["environment"]
+        },
+    )
+
+
+def is_expired_task_token_error(error: ClientError) -> bool:
+    return error.response["Error"]["Code"] in EXPIRED_TASK_TOKEN_ERROR_CODES
+
+
+def send_task_heartbeat(sfn_client, task_token: str) -> bool:
+    """
+    Send a task heartbeat, and return False if the task token has timed out
+    """
+    try:
+        sfn_client.send_task_heartbeat(taskToken=task_token)
+    except ClientError as error:
+        if is_expired_task_token_error(error):
+            return False
+        raise
+    return True
+
+
+def send_task_result(sfn_client, task_token: str, exit_code: int):
+    try:
+        if exit_code == 0:
+            sfn_client.send_task_success(taskToken=task_token, output=json.dumps({"exitCode": exit_code}))
+        else:
+            sfn_client.send_task_failure(
+                taskToken=task_token,
+                error=TASK_FAILURE_ERROR,
+                cause=f"The decompression container exited with code {exit_code}"
+            )
+    except ClientError as error:
+        if not is_expired_task_token_error(error):
+            raise
+        print("Warning! The task token timed out before the job finished, not sending the result", file=sys.stderr)
+
+
+def stop_process(process: subprocess.Popen):
+    """
+    Terminate the job (and every process it started), killing it if it outlives the grace period
+    """
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=TERMINATE_GRACE_SECONDS)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    process.wait()
+
+
+class Worker:
+    """
+    Runs one job at a time from the work queue
+    """
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.sqs_client = get_client("sqs")
+        self.sfn_client = get_client("stepfunctions")
+        self.warm_env_file: Optional[Path] = None
+        self.warm_env_time = 0.0
+        self.process: Optional[subprocess.Popen] = None
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+        process = self.process
+        if process is not None:
+            stop_process(process)
+
+    def get_warm_env_file(self) -> Path:
+        if self.warm_env_file is None or time.monotonic() - self.warm_env_time > self.args.bootstrap_refresh_seconds:
+            start_time = time.perf_counter()
+            self.warm_env_file = run_warm_bootstrap(self.args.work_dir)
+            self.warm_env_time = time.monotonic()
+            print(f"Warm bootstrap complete in {time.perf_counter() - start_time:.3f}s", file=sys.stderr)
+        return self.warm_env_file
+
+    def get_visibility_timeout(self) -> int:
+        return self.args.heartbeat_interval_seconds * VISIBILITY_TIMEOUT_HEARTBEAT_INTERVALS
+
+    def receive_work_item(self) -> Optional[WorkItem]:
+        messages = self.sqs_client.receive_message(
+            QueueUrl=self.args.queue_url,
+            MaxNumberOfMessages=1,
+            WaitTimeSeconds=self.args.wait_time_seconds,
+            VisibilityTimeout=self.get_visibility_timeout(),
+        ).get("Messages", [])
+        if not messages:
+            return None
+        return parse_message(messages[0])
+
+    def run_job(self, work_item: WorkItem, job_dir: Path) -> Optional[int]:
+        """
+        Run the entrypoint with the job's environment, and return its exit code,
+        or None if the job was stopped (the worker was stopped, or the task token timed out)
+        """
+        job_env = {
+            **{
+                env_name: env_value
+                for env_name, env_value in os.environ.items()
+                if env_name not in WORKER_ENV_NAMES
+            },
+            **work_item.environment,
+            "WARM_BOOTSTRAP_ENV_FILE": str(self.get_warm_env_file()),
+            "ICAV2_OUTPUT_CACHE_FILE": str(self.args.work_dir.absolute() / ICAV2_OUTPUT_CACHE_FILE_NAME),
+        }
+        # The entrypoint runs the scripts relative to its working directory
+        job_dir.mkdir(parents=True)
+        (job_dir / "scripts").symlink_to(self.args.entrypoint.absolute().parent / "scripts")
+
+        self.process = subprocess.Popen(
+            ["bash", str(self.args.entrypoint.absolute())],
+            cwd=job_dir, env=job_env, start_new_session=True
+        )
+        task_token_live = True
+        while True:
+            try:
+                exit_code = self.process.wait(timeout=self.args.heartbeat_interval_seconds)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            task_token_live = send_task_heartbeat(self.sfn_client, work_item.task_token)
+            if not task_token_live:
+                print("Error! The task token timed out, stopping the job", file=sys.stderr)
+                stop_process(self.process)
+                break
+            self.sqs_client.change_message_visibility(
+                QueueUrl=self.args.queue_url,
+                ReceiptHandle=work_item.receipt_handle,
+                VisibilityTimeout=self.get_visibility_timeout(),
+            )
+        self.process = None
+
+        if self.stop_event.is_set() or not task_token_live:
+            return None
+        return exit_code
+
+    def return_work_item(self, work_item: WorkItem):
+        """
+        Return the job to the queue for another worker
+        """
+        self.sqs_client.change_message_visibility(
+            QueueUrl=self.args.queue_url,
+            ReceiptHandle=work_item.receipt_handle,
+            VisibilityTimeout=0,
+        )
+
+    def process_work_item(self, work_item: WorkItem, job_number: int):
+        job_dir = self.args.work_dir / f"job_{job_number}"
+        if self.stop_event.is_set():
+            self.return_work_item(work_item)
+            return
+        if not send_task_heartbeat(self.sfn_client, work_item.task_token):
+            print("Warning! The task token has already timed out, skipping the job", file=sys.stderr)
+            self.sqs_client.delete_message(QueueUrl=self.args.queue_url, ReceiptHandle=work_item.receipt_handle)
+            return
+
+        set_task_protection(True)
+        try:
+            start_time = time.perf_counter()
+            exit_code = self.run_job(work_item, job_dir)
+            print(
+                f"Job {job_number} finished in {time.perf_counter() - start_time:.1f}s with exit code {exit_code}",
+                file=sys.stderr
+            )
+            if exit_code is None and self.stop_event.is_set():
+                self.return_work_item(work_item)
+                return
+            if exit_code is not None:
+                send_task_result(self.sfn_client, work_item.task_token, exit_code)
+            self.sqs_client.delete_message(QueueUrl=self.args.queue_url, ReceiptHandle=work_item.receipt_handle)
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            set_task_protection(False)
+
+    def run(self):
+        self.args.work_dir.mkdir(parents=True, exist_ok=True)
+        self.get_warm_env_file()
+        if self.args.ora_reference_path is not None and self.args.ora_reference_path.exists():
+            warm_ora_reference(self.args.ora_reference_path)
+
+        job_count = 0
+        while not self.stop_event.is_set() and job_count != self.args.max_jobs:
+            work_item = self.receive_work_item()
+            if work_item is None:
+                continue
+            job_count += 1
+            print(
+                f"Starting job {job_count} "
+                f"({work_item.environment.get('JOB_TYPE')} of {work_item.environment.get('INPUT_ORA_URI')})",
+                file=sys.stderr
+            )
+            self.process_work_item(work_item, job_count)
+
+
+def main():
+    args = get_args()
+
+    if not args.queue_url:
+        raise ValueError("--queue-url (or WORK_QUEUE_URL) must be set")
+    if args.heartbeat_interval_seconds < 1 or args.bootstrap_refresh_seconds < 1:
+        raise ValueError("--heartbeat-interval-seconds and --bootstrap-refresh-seconds must be positive integers")
+    if not 0 <= args.wait_time_seconds <= 20:
+        raise ValueError("--wait-time-seconds must be between 0 and 20")
+
+    worker = Worker(args)
+
+    # Stop the running job (returning it to the queue) if we are stopped (i.e. the service is scaled in)
+    def handle_sigterm(signum, frame):
+        threading.Thread(target=worker.stop, daemon=True).start()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
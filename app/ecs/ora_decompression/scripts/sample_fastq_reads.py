@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+"""
+Exact count, pair consistent streaming fastq read sampler.
+
+Reads a fastq stream from stdin and writes exactly --max-reads records to stdout
+(or all records if the stream holds fewer than --max-reads).
+
+We use bottom-k sampling on a seeded hash of the read name.
+Every read name is hashed, and we keep the --max-reads records with the smallest hashes.
+Because the hash depends only on the read name and the seed,
+R1 and R2 select identical reads without needing to coordinate with each other.
+Selected records are written out in their original order so R1 and R2 stay in sync.
+
+Memory is bounded by --max-reads records, and the input is only read once.
+
+The stream is cut into chunks of complete records, each chunk is hashed by a worker process
+which returns only its own bottom-k candidates, the main process then merges the candidates.
+The bottom-k of the union of each chunk's bottom-k is the bottom-k of the whole stream, so the result is exact.
+"""
+
+# Standard library imports
+import argparse
+import heapq
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from hashlib import blake2b
+from typing import Deque, Iterator, List, Optional, Tuple
+
+# Globals
+CHUNK_SIZE = 16 * 1024 * 1024  # 16 MiB
+FASTQ_LINES_PER_READ = 4
+HASH_DIGEST_SIZE = 8
+DEFAULT_SEED = 11  # Must be a fixed value since we need to ensure R1 and R2 return the same reads
+DEFAULT_PROCESSES = 2
+
+# (hash digest, read name, record index, record)
+Candidate = Tuple[bytes, bytes, int, bytes]
+# (hash digest, read name)
+Threshold = Tuple[bytes, bytes]
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-reads", required=True, type=int,
+        help="The exact number of reads to return"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=DEFAULT_SEED,
+        help="The seed for the read name hash, R1 and R2 must use the same seed"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=DEFAULT_PROCESSES,
+        help="Number of worker processes used to hash read names, use 1 to hash in the main process"
+    )
+    return parser.parse_args()
+
+
+def iter_record_chunks(input_stream) -> Iterator[Tuple[bytes, int]]:
+    """
+    Yield (chunk, record count) tuples where each chunk holds only complete fastq records.
+    We only count newlines here (which is fast) and leave the line splitting to the workers.
+    """
+    remainder = b""
+    while chunk := input_stream.read(CHUNK_SIZE):
+        data = remainder + chunk
+        newline_count = data.count(b"\n")
+        # Walk back from the last newline to the last complete record
+        cut_index = data.rfind(b"\n")
+        for _ in range(newline_count % FASTQ_LINES_PER_READ):
+            cut_index = data.rfind(b"\n", 0, cut_index)
+        cut_index += 1
+        remainder = data[cut_index:]
+        if cut_index > 0:
+            yield data[:cut_index], (newline_count - newline_count % FASTQ_LINES_PER_READ) // FASTQ_LINES_PER_READ
+
+    if remainder.strip():
+        remainder = remainder.rstrip(b"\n") + b"\n"
+        if remainder.count(b"\n") % FASTQ_LINES_PER_READ != 0:
+            raise ValueError("Truncated fastq record found at the end of the input stream")
+        yield remainder, remainder.count(b"\n") // FASTQ_LINES_PER_READ
+
+
+def get_chunk_candidates(
+        chunk: bytes,
+        first_record_index: int,
+        max_reads: int,
+        hash_key: bytes,
+        threshold: Optional[Threshold]
+) -> List[Candidate]:
+    """
+    Hash the read names of every record in the chunk and return the bottom-k records of the chunk.
+    Records at or above the (possibly stale) global threshold can never be selected, so are dropped early.
+
+    The read name is everything up to the first whitespace of the header,
+    with any trailing /1 or /2 removed so that R1 and R2 names are identical
+
+    Raises a ValueError (naming the 0-based index of the record in the stream) if the chunk does not hold
+    complete four line records, or a record's header does not start with @ followed by a read name
+    """
+    lines = chunk.split(b"\n")
+    if lines[-1] or (len(lines) - 1) % FASTQ_LINES_PER_READ != 0:
+        truncated_record_index = first_record_index + (len(lines) - 1) // FASTQ_LINES_PER_READ
+        raise ValueError(
+            f"Truncated fastq record {truncated_record_index}, expected {FASTQ_LINES_PER_READ} lines per record"
+        )
+
+    # Malformed headers (i.e. the blank line of a truncated record) are given an empty read name
+    read_names = [
+        header_line.split(maxsplit=1)[0] if header_line.startswith(b"@") else b""
+        for header_line in lines[0:len(lines) - 1:FASTQ_LINES_PER_READ]
+    ]
+    for invalid_read_name in (b"", b"@"):
+        if invalid_read_name in read_names:
+            record_offset = read_names.index(invalid_read_name)
+            raise ValueError(
+                f"Malformed fastq record {first_record_index + record_offset}, "
+                f"expected a header line starting with @ and the read name but got "
+                f"{lines[record_offset * FASTQ_LINES_PER_READ][:100]!r}"
+            )
+    if read_names and read_names[0][-2:] in (b"/1", b"/2"):
+        read_names = [
+            read_name[:-2] if read_name[-2:] in (b"/1", b"/2") else read_name
+            for read_name in read_names
+        ]
+
+    hashed_names = [
+        (blake2b(read_name, digest_size=HASH_DIGEST_SIZE, key=hash_key).digest(), read_name, record_offset)
+        for record_offset, read_name in enumerate(read_names)
+    ]
+
+    # Read names break any hash ties so R1 and R2 still agree
+    if threshold is not None:
+        hashed_names = [
+            hashed_name
+            for hashed_name in hashed_names
+            if hashed_name[:2] < threshold
+        ]
+
+    return [
+        (
+            read_hash,
+            read_name,
+            first_record_index + record_offset,
+            b"\n".join(
+                lines[record_offset * FASTQ_LINES_PER_READ:(record_offset + 1) * FASTQ_LINES_PER_READ]
+            ) + b"\n"
+        )
+        for read_hash, read_name, record_offset in heapq.nsmallest(max_reads, hashed_names)
+    ]
+
+
+class BottomK:
+    """
+    Keep the max_reads candidates with the smallest (hash, read name) pairs
+    """
+    def __init__(self, max_reads: int):
+        self.max_reads = max_reads
+        # Max heap of the candidates we are keeping (python only has min heaps, so we store inverted keys)
+        self.heap: List[Tuple['_InvertedKey', int, bytes]] = []
+
+    @property
+    def threshold(self) -> Optional[Threshold]:
+        if len(self.heap) < self.max_reads:
+            return None
+        return self.heap[0][0].key
+
+    def add(self, candidates: List[Candidate]):
+        for read_hash, read_name, record_index, record in candidates:
+            heap_item = (_InvertedKey((read_hash, read_name)), record_index, record)
+            if len(self.heap) < self.max_reads:
+                heapq.heappush(self.heap, heap_item)
+            elif (read_hash, read_name) < self.heap[0][0].key:
+                heapq.heapreplace(self.heap, heap_item)
+
+    def get_records(self) -> List[bytes]:
+        return list(map(
+            lambda heap_item_iter_: heap_item_iter_[2],
+            sorted(self.heap, key=lambda heap_item_iter_: heap_item_iter_[1])
+        ))
+
+
+class _InvertedKey:
+    """
+    Reverse the ordering of a (hash, read name) key so the heap root is the largest key we are keeping
+    """
+    __slots__ = ("key",)
+
+    def __init__(self, key: Threshold):
+        self.key = key
+
+    def __lt__(self, other: '_InvertedKey') -> bool:
+        return self.key > other.key
+
+
+def sample_reads(input_stream, max_reads: int, seed: int, processes: int) -> List[bytes]:
+    """
+    Return the max_reads records with the smallest read name hashes, in their original order
+    """
+    hash_key = seed.to_bytes(8, "little", signed=False)
+    bottom_k = BottomK(max_reads)
+
+    record_index = 0
+    if processes <= 1:
+        for chunk, record_count in iter_record_chunks(input_stream):
+            bottom_k.add(get_chunk_candidates(chunk, record_index, max_reads, hash_key, bottom_k.threshold))
+            record_index += record_count
+        return bottom_k.get_records()
+
+    # Keep a bounded number of chunks in flight so memory stays bounded
+    in_flight: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for chunk, record_count in iter_record_chunks(input_stream):
+            if len(in_flight) >= 2 * processes:
+                bottom_k.add(in_flight.popleft().result())
+            in_flight.append(
+                executor.submit(
+                    get_chunk_candidates, chunk, record_index, max_reads, hash_key, bottom_k.threshold
+                )
+            )
+            record_index += record_count
+        while in_flight:
+            bottom_k.add(in_flight.popleft().result())
+
+    return bottom_k.get_records()
+
+
+def main():
+    args = get_args()
+
+    if args.max_reads < 1:
+        raise ValueError("--max-reads must be a positive integer")
+
+    output_stream = sys.stdout.buffer
+    for record in sample_reads(sys.stdin.buffer, args.max_reads, args.seed, args.processes):
+        output_stream.write(record)
+    output_stream.flush()
+
+
+if __name__ == "__main__":
+    main()
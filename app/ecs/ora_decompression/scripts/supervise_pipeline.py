@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+"""
+Run a pipeline of stage processes (stage 1 | stage 2 | ... | stage n), failing fast if any stage fails or stalls.
+
+A bash pipeline only reports the exit code of its last stage (or, with pipefail, fails on the broken pipe
+of every stage upstream of a head), and a stalled stage sits there until the task times out.
+Instead, the supervisor starts every stage itself, connecting each stage's stdout to the next stage's stdin
+(stage 1 reads the supervisor's stdin, stage n writes to the supervisor's stdout), and every POLL_INTERVAL_SECONDS
+  * checks the exit code of each stage.
+    A non-zero exit code fails the pipeline, unless a stage downstream of it that may close its stdin early
+    (closesInputEarly, i.e. head) had already exited successfully, as the stage was then only stopped by a broken pipe.
+  * checks the progress of each stage, the bytes read and written by the stage's processes (from /proc/<pid>/io).
+    If no stage has made any progress for --stall-timeout seconds, the pipeline is stalled
+    (a stall timeout of 0 turns off stall detection, i.e. for a pipeline that waits on another pipeline).
+    Once a stage stalls, the stages upstream of it block writing to their (full) stdout pipes,
+    and the stages downstream of it block reading from their (empty) stdin pipes,
+    so the stalled stage is the first stage that is not blocked on a pipe (from /proc/<pid>/wchan),
+    falling back to the stage that stopped making progress first.
+
+On failure, every stage is stopped, and a failure document is written to --failure-json, with the keys
+  * failedStage: The name of the stage that failed (or stalled), null if the supervisor itself failed
+  * reason: EXIT_CODE, STALLED, START_FAILED (i.e. the stage's command was not found)
+    or SUPERVISOR_ERROR (any other error of the supervisor)
+  * message: A description of the failure
+  * exitCode: The exit code of the failed stage (null if it stalled, or did not start)
+  * stderrTail: The last STDERR_TAIL_LINES lines of the failed stage's stderr
+  * stages: The exit code, bytes read and written, seconds since the last progress,
+    and whether it is blocked on a pipe, of every stage
+then the supervisor exits with a non-zero exit code.
+
+The pipeline is a json list (--pipeline-json) of stages, each with the keys
+  * name: The name of the stage
+  * command: The command of the stage, as a list of arguments
+  * closesInputEarly (optional): The stage may stop reading its stdin before the end of the stream (i.e. head)
+  * stderrFile (optional): Write the stage's stderr to this file rather than to the supervisor's stderr (i.e. the orad logs)
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Local imports
+from pipeline_probe import set_pipe_size
+
+# Globals
+DEFAULT_STALL_TIMEOUT_SECONDS = 300
+POLL_INTERVAL_SECONDS = 1
+TERMINATE_GRACE_SECONDS = 10
+STDERR_TAIL_LINES = 50
+PIPE_WAIT_CHANNELS = ["pipe_read", "pipe_write", "anon_pipe_read", "anon_pipe_write", "pipe_wait"]
+
+
+@dataclass
+class PipelineStage:
+    name: str
+    command: List[str]
+    closes_input_early: bool = False
+    stderr_file: Optional[Path] = None
+    process: Optional[subprocess.Popen] = None
+    stderr_tail: Deque[str] = field(default_factory=lambda: deque(maxlen=STDERR_TAIL_LINES))
+    stderr_thread: Optional[threading.Thread] = None
+    exit_code: Optional[int] = None
+    read_bytes: int = 0
+    write_bytes: int = 0
+    last_progress_time: float = field(default_factory=time.monotonic)
+    waiting_on_pipe: bool = False
+
+    def get_summary(self, now: float) -> Dict:
+        return {
+            "stage": self.name,
+            "exitCode": self.exit_code,
+            "readBytes": self.read_bytes,
+            "writeBytes": self.write_bytes,
+            "secondsSinceProgress": round(now - self.last_progress_time, 3),
+            "waitingOnPipe": self.waiting_on_pipe,
+        }
+
+
+class PipelineFailure(Exception):
+    def __init__(self, stage: Optional[PipelineStage], reason: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+        self.reason = reason
+        self.message = message
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--pipeline-json", required=True, type=Path,
+        help="Path to the json list of stages"
+    )
+    parser.add_argument(
+        "--stall-timeout", type=float, default=DEFAULT_STALL_TIMEOUT_SECONDS,
+        help="Fail the pipeline if no stage has made any progress for this many seconds, 0 to never fail on a stall"
+    )
+    parser.add_argument(
+        "--failure-json", type=Path, default=None,
+        help="Path to write the failure document to if the pipeline fails"
+    )
+    return parser.parse_args()
+
+
+def read_pipeline_json(pipeline_json: Path) -> List[PipelineStage]:
+    stages = [
+        PipelineStage(
+            name=stage["name"],
+            command=stage["command"],
+            closes_input_early=stage.get("closesInputEarly", False),
+            stderr_file=Path(stage["stderrFile"]) if stage.get("stderrFile") else None,
+        )
+        for stage in json.loads(pipeline_json.read_text())
+    ]
+    if not stages:
+        raise ValueError("Expected at least one stage in the pipeline")
+    return stages
+
+
+def forward_stderr(stage: PipelineStage):
+    """
+    Forward the stage's stderr line by line (to its stderr file, or our stderr), keeping the tail
+    """
+    stderr_h = open(stage.stderr_file, "w") if stage.stderr_file is not None else sys.stderr
+    try:
+        for line in stage.process.stderr:
+            line = line.decode(errors="replace")
+            stage.stderr_tail.append(line.rstrip("\n"))
+            stderr_h.write(line)
+            stderr_h.flush()
+    finally:
+        if stage.stderr_file is not None:
+            stderr_h.close()
+
+
+def start_stages(stages: List[PipelineStage]):
+    """
+    Start each stage in its own session (so the stage and any processes it starts can be stopped together),
+    reading from the previous stage's stdout
+    """
+    stdin_fd = sys.stdin.fileno()
+    for stage_index, stage in enumerate(stages):
+        if stage_index < len(stages) - 1:
+            read_fd, stdout_fd = os.pipe()
+            set_pipe_size(stdout_fd)
+        else:
+            read_fd, stdout_fd = None, sys.stdout.fileno()
+
+        try:
+            stage.process = subprocess.Popen(
+                stage.command,
+                stdin=stdin_fd, stdout=stdout_fd, stderr=subprocess.PIPE,
+                start_new_session=True
+            )
+        except OSError as e:
+            raise PipelineFailure(stage, "START_FAILED", f"Stage {stage.name} could not be started: {e}") from e
+        stage.stderr_thread = threading.Thread(target=forward_stderr, args=(stage,), daemon=True)
+        stage.stderr_thread.start()
+
+        # The stages now hold their own copies of the pipe ends
+        if stage_index > 0:
+            os.close(stdin_fd)
+        if read_fd is not None:
+            os.close(stdout_fd)
+            stdin_fd = read_fd
+
+
+def get_process_state_by_session() -> Dict[int, Tuple[int, int, bool]]:
+    """
+    The bytes read and written by every process summed by session id,
+    and whether any process in the session is blocked reading from or writing to a pipe.
+    Each stage is the leader of its own session, so this includes any processes the stage has started
+    """
+    process_state_by_session: Dict[int, Tuple[int, int, bool]] = {}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as stat_h:
+                # The fields after the command name (which may contain spaces) are state, ppid, pgrp, session
+                session_id = int(stat_h.read().rsplit(")", 1)[1].split()[3])
+            with open(f"/proc/{pid}/io") as io_h:
+                io_counts = dict(line.split(": ") for line in io_h.read().splitlines())
+            with open(f"/proc/{pid}/wchan") as wchan_h:
+                wait_channel = wchan_h.read().strip()
+        except (OSError, IndexError, ValueError):
+            # The process has exited, or we cannot read its counts
+            continue
+        read_bytes, write_bytes, waiting_on_pipe = process_state_by_session.get(session_id, (0, 0, False))
+        process_state_by_session[session_id] = (
+            read_bytes + int(io_counts.get("rchar", 0)),
+            write_bytes + int(io_counts.get("wchar", 0)),
+            waiting_on_pipe or wait_channel in PIPE_WAIT_CHANNELS,
+        )
+    return process_state_by_session
+
+
+def check_stage_exits(stages: List[PipelineStage]):
+    """
+    Collect the exit code of any stages that have finished, raising on any unexpected failure.
+    Downstream stages are checked first so a head that exits at the same time as the stage upstream of it is seen first
+    """
+    for stage_index in reversed(range(len(stages))):
+        stage = stages[stage_index]
+        if stage.exit_code is not None or stage.process.poll() is None:
+            continue
+        stage.exit_code = stage.process.returncode
+        stage.last_progress_time = time.monotonic()
+        if stage.exit_code == 0:
+            continue
+        if any(
+            downstream_stage.closes_input_early and downstream_stage.exit_code == 0
+            for downstream_stage in stages[stage_index + 1:]
+        ):
+            print(
+                f"Stage {stage.name} exited with code {stage.exit_code} after a downstream stage closed its input, ignoring",
+                file=sys.stderr
+            )
+            continue
+        raise PipelineFailure(stage, "EXIT_CODE", f"Stage {stage.name} failed with exit code {stage.exit_code}")
+
+
+def check_stage_progress(stages: List[PipelineStage], stall_timeout: float):
+    """
+    Update the progress of each running stage, raising if no stage has made progress within the stall timeout
+    """
+    now = time.monotonic()
+    process_state_by_session = get_process_state_by_session()
+    for stage in stages:
+        if stage.exit_code is not None:
+            continue
+        read_bytes, write_bytes, stage.waiting_on_pipe = process_state_by_session.get(
+            stage.process.pid, (stage.read_bytes, stage.write_bytes, False)
+        )
+        if (read_bytes, write_bytes) != (stage.read_bytes, stage.write_bytes):
+            stage.read_bytes, stage.write_bytes = read_bytes, write_bytes
+            stage.last_progress_time = now
+
+    if stall_timeout == 0 or now - max(stage.last_progress_time for stage in stages) < stall_timeout:
+        return
+
+    running_stages = [stage for stage in stages if stage.exit_code is None]
+    stalled_stage = next(
+        (stage for stage in running_stages if not stage.waiting_on_pipe),
+        min(running_stages, key=lambda stage: stage.last_progress_time)
+    )
+    raise PipelineFailure(
+        stalled_stage, "STALLED",
+        f"No progress in the pipeline for {stall_timeout:.0f} seconds, "
+        f"stage {stalled_stage.name} stalled "
+        f"({now - stalled_stage.last_progress_time:.0f} seconds since it last read or wrote any bytes)"
+    )
+
+
+def stop_stages(stages: List[PipelineStage]):
+    """
+    Terminate every running stage (and the processes it started), killing any that outlive the grace period
+    """
+    running_stages = [stage for stage in stages if stage.process is not None and stage.process.poll() is None]
+    for stage in running_stages:
+        try:
+            os.killpg(stage.process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + TERMINATE_GRACE_SECONDS
+    for stage in running_stages:
+        try:
+            stage.process.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(stage.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            stage.process.wait()
+
+
+def run_pipeline(stages: List[PipelineStage], stall_timeout: float):
+    start_stages(stages)
+    while any(stage.exit_code is None for stage in stages):
+        time.sleep(POLL_INTERVAL_SECONDS)
+        check_stage_exits(stages)
+        check_stage_progress(stages, stall_timeout)
+
+    # Make sure we have forwarded all of each stage's stderr
+    for stage in stages:
+        stage.stderr_thread.join()
+
+
+def write_failure_json(failure: PipelineFailure, stages: List[PipelineStage], failure_json: Path):
+    now = time.monotonic()
+    with open(failure_json, "w") as failure_json_h:
+        json.dump(
+            {
+                "failedStage": failure.stage.name if failure.stage is not None else None,
+                "reason": failure.reason,
+                "message": failure.message,
+                "exitCode": failure.stage.exit_code if failure.stage is not None else None,
+                "stderrTail": "\n".join(failure.stage.stderr_tail) if failure.stage is not None else "",
+                "stages": [stage.get_summary(now) for stage in stages],
+            },
+            failure_json_h,
+            indent=2
+        )
+
+
+def main():
+    args = get_args()
+
+    if args.stall_timeout < 0:
+        raise ValueError("--stall-timeout must be a positive number (or 0)")
+
+    stages = read_pipeline_json(args.pipeline_json)
+
+    # Stop the stages if we are stopped (i.e. the task is stopped)
+    def handle_sigterm(signum, frame):
+        stop_stages(stages)
+        sys.exit(128 + signum)
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    failure: Optional[PipelineFailure] = None
+    try:
+        run_pipeline(stages, args.stall_timeout)
+    except PipelineFailure as pipeline_failure:
+        failure = pipeline_failure
+    except Exception as e:
+        traceback.print_exc()
+        failure = PipelineFailure(None, "SUPERVISOR_ERROR", f"The pipeline supervisor failed: {e!r}")
+    finally:
+        # Never leave a stage running behind us
+        stop_stages(stages)
+
+    if failure is not None:
+        print(f"Error! {failure.message}", file=sys.stderr)
+        # The stderr of a stage that stalled is still open, so only wait on stages that have stopped
+        for stage in stages:
+            if stage.stderr_thread is not None:
+                stage.stderr_thread.join(timeout=1)
+        if args.failure_json is not None:
+            write_failure_json(failure, stages, args.failure_json)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+
+"""
+Choose the thread allocation of an ORA_DECOMPRESSION pipeline from a short pilot run on the head of the ora file.
+
+The static allocation splits the thread budget in half between the read sampler and the compressor,
+with a fixed number of download connections and upload parts in flight, whichever stage is the limiter.
+Instead, we spend the first few seconds of the job measuring each stage on the head of the ora file:
+  * download: --pilot-bytes of the ora file fetched as --max-download-connections concurrent ranges,
+    giving the throughput of a single connection and of all connections at once
+  * orad: the downloaded bytes decompressed by orad (for at most --pilot-seconds),
+    giving its output rate, the cores it uses and the expansion of ora to fastq
+  * compression: the decompressed fastq deflated in SEGMENT_SIZE segments by the job's engine and level (single threaded),
+    giving the raw MiB compressed per cpu second and the compression ratio
+  * sampling (only when sampling): the read name hashing of the sampler, as raw MiB per cpu second
+
+orad cannot be tuned, so it sets the target throughput of the pipeline.
+We then pick the fewest resources that keep up with the target (with HEADROOM to spare) within the thread budget,
+  * sampler processes: target / sampling rate per process, up to the threads left after orad and RESERVED_THREADS
+  * compression threads: target / compression rate per thread, up to the threads left after orad and RESERVED_THREADS
+    The sampler only writes its reads once it has read the whole stream, so it never runs alongside the compressor.
+    When sampling, the compressor only has the sampled reads to get through, so it takes all the threads left.
+  * download connections: target / (expansion * rate per connection), up to --max-download-connections
+  * upload concurrency: target / (compression ratio * rate per connection), up to --max-upload-concurrency
+    (uploading a part to s3 uses the same network path as downloading a range, so we use the measured download rate)
+If the threads run out, the target drops to what the compressor (or sampler) can keep up with.
+
+The allocation is written to stdout as a json document (read by the entrypoint), with the keys
+  * downloadConnections / compressionThreads / samplerProcesses / uploadConcurrency
+  * predictedMibPerSecond: The predicted throughput of the pipeline (in raw fastq MiB/s)
+  * limitingStage: The stage that sets the predicted throughput (download, orad, compression or sampling)
+  * measurements: The pilot measurements the allocation was chosen from
+and also logged to stderr (prefixed with 'THREAD_ALLOCATION ') for later analysis.
+
+If --compression-threads is set (i.e. by the job), the compressor is held at that many threads.
+"""
+
+# Standard library imports
+import argparse
+import json
+import math
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+# Local imports
+from compress_stream import COMPRESSION_ENGINES, DEFAULT_ENGINE, get_compression_level, get_deflate_module
+from download_presigned_url import (
+    DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT_SECONDS, READ_SIZE, fetch_range, get_object_size
+)
+from sample_fastq_reads import DEFAULT_SEED, FASTQ_LINES_PER_READ, get_chunk_candidates
+
+# Globals
+DEFAULT_PILOT_BYTES = 32 * 1024 * 1024  # 32 MiB of the ora file
+DEFAULT_PILOT_SECONDS = 3
+DEFAULT_MAX_DOWNLOAD_CONNECTIONS = 16
+DEFAULT_MAX_UPLOAD_CONCURRENCY = 16
+DEFAULT_ORAD_PATH = "/usr/local/bin/orad"
+SEGMENT_SIZE = 1024 * 1024  # 1 MiB, as per compress_upload_resumable.py
+# Fastq held back from orad for the compression and sampling pilots
+MAX_FASTQ_SAMPLE_SIZE = 64 * 1024 * 1024  # 64 MiB
+# Spare capacity given to each stage over the target throughput
+HEADROOM = 1.25
+# The download, read selection, stream stats and stage probes
+RESERVED_THREADS = 1
+THREAD_ALLOCATION_PREFIX = "THREAD_ALLOCATION"
+MIB = 1024 * 1024
+
+
+@dataclass
+class PilotMeasurements:
+    # Download, in ora MiB/s
+    download_mib_per_second_per_connection: float
+    download_mib_per_second: float
+    download_connections: int
+    # orad, in raw fastq MiB/s
+    orad_mib_per_second: float
+    orad_cores: float
+    # Raw fastq bytes per ora byte
+    ora_expansion_ratio: float
+    # Compression, in raw fastq MiB per cpu second
+    compression_mib_per_cpu_second: float
+    # Raw fastq bytes per compressed byte
+    compression_ratio: float
+    # Sampling, in raw fastq MiB per cpu second (None when not sampling)
+    sampling_mib_per_cpu_second: Optional[float]
+    pilot_seconds: float
+
+
+@dataclass
+class ThreadAllocation:
+    download_connections: int
+    compression_threads: int
+    sampler_processes: int
+    upload_concurrency: int
+    predicted_mib_per_second: float
+    limiting_stage: str
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "url",
+        help="The (presigned) url of the ora file"
+    )
+    parser.add_argument(
+        "--thread-budget", type=int, required=True,
+        help="Number of threads available to the pipeline"
+    )
+    parser.add_argument(
+        "--ora-reference", required=True,
+        help="Path to the orad reference data"
+    )
+    parser.add_argument(
+        "--orad-path", default=DEFAULT_ORAD_PATH,
+        help="Path to the orad binary"
+    )
+    parser.add_argument(
+        "--engine", choices=list(COMPRESSION_ENGINES.keys()), default=DEFAULT_ENGINE,
+        help="The compression engine of the job"
+    )
+    parser.add_argument(
+        "--level", type=int, default=-1,
+        help="The compression level of the job, -1 for the default level of the engine"
+    )
+    parser.add_argument(
+        "--compression-threads", type=int, default=-1,
+        help="Hold the compressor at this many threads, -1 to choose the number of threads"
+    )
+    parser.add_argument(
+        "--sampling-max-reads", type=int, default=-1,
+        help="The max reads of the read sampler, -1 if the job is not sampling"
+    )
+    parser.add_argument(
+        "--pilot-bytes", type=int, default=DEFAULT_PILOT_BYTES,
+        help="Number of bytes of the ora file to download for the pilot"
+    )
+    parser.add_argument(
+        "--pilot-seconds", type=float, default=DEFAULT_PILOT_SECONDS,
+        help="Maximum number of seconds to run orad for"
+    )
+    parser.add_argument(
+        "--max-download-connections", type=int, default=DEFAULT_MAX_DOWNLOAD_CONNECTIONS,
+        help="Maximum number of concurrent range requests (also used by the download pilot)"
+    )
+    parser.add_argument(
+        "--max-upload-concurrency", type=int, default=DEFAULT_MAX_UPLOAD_CONCURRENCY,
+        help="Maximum number of parts uploaded at once"
+    )
+    return parser.parse_args()
+
+
+def pilot_download(url: str, pilot_bytes: int, connections: int) -> Tuple[bytes, float, float]:
+    """
+    Fetch the head of the object as concurrent ranges,
+    returning the bytes, the median MiB/s of a single connection and the MiB/s of all connections
+    """
+    object_size = get_object_size(url, DEFAULT_TIMEOUT_SECONDS)
+    if object_size is None:
+        raise ValueError("Server does not support range requests, cannot measure the download connections")
+    pilot_bytes = min(pilot_bytes, object_size)
+    if pilot_bytes == 0:
+        raise ValueError("Cannot run a pilot on an empty ora file")
+
+    range_size = math.ceil(pilot_bytes / connections)
+    ranges = [(start, min(start + range_size, pilot_bytes) - 1) for start in range(0, pilot_bytes, range_size)]
+
+    def fetch_timed_range(start: int, end: int) -> Tuple[bytes, float]:
+        start_time = time.perf_counter()
+        data = fetch_range(url, start, end, DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT_SECONDS)
+        return data, time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        results = list(executor.map(lambda range_: fetch_timed_range(*range_), ranges))
+    elapsed_seconds = time.perf_counter() - start_time
+
+    per_connection_mib_per_second = statistics.median(
+        len(data) / MIB / max(seconds, 1e-9) for data, seconds in results
+    )
+    return (
+        b"".join(data for data, _ in results),
+        per_connection_mib_per_second,
+        pilot_bytes / MIB / max(elapsed_seconds, 1e-9)
+    )
+
+
+def pilot_orad(ora_bytes: bytes, orad_path: str, ora_reference: str, pilot_seconds: float) -> Tuple[bytes, float, float, float]:
+    """
+    Decompress the head of the ora file (stopping after pilot_seconds),
+    returning the start of the fastq, the fastq MiB/s, the cores used and the expansion ratio.
+    The head is truncated, so orad is expected to fail once it reaches the end
+    """
+    process = subprocess.Popen(
+        [orad_path, "--raw", "--stdout", "--ora-reference", ora_reference, "-"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    ora_bytes_written = 0
+
+    def write_stdin():
+        nonlocal ora_bytes_written
+        try:
+            for start in range(0, len(ora_bytes), READ_SIZE):
+                process.stdin.write(ora_bytes[start:start + READ_SIZE])
+                ora_bytes_written = start + len(ora_bytes[start:start + READ_SIZE])
+            process.stdin.close()
+        except (BrokenPipeError, ValueError):
+            # orad has exited (or we stopped it)
+            pass
+
+    rusage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    writer = threading.Thread(target=write_stdin, daemon=True)
+    start_time = time.perf_counter()
+    writer.start()
+
+    fastq_sample = bytearray()
+    fastq_byte_count = 0
+    while data := process.stdout.read(READ_SIZE):
+        fastq_byte_count += len(data)
+        if len(fastq_sample) < MAX_FASTQ_SAMPLE_SIZE:
+            fastq_sample += data
+        if time.perf_counter() - start_time > pilot_seconds:
+            process.kill()
+            break
+    elapsed_seconds = time.perf_counter() - start_time
+    ora_bytes_consumed = ora_bytes_written
+    process.kill()
+    process.wait()
+    writer.join()
+    rusage_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    if fastq_byte_count == 0 or ora_bytes_consumed == 0:
+        raise ValueError("orad did not produce any output from the head of the ora file")
+
+    cpu_seconds = (
+        (rusage_end.ru_utime - rusage_start.ru_utime) +
+        (rusage_end.ru_stime - rusage_start.ru_stime)
+    )
+    return (
+        bytes(fastq_sample),
+        fastq_byte_count / MIB / max(elapsed_seconds, 1e-9),
+        cpu_seconds / max(elapsed_seconds, 1e-9),
+        fastq_byte_count / ora_bytes_consumed
+    )
+
+
+def pilot_compression(fastq_sample: bytes, engine: str, level: int) -> Tuple[float, float]:
+    """
+    Deflate the fastq in segments as the compressors do, returning the MiB per cpu second and the compression ratio
+    """
+    deflate_module = get_deflate_module(engine)
+    compressed_byte_count = 0
+    start_time = time.process_time()
+    for start in range(0, len(fastq_sample), SEGMENT_SIZE):
+        compressor = deflate_module.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed_byte_count += len(
+            compressor.compress(fastq_sample[start:start + SEGMENT_SIZE]) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+    cpu_seconds = time.process_time() - start_time
+    return (
+        len(fastq_sample) / MIB / max(cpu_seconds, 1e-9),
+        len(fastq_sample) / max(compressed_byte_count, 1)
+    )
+
+
+def pilot_sampling(fastq_sample: bytes, max_reads: int) -> float:
+    """
+    Hash the read names as the sampler does, returning the MiB per cpu second
+    """
+    # Only whole records, the sample ends wherever orad was stopped
+    cut_index = len(fastq_sample)
+    for _ in range(fastq_sample.count(b"\n") % FASTQ_LINES_PER_READ + 1):
+        cut_index = fastq_sample.rfind(b"\n", 0, cut_index)
+    records = fastq_sample[:cut_index + 1]
+    if not records:
+        raise ValueError("orad did not produce a whole fastq record from the head of the ora file")
+
+    start_time = time.process_time()
+    get_chunk_candidates(records, 0, max_reads, DEFAULT_SEED.to_bytes(8, "little", signed=False), None)
+    cpu_seconds = time.process_time() - start_time
+    return len(records) / MIB / max(cpu_seconds, 1e-9)
+
+
+def get_thread_allocation(
+        measurements: PilotMeasurements,
+        thread_budget: int,
+        compression_threads: int,
+        sampling: bool,
+        max_download_connections: int,
+        max_upload_concurrency: int
+) -> ThreadAllocation:
+    """
+    The fewest resources for each stage that keep up with orad, within the thread budget
+    """
+    target_mib_per_second = measurements.orad_mib_per_second
+    limiting_stage = "orad"
+
+    # Threads left once orad and the lightweight stages have theirs
+    available_threads = max(thread_budget - math.ceil(measurements.orad_cores) - RESERVED_THREADS, 1)
+
+    # Sampling, the sampler only writes its reads once it has read the whole stream,
+    # so the sampler and the compressor are never busy at once and each may take all the available threads
+    sampler_processes = 1
+    if sampling:
+        sampler_processes = math.ceil(
+            target_mib_per_second * HEADROOM / measurements.sampling_mib_per_cpu_second
+        )
+        sampler_processes = min(max(sampler_processes, 1), available_threads)
+        if sampler_processes * measurements.sampling_mib_per_cpu_second < target_mib_per_second:
+            target_mib_per_second = sampler_processes * measurements.sampling_mib_per_cpu_second
+            limiting_stage = "sampling"
+
+    # Compression, when sampling the compressor only has the sampled reads to get through, so takes all it can
+    if compression_threads > 0:
+        compression_threads = min(compression_threads, thread_budget)
+    elif sampling:
+        compression_threads = available_threads
+    else:
+        compression_threads = math.ceil(
+            target_mib_per_second * HEADROOM / measurements.compression_mib_per_cpu_second
+        )
+        compression_threads = min(max(compression_threads, 1), available_threads)
+    if not sampling and compression_threads * measurements.compression_mib_per_cpu_second < target_mib_per_second:
+        target_mib_per_second = compression_threads * measurements.compression_mib_per_cpu_second
+        limiting_stage = "compression"
+
+    # Download, connections are network rather than cpu bound
+    download_connections = math.ceil(
+        target_mib_per_second * HEADROOM /
+        measurements.ora_expansion_ratio / measurements.download_mib_per_second_per_connection
+    )
+    download_connections = min(max(download_connections, 1), max_download_connections)
+    download_mib_per_second = min(
+        download_connections * measurements.download_mib_per_second_per_connection,
+        # We only know the ceiling of the connections we measured
+        measurements.download_mib_per_second
+        if download_connections >= measurements.download_connections else math.inf
+    )
+    if download_mib_per_second * measurements.ora_expansion_ratio < target_mib_per_second:
+        target_mib_per_second = download_mib_per_second * measurements.ora_expansion_ratio
+        limiting_stage = "download"
+
+    # Upload
+    upload_concurrency = math.ceil(
+        target_mib_per_second * HEADROOM /
+        measurements.compression_ratio / measurements.download_mib_per_second_per_connection
+    )
+    upload_concurrency = min(max(upload_concurrency, 1), max_upload_concurrency)
+
+    return ThreadAllocation(
+        download_connections=download_connections,
+        compression_threads=compression_threads,
+        sampler_processes=sampler_processes,
+        upload_concurrency=upload_concurrency,
+        predicted_mib_per_second=round(target_mib_per_second, 3),
+        limiting_stage=limiting_stage,
+    )
+
+
+def to_camel_case_dict(obj) -> Dict:
+    def to_camel_case(name: str) -> str:
+        first, *rest = name.split("_")
+        return first + "".join(part.title() for part in rest)
+
+    return {
+        to_camel_case(key): round(value, 3) if isinstance(value, float) else value
+        for key, value in asdict(obj).items()
+    }
+
+
+def main():
+    args = get_args()
+
+    if args.thread_budget < 1:
+        raise ValueError("--thread-budget must be a positive integer")
+    if args.max_download_connections < 1 or args.max_upload_concurrency < 1:
+        raise ValueError("--max-download-connections and --max-upload-concurrency must be positive integers")
+
+    level = get_compression_level(args.engine, args.level)
+    sampling = args.sampling_max_reads > 0
+
+    start_time = time.perf_counter()
+    ora_bytes, download_mib_per_second_per_connection, download_mib_per_second = pilot_download(
+        args.url, args.pilot_bytes, args.max_download_connections
+    )
+    fastq_sample, orad_mib_per_second, orad_cores, ora_expansion_ratio = pilot_orad(
+        ora_bytes, args.orad_path, args.ora_reference, args.pilot_seconds
+    )
+    compression_mib_per_cpu_second, compression_ratio = pilot_compression(fastq_sample, args.engine, level)
+    sampling_mib_per_cpu_second = pilot_sampling(fastq_sample, args.sampling_max_reads) if sampling else None
+
+    measurements = PilotMeasurements(
+        download_mib_per_second_per_connection=download_mib_per_second_per_connection,
+        download_mib_per_second=download_mib_per_second,
+        download_connections=args.max_download_connections,
+        orad_mib_per_second=orad_mib_per_second,
+        orad_cores=orad_cores,
+        ora_expansion_ratio=ora_expansion_ratio,
+        compression_mib_per_cpu_second=compression_mib_per_cpu_second,
+        compression_ratio=compression_ratio,
+        sampling_mib_per_cpu_second=sampling_mib_per_cpu_second,
+        pilot_seconds=time.perf_counter() - start_time,
+    )
+    thread_allocation = get_thread_allocation(
+        measurements,
+        thread_budget=args.thread_budget,
+        compression_threads=args.compression_threads,
+        sampling=sampling,
+        max_download_connections=args.max_download_connections,
+        max_upload_concurrency=args.max_upload_concurrency,
+    )
+
+    thread_allocation_json = {
+        **to_camel_case_dict(thread_allocation),
+        "threadBudget": args.thread_budget,
+        "measurements": to_camel_case_dict(measurements),
+    }
+    print(f"{THREAD_ALLOCATION_PREFIX} {json.dumps(thread_allocation_json)}", file=sys.stderr, flush=True)
+    print(json.dumps(thread_allocation_json))
+
+
+if __name__ == "__main__":
+    main()
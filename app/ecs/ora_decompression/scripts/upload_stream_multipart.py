@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+
+"""
+Upload stdin to an S3 uri as a multipart upload, without needing to know the size of the stream up front.
+
+'aws s3 cp - <uri>' picks a single part size from --expected-size,
+and fails once the upload reaches the 10,000 part limit, so we previously needed a gzip size estimate before we started.
+
+Instead, part sizes grow as the upload progresses.
+The first PART_SIZE_GROWTH_INTERVAL parts are MIN_PART_SIZE,
+and the part size doubles every PART_SIZE_GROWTH_INTERVAL parts (up to the 5 GiB S3 maximum).
+Small files use small parts, and 10,000 parts cover well over the 5 TiB S3 maximum object size.
+
+Parts are uploaded concurrently from a bounded pool.
+At most --concurrency parts are being uploaded at once, and we only read the next part from stdin
+once a slot is free, so memory is bounded by roughly (--concurrency + 1) parts.
+
+Streams smaller than the first part are uploaded with a single put object call.
+If any part fails (after botocore's own retries), the multipart upload is aborted.
+
+The md5 of each part is calculated as it is uploaded (and sent as its Content-MD5, so S3 rejects a corrupted part),
+along with the md5 of the whole stream. From these we get the ETag S3 gives the object
+(the md5 of the stream for a single put object call, else the md5 of the concatenated part md5s, a dash
+and the part count, this holds for unencrypted and SSE-S3 (AES256) objects but not SSE-KMS objects).
+If --output-json is set, the byteCount, md5sum and etag (without the surrounding quotes) of the object are written to it,
+so the object can be verified and registered without being read back.
+
+Credentials are collected from the environment as per any boto3 client,
+AWS_REGION and AWS_ENDPOINT_URL may be used to set the region and endpoint.
+If UPLOAD_AWS_CREDENTIALS_JSON is set (a json dictionary with the AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY,
+AWS_SESSION_TOKEN and AWS_REGION keys, as returned by resolve_icav2_output.py),
+those credentials are used for the upload instead.
+If they also have an AWS_CREDENTIALS_EXPIRATION (and the project folder and cache file they were resolved through),
+they are refreshed through resolve_icav2_output.py before they expire, so a long upload outlives the credentials.
+"""
+
+# Standard library imports
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Boto3 imports
+import boto3
+from botocore.config import Config
+from botocore.credentials import RefreshableCredentials
+from botocore.session import get_session
+
+# Local imports
+from resolve_icav2_output import refresh_upload_credentials
+
+# Globals
+MIN_PART_SIZE = 8 * 1024 * 1024  # 8 MiB
+MAX_PART_SIZE = 5 * 1024 * 1024 * 1024  # 5 GiB
+MAX_PARTS = 10_000
+PART_SIZE_GROWTH_INTERVAL = 1000  # Double the part size every 1000 parts
+DEFAULT_CONCURRENCY = 4
+READ_SIZE = 1024 * 1024  # 1 MiB
+UPLOAD_AWS_CREDENTIALS_JSON_ENV_VAR = "UPLOAD_AWS_CREDENTIALS_JSON"
+
+
+@dataclass
+class UploadSummary:
+    byte_count: int
+    # None if the upload was resumed (see compress_upload_resumable.py)
+    md5sum: Optional[str]
+    etag: str
+
+    def to_dict(self) -> Dict:
+        return {
+            "byteCount": self.byte_count,
+            "md5sum": self.md5sum,
+            "etag": self.etag,
+        }
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "s3_uri",
+        help="The destination s3 uri"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="Maximum number of parts uploaded at once"
+    )
+    parser.add_argument(
+        "--sse", default="AES256",
+        help="Server side encryption to use for the object"
+    )
+    parser.add_argument(
+        "--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL"),
+        help="Override the S3 endpoint (i.e. for a local S3 stand-in)"
+    )
+    parser.add_argument(
+        "--output-json", type=Path,
+        help="Path to write the byte count, md5sum and etag of the uploaded object to"
+    )
+    return parser.parse_args()
+
+
+def get_part_size(part_number: int) -> int:
+    """
+    Part size for a (1-based) part number
+    """
+    return min(
+        MIN_PART_SIZE * 2 ** ((part_number - 1) // PART_SIZE_GROWTH_INTERVAL),
+        MAX_PART_SIZE
+    )
+
+
+def read_exactly(input_stream: BinaryIO, size: int) -> bytes:
+    """
+    Read size bytes from the stream, or less only if we reach the end of the stream
+    """
+    buffer = bytearray()
+    while len(buffer) < size:
+        data = input_stream.read(min(READ_SIZE, size - len(buffer)))
+        if not data:
+            break
+        buffer += data
+    return bytes(buffer)
+
+
+def iter_parts(input_stream: BinaryIO) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (part number, part body) tuples, the last part may be smaller than its part size
+    """
+    part_number = 1
+    while True:
+        part_body = read_exactly(input_stream, get_part_size(part_number))
+        if not part_body and part_number > 1:
+            return
+        yield part_number, part_body
+        if len(part_body) < get_part_size(part_number):
+            return
+        part_number += 1
+        if part_number > MAX_PARTS:
+            raise ValueError(f"Stream is larger than the {MAX_PARTS} parts supported by a multipart upload")
+
+
+def get_refreshable_session(upload_credentials: Dict[str, str]) -> boto3.Session:
+    """
+    Get a session whose credentials are refreshed (through the icav2 output cache) before they expire
+    """
+    def get_credentials_metadata(credentials: Dict[str, str]) -> Dict[str, str]:
+        return {
+            "access_key": credentials["AWS_ACCESS_KEY_ID"],
+            "secret_key": credentials["AWS_SECRET_ACCESS_KEY"],
+            "token": credentials.get("AWS_SESSION_TOKEN"),
+            "expiry_time": credentials["AWS_CREDENTIALS_EXPIRATION"],
+        }
+
+    botocore_session = get_session()
+    botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+        metadata=get_credentials_metadata(upload_credentials),
+        refresh_using=lambda: get_credentials_metadata(refresh_upload_credentials(upload_credentials)),
+        method="icav2-project-folder",
+    )
+    return boto3.Session(botocore_session=botocore_session)
+
+
+def get_s3_client(endpoint_url: Optional[str], concurrency: int, use_upload_credentials: bool = True):
+    """
+    Get an s3 client, using the upload credentials (if set and requested) over the default credentials
+    """
+    session = boto3.Session()
+    credentials_kwargs = {}
+    region_name = os.environ.get("AWS_REGION")
+    if use_upload_credentials and os.environ.get(UPLOAD_AWS_CREDENTIALS_JSON_ENV_VAR):
+        upload_credentials = json.loads(os.environ[UPLOAD_AWS_CREDENTIALS_JSON_ENV_VAR])
+        if upload_credentials.get("AWS_CREDENTIALS_EXPIRATION"):
+            session = get_refreshable_session(upload_credentials)
+        else:
+            credentials_kwargs = {
+                "aws_access_key_id": upload_credentials["AWS_ACCESS_KEY_ID"],
+                "aws_secret_access_key": upload_credentials["AWS_SECRET_ACCESS_KEY"],
+                "aws_session_token": upload_credentials.get("AWS_SESSION_TOKEN"),
+            }
+        region_name = upload_credentials.get("AWS_REGION", region_name)
+
+    return session.client(
+        "s3",
+        region_name=region_name,
+        endpoint_url=endpoint_url,
+        config=Config(
+            max_pool_connections=concurrency,
+            retries={"max_attempts": 10, "mode": "standard"},
+        ),
+        **credentials_kwargs
+    )
+
+
+def get_content_md5(md5_digest: bytes) -> str:
+    return base64.b64encode(md5_digest).decode()
+
+
+def get_multipart_etag(part_md5sums: List[str]) -> str:
+    """
+    The ETag S3 gives an object completed from parts with these md5sums (without the surrounding quotes)
+    """
+    return "{}-{}".format(
+        hashlib.md5(b"".join(bytes.fromhex(part_md5sum) for part_md5sum in part_md5sums)).hexdigest(),
+        len(part_md5sums)
+    )
+
+
+def upload_part(s3_client, bucket: str, key: str, upload_id: str, part_number: int, part_body: bytes) -> Dict:
+    """
+    Upload a part, and return its part number, etag and md5sum
+    (only the part number and etag are passed on to complete_multipart_upload)
+    """
+    md5_digest = hashlib.md5(part_body).digest()
+    response = s3_client.upload_part(
+        Bucket=bucket,
+        Key=key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        Body=part_body,
+        ContentMD5=get_content_md5(md5_digest),
+    )
+    return {
+        "PartNumber": part_number,
+        "ETag": response["ETag"],
+        "Md5": md5_digest.hex(),
+    }
+
+
+def upload_stream(
+        input_stream: BinaryIO,
+        s3_client,
+        bucket: str,
+        key: str,
+        sse: str,
+        concurrency: int
+) -> UploadSummary:
+    """
+    Upload the stream and return the byte count, md5sum and etag of the uploaded object
+    """
+    parts_iter = iter_parts(input_stream)
+    first_part_number, first_part_body = next(parts_iter)
+
+    # Small streams don't need a multipart upload
+    if len(first_part_body) < get_part_size(first_part_number):
+        md5_digest = hashlib.md5(first_part_body).digest()
+        s3_client.put_object(
+            Bucket=bucket, Key=key, Body=first_part_body, ServerSideEncryption=sse,
+            ContentMD5=get_content_md5(md5_digest)
+        )
+        return UploadSummary(byte_count=len(first_part_body), md5sum=md5_digest.hex(), etag=md5_digest.hex())
+
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=bucket, Key=key, ServerSideEncryption=sse
+    )["UploadId"]
+
+    bytes_uploaded = 0
+    md5_obj = hashlib.md5()
+    completed_parts: List[Dict] = []
+    in_flight: Deque[Future] = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for part_number, part_body in chain([(first_part_number, first_part_body)], parts_iter):
+            # Wait for a free slot before we read (and hold) any more of the stream
+            if len(in_flight) >= concurrency:
+                completed_parts.append(in_flight.popleft().result())
+            in_flight.append(
+                executor.submit(upload_part, s3_client, bucket, key, upload_id, part_number, part_body)
+            )
+            bytes_uploaded += len(part_body)
+            md5_obj.update(part_body)
+        while in_flight:
+            completed_parts.append(in_flight.popleft().result())
+
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": part["PartNumber"], "ETag": part["ETag"]}
+                for part in completed_parts
+            ]},
+        )
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    executor.shutdown(wait=True)
+
+    return UploadSummary(
+        byte_count=bytes_uploaded,
+        md5sum=md5_obj.hexdigest(),
+        etag=get_multipart_etag([part["Md5"] for part in completed_parts]),
+    )
+
+
+def main():
+    args = get_args()
+
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be a positive integer")
+
+    s3_uri_obj = urlparse(args.s3_uri)
+    if s3_uri_obj.scheme != "s3":
+        raise ValueError(f"Expected an s3 uri but got '{args.s3_uri}'")
+
+    upload_summary = upload_stream(
+        sys.stdin.buffer,
+        get_s3_client(args.endpoint_url, args.concurrency),
+        bucket=s3_uri_obj.netloc,
+        key=s3_uri_obj.path.lstrip("/"),
+        sse=args.sse,
+        concurrency=args.concurrency,
+    )
+    print(f"Uploaded {upload_summary.byte_count} bytes to {args.s3_uri} (etag {upload_summary.etag})", file=sys.stderr)
+
+    if args.output_json is not None:
+        with open(args.output_json, "w") as output_json_h:
+            json.dump(upload_summary.to_dict(), output_json_h)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+"""
+Split a fastq stream (stdin) into gzip compressed chunk files of --chunk-read-count reads,
+uploading each chunk while the stream is still being read.
+
+The chunks are named in the Illumina chunked fastq scheme, the destination s3 uri must end in _001.fastq.gz
+and is used for the first chunk, the second chunk is uploaded to _002.fastq.gz and so on.
+Chunks are cut on read boundaries, so every chunk (except the last) holds exactly --chunk-read-count reads.
+When R1 and R2 are split with the same chunk read count, chunk N of R1 holds the mates of chunk N of R2.
+
+Each chunk is compressed with compress_stream.py (so any compression engine may be used),
+and uploaded with the streaming multipart uploader (see upload_stream_multipart.py).
+The next chunk is started as soon as the current chunk has all of its reads,
+with at most MAX_CHUNKS_IN_FLIGHT chunks being compressed and uploaded at once.
+
+Writes a json document to --output-json with the keys
+  * byteCount: The total compressed size of all chunks
+  * chunkReadCount: The number of reads in each chunk
+  * chunks: The chunkNumber (1-based), fileName, firstReadNumber (0-based), readCount, gzipFileSizeInBytes,
+    gzipMd5sum and gzipFileEtag (see upload_stream_multipart.py) of each chunk
+"""
+
+# Standard library imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+# Local imports
+from compress_stream import COMPRESSION_ENGINES, DEFAULT_ENGINE, DEFAULT_THREADS
+from upload_stream_multipart import DEFAULT_CONCURRENCY, UploadSummary, get_s3_client, upload_stream
+
+# Globals
+READ_SIZE = 1024 * 1024  # 1 MiB
+LINES_PER_READ = 4
+MAX_CHUNKS_IN_FLIGHT = 2
+FIRST_CHUNK_SUFFIX = "_001.fastq.gz"
+COMPRESS_STREAM_SCRIPT = Path(__file__).parent / "compress_stream.py"
+
+
+@dataclass
+class Chunk:
+    chunk_number: int
+    first_read_number: int
+    s3_uri: str
+    process: subprocess.Popen
+    upload_future: Future
+    line_count: int = 0
+
+    def get_summary(self) -> Dict:
+        upload_summary: UploadSummary = self.upload_future.result()
+        return {
+            "chunkNumber": self.chunk_number,
+            "fileName": self.s3_uri.rsplit("/", 1)[-1],
+            "firstReadNumber": self.first_read_number,
+            "readCount": self.line_count // LINES_PER_READ,
+            "gzipFileSizeInBytes": upload_summary.byte_count,
+            "gzipMd5sum": upload_summary.md5sum,
+            "gzipFileEtag": upload_summary.etag,
+        }
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "s3_uri",
+        help=f"The destination s3 uri of the first chunk, must end in {FIRST_CHUNK_SUFFIX}"
+    )
+    parser.add_argument(
+        "--chunk-read-count", required=True, type=int,
+        help="Number of reads in each chunk"
+    )
+    parser.add_argument(
+        "--engine", choices=list(COMPRESSION_ENGINES.keys()), default=DEFAULT_ENGINE,
+        help="The compression engine"
+    )
+    parser.add_argument(
+        "--level", type=int, default=-1,
+        help="The compression level, -1 for the default level of the engine"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=DEFAULT_THREADS,
+        help="Number of compression threads for each chunk"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="Maximum number of parts of each chunk uploaded at once"
+    )
+    parser.add_argument(
+        "--sse", default="AES256",
+        help="Server side encryption to use for each chunk"
+    )
+    parser.add_argument(
+        "--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL"),
+        help="Override the S3 endpoint (i.e. for a local S3 stand-in)"
+    )
+    parser.add_argument(
+        "--output-json", required=True, type=Path,
+        help="Path to write the chunk summaries to"
+    )
+    return parser.parse_args()
+
+
+def get_chunk_s3_uri(s3_uri: str, chunk_number: int) -> str:
+    """
+    The s3 uri of the (1-based) chunk number, i.e. _R1_001.fastq.gz -> _R1_002.fastq.gz
+    """
+    return s3_uri[:-len(FIRST_CHUNK_SUFFIX)] + f"_{chunk_number:03d}.fastq.gz"
+
+
+def start_chunk(
+        executor: ThreadPoolExecutor,
+        s3_client,
+        s3_uri: str,
+        chunk_number: int,
+        first_read_number: int,
+        args: argparse.Namespace
+) -> Chunk:
+    """
+    Start compressing the chunk, and uploading the compressed stream in a background thread
+    """
+    chunk_s3_uri = get_chunk_s3_uri(s3_uri, chunk_number)
+    process = subprocess.Popen(
+        [
+            sys.executable, str(COMPRESS_STREAM_SCRIPT),
+            "--engine", args.engine,
+            "--level", str(args.level),
+            "--threads", str(args.threads),
+        ],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    s3_uri_obj = urlparse(chunk_s3_uri)
+    upload_future = executor.submit(
+        upload_stream,
+        process.stdout,
+        s3_client,
+        bucket=s3_uri_obj.netloc,
+        key=s3_uri_obj.path.lstrip("/"),
+        sse=args.sse,
+        concurrency=args.concurrency,
+    )
+    return Chunk(
+        chunk_number=chunk_number,
+        first_read_number=first_read_number,
+        s3_uri=chunk_s3_uri,
+        process=process,
+        upload_future=upload_future,
+    )
+
+
+def finish_chunk(chunk: Chunk):
+    """
+    Wait on the compression and upload of the chunk (its stdin must already be closed)
+    """
+    chunk.upload_future.result()
+    if chunk.process.wait() != 0:
+        raise ValueError(f"Compression of chunk {chunk.chunk_number} failed with exit code {chunk.process.returncode}")
+    print(
+        f"Uploaded chunk {chunk.chunk_number} ({chunk.line_count // LINES_PER_READ} reads) to {chunk.s3_uri}",
+        file=sys.stderr
+    )
+
+
+def write_chunks(input_stream: BinaryIO, s3_client, args: argparse.Namespace) -> List[Chunk]:
+    """
+    Split the stream into chunks of the chunk read count, cutting each chunk at the end of its last read
+    """
+    chunk_line_count = args.chunk_read_count * LINES_PER_READ
+    chunks: List[Chunk] = []
+    in_flight: Deque[Chunk] = deque()
+    executor = ThreadPoolExecutor(max_workers=MAX_CHUNKS_IN_FLIGHT)
+    current_chunk: Optional[Chunk] = None
+
+    def next_chunk() -> Chunk:
+        # Wait for a free slot before starting another chunk
+        if len(in_flight) >= MAX_CHUNKS_IN_FLIGHT:
+            finish_chunk(in_flight.popleft())
+        chunk = start_chunk(
+            executor, s3_client, args.s3_uri,
+            chunk_number=len(chunks) + 1,
+            first_read_number=len(chunks) * args.chunk_read_count,
+            args=args
+        )
+        chunks.append(chunk)
+        in_flight.append(chunk)
+        return chunk
+
+    def close_chunk(chunk: Chunk):
+        chunk.process.stdin.close()
+
+    try:
+        while True:
+            data = input_stream.read(READ_SIZE)
+            if not data:
+                break
+            while data:
+                # Chunks are only started once we have data for them, so we never upload a trailing empty chunk
+                if current_chunk is None:
+                    current_chunk = next_chunk()
+                lines_remaining = chunk_line_count - current_chunk.line_count
+                data_line_count = data.count(b"\n")
+                if data_line_count < lines_remaining:
+                    current_chunk.process.stdin.write(data)
+                    current_chunk.line_count += data_line_count
+                    break
+                # Find the end of the last line of the chunk
+                end_position = -1
+                for _ in range(lines_remaining):
+                    end_position = data.index(b"\n", end_position + 1)
+                current_chunk.process.stdin.write(data[:end_position + 1])
+                current_chunk.line_count += lines_remaining
+                close_chunk(current_chunk)
+                current_chunk = None
+                data = data[end_position + 1:]
+
+        # An empty stream is still written as a single (empty) chunk
+        if not chunks:
+            current_chunk = next_chunk()
+        if current_chunk is not None:
+            if current_chunk.line_count % LINES_PER_READ != 0:
+                raise ValueError(f"Expected the stream to end on a read boundary, got {current_chunk.line_count} lines")
+            close_chunk(current_chunk)
+        while in_flight:
+            finish_chunk(in_flight.popleft())
+    except BaseException:
+        for chunk in chunks:
+            if chunk.process.poll() is None:
+                chunk.process.kill()
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+    return chunks
+
+
+def main():
+    args = get_args()
+
+    if args.chunk_read_count < 1:
+        raise ValueError("--chunk-read-count must be a positive integer")
+    if args.threads < 1 or args.concurrency < 1:
+        raise ValueError("--threads and --concurrency must be positive integers")
+
+    s3_uri_obj = urlparse(args.s3_uri)
+    if s3_uri_obj.scheme != "s3" or not args.s3_uri.endswith(FIRST_CHUNK_SUFFIX):
+        raise ValueError(f"Expected an s3 uri ending in {FIRST_CHUNK_SUFFIX} but got '{args.s3_uri}'")
+
+    # Each in flight chunk uploads up to --concurrency parts at once
+    s3_client = get_s3_client(args.endpoint_url, args.concurrency * MAX_CHUNKS_IN_FLIGHT)
+
+    chunks = write_chunks(sys.stdin.buffer, s3_client, args)
+    chunk_summaries = [chunk.get_summary() for chunk in chunks]
+
+    with open(args.output_json, "w") as output_json_h:
+        json.dump(
+            {
+                "byteCount": sum(chunk_summary["gzipFileSizeInBytes"] for chunk_summary in chunk_summaries),
+                "chunkReadCount": args.chunk_read_count,
+                "chunks": chunk_summaries,
+            },
+            output_json_h,
+            indent=2
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+
+"""
+The container scripts are run as standalone scripts (not a package), so add the scripts directory to the path
+"""
+
+# Standard library imports
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent / "scripts"))
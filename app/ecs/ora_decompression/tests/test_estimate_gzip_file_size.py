@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the gzip file size estimator
+"""
+
+# Standard library imports
+import io
+import random
+
+# Local imports
+from estimate_gzip_file_size import (
+    DEFAULT_CONFIDENCE_LEVEL, DEFAULT_SEED, DEFLATE_WINDOW_SIZE, GZIP_HEADER_AND_TRAILER_SIZE,
+    estimate_gzip_file_size, get_compressed_block_size
+)
+
+# Globals
+BLOCK_SIZE = 64 * 1024  # 64 KiB
+
+
+def get_fastq(num_reads: int) -> bytes:
+    rng = random.Random(42)
+    records = []
+    for read_index in range(num_reads):
+        # Quality drifts across the run, as it does in real data
+        quality_chars = "FFFFFFFF:," if read_index < num_reads // 2 else "F:,#"
+        sequence = "".join(rng.choice("ACGT") for _ in range(100))
+        quality = "".join(rng.choice(quality_chars) for _ in range(100))
+        records.append(f"@A00001:1:HTEST:1:1101:{read_index}:1 1:N:0:ACGT\n{sequence}\n+\n{quality}\n")
+    return "".join(records).encode()
+
+
+def get_measured_gzip_size(fastq: bytes) -> int:
+    """
+    The compressed size of every block, each primed with the preceding window
+    """
+    compressed_size = 0
+    for offset in range(0, len(fastq), BLOCK_SIZE):
+        compressed_size += get_compressed_block_size(
+            fastq[offset:offset + BLOCK_SIZE],
+            fastq[max(offset - DEFLATE_WINDOW_SIZE, 0):offset]
+        )
+    return compressed_size + GZIP_HEADER_AND_TRAILER_SIZE
+
+
+def run_estimator(fastq: bytes, total_read_count: int, target_sampled_blocks: int, relative_precision: float):
+    return estimate_gzip_file_size(
+        io.BytesIO(fastq),
+        total_read_count=total_read_count,
+        block_size=BLOCK_SIZE,
+        target_sampled_blocks=target_sampled_blocks,
+        min_sampled_blocks=4,
+        relative_precision=relative_precision,
+        confidence_level=DEFAULT_CONFIDENCE_LEVEL,
+        threads=2,
+        seed=DEFAULT_SEED,
+    )
+
+
+def test_every_block_sampled_reports_the_measured_size():
+    fastq = get_fastq(2000)
+
+    # No read count, so the stride is 1, and the precision is never reached, so every block is compressed
+    estimate = run_estimator(fastq, total_read_count=0, target_sampled_blocks=512, relative_precision=0.0)
+
+    assert estimate["blockCount"] > 1
+    assert estimate["sampledBlockCount"] == estimate["blockCount"]
+    assert estimate["rawFileSizeInBytes"] == len(fastq)
+    # The measured size is the point estimate and both bounds of the interval
+    assert estimate["gzipFileSizeInBytes"] == get_measured_gzip_size(fastq)
+    assert estimate["gzipFileSizeInBytesLowerBound"] == estimate["gzipFileSizeInBytes"]
+    assert estimate["gzipFileSizeInBytesUpperBound"] == estimate["gzipFileSizeInBytes"]
+
+
+def test_single_block_stream_reports_the_measured_size():
+    fastq = get_fastq(10)
+
+    estimate = run_estimator(fastq, total_read_count=10, target_sampled_blocks=512, relative_precision=0.005)
+
+    assert estimate["blockCount"] == estimate["sampledBlockCount"] == 1
+    assert (
+        estimate["gzipFileSizeInBytesLowerBound"] ==
+        estimate["gzipFileSizeInBytes"] ==
+        estimate["gzipFileSizeInBytesUpperBound"] ==
+        get_measured_gzip_size(fastq)
+    )
+
+
+def test_empty_stream():
+    estimate = run_estimator(b"", total_read_count=0, target_sampled_blocks=512, relative_precision=0.005)
+
+    assert estimate["blockCount"] == 0
+    assert estimate["gzipFileSizeInBytes"] == 2 + GZIP_HEADER_AND_TRAILER_SIZE
+    assert (
+        estimate["gzipFileSizeInBytesLowerBound"] ==
+        estimate["gzipFileSizeInBytesUpperBound"] ==
+        2 + GZIP_HEADER_AND_TRAILER_SIZE
+    )
+
+
+def test_sampled_interval_covers_the_measured_size():
+    fastq = get_fastq(20000)
+
+    estimate = run_estimator(fastq, total_read_count=20000, target_sampled_blocks=16, relative_precision=0.005)
+
+    assert estimate["sampledBlockCount"] < estimate["blockCount"]
+    assert (
+        estimate["gzipFileSizeInBytesLowerBound"] <=
+        get_measured_gzip_size(fastq) <=
+        estimate["gzipFileSizeInBytesUpperBound"]
+    )
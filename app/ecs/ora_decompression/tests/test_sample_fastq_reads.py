@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the exact count, pair consistent read sampler
+"""
+
+# Standard library imports
+import io
+import random
+from typing import List, Tuple
+
+# Test imports
+import pytest
+
+# Local imports
+from sample_fastq_reads import DEFAULT_SEED, sample_reads
+
+
+def get_fastq_pair(num_reads: int, read_number_suffix: bool = False) -> Tuple[bytes, bytes]:
+    """
+    Build an R1 / R2 pair of fastq files, R1 and R2 share each read name (and differ in sequence)
+    """
+    rng = random.Random(42)
+    r1_records: List[bytes] = []
+    r2_records: List[bytes] = []
+    for read_index in range(num_reads):
+        read_name = f"A00001:1:HTEST:1:1101:{rng.randrange(1000, 32000)}:{read_index}"
+        for read_number, records in ((1, r1_records), (2, r2_records)):
+            header = (
+                f"@{read_name}/{read_number}"
+                if read_number_suffix else
+                f"@{read_name} {read_number}:N:0:ACGT"
+            )
+            sequence = "".join(rng.choice("ACGT") for _ in range(20))
+            records.append(f"{header}\n{sequence}\n+\n{'F' * len(sequence)}\n".encode())
+    return b"".join(r1_records), b"".join(r2_records)
+
+
+def get_records(fastq: bytes) -> List[bytes]:
+    lines = fastq.split(b"\n")[:-1]
+    return [
+        b"\n".join(lines[line_index:line_index + 4]) + b"\n"
+        for line_index in range(0, len(lines), 4)
+    ]
+
+
+def get_read_names(records: List[bytes]) -> List[bytes]:
+    return [
+        record.split(maxsplit=1)[0].rsplit(b"/", 1)[0]
+        for record in records
+    ]
+
+
+@pytest.mark.parametrize("read_number_suffix", [False, True])
+@pytest.mark.parametrize("max_reads", [1, 37, 250])
+def test_sample_reads_exact_count_and_pair_consistent(max_reads: int, read_number_suffix: bool):
+    r1_fastq, r2_fastq = get_fastq_pair(500, read_number_suffix=read_number_suffix)
+
+    r1_records = sample_reads(io.BytesIO(r1_fastq), max_reads, DEFAULT_SEED, processes=1)
+    r2_records = sample_reads(io.BytesIO(r2_fastq), max_reads, DEFAULT_SEED, processes=1)
+
+    assert len(r1_records) == max_reads
+    assert len(r2_records) == max_reads
+    # R1 and R2 select the identical reads
+    assert get_read_names(r1_records) == get_read_names(r2_records)
+    # Each selected record is a complete record of the input, in its original order
+    input_records = get_records(r1_fastq)
+    input_record_indices = list(map(lambda record_iter_: input_records.index(record_iter_), r1_records))
+    assert input_record_indices == sorted(input_record_indices)
+
+
+def test_sample_reads_fewer_reads_than_max_reads():
+    r1_fastq, _ = get_fastq_pair(10)
+
+    r1_records = sample_reads(io.BytesIO(r1_fastq), 100, DEFAULT_SEED, processes=1)
+
+    assert b"".join(r1_records) == r1_fastq
+
+
+def test_sample_reads_is_seeded():
+    r1_fastq, _ = get_fastq_pair(500)
+
+    assert (
+        sample_reads(io.BytesIO(r1_fastq), 50, DEFAULT_SEED, processes=1) ==
+        sample_reads(io.BytesIO(r1_fastq), 50, DEFAULT_SEED, processes=1)
+    )
+    assert (
+        sample_reads(io.BytesIO(r1_fastq), 50, DEFAULT_SEED, processes=1) !=
+        sample_reads(io.BytesIO(r1_fastq), 50, DEFAULT_SEED + 1, processes=1)
+    )
+
+
+def test_sample_reads_multiple_processes_match_single_process():
+    r1_fastq, _ = get_fastq_pair(500)
+
+    assert (
+        sample_reads(io.BytesIO(r1_fastq), 50, DEFAULT_SEED, processes=2) ==
+        sample_reads(io.BytesIO(r1_fastq), 50, DEFAULT_SEED, processes=1)
+    )
+
+
+def test_sample_reads_truncated_record():
+    r1_fastq, _ = get_fastq_pair(10)
+
+    with pytest.raises(ValueError, match="Truncated fastq record"):
+        sample_reads(io.BytesIO(r1_fastq.rsplit(b"\n", 3)[0] + b"\n"), 5, DEFAULT_SEED, processes=1)
+
+
+def test_sample_reads_malformed_header_names_the_record():
+    r1_fastq, _ = get_fastq_pair(10)
+    lines = r1_fastq.split(b"\n")
+    # Drop the @ from the header of the fourth record (record index 3)
+    lines[3 * 4] = lines[3 * 4].lstrip(b"@")
+
+    with pytest.raises(ValueError, match="Malformed fastq record 3,"):
+        sample_reads(io.BytesIO(b"\n".join(lines)), 5, DEFAULT_SEED, processes=1)
@@ -3,7 +3,7 @@ from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from fastapi.routing import APIRouter
 from mangum import Mangum
-from jobs_api.api import jobs
+from jobs_api.api import jobs, concurrency_slots
 
 openapi_url = "/schema/openapi.json"
 app = FastAPI(
@@ -13,6 +13,7 @@ app = FastAPI(
 )
 router = APIRouter(prefix="/api/v1")
 router.include_router(jobs.router, prefix="/jobs")
+router.include_router(concurrency_slots.router, prefix="/concurrency-slots")
 app.include_router(router)
 
 def custom_openapi():
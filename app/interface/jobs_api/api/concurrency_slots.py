@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+
+Routes for the API V1 Fastq Decompression Concurrency Slots endpoint
+
+This is the list of routes available
+- GET / : The concurrency slot usage of each dispatch mode, across every job
+
+"""
+
+# Standard imports
+from os import environ
+from textwrap import dedent
+from typing import Dict, List, get_args
+
+from fastapi.routing import APIRouter
+
+# Model imports
+from ..models import DispatchMode, JobPriority
+from ..models.concurrency_slot import (
+    ConcurrencySlotData,
+    ConcurrencySlotPoolUsageResponse,
+    ConcurrencySlotUsageResponse,
+)
+from ..globals import MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME_ENV_VAR, MAX_CONCURRENT_WORKER_JOBS_ENV_VAR
+from ..utils import get_ssm_client
+
+
+# Router for the API V1 Fastq Decompression Concurrency Slots endpoint
+router = APIRouter()
+
+
+def get_max_concurrent_slots_by_dispatch_mode() -> Dict[DispatchMode, int]:
+    return {
+        "TASK": int(
+            get_ssm_client().get_parameter(
+                Name=environ[MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME_ENV_VAR]
+            )['Parameter']['Value']
+        ),
+        "WORKER_POOL": int(environ[MAX_CONCURRENT_WORKER_JOBS_ENV_VAR]),
+    }
+
+
+@router.get(
+    "/",
+    tags=["query"],
+    description=dedent("""
+    Get the concurrency slot usage of each dispatch mode.
+    Each decompression holds a concurrency slot (of its own ECS task, or of the worker pool) while it runs,
+    decompressions wait for a free slot once every slot is held, and are given slots by priority,
+    then shared fairly between the jobs of each priority.
+    """)
+)
+async def get_concurrency_slot_usage() -> ConcurrencySlotUsageResponse:
+    active_item_list = ConcurrencySlotData.list_active()
+
+    pool_list: List[ConcurrencySlotPoolUsageResponse] = []
+    for dispatch_mode, max_concurrent_slots in get_max_concurrent_slots_by_dispatch_mode().items():
+        pool_item_list = list(filter(
+            lambda item_iter_: item_iter_.get_dispatch_mode() == dispatch_mode,
+            active_item_list
+        ))
+        slot_list = list(filter(lambda item_iter_: not item_iter_.is_waiter(), pool_item_list))
+        waiter_list = list(filter(lambda item_iter_: item_iter_.is_waiter(), pool_item_list))
+
+        pool_list.append(
+            ConcurrencySlotPoolUsageResponse(
+                dispatch_mode=dispatch_mode,
+                max_concurrent_slots=max_concurrent_slots,
+                active_slot_count=len(slot_list),
+                # Slots held above a lowered max concurrent tasks still count against it
+                available_slot_count=max(max_concurrent_slots - len(slot_list), 0),
+                waiting_count_by_priority={
+                    priority: len(list(filter(
+                        lambda waiter_iter_: (
+                            waiter_iter_.priority if waiter_iter_.priority is not None else "NORMAL"
+                        ) == priority,
+                        waiter_list
+                    )))
+                    for priority in get_args(JobPriority)
+                },
+                slots=list(map(
+                    lambda slot_iter_: slot_iter_.to_response(),
+                    slot_list
+                ))
+            )
+        )
+
+    return ConcurrencySlotUsageResponse(
+        pools=pool_list
+    ).model_dump(by_alias=True)
@@ -13,7 +13,7 @@ This is the list of routes available
 from datetime import datetime, timezone
 from os import environ
 from textwrap import dedent
-from typing import Annotated, Dict, Union, List
+from typing import Annotated, Dict, Optional, Union, List
 
 from fastapi import Depends, Query, Body
 from fastapi.routing import APIRouter, HTTPException
@@ -34,14 +34,39 @@ from ..models.job import (
 from ..models.query import JobQueryParameters
 from ..globals import DECOMPRESSION_JOB_STATE_MACHINE_ARN_ENV_VAR, get_default_job_patch_entry, \
     DECOMPRESSION_JOB_S3_BUCKET_ENV_VAR, DECOMPRESSION_JOB_METADATA_PREFIX_ENV_VAR, \
-    DECOMPRESSION_JOB_OUTPUT_PREFIX_ENV_VAR
-from ..utils import sanitise_fdj_orcabus_id, launch_sfn, abort_sfn
+    DECOMPRESSION_JOB_OUTPUT_PREFIX_ENV_VAR, COMPRESSION_LEVEL_RANGE_BY_ENGINE, RESULT_CACHE_JOB_TYPES, \
+    JOB_PRIORITY_ORDER
+from ..utils import sanitise_fdj_orcabus_id, launch_sfn, abort_sfn, get_ingest_id_by_fastq_id_map
 from ..events.events import put_job_state_change_event
 
 
 # Router for the API V1 Fastq Decompression Jobs endpoint
 router = APIRouter()
 
+
+def get_cached_job(job_obj: JobData) -> Optional[JobData]:
+    """
+    Get the job that answers a new job with the same cache key, either
+      * a PENDING / RUNNING job (of the same or a higher priority) the new job can attach to, or
+      * a SUCCEEDED job, if the result of the job type is stored in the job itself
+    Jobs that FAILED or were ABORTED are never reused, the new job is launched instead
+    """
+    requested_priority_rank = JOB_PRIORITY_ORDER.index(job_obj.priority or "NORMAL")
+    succeeded_job_obj = None
+    for cached_job_obj in JobData.query_by_cache_key(job_obj.cache_key):
+        if cached_job_obj.status in ['PENDING', 'RUNNING']:
+            # Do not hold up a request behind a lower priority job (i.e. a bulk backfill)
+            if JOB_PRIORITY_ORDER.index(cached_job_obj.priority or "NORMAL") <= requested_priority_rank:
+                return cached_job_obj
+        elif (
+            cached_job_obj.status == 'SUCCEEDED' and
+            cached_job_obj.job_type in RESULT_CACHE_JOB_TYPES and
+            succeeded_job_obj is None
+        ):
+            succeeded_job_obj = cached_job_obj
+    return succeeded_job_obj
+
+
 # Define a dependency function that returns the pagination parameters
 def get_pagination_params(
     # page must be greater than or equal to 1
@@ -148,6 +173,9 @@ async def get_jobs(job_id: str = Depends(sanitise_fdj_orcabus_id)) -> JobRespons
     Create a new fastq decompression job.
     Given a list of fastq list row orcabus ids, create a new decompression job.
     This will create a new job object and return the job object as a response.
+    The ingest ids of the ora files of the fastqs are resolved from the fastq API,
+    and a job with the same inputs that is still running
+    (or has succeeded, for jobs with results stored in the job) is returned instead of launching a duplicate job.
     """)
 )
 async def create_job(job_obj: JobCreate) -> JobResponse:
@@ -157,16 +185,32 @@ async def create_job(job_obj: JobCreate) -> JobResponse:
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid job object provided")
 
-    # Query any PENDING / RUNNING jobs that may contain the same fastq id?
-    job_list = []
-    for status_iter_ in ["PENDING", "RUNNING"]:
-        job_list += list((
-            JobData.query(
-                A.status == status_iter_,
-                index="status-index",
-                load_full_item=True
+    # Check the compression level is supported by the compression engine
+    if job_obj.compression_level is not None:
+        min_level, max_level = COMPRESSION_LEVEL_RANGE_BY_ENGINE[job_obj.compression_engine or "PIGZ"]
+        if not min_level <= job_obj.compression_level <= max_level:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid compression level, must be between {min_level} and {max_level} for the {job_obj.compression_engine or 'PIGZ'} compression engine"
             )
-        ))
+    if job_obj.compression_threads is not None and job_obj.compression_threads < 1:
+        raise HTTPException(status_code=400, detail="Invalid compression threads, must be a positive integer")
+
+    # Check the output layout is supported by the output format
+    if job_obj.chunk_read_count is not None and job_obj.chunk_read_count < 1:
+        raise HTTPException(status_code=400, detail="Invalid chunk read count, must be a positive integer")
+    if job_obj.output_layout == "CHUNKED" and job_obj.output_format not in (None, "GZIP"):
+        raise HTTPException(status_code=400, detail="Invalid output layout, the CHUNKED output layout requires the GZIP output format")
+
+    # Answer the request from a job with the same inputs (the same ingest ids and options)
+    # Rather than decompressing the same ora files again
+    # The ingest ids are always resolved here, never taken from the request
+    job_obj.ingest_id_by_fastq_id_map = get_ingest_id_by_fastq_id_map(job_obj.fastq_id_list)
+    job_obj.cache_key = job_obj.get_cache_key()
+    if job_obj.cache_key is not None:
+        cached_job_obj = get_cached_job(job_obj)
+        if cached_job_obj is not None:
+            return cached_job_obj.to_dict()
 
     # Set the key prefix
     current_dateobj = datetime.now(timezone.utc)
@@ -184,6 +228,16 @@ async def create_job(job_obj: JobCreate) -> JobResponse:
         "maxReads": job_obj.max_reads if job_obj.max_reads is not None else -1,
         "sampling": job_obj.sampling if job_obj.sampling is not None else False,
         "noSplitByLane": job_obj.no_split_by_lane if job_obj.no_split_by_lane is not None else False,
+        "outputFormat": job_obj.output_format if job_obj.output_format is not None else "GZIP",
+        "compressionEngine": job_obj.compression_engine if job_obj.compression_engine is not None else "PIGZ",
+        "compressionLevel": job_obj.compression_level if job_obj.compression_level is not None else -1,
+        "compressionThreads": job_obj.compression_threads if job_obj.compression_threads is not None else -1,
+        "threadAllocation": job_obj.thread_allocation if job_obj.thread_allocation is not None else "STATIC",
+        "outputLayout": job_obj.output_layout if job_obj.output_layout is not None else "SINGLE",
+        "chunkReadCount": job_obj.chunk_read_count if job_obj.chunk_read_count is not None else -1,
+        "qualityBinning": job_obj.quality_binning if job_obj.quality_binning is not None else "NONE",
+        "dispatchMode": job_obj.dispatch_mode if job_obj.dispatch_mode is not None else "TASK",
+        "priority": job_obj.priority if job_obj.priority is not None else "NORMAL",
         "fileUriByFastqIdMap": job_obj.file_uri_by_fastq_id_map,  # Can be 'none' if not provided.
         "outputUriPrefix": job_obj.output_uri_prefix,
         "s3JobMetadataBucket": environ[DECOMPRESSION_JOB_S3_BUCKET_ENV_VAR],
@@ -218,7 +272,9 @@ async def create_job(job_obj: JobCreate) -> JobResponse:
     tags=["job update"],
     description=dedent("""
     This will update a job status. This will update a job and set the status to the new status.
-    This is internal use only and should only be used by the job execution step function.
+    This is internal use only and should only be used by the job execution step function
+    (and the handler of its execution status change events).
+    Jobs that have SUCCEEDED or FAILED are final, and are returned unchanged.
     """)
 )
 async def update_job(job_id: str = Depends(sanitise_fdj_orcabus_id), job_status_obj: Annotated[JobPatch, Body()] = get_default_job_patch_entry()) -> JobResponse:
@@ -226,6 +282,11 @@ async def update_job(job_id: str = Depends(sanitise_fdj_orcabus_id), job_status_
         raise HTTPException(status_code=400, detail="Invalid status provided, must be one of RUNNING, FAILED, SUCCEEDED or ABORTED")
     try:
         job_obj = JobData.get(job_id)
+
+        # The execution status change event of an execution that has already reported its own failure
+        if job_obj.status in ['SUCCEEDED', 'FAILED']:
+            return job_obj.to_dict()
+
         job_obj.status = job_status_obj.status
 
         if job_status_obj.steps_execution_arn is not None:
@@ -241,7 +302,7 @@ async def update_job(job_id: str = Depends(sanitise_fdj_orcabus_id), job_status_
         # Set the error message if provided and job is in a failed state
         if job_obj.status == 'FAILED':
             if job_status_obj.error_message is not None:
-                job_obj.error_message = job_status_obj.error_message
+                job_obj.error_messages = job_status_obj.error_message
 
         job_obj.save()
         job_dict = job_obj.to_dict()
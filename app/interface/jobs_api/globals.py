@@ -21,6 +21,13 @@ ORCABUS_ULID_REGEX_MATCH = re.compile(r'^[a-z0-9]{3}\.[A-Z0-9]{26}$')
 UUID4_REGEX_MATCH_STR = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
 URI_MATCH_STR = r'^(?:s3|icav2)://[^\s]+$'
 
+# Supported (min, max) compression levels of each compression engine
+COMPRESSION_LEVEL_RANGE_BY_ENGINE = {
+    "PIGZ": (1, 9),
+    "IGZIP": (0, 3),
+    "ZLIB_NG": (1, 9),
+}
+
 # Envs
 EVENT_BUS_NAME_ENV_VAR = "EVENT_BUS_NAME"
 EVENT_SOURCE_ENV_VAR = "EVENT_SOURCE"
@@ -32,6 +39,44 @@ DECOMPRESSION_JOB_OUTPUT_PREFIX_ENV_VAR = "DECOMPRESSION_JOB_DATA_OUTPUT_PREFIX"
 
 DYNAMODB_DECOMPRESSION_JOB_TABLE_NAME_ENV_VAR = "DYNAMODB_DECOMPRESSION_JOB_TABLE_NAME"
 DYNAMODB_HOST_ENV_VAR = "DYNAMODB_HOST"
+DYNAMODB_CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR = "DYNAMODB_CONCURRENCY_SLOT_TABLE_NAME"
+
+# Concurrency slot env vars
+MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME_ENV_VAR = "MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME"
+MAX_CONCURRENT_WORKER_JOBS_ENV_VAR = "MAX_CONCURRENT_WORKER_JOBS"
+
+# Result cache
+# The job options that change the result of a job (and their defaults), part of the result cache key of the job.
+# The priority, dispatch mode, compression threads and thread allocation only decide when, where and how fast
+# the job runs, so are left out
+JOB_CACHE_KEY_OPTION_DEFAULTS = {
+    "job_type": None,
+    "max_reads": -1,
+    "sampling": False,
+    "no_split_by_lane": False,
+    "output_format": "GZIP",
+    "compression_engine": "PIGZ",
+    "compression_level": -1,
+    "output_layout": "SINGLE",
+    "chunk_read_count": -1,
+    "quality_binning": "NONE",
+    "output_uri_prefix": None,
+    "file_uri_by_fastq_id_map": None,
+}
+# Job types whose results are stored in the job itself, a succeeded job of these types answers repeat requests.
+# Decompressed fastqs are written to the decompression data prefix and expire after a day,
+# so ORA_DECOMPRESSION requests only attach to a job that is still running
+RESULT_CACHE_JOB_TYPES = [
+    'GZIP_FILESIZE_CALCULATION',
+    'RAW_MD5SUM_CALCULATION',
+    'READ_COUNT_CALCULATION',
+    'MULTI_STATS_CALCULATION',
+    'FASTQ_STATS',
+]
+# Highest priority first
+JOB_PRIORITY_ORDER = ['HIGH', 'NORMAL', 'LOW']
+# The number of fastqs looked up at once when resolving the ingest ids of a job
+MAX_FASTQ_LOOKUP_WORKERS = 8
 
 # SFN Env vars
 DECOMPRESSION_JOB_STATE_MACHINE_ARN_ENV_VAR = "DECOMPRESSION_JOB_STATE_MACHINE_ARN"
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from typing import Literal, Optional, List
+from typing import Literal, Optional, List, Dict
 from pydantic import BaseModel, ConfigDict
 from ..utils import to_camel
 
@@ -8,8 +8,97 @@ BoolQuery = Literal[True, False, 'ALL']
 
 JobStatus = Literal['PENDING', 'RUNNING', 'FAILED', 'ABORTED', 'SUCCEEDED']
 
+# GZIP: A plain gzip file (pigz --fast)
+# BGZF: A blocked gzip file, with a .gzi block index and a .ridx read offset index alongside
+OutputFormat = Literal['GZIP', 'BGZF']
+
+# The gzip compression engine used by ORA_DECOMPRESSION jobs
+# PIGZ: pigz (zlib), IGZIP: ISA-L igzip, ZLIB_NG: zlib-ng
+CompressionEngine = Literal['PIGZ', 'IGZIP', 'ZLIB_NG']
+
+# How ORA_DECOMPRESSION jobs split the task's threads between the stages of the pipeline
+# STATIC: A fixed split, ADAPTIVE: Sized from a pilot run on the head of each ora file
+ThreadAllocation = Literal['STATIC', 'ADAPTIVE']
+
+# How ORA_DECOMPRESSION jobs lay out the decompressed reads
+# SINGLE: One file per read, CHUNKED: Chunk files of chunk read count reads per read (_R1_001, _R1_002, ...),
+# INTERLEAVED: One file of interleaved R1 and R2 reads (paired fastqs only)
+OutputLayout = Literal['SINGLE', 'CHUNKED', 'INTERLEAVED']
+
+# Lossy quality score binning of ORA_DECOMPRESSION jobs, applied between orad and the compressor
+# NONE: Quality scores are kept as is, ILLUMINA_8_BIN / ILLUMINA_4_BIN: The Illumina 8 / 4 level binning
+QualityBinning = Literal['NONE', 'ILLUMINA_8_BIN', 'ILLUMINA_4_BIN']
+
+# Where each decompression of a job runs
+# TASK: In its own ECS task, WORKER_POOL: On the long-lived decompression worker pool
+DispatchMode = Literal['TASK', 'WORKER_POOL']
+
+# The order in which the decompressions of a job are given concurrency slots (fairly shared between the jobs of a priority)
+# HIGH: Synchronous requests (with a task token) blocking an upstream workflow, NORMAL: The default, LOW: Bulk backfills
+JobPriority = Literal['HIGH', 'NORMAL', 'LOW']
+
 
 # Output jobs
+class PipelineStageSummary(BaseModel):
+    """
+    The throughput of a stage of the decompression pipeline, measured at the stage boundary downstream of the stage
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    stage: str
+    byte_count: int
+    # Only for stages with an uncompressed fastq output
+    record_count: Optional[int] = None
+    elapsed_seconds: float
+    mib_per_second: float
+    # Time the boundary spent waiting on the stage (upstream) and on the stages after it (downstream)
+    waiting_on_upstream_seconds: float
+    waiting_on_downstream_seconds: float
+    waiting_on_downstream_seconds_by_stage: Optional[Dict[str, float]] = None
+    downstream_closed: bool = False
+
+
+class DecompressionJobOutputChunk(BaseModel):
+    """
+    A chunk file of a CHUNKED output
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    chunk_number: int
+    gzip_file_uri: str
+    # The (0-based) read number of the first read in the chunk
+    first_read_number: int
+    read_count: int
+    gzip_file_size_in_bytes: int
+    gzip_md5sum: Optional[str] = None
+    gzip_file_etag: Optional[str] = None
+
+
+class QualityBinningSummary(BaseModel):
+    """
+    The quality binning of a read, and the gzip size it saved
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    # The md5sum of the binned reads (the raw md5sum is of the reads before binning)
+    binned_md5sum: str
+    quality_value_count: int
+    changed_quality_value_count: int
+    # The fraction of the gzip size saved by binning, measured on a sample of the blocks of the read
+    gzip_size_reduction: Optional[float] = None
+    # The gzip file size had the reads not been binned (from the gzip size reduction), not set for INTERLEAVED outputs
+    unbinned_gzip_file_size_in_bytes_estimate: Optional[int] = None
+
+
 class DecompressionJobOutputObjectItem(BaseModel):
     """
     The output object item, used to store the results of the job
@@ -21,6 +110,28 @@ class DecompressionJobOutputObjectItem(BaseModel):
 
     ingest_id: str
     gzip_file_uri: Optional[str] = None
+    output_format: Optional[OutputFormat] = None
+    # For INTERLEAVED outputs, the gzip file (and its size) is shared by both reads
+    output_layout: Optional[OutputLayout] = None
+    # CHUNKED outputs only, the gzip file uri is the first chunk
+    chunk_read_count: Optional[int] = None
+    chunks: Optional[List[DecompressionJobOutputChunk]] = None
+    # BGZF outputs only, the block index and read offset index uploaded alongside the gzip file
+    gzi_index_uri: Optional[str] = None
+    read_index_uri: Optional[str] = None
+    quality_binning: Optional[QualityBinning] = None
+    # Binned outputs only
+    quality_binning_summary: Optional[QualityBinningSummary] = None
+    # Statistics of the decompressed output, collected as by-products of the decompression
+    raw_md5sum: Optional[str] = None
+    read_count: Optional[int] = None
+    gzip_file_size_in_bytes: Optional[int] = None
+    # Checksums of the gzip file, calculated as it is uploaded
+    # The etag is the ETag S3 gives the gzip file (without the surrounding quotes)
+    gzip_md5sum: Optional[str] = None
+    gzip_file_etag: Optional[str] = None
+    # Throughput of each stage of the decompression pipeline, in pipeline order
+    stage_summaries: Optional[List[PipelineStageSummary]] = None
 
 
 class DecompressionJobOutputObjectFastqId(BaseModel):
@@ -47,6 +158,9 @@ class GzipFileSizeCalculationOutputObjectItem(BaseModel):
 
     ingest_id: str
     gzip_file_size_in_bytes: Optional[int] = None
+    gzip_file_size_in_bytes_lower_bound: Optional[int] = None
+    gzip_file_size_in_bytes_upper_bound: Optional[int] = None
+    confidence_level: Optional[float] = None
 
 
 class GzipFileSizeCalculationOutputsFastqId(BaseModel):
@@ -101,6 +215,136 @@ class ReadCountCalculationOutputsFastqId(BaseModel):
     read_count: int
 
 
+class MultiStatsCalculationOutputsObjectItem(BaseModel):
+    """
+    The multi stats calculation output object item,
+    the raw md5sum, read count and gzip file size calculated from a single decompression
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    ingest_id: str
+    raw_md5sum: Optional[str] = None
+    read_count: Optional[int] = None
+    gzip_file_size_in_bytes: Optional[int] = None
+
+
+class MultiStatsCalculationOutputsFastqId(BaseModel):
+    """
+    The output object for multi stats calculation
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    fastq_id: str
+    multi_stats_by_ora_file_ingest_id_list: List[MultiStatsCalculationOutputsObjectItem]
+
+
+class FastqStatsBaseComposition(BaseModel):
+    """
+    The fraction of bases that are A, C, G, T or N (any other character is counted as an N)
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    a: Optional[float] = None
+    c: Optional[float] = None
+    g: Optional[float] = None
+    t: Optional[float] = None
+    n: Optional[float] = None
+
+
+class FastqStatsReadLengthCount(BaseModel):
+    """
+    A bin of the read length histogram
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    read_length: int
+    read_count: int
+
+
+class FastqStatsGcContentCount(BaseModel):
+    """
+    A bin of the per read gc content histogram, the gc percentage of the read rounded to the nearest percent
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    gc_percent: int
+    read_count: int
+
+
+class FastqStatsPositionSummary(BaseModel):
+    """
+    The base composition and quality of the bases at a (1-based) position of the reads
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    position: int
+    base_count: int
+    base_composition: FastqStatsBaseComposition
+    mean_quality: Optional[float] = None
+    q30_fraction: Optional[float] = None
+
+
+class FastqStatsCalculationOutputsObjectItem(BaseModel):
+    """
+    The fastq stats calculation output object item,
+    the read length, base composition, gc content and quality statistics calculated from a single decompression
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    ingest_id: str
+    read_count: int
+    base_count: int
+    min_read_length: Optional[int] = None
+    max_read_length: Optional[int] = None
+    mean_read_length: Optional[float] = None
+    # The histograms and per position summaries are omitted from the job output,
+    # they are only kept in the metadata json at the output metadata uri
+    read_length_histogram: Optional[List[FastqStatsReadLengthCount]] = None
+    base_composition: FastqStatsBaseComposition
+    # Fraction of the called (A, C, G or T) bases that are G or C
+    gc_content: Optional[float] = None
+    gc_content_histogram: Optional[List[FastqStatsGcContentCount]] = None
+    mean_quality: Optional[float] = None
+    q20_fraction: Optional[float] = None
+    q30_fraction: Optional[float] = None
+    per_position_summary_list: Optional[List[FastqStatsPositionSummary]] = None
+    output_metadata_uri: Optional[str] = None
+
+
+class FastqStatsCalculationOutputsFastqId(BaseModel):
+    """
+    The output object for fastq stats calculation
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    fastq_id: str
+    fastq_stats_by_ora_file_ingest_id_list: List[FastqStatsCalculationOutputsObjectItem]
+
+
 class DecompressionJobOutputObject(BaseModel):
     """
     The output object for decompression jobs, used to store the results of the job
@@ -151,3 +395,29 @@ class ReadCountCalculationOutputObject(BaseModel):
 
     # Raw md5sum by ORA file ingest ID list
     read_count_list: List[ReadCountCalculationOutputsFastqId]
+
+
+class MultiStatsCalculationOutputObject(BaseModel):
+    """
+    The output object for multi stats calculation
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    # Multi stats by ORA file ingest ID list
+    multi_stats_list: List[MultiStatsCalculationOutputsFastqId]
+
+
+class FastqStatsCalculationOutputObject(BaseModel):
+    """
+    The output object for fastq stats calculation
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    # Fastq stats by ORA file ingest ID list
+    fastq_stats_list: List[FastqStatsCalculationOutputsFastqId]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""
+The concurrency slot data and response models
+
+Each decompression holds a concurrency slot (of the ECS task or the worker pool) while it runs,
+leased by the acquire concurrency slot lambda of the run decompression job step function.
+A slot item with an expired lease is free (the decompression died without releasing it).
+
+Decompressions waiting on a slot are registered as waiter items in the same table,
+given slots by priority, then shared fairly between the jobs of each priority.
+"""
+
+from datetime import datetime, timezone
+from os import environ
+from typing import Dict, List, Optional, Self
+
+from dyntastic import Dyntastic
+from pydantic import BaseModel, ConfigDict
+
+# Model imports
+from . import DispatchMode, JobPriority
+
+# Util imports
+from ..utils import to_camel
+
+# Globals
+SLOT_ID_PREFIX_BY_DISPATCH_MODE: Dict[DispatchMode, str] = {
+    "TASK": "slot-",
+    "WORKER_POOL": "worker-slot-",
+}
+WAITER_ID_PREFIX = "waiter-"
+
+
+class ConcurrencySlotResponse(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    id: str
+    job_id: str
+    fastq_id: Optional[str] = None
+    priority: Optional[JobPriority] = None
+    leased_at: datetime
+    lease_expires_at: datetime
+
+
+class ConcurrencySlotPoolUsageResponse(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    dispatch_mode: DispatchMode
+    max_concurrent_slots: int
+    active_slot_count: int
+    available_slot_count: int
+    waiting_count_by_priority: Dict[JobPriority, int]
+    slots: List[ConcurrencySlotResponse]
+
+
+class ConcurrencySlotUsageResponse(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+
+    pools: List[ConcurrencySlotPoolUsageResponse]
+
+
+class ConcurrencySlotData(Dyntastic):
+    """
+    The concurrency slot (or waiter) data object (as written by the concurrency slot lambdas)
+    """
+    __table_name__ = environ['DYNAMODB_CONCURRENCY_SLOT_TABLE_NAME']
+    __table_host__ = environ['DYNAMODB_HOST']
+    __hash_key__ = "id"
+
+    id: str
+    job_id: str
+    fastq_id: Optional[str] = None
+    priority: Optional[JobPriority] = None
+    dispatch_mode: Optional[DispatchMode] = None
+    # Slots only
+    lease_id: Optional[str] = None
+    leased_at: Optional[int] = None
+    # Waiters only
+    enqueued_at: Optional[int] = None
+    expires_at: int
+    ttl: int
+
+    def is_active(self, now: datetime) -> bool:
+        return self.expires_at >= int(now.timestamp())
+
+    def is_waiter(self) -> bool:
+        return self.id.startswith(WAITER_ID_PREFIX)
+
+    def get_dispatch_mode(self) -> DispatchMode:
+        if self.is_waiter():
+            return self.dispatch_mode if self.dispatch_mode is not None else "TASK"
+        return "WORKER_POOL" if self.id.startswith(SLOT_ID_PREFIX_BY_DISPATCH_MODE["WORKER_POOL"]) else "TASK"
+
+    def to_response(self) -> ConcurrencySlotResponse:
+        return ConcurrencySlotResponse(
+            id=self.id,
+            job_id=self.job_id,
+            fastq_id=self.fastq_id,
+            priority=self.priority,
+            leased_at=datetime.fromtimestamp(self.leased_at, tz=timezone.utc),
+            lease_expires_at=datetime.fromtimestamp(self.expires_at, tz=timezone.utc),
+        )
+
+    @classmethod
+    def list_active(cls) -> List[Self]:
+        """
+        List the slots with an unexpired lease and the waiters that are still waiting, ordered by id
+        """
+        now = datetime.now(timezone.utc)
+        return sorted(
+            filter(
+                lambda slot_iter_: slot_iter_.is_active(now),
+                cls.scan(consistent_read=True)
+            ),
+            key=lambda slot_iter_: slot_iter_.id
+        )
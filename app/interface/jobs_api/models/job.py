@@ -10,7 +10,7 @@ from typing import List, Literal, Dict
 from os import environ
 from typing import Optional, Self, ClassVar, Union
 
-from dyntastic import Dyntastic
+from dyntastic import A, Dyntastic
 from fastapi.encoders import jsonable_encoder
 from pydantic import Field, BaseModel, model_validator, ConfigDict
 from datetime import datetime, timezone, timedelta
@@ -18,23 +18,34 @@ from datetime import datetime, timezone, timedelta
 # Local imports
 from . import (
     JobStatus,
+    OutputFormat,
+    CompressionEngine,
+    ThreadAllocation,
+    OutputLayout,
+    QualityBinning,
+    DispatchMode,
+    JobPriority,
     DecompressionJobOutputObject,
     GzipFileSizeCalculationOutputObject,
     RawMd5sumCalculationOutputObject,
-    ReadCountCalculationOutputObject
+    ReadCountCalculationOutputObject,
+    MultiStatsCalculationOutputObject,
+    FastqStatsCalculationOutputObject
 )
 
 # Util imports
 from ..utils import (
-    to_camel, get_ulid, get_decompression_endpoint_url, to_snake
+    to_camel, get_ulid, get_decompression_endpoint_url, to_snake, get_job_cache_key
 )
-from ..globals import DECOMPRESSION_JOB_PREFIX
+from ..globals import DECOMPRESSION_JOB_PREFIX, JOB_CACHE_KEY_OPTION_DEFAULTS
 
 JobType = Literal[
     'ORA_DECOMPRESSION',
     'GZIP_FILESIZE_CALCULATION',
     'RAW_MD5SUM_CALCULATION',
     'READ_COUNT_CALCULATION',
+    'MULTI_STATS_CALCULATION',
+    'FASTQ_STATS',
 ]
 
 
@@ -61,7 +72,19 @@ class JobBase(BaseModel):
     output_uri_prefix: Optional[str] = None
     sampling: Optional[bool] = None
     no_split_by_lane: Optional[bool] = None
+    output_format: Optional[OutputFormat] = None
+    compression_engine: Optional[CompressionEngine] = None
+    compression_level: Optional[int] = None
+    compression_threads: Optional[int] = None
+    thread_allocation: Optional[ThreadAllocation] = None
+    output_layout: Optional[OutputLayout] = None
+    chunk_read_count: Optional[int] = None
+    quality_binning: Optional[QualityBinning] = None
+    dispatch_mode: Optional[DispatchMode] = None
+    priority: Optional[JobPriority] = None
     file_uri_by_fastq_id_map: Optional[Dict[str, List[str]]] = None
+    # The ingest ids of the ora files of each fastq (R1 then R2), the source of the result cache key of the job
+    ingest_id_by_fastq_id_map: Optional[Dict[str, List[str]]] = None
 
 
 class JobOrcabusId(BaseModel):
@@ -80,11 +103,15 @@ class JobWithId(JobBase, JobOrcabusId):
     start_time: datetime = Field(default_factory=default_start_time_factory)
     end_time: Optional[datetime] = None
     error_messages: Optional[str] = None
+    # Jobs with the same cache key have the same result
+    cache_key: Optional[str] = None
     output: Optional[Union[
         DecompressionJobOutputObject |
         GzipFileSizeCalculationOutputObject |
         RawMd5sumCalculationOutputObject |
-        ReadCountCalculationOutputObject
+        ReadCountCalculationOutputObject |
+        MultiStatsCalculationOutputObject |
+        FastqStatsCalculationOutputObject
     ]] = None
 
 
@@ -137,7 +164,9 @@ class JobPatch(BaseModel):
         DecompressionJobOutputObject,
         GzipFileSizeCalculationOutputObject,
         RawMd5sumCalculationOutputObject,
-        ReadCountCalculationOutputObject
+        ReadCountCalculationOutputObject,
+        MultiStatsCalculationOutputObject,
+        FastqStatsCalculationOutputObject
     ]] = None
 
 
@@ -167,6 +196,43 @@ class JobData(JobWithId, Dyntastic):
             ).model_dump(by_alias=True)
         )
 
+    def get_cache_key(self) -> Optional[str]:
+        """
+        The result cache key of the job, a hash of the ingest ids of the ora files of each fastq
+        and the job options that change the result.
+        A new ingest id for a fastq (i.e. the ora file was replaced) is a new cache key.
+        None if the ingest ids of every fastq are not known
+        :return:
+        """
+        if (
+            self.ingest_id_by_fastq_id_map is None or
+            set(self.ingest_id_by_fastq_id_map.keys()) != set(self.fastq_id_list)
+        ):
+            return None
+
+        return get_job_cache_key(
+            self.ingest_id_by_fastq_id_map,
+            {
+                option_name: getattr(self, option_name)
+                for option_name in JOB_CACHE_KEY_OPTION_DEFAULTS.keys()
+            }
+        )
+
+    @classmethod
+    def query_by_cache_key(cls, cache_key: str) -> List[Self]:
+        """
+        List the jobs with the cache key, newest first
+        """
+        return sorted(
+            cls.query(
+                A.cache_key == cache_key,
+                index="cache_key-index",
+                load_full_item=True
+            ),
+            key=lambda job_iter_: job_iter_.id,
+            reverse=True
+        )
+
     @classmethod
     def from_dict(cls, **data) -> Self:
         """
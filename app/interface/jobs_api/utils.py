@@ -1,13 +1,16 @@
 #!/usr/bin/env python
 
 # Imports
+import hashlib
 import json
 import re
 from os import environ
 import ulid
 import boto3
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 from pydantic.alias_generators import (
     to_snake as pydantic_to_snake,
     to_camel as pydantic_to_camel
@@ -15,7 +18,8 @@ from pydantic.alias_generators import (
 
 from .globals import (
     ORCABUS_ULID_REGEX_MATCH,
-    DECOMPRESSION_JOB_PREFIX, FASTQ_SET_PREFIX
+    DECOMPRESSION_JOB_PREFIX, FASTQ_SET_PREFIX, MAX_FASTQ_LOOKUP_WORKERS,
+    JOB_CACHE_KEY_OPTION_DEFAULTS
 )
 
 
@@ -133,6 +137,58 @@ def launch_sfn(sfn_name: str, sfn_input: dict) -> str:
     return response['executionArn']
 
 
+# Fastq things
+def get_ingest_id_list(fastq_id: str) -> List[str]:
+    """
+    Get the ingest ids of the ora files of the fastq, R1 then R2
+    """
+    # Layer imports
+    # Imported here, so the rest of the api can be imported without the orcabus api tools layer
+    from orcabus_api_tools.fastq import get_fastq
+
+    fastq_obj = get_fastq(fastq_id=fastq_id)
+    ingest_id_list = [fastq_obj['readSet']['r1']['ingestId']]
+    if fastq_obj['readSet'].get('r2', None) is not None:
+        ingest_id_list.append(fastq_obj['readSet']['r2']['ingestId'])
+    return ingest_id_list
+
+
+def get_ingest_id_by_fastq_id_map(fastq_id_list: List[str]) -> Optional[Dict[str, List[str]]]:
+    """
+    Get the ingest ids of the ora files of each fastq, the source of the result cache key of a job.
+    None if the ingest ids of any fastq cannot be resolved (the job is then launched without a cache key)
+    """
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_FASTQ_LOOKUP_WORKERS) as executor:
+            return dict(zip(
+                fastq_id_list,
+                executor.map(get_ingest_id_list, fastq_id_list)
+            ))
+    except Exception:
+        return None
+
+
+# Cache things
+def get_job_cache_key(ingest_id_by_fastq_id_map: Dict[str, List[str]], option_values: Dict[str, Any]) -> str:
+    """
+    Hash the ingest ids of the ora files of each fastq and the job options that change the result.
+    Options that are unset or at their default are left out of the hash,
+    so adding an option (with a default) to JOB_CACHE_KEY_OPTION_DEFAULTS keeps the cache keys of existing jobs
+    """
+    cache_key_dict = {
+        "ingestIdListByFastqId": ingest_id_by_fastq_id_map,
+        **{
+            option_name: option_values[option_name]
+            for option_name, option_default in JOB_CACHE_KEY_OPTION_DEFAULTS.items()
+            if option_values.get(option_name) is not None and option_values[option_name] != option_default
+        }
+    }
+
+    return hashlib.sha256(
+        json.dumps(cache_key_dict, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
 # Abort sfn
 def abort_sfn(execution_arn: str) -> None:
     sfn_client = get_sfn_client()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+"""
+Add the interface directory to the path (the api is run from there), and set the env vars read on import
+"""
+
+# Standard library imports
+import sys
+from os import environ
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+environ.setdefault("EVENT_DETAIL_TYPE_JOB_STATE_CHANGE", "FastqDecompressionJobStateChange")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+Unit tests for the result cache key of a job
+"""
+
+# Test imports
+import pytest
+
+# Local imports
+from jobs_api import utils
+from jobs_api.globals import JOB_CACHE_KEY_OPTION_DEFAULTS
+from jobs_api.utils import get_job_cache_key
+
+# Globals
+INGEST_ID_BY_FASTQ_ID_MAP = {
+    "fqr.01JN26HK6CN5WH4F3ZA0FMH8JW": [
+        "019571a3-2ff6-7b51-b6fe-0d4d5fb7ea7f",
+        "019571a3-30a4-7652-8ab5-d94f6e46bd87",
+    ]
+}
+GZIP_FILESIZE_OPTIONS = {
+    "job_type": "GZIP_FILESIZE_CALCULATION",
+}
+
+
+def test_cache_key_is_stable_when_a_defaulted_option_is_added(monkeypatch):
+    cache_key = get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+
+    monkeypatch.setattr(
+        utils, "JOB_CACHE_KEY_OPTION_DEFAULTS",
+        {**JOB_CACHE_KEY_OPTION_DEFAULTS, "new_option": "NEW_OPTION_DEFAULT"}
+    )
+
+    # Unset, or set to its default, the new option does not change the key
+    assert get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS) == cache_key
+    assert get_job_cache_key(
+        INGEST_ID_BY_FASTQ_ID_MAP, {**GZIP_FILESIZE_OPTIONS, "new_option": "NEW_OPTION_DEFAULT"}
+    ) == cache_key
+    # Set to anything else, it does
+    assert get_job_cache_key(
+        INGEST_ID_BY_FASTQ_ID_MAP, {**GZIP_FILESIZE_OPTIONS, "new_option": "NOT_THE_DEFAULT"}
+    ) != cache_key
+
+
+@pytest.mark.parametrize(
+    "option_name",
+    [
+        option_name
+        for option_name, option_default in JOB_CACHE_KEY_OPTION_DEFAULTS.items()
+        if option_default is not None
+    ]
+)
+def test_explicit_default_matches_unset_option(option_name):
+    assert get_job_cache_key(
+        INGEST_ID_BY_FASTQ_ID_MAP, {**GZIP_FILESIZE_OPTIONS, option_name: JOB_CACHE_KEY_OPTION_DEFAULTS[option_name]}
+    ) == get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+    assert get_job_cache_key(
+        INGEST_ID_BY_FASTQ_ID_MAP, {**GZIP_FILESIZE_OPTIONS, option_name: None}
+    ) == get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+
+
+@pytest.mark.parametrize(
+    "option_name, option_value",
+    [
+        ("job_type", "RAW_MD5SUM_CALCULATION"),
+        ("max_reads", 1000),
+        ("sampling", True),
+        ("output_format", "BGZF"),
+        ("output_layout", "INTERLEAVED"),
+        ("quality_binning", "ILLUMINA_8_BIN"),
+        ("output_uri_prefix", "s3://bucket/prefix/"),
+    ]
+)
+def test_options_that_change_the_result_change_the_key(option_name, option_value):
+    assert get_job_cache_key(
+        INGEST_ID_BY_FASTQ_ID_MAP, {**GZIP_FILESIZE_OPTIONS, option_name: option_value}
+    ) != get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+
+
+def test_options_that_do_not_change_the_result_do_not_change_the_key():
+    assert get_job_cache_key(
+        INGEST_ID_BY_FASTQ_ID_MAP,
+        {**GZIP_FILESIZE_OPTIONS, "priority": "HIGH", "dispatch_mode": "WORKER_POOL", "compression_threads": 8}
+    ) == get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+
+
+def test_new_ingest_id_changes_the_key():
+    fastq_id = list(INGEST_ID_BY_FASTQ_ID_MAP.keys())[0]
+
+    assert get_job_cache_key(
+        {fastq_id: ["019571a3-0000-7000-8000-000000000000", INGEST_ID_BY_FASTQ_ID_MAP[fastq_id][1]]},
+        GZIP_FILESIZE_OPTIONS
+    ) != get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+
+
+def test_job_data_cache_key():
+    # The job models need the fastapi tools of the deployed api
+    pytest.importorskip("src.fastapi_tools")
+    from jobs_api.models.job import JobData
+
+    fastq_id = list(INGEST_ID_BY_FASTQ_ID_MAP.keys())[0]
+    job_data = JobData(
+        job_type="GZIP_FILESIZE_CALCULATION",
+        fastq_id_list=[fastq_id],
+        ingest_id_by_fastq_id_map=INGEST_ID_BY_FASTQ_ID_MAP,
+    )
+
+    assert job_data.get_cache_key() == get_job_cache_key(INGEST_ID_BY_FASTQ_ID_MAP, GZIP_FILESIZE_OPTIONS)
+    assert JobData(
+        **job_data.model_dump(exclude={"id", "sampling", "output_format"}),
+        sampling=False, output_format="GZIP",
+    ).get_cache_key() == job_data.get_cache_key()
+    # The ingest ids of every fastq must be known
+    assert JobData(
+        job_type="GZIP_FILESIZE_CALCULATION",
+        fastq_id_list=[fastq_id, "fqr.01JN26HK6CN5WH4F3ZA0FMH8JX"],
+        ingest_id_by_fastq_id_map=INGEST_ID_BY_FASTQ_ID_MAP,
+    ).get_cache_key() is None
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+
+"""
+Acquire a concurrency slot before launching a decompression (as an ECS task, or on the worker pool)
+
+The concurrency slot table is a semaphore shared by every decompression job, with a pool of slots per dispatch mode
+  * TASK: slot-000 up to the max concurrent tasks (read from ssm)
+  * WORKER_POOL: worker-slot-000 up to the max number of workers of the worker pool
+holding at most one item per slot.
+A slot is held by a lease (a lease id and the time the lease expires at),
+the container renews the lease while the decompression runs (see scripts/renew_concurrency_slot.py),
+and the release concurrency slot lambda deletes the slot once the decompression has completed.
+
+A slot is free if it has no item, or its lease has expired (i.e. the task died without releasing it),
+the item also has a ttl of its expiry so DynamoDB eventually removes the slots that are never reclaimed
+(i.e. after the max concurrent tasks is lowered).
+
+Decompressions waiting on a slot are scheduled rather than served in the order they happen to retry.
+The step function invokes this lambda with a task token (waitForTaskToken),
+and the waiting decompression registers a waiter item (waiter-<job id>-<fastq id>-<read set>) in the same table,
+holding the task token, and the waiters of each pool are ordered by
+  * priority: HIGH (i.e. synchronous requests blocking an upstream workflow), then NORMAL, then LOW,
+    a LOW waiter is promoted to NORMAL once it has waited PRIORITY_AGING_SECONDS, so LOW is never starved
+  * fair share between jobs: the jobs of a priority class take turns (round robin), starting with the jobs
+    holding the fewest slots, so a single large job cannot hold every slot while other jobs wait
+  * then the time the waiter started waiting
+Only the waiters at the head of the order (as many as there are free slots) are given a slot.
+
+Slots are given out by a grant pass, run after a waiter registers, and after a slot is released
+(the release concurrency slot lambda invokes this lambda without a task token, to grant the freed slot).
+The grant pass claims each head waiter with a conditional delete of its waiter item (so a waiter is granted once),
+leases it a free slot with a conditional put (so two executions racing for a slot cannot both hold it),
+and sends the lease to the task token of the waiter.
+A waiter whose execution has gone (the task token is no longer valid) gives its slot straight back.
+
+Rather than polling, the waiting execution sleeps on its task token.
+The acquire state times out every WAITER_TIMEOUT_SECONDS and is retried, which refreshes the waiter
+(keeping its place in the order) and runs a grant pass, so slots whose lease has expired
+(i.e. the execution was aborted without releasing its slot) are still reclaimed.
+"""
+
+# Standard imports
+import heapq
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from os import environ
+from typing import Dict, List, Literal, Optional, Union
+from uuid import uuid4
+
+# Boto3 imports
+import boto3
+from botocore.exceptions import ClientError
+
+# Type hints
+DispatchMode = Literal['TASK', 'WORKER_POOL']
+JobPriority = Literal['HIGH', 'NORMAL', 'LOW']
+
+# Globals
+CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR = "CONCURRENCY_SLOT_TABLE_NAME"
+MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME_ENV_VAR = "MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME"
+MAX_CONCURRENT_WORKER_JOBS_ENV_VAR = "MAX_CONCURRENT_WORKER_JOBS"
+SLOT_ID_PREFIX_BY_DISPATCH_MODE: Dict[DispatchMode, str] = {
+    "TASK": "slot-",
+    "WORKER_POOL": "worker-slot-",
+}
+WAITER_ID_PREFIX = "waiter-"
+# The container renews the lease every third of the lease,
+# long enough to cover the ECS capacity retries and start up of the task before its first renewal
+DEFAULT_LEASE_SECONDS = 15 * 60  # 15 minutes
+# Reread the max concurrent tasks parameter at most once a minute per lambda container
+MAX_CONCURRENT_TASKS_CACHE_SECONDS = 60
+
+# Scheduling
+DEFAULT_PRIORITY: JobPriority = "NORMAL"
+PRIORITY_RANK: Dict[JobPriority, int] = {
+    "HIGH": 0,
+    "NORMAL": 1,
+    "LOW": 2,
+}
+PRIORITY_AGING_SECONDS = 60 * 60  # 1 hour
+# The timeout of the acquire concurrency slot states of the step function,
+# the waiter is refreshed each time the state times out and is retried
+WAITER_TIMEOUT_SECONDS = 15 * 60  # 15 minutes
+# A waiter that has not been refreshed for longer than the timeout of the acquire state has gone
+# (i.e. the execution was aborted), and is no longer scheduled
+WAITER_EXPIRY_SECONDS = 2 * WAITER_TIMEOUT_SECONDS
+# The task token is no longer valid (the execution has timed out, or was aborted)
+EXPIRED_TASK_TOKEN_ERROR_CODES = ["TaskDoesNotExist", "TaskTimedOut", "InvalidToken"]
+
+# Cache the max concurrent tasks between invocations
+MAX_CONCURRENT_TASKS_CACHE: Dict[str, Union[int, float]] = {}
+
+
+@dataclass
+class Waiter:
+    id: str
+    job_id: str
+    priority: JobPriority
+    enqueued_at: int
+
+
+def get_slot_id(dispatch_mode: DispatchMode, slot_index: int) -> str:
+    return f"{SLOT_ID_PREFIX_BY_DISPATCH_MODE[dispatch_mode]}{str(slot_index).zfill(3)}"
+
+
+def get_waiter_id(job_id: str, fastq_id: Optional[str], read_set: Optional[str]) -> str:
+    return '-'.join(filter(
+        lambda id_part_iter_: id_part_iter_ is not None,
+        [WAITER_ID_PREFIX.rstrip('-'), job_id, fastq_id, read_set]
+    ))
+
+
+def get_max_concurrent_tasks() -> int:
+    """
+    Get the max concurrent tasks from ssm (cached for a minute)
+    """
+    if MAX_CONCURRENT_TASKS_CACHE.get("expiresAt", 0) <= time.time():
+        MAX_CONCURRENT_TASKS_CACHE["maxConcurrentTasks"] = int(
+            boto3.client("ssm").get_parameter(
+                Name=environ[MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME_ENV_VAR]
+            )["Parameter"]["Value"]
+        )
+        MAX_CONCURRENT_TASKS_CACHE["expiresAt"] = time.time() + MAX_CONCURRENT_TASKS_CACHE_SECONDS
+    return int(MAX_CONCURRENT_TASKS_CACHE["maxConcurrentTasks"])
+
+
+def get_max_concurrent_slots(dispatch_mode: DispatchMode) -> int:
+    if dispatch_mode == "WORKER_POOL":
+        return int(environ[MAX_CONCURRENT_WORKER_JOBS_ENV_VAR])
+    return get_max_concurrent_tasks()
+
+
+def get_effective_priority_rank(waiter: Waiter, now: int) -> int:
+    """
+    The priority rank of the waiter, a LOW waiter is promoted to NORMAL once it has waited PRIORITY_AGING_SECONDS
+    (never to HIGH, which is kept for the synchronous requests)
+    """
+    if waiter.priority == "LOW" and now - waiter.enqueued_at >= PRIORITY_AGING_SECONDS:
+        return PRIORITY_RANK["NORMAL"]
+    return PRIORITY_RANK[waiter.priority]
+
+
+def order_waiters(
+        waiter_list: List[Waiter],
+        held_slot_count_by_job_id: Dict[str, int],
+        now: int
+) -> List[Waiter]:
+    """
+    Order the waiters by (effective) priority, then round robin between the jobs of each priority class
+    (the job holding the fewest slots, counting the slots given to the waiters ahead, goes first),
+    then by the time each waiter started waiting
+    """
+    # The waiters of each job, oldest first
+    waiters_by_job_id: Dict[str, List[Waiter]] = defaultdict(list)
+    for waiter in sorted(waiter_list, key=lambda waiter_iter_: (waiter_iter_.enqueued_at, waiter_iter_.id)):
+        waiters_by_job_id[waiter.job_id].append(waiter)
+
+    def get_heap_item(job_id: str, job_waiter_index: int, job_slot_count: int):
+        head_waiter = waiters_by_job_id[job_id][job_waiter_index]
+        return (
+            get_effective_priority_rank(head_waiter, now),
+            job_slot_count,
+            head_waiter.enqueued_at,
+            job_id,
+            job_waiter_index,
+        )
+
+    job_heap = [
+        get_heap_item(job_id, 0, held_slot_count_by_job_id.get(job_id, 0))
+        for job_id in waiters_by_job_id.keys()
+    ]
+    heapq.heapify(job_heap)
+
+    ordered_waiter_list = []
+    while job_heap:
+        _, job_slot_count, _, job_id, job_waiter_index = heapq.heappop(job_heap)
+        ordered_waiter_list.append(waiters_by_job_id[job_id][job_waiter_index])
+        if job_waiter_index + 1 < len(waiters_by_job_id[job_id]):
+            heapq.heappush(job_heap, get_heap_item(job_id, job_waiter_index + 1, job_slot_count + 1))
+
+    return ordered_waiter_list
+
+
+def scan_concurrency_slot_table(table_name: str) -> List[Dict]:
+    paginator = boto3.client("dynamodb").get_paginator("scan")
+    item_list = []
+    for page in paginator.paginate(TableName=table_name, ConsistentRead=True):
+        item_list += page["Items"]
+    return item_list
+
+
+def put_waiter(
+        table_name: str,
+        waiter_id: str,
+        job_id: str,
+        fastq_id: Optional[str],
+        dispatch_mode: DispatchMode,
+        priority: JobPriority,
+        task_token: str,
+        lease_seconds: int,
+        now: int
+) -> int:
+    """
+    Register (or refresh) the waiter with its task token, return the time it started waiting
+    """
+    response = boto3.client("dynamodb").update_item(
+        TableName=table_name,
+        Key={"id": {"S": waiter_id}},
+        UpdateExpression=(
+            "SET job_id = :job_id, dispatch_mode = :dispatch_mode, priority = :priority, "
+            "task_token = :task_token, lease_seconds = :lease_seconds, "
+            "enqueued_at = if_not_exists(enqueued_at, :now), expires_at = :expires_at, #ttl = :expires_at"
+            + (", fastq_id = :fastq_id" if fastq_id is not None else "")
+        ),
+        ExpressionAttributeNames={"#ttl": "ttl"},
+        ExpressionAttributeValues={
+            ":job_id": {"S": job_id},
+            ":dispatch_mode": {"S": dispatch_mode},
+            ":priority": {"S": priority},
+            ":task_token": {"S": task_token},
+            ":lease_seconds": {"N": str(lease_seconds)},
+            ":now": {"N": str(now)},
+            ":expires_at": {"N": str(now + WAITER_EXPIRY_SECONDS)},
+            **({":fastq_id": {"S": fastq_id}} if fastq_id is not None else {}),
+        },
+        ReturnValues="ALL_NEW",
+    )
+    return int(response["Attributes"]["enqueued_at"]["N"])
+
+
+def claim_waiter(table_name: str, waiter_id: str, task_token: str) -> Optional[Dict]:
+    """
+    Delete the waiter if it still holds the task token, return the waiter item,
+    or None if another grant pass has claimed the waiter (or it has re-registered with a new task token)
+    """
+    try:
+        response = boto3.client("dynamodb").delete_item(
+            TableName=table_name,
+            Key={"id": {"S": waiter_id}},
+            ConditionExpression="task_token = :task_token",
+            ExpressionAttributeValues={":task_token": {"S": task_token}},
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return None
+        raise
+    return response["Attributes"]
+
+
+def return_waiter(table_name: str, waiter_item: Dict):
+    """
+    Put back a claimed waiter that could not be given a slot, unless it has since re-registered
+    """
+    try:
+        boto3.client("dynamodb").put_item(
+            TableName=table_name,
+            Item=waiter_item,
+            ConditionExpression="attribute_not_exists(id)",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return
+        raise
+
+
+def put_slot_lease(
+        table_name: str,
+        slot_id: str,
+        lease_id: str,
+        job_id: str,
+        fastq_id: Optional[str],
+        dispatch_mode: DispatchMode,
+        priority: JobPriority,
+        now: int,
+        lease_seconds: int
+) -> bool:
+    """
+    Lease the slot if it is free, return False if another execution holds the slot
+    """
+    item = {
+        "id": {"S": slot_id},
+        "lease_id": {"S": lease_id},
+        "job_id": {"S": job_id},
+        "dispatch_mode": {"S": dispatch_mode},
+        "priority": {"S": priority},
+        "leased_at": {"N": str(now)},
+        "expires_at": {"N": str(now + lease_seconds)},
+        "ttl": {"N": str(now + lease_seconds)},
+    }
+    if fastq_id is not None:
+        item["fastq_id"] = {"S": fastq_id}
+
+    try:
+        boto3.client("dynamodb").put_item(
+            TableName=table_name,
+            Item=item,
+            ConditionExpression="attribute_not_exists(id) OR expires_at < :now",
+            ExpressionAttributeValues={":now": {"N": str(now)}},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def delete_slot_lease(table_name: str, slot_id: str, lease_id: str):
+    """
+    Give back a slot leased to a waiter whose execution has gone
+    """
+    try:
+        boto3.client("dynamodb").delete_item(
+            TableName=table_name,
+            Key={"id": {"S": slot_id}},
+            ConditionExpression="lease_id = :lease_id",
+            ExpressionAttributeValues={":lease_id": {"S": lease_id}},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return
+        raise
+
+
+def send_slot_lease(task_token: str, slot_lease: Dict[str, Union[str, int]]) -> bool:
+    """
+    Send the slot lease to the waiting execution, return False if the task token is no longer valid
+    """
+    try:
+        boto3.client("stepfunctions").send_task_success(
+            taskToken=task_token,
+            output=json.dumps(slot_lease),
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] in EXPIRED_TASK_TOKEN_ERROR_CODES:
+            return False
+        raise
+    return True
+
+
+def grant_free_slots(table_name: str, dispatch_mode: DispatchMode) -> int:
+    """
+    Give the free slots of the pool to the waiters at the head of the order, return the number of slots granted
+    """
+    max_concurrent_slots = get_max_concurrent_slots(dispatch_mode)
+    slot_id_prefix = SLOT_ID_PREFIX_BY_DISPATCH_MODE[dispatch_mode]
+    now = int(time.time())
+
+    # Collect the held slots (leases on slots above a lowered max still count) and the waiters of the pool
+    held_slot_ids = []
+    held_slot_count_by_job_id = Counter()
+    waiter_list = []
+    task_token_by_waiter_id: Dict[str, str] = {}
+    for item in scan_concurrency_slot_table(table_name):
+        if int(item["expires_at"]["N"]) < now:
+            continue
+        if item["id"]["S"].startswith(slot_id_prefix):
+            held_slot_ids.append(item["id"]["S"])
+            held_slot_count_by_job_id[item["job_id"]["S"]] += 1
+        elif (
+            item["id"]["S"].startswith(WAITER_ID_PREFIX) and
+            item.get("dispatch_mode", {}).get("S", "TASK") == dispatch_mode and
+            "task_token" in item
+        ):
+            task_token_by_waiter_id[item["id"]["S"]] = item["task_token"]["S"]
+            waiter_list.append(Waiter(
+                id=item["id"]["S"],
+                job_id=item["job_id"]["S"],
+                priority=item.get("priority", {}).get("S", DEFAULT_PRIORITY),
+                enqueued_at=int(item["enqueued_at"]["N"]),
+            ))
+
+    # Try the free slots in a random order, so concurrent grant passes rarely race for the same slot
+    free_slot_ids = list(
+        set(map(lambda slot_index_iter_: get_slot_id(dispatch_mode, slot_index_iter_), range(max_concurrent_slots))) -
+        set(held_slot_ids)
+    )
+    random.shuffle(free_slot_ids)
+
+    granted_slot_count = 0
+    for waiter in order_waiters(waiter_list, held_slot_count_by_job_id, now):
+        if not free_slot_ids:
+            break
+
+        waiter_item = claim_waiter(table_name, waiter.id, task_token_by_waiter_id[waiter.id])
+        if waiter_item is None:
+            continue
+
+        fastq_id = waiter_item.get("fastq_id", {}).get("S", None)
+        lease_seconds = int(waiter_item.get("lease_seconds", {}).get("N", DEFAULT_LEASE_SECONDS))
+        lease_id = str(uuid4())
+        slot_id = None
+        while free_slot_ids:
+            slot_id_iter = free_slot_ids.pop()
+            if put_slot_lease(
+                table_name, slot_id_iter, lease_id, waiter.job_id, fastq_id, dispatch_mode, waiter.priority,
+                now, lease_seconds
+            ):
+                slot_id = slot_id_iter
+                break
+
+        if slot_id is None:
+            # Another grant pass took the free slots, keep the waiter's place in the order
+            return_waiter(table_name, waiter_item)
+            break
+
+        if not send_slot_lease(
+                task_token_by_waiter_id[waiter.id],
+                {
+                    "slotId": slot_id,
+                    "leaseId": lease_id,
+                    "leaseSeconds": lease_seconds,
+                    "leaseExpiresAt": now + lease_seconds,
+                    "waitedSeconds": now - waiter.enqueued_at,
+                }
+        ):
+            # The execution has gone, give the slot to the next waiter
+            delete_slot_lease(table_name, slot_id, lease_id)
+            free_slot_ids.append(slot_id)
+            continue
+
+        granted_slot_count += 1
+
+    return granted_slot_count
+
+
+def handler(event, context) -> Dict[str, int]:
+    """
+    Lambda handler to register a decompression waiting on a concurrency slot, and give out the free slots.
+    Invoked without a task token (i.e. once a slot is released), only gives out the free slots.
+    :param event:
+    :param context:
+    :return:
+    """
+    # Get inputs
+    task_token = event.get("taskToken", None)
+    job_id = event.get("jobId", None)
+    fastq_id = event.get("fastqId", None)
+    # PAIR, R1 or R2, the unpaired reads of a fastq are decompressed (and wait) separately
+    read_set = event.get("readSet", None)
+    dispatch_mode: DispatchMode = event.get("dispatchMode", None) or "TASK"
+    priority: JobPriority = event.get("priority", None) or DEFAULT_PRIORITY
+    lease_seconds = int(event.get("leaseSeconds", DEFAULT_LEASE_SECONDS))
+
+    if dispatch_mode not in SLOT_ID_PREFIX_BY_DISPATCH_MODE:
+        raise ValueError(f"Invalid dispatchMode '{dispatch_mode}'")
+    if task_token is not None and job_id is None:
+        raise ValueError("jobId is required")
+    if priority not in PRIORITY_RANK:
+        raise ValueError(f"Invalid priority '{priority}'")
+
+    table_name = environ[CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR]
+
+    # Register (or refresh) the waiter, keeping its place in the order
+    if task_token is not None:
+        put_waiter(
+            table_name, get_waiter_id(job_id, fastq_id, read_set), job_id, fastq_id,
+            dispatch_mode, priority, task_token, lease_seconds, int(time.time())
+        )
+
+    return {
+        "grantedSlotCount": grant_free_slots(table_name, dispatch_mode),
+    }
+
+
+if __name__ == "__main__":
+    environ['AWS_PROFILE'] = 'umccr-development'
+    environ[CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR] = 'FastqDecompressionConcurrencySlotTable'
+    environ[MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME_ENV_VAR] = '/orcabus/services/fastq-deora/max-concurrent-tasks'
+    environ[MAX_CONCURRENT_WORKER_JOBS_ENV_VAR] = '8'
+    print(json.dumps(
+        handler(
+            {
+                "dispatchMode": "TASK",
+            },
+            None
+        ),
+        indent=4
+    ))
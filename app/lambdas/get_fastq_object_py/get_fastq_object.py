@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 
 """
-Get the fastq list row object and then return the gzip file compression size in bytes information
-for both read1 and read2
+Get the fastq list row object and then return the source ora uris, destination gzip uris
+and output metadata locations for both read1 and read2
+(and, for paired fastqs, the destination of the interleaved gzip uri of both reads)
+
+Called once per batch of fastqs of the job (rather than once per fastq), requesting the fastq objects of the batch concurrently
 """
 
 # Standard imports
 import re
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
 
 # Layer imports
 from orcabus_api_tools.fastq import get_fastq
 from orcabus_api_tools.fastq.models import Fastq
 
 # Globals
-EMPTY_GZIP_FASTQ_SIZE_BYTES = 28
+MAX_FASTQ_LOOKUP_WORKERS = 16
+
 
 def get_sample_number_from_fastq_uri(fastq_uri: str) -> int:
     try:
@@ -23,65 +28,31 @@ def get_sample_number_from_fastq_uri(fastq_uri: str) -> int:
         return 1  # Default to 1 if the regex fails or no match is found
 
 
-def get_gzip_file_size_in_bytes(fastq_obj: Fastq, read_num: str, max_reads: int) -> int:
-    """
-    Calculate the gzip file size in bytes based on the fastq object and max_reads.
-    If max_reads is -1, return the full gzipCompressionSizeInBytes.
-    Otherwise, calculate it proportionally to the total read count.
-    If we don't have a readcount,
-    """
-    # First check we have the gzip compression size in bytes available
-    if fastq_obj['readSet'][read_num].get('gzipCompressionSizeInBytes', None) is None:
-        # If not, return -1
-        return -1
-
-    # If the max reads are not set
-    # Return the full gzipCompressionSizeInBytes
-    if max_reads == -1:
-        return fastq_obj['readSet'][read_num]['gzipCompressionSizeInBytes']
-
-    # If we don't have a read count, we can't predict base on the size
-    # So again return -1
-    if fastq_obj.get('readCount', None) is None:
-        return -1
-
-    # If the readCount is zero, then our expected size is of an empty gzipped FASTQ file (28 bytes),
-    if fastq_obj['readCount'] == 0:
-        return EMPTY_GZIP_FASTQ_SIZE_BYTES
-
-    # Otherwise return the gzipCompressionSizeInBytes proportional to the read count we're after
-    return (
-        (
-            fastq_obj['readSet'][read_num]['gzipCompressionSizeInBytes'] *
-            min(
-                max_reads, fastq_obj['readCount']
-            )
-        ) /
-        fastq_obj['readCount']
-    )
-
-
-def get_file_name_from_fastq_obj(fastq_obj: Fastq, read_num: str) -> str:
+def get_file_name_from_fastq_obj(fastq_obj: Fastq, read_num: Optional[str]) -> str:
     """
     Generate the file name for the gzip file based on the fastq object and read number.
+    If the read number is None (an interleaved file of both reads), the read number is left out of the file name.
     """
-    return '_'.join([
-        # Sample Name should be the library id
-        f"{fastq_obj['library']['libraryId']}",
-        # Sample Number, we can extract from the URI (or 1 if not available)
-        f"S{get_sample_number_from_fastq_uri(fastq_obj['readSet'][read_num]['s3Uri'])}",
-        # Lane number, padded to 3 digits
-        f"L{str(fastq_obj['lane']).zfill(3)}",
-        # Read number, uppercased and padded to 3 digits
-        read_num.upper(),
-        # Fixed suffix for the file
-        "001.fastq.gz"
-    ])
+    return '_'.join(list(filter(
+        lambda name_part_iter_: name_part_iter_ is not None,
+        [
+            # Sample Name should be the library id
+            f"{fastq_obj['library']['libraryId']}",
+            # Sample Number, we can extract from the URI (or 1 if not available)
+            f"S{get_sample_number_from_fastq_uri(fastq_obj['readSet'][read_num or 'r1']['s3Uri'])}",
+            # Lane number, padded to 3 digits
+            f"L{str(fastq_obj['lane']).zfill(3)}",
+            # Read number, uppercased and padded to 3 digits
+            read_num.upper() if read_num is not None else None,
+            # Fixed suffix for the file
+            "001.fastq.gz"
+        ]
+    )))
 
 
 def get_gzip_file_uri_dest(
         fastq_obj: Fastq,
-        read_num: str,
+        read_num: Optional[str],
         output_uri_prefix: str,
         no_split_by_lane: bool = False
 ) -> str:
@@ -123,33 +94,17 @@ def get_metadata_uri(fastq_obj: Fastq, read_num: str, metadata_bucket: str, meta
     )
 
 
-def handler(event, context):
+def get_fastq_obj_dict(
+        fastq_obj: Fastq,
+        output_uri_prefix: str,
+        metadata_bucket: str,
+        metadata_path_prefix: str,
+        no_split_by_lane: bool = False,
+        file_uri_list: Optional[List[str]] = None
+) -> Dict[str, Union[str, int]]:
     """
-    Get the fastq list row object and then return the gzip file compression size in bytes information
-    :param event:
-    :param context:
-    :return:
+    Get the source, destination and metadata locations of the reads of the fastq object
     """
-
-    # Get the fastq_id from the event
-    fastq_id: str = event.get("fastqId")
-    output_uri_prefix: str = event.get("outputUriPrefix")
-    metadata_bucket: str = event.get("metadataBucket")
-    metadata_path_prefix: str = event.get("metadataPathPrefix")
-    max_reads: int = event.get("maxReads")
-    no_split_by_lane: bool = event.get("noSplitByLane", False)
-    file_uri_list: List[str] = event.get("fileUriList", None)
-
-    # Ensure that the fastq id is present
-    if not fastq_id:
-        raise ValueError("Expected 'fastqId' in event")
-
-    # Get the fastq object using the provided fastq_id
-    fastq_obj = get_fastq(
-        fastq_id=fastq_id,
-        includeS3Details=True
-    )
-
     # Get metadata json fastq pair dicts for read1
     if file_uri_list is not None:
         r1_ora_file_uri_src = next(filter(
@@ -163,9 +118,6 @@ def handler(event, context):
     metadata_json_fastq_pair_dicts = {
         "r1OraFileUriSrc": r1_ora_file_uri_src,
         "r1OraIngestId": fastq_obj['readSet']['r1']['ingestId'],
-        "r1GzipFileSizeInBytes": (
-            int(get_gzip_file_size_in_bytes(fastq_obj, 'r1', max_reads))
-        ),
         "r1GzipFileUriDest": get_gzip_file_uri_dest(
             fastq_obj,
             'r1',
@@ -174,7 +126,8 @@ def handler(event, context):
         ),
         "r1OutputMetadataUri": get_metadata_uri(fastq_obj, 'r1', metadata_bucket, metadata_path_prefix),
         "r1OutputMetadataPath": get_metadata_path(fastq_obj, 'r1', metadata_path_prefix),
-        "totalReadCount": fastq_obj.get('readCount', -1),
+        # The read count may be present but null (i.e. the fastq has not yet been synced)
+        "totalReadCount": fastq_obj.get('readCount') if fastq_obj.get('readCount') is not None else -1,
     }
 
     if fastq_obj['readSet'].get('r2', None) is None:
@@ -193,9 +146,6 @@ def handler(event, context):
     metadata_json_fastq_pair_dicts.update({
         "r2OraFileUriSrc": r2_ora_file_uri_src,
         "r2OraIngestId": fastq_obj['readSet']['r2']['ingestId'],
-        "r2GzipFileSizeInBytes": (
-            int(get_gzip_file_size_in_bytes(fastq_obj, 'r2', max_reads))
-        ),
         "r2GzipFileUriDest": get_gzip_file_uri_dest(
             fastq_obj,
             'r2',
@@ -204,8 +154,94 @@ def handler(event, context):
         ),
         "r2OutputMetadataUri": get_metadata_uri(fastq_obj, 'r2', metadata_bucket, metadata_path_prefix),
         "r2OutputMetadataPath": get_metadata_path(fastq_obj, 'r2', metadata_path_prefix),
+        # Only used by the INTERLEAVED output layout
+        "interleavedGzipFileUriDest": get_gzip_file_uri_dest(
+            fastq_obj,
+            None,
+            output_uri_prefix,
+            no_split_by_lane
+        ),
+        # When R1 and R2 are decompressed in the same task, a single metadata document is written for both reads
+        "pairedOutputMetadataUri": get_metadata_uri(fastq_obj, 'paired', metadata_bucket, metadata_path_prefix),
+        "pairedOutputMetadataPath": get_metadata_path(fastq_obj, 'paired', metadata_path_prefix),
     })
 
+    return metadata_json_fastq_pair_dicts
+
+
+def get_fastq_obj(fastq_id: str) -> Fastq:
+    return get_fastq(
+        fastq_id=fastq_id,
+        includeS3Details=True
+    )
+
+
+def get_fastq_obj_list(fastq_id_list: List[str]) -> List[Fastq]:
+    """
+    Get the fastq objects of every fastq id, requested concurrently, in the order of the fastq id list
+    """
+    if len(fastq_id_list) == 1:
+        return [get_fastq_obj(fastq_id_list[0])]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_FASTQ_LOOKUP_WORKERS, len(fastq_id_list))) as executor:
+        return list(executor.map(get_fastq_obj, fastq_id_list))
+
+
+def handler(event, context):
+    """
+    Get the fastq list row object and then return the source, destination and metadata locations
+
+    Given a fastqIdList (rather than a single fastqId), the fastq objects are requested concurrently,
+    and the locations of every fastq are returned, keyed by fastq id
+    :param event:
+    :param context:
+    :return:
+    """
+
+    # Get the fastq_id from the event
+    fastq_id: str = event.get("fastqId")
+    fastq_id_list: List[str] = event.get("fastqIdList", None)
+    output_uri_prefix: str = event.get("outputUriPrefix")
+    metadata_bucket: str = event.get("metadataBucket")
+    metadata_path_prefix: str = event.get("metadataPathPrefix")
+    no_split_by_lane: bool = event.get("noSplitByLane", False)
+    file_uri_list: List[str] = event.get("fileUriList", None)
+    file_uri_by_fastq_id_map: Dict[str, List[str]] = event.get("fileUriByFastqIdMap", None)
+
+    # Batch of fastqs
+    if fastq_id_list is not None:
+        if file_uri_by_fastq_id_map is None:
+            file_uri_by_fastq_id_map = {}
+
+        return {
+            "fastqObjDictByFastqId": dict(map(
+                lambda fastq_id_and_obj_iter_: (
+                    fastq_id_and_obj_iter_[0],
+                    get_fastq_obj_dict(
+                        fastq_id_and_obj_iter_[1],
+                        output_uri_prefix,
+                        metadata_bucket,
+                        metadata_path_prefix,
+                        no_split_by_lane,
+                        file_uri_by_fastq_id_map.get(fastq_id_and_obj_iter_[0], None)
+                    )
+                ),
+                zip(fastq_id_list, get_fastq_obj_list(fastq_id_list))
+            ))
+        }
+
+    # Ensure that the fastq id is present
+    if not fastq_id:
+        raise ValueError("Expected 'fastqId' or 'fastqIdList' in event")
+
+    # Get the fastq object using the provided fastq_id
     return {
-        "fastqObjDict": metadata_json_fastq_pair_dicts
+        "fastqObjDict": get_fastq_obj_dict(
+            get_fastq_obj(fastq_id),
+            output_uri_prefix,
+            metadata_bucket,
+            metadata_path_prefix,
+            no_split_by_lane,
+            file_uri_list
+        )
     }
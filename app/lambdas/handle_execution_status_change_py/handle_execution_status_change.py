@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+Handle the execution status change event of a run decompression job execution that did not succeed
+
+The execution updates the status of its job itself, unless it was aborted, timed out,
+or failed before it could catch the error (i.e. a state failed outside of the catch of the fastq map).
+On each of these events we update the job status (ABORTED, or FAILED with the error of the execution),
+which emits the job state change event that releases the requests waiting on the job.
+
+Jobs that have already SUCCEEDED or FAILED are left unchanged by the API,
+so the failure of an execution that has already reported its own failure is a no-op.
+"""
+
+# Standard imports
+import json
+from typing import Dict, Optional
+
+# Layer imports
+from orcabus_api_tools.fastq_decompression import update_status
+
+
+def get_error_message(execution_detail: Dict) -> str:
+    error: Optional[str] = execution_detail.get("error", None)
+    cause: Optional[str] = execution_detail.get("cause", None)
+    if error is None and cause is None:
+        return f"The job execution {execution_detail['status'].lower().replace('_', ' ')}"
+    return ": ".join(filter(lambda error_part_iter_: error_part_iter_ is not None, [error, cause]))
+
+
+def handler(event, context):
+    """
+    Lambda handler for the Step Functions Execution Status Change events of the run decompression job state machine
+    :param event:
+    :param context:
+    :return:
+    """
+    execution_detail = event.get("detail", {})
+
+    # Get the job id from the execution input
+    job_id = json.loads(execution_detail.get("input") or "{}").get("jobId", None)
+    if job_id is None:
+        raise ValueError("Expected 'jobId' in the execution input")
+
+    if execution_detail["status"] == "ABORTED":
+        update_status(
+            job_id,
+            status="ABORTED",
+            stepsExecutionArn=execution_detail["executionArn"],
+        )
+        return
+
+    # FAILED or TIMED_OUT
+    update_status(
+        job_id,
+        status="FAILED",
+        stepsExecutionArn=execution_detail["executionArn"],
+        errorMessage=get_error_message(execution_detail),
+    )
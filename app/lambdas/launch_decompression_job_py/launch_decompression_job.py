@@ -2,6 +2,9 @@
 
 """
 Launch the decompression job with a given payload
+
+The API resolves the ingest ids of the ora files of each fastq itself,
+so it can answer the request from a job with the same inputs (see the result cache of the jobs API)
 """
 from typing import Dict
 
@@ -33,6 +36,30 @@ def handler(event, context) -> Dict[str, Job]:
     # Get the noSplitByLane parameter
     no_split_by_lane = event.get("noSplitByLane", False)
 
+    # Get the outputFormat parameter
+    output_format = event.get("outputFormat", None)
+
+    # Get the compression parameters
+    compression_engine = event.get("compressionEngine", None)
+    compression_level = event.get("compressionLevel", None)
+    compression_threads = event.get("compressionThreads", None)
+
+    # Get the threadAllocation parameter
+    thread_allocation = event.get("threadAllocation", None)
+
+    # Get the output layout parameters
+    output_layout = event.get("outputLayout", None)
+    chunk_read_count = event.get("chunkReadCount", None)
+
+    # Get the qualityBinning parameter
+    quality_binning = event.get("qualityBinning", None)
+
+    # Get the dispatchMode parameter
+    dispatch_mode = event.get("dispatchMode", None)
+
+    # Get the priority parameter
+    priority = event.get("priority", None)
+
     # Get the fileUriList parameter
     file_uri_by_fastq_id_map = event.get("fileUriByFastqIdMap", None)
 
@@ -45,6 +72,16 @@ def handler(event, context) -> Dict[str, Job]:
             maxReads=max_reads,
             sampling=sampling,
             noSplitByLane=no_split_by_lane,
+            outputFormat=output_format,
+            compressionEngine=compression_engine,
+            compressionLevel=compression_level,
+            compressionThreads=compression_threads,
+            threadAllocation=thread_allocation,
+            outputLayout=output_layout,
+            chunkReadCount=chunk_read_count,
+            qualityBinning=quality_binning,
+            dispatchMode=dispatch_mode,
+            priority=priority,
             fileUriByFastqIdMap=file_uri_by_fastq_id_map,
         )
     }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""
+Release a concurrency slot once its decompression task has completed (or failed)
+
+The slot is deleted if we still hold its lease,
+if the lease has expired and the slot has since been acquired by another execution, the slot is left alone.
+
+Once released, we invoke the acquire concurrency slot lambda (asynchronously, without a task token)
+to give the freed slot to the waiter at the head of the order.
+"""
+
+# Standard imports
+import json
+from os import environ
+from typing import Dict
+
+# Boto3 imports
+import boto3
+from botocore.exceptions import ClientError
+
+# Globals
+CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR = "CONCURRENCY_SLOT_TABLE_NAME"
+ACQUIRE_CONCURRENCY_SLOT_LAMBDA_FUNCTION_NAME_ENV_VAR = "ACQUIRE_CONCURRENCY_SLOT_LAMBDA_FUNCTION_NAME"
+
+
+def handler(event, context) -> Dict[str, bool]:
+    """
+    Lambda handler to release a concurrency slot
+    :param event:
+    :param context:
+    :return:
+    """
+    # Get inputs
+    slot_id = event.get("slotId", None)
+    lease_id = event.get("leaseId", None)
+    dispatch_mode = event.get("dispatchMode", None) or "TASK"
+
+    if slot_id is None or lease_id is None:
+        raise ValueError("slotId and leaseId are required")
+
+    try:
+        boto3.client("dynamodb").delete_item(
+            TableName=environ[CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR],
+            Key={"id": {"S": slot_id}},
+            ConditionExpression="lease_id = :lease_id",
+            ExpressionAttributeValues={":lease_id": {"S": lease_id}},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return {"released": False}
+        raise
+
+    # Give the freed slot to the next waiter
+    boto3.client("lambda").invoke(
+        FunctionName=environ[ACQUIRE_CONCURRENCY_SLOT_LAMBDA_FUNCTION_NAME_ENV_VAR],
+        InvocationType="Event",
+        Payload=json.dumps({"dispatchMode": dispatch_mode}),
+    )
+
+    return {"released": True}
+
+
+if __name__ == "__main__":
+    environ['AWS_PROFILE'] = 'umccr-development'
+    environ[CONCURRENCY_SLOT_TABLE_NAME_ENV_VAR] = 'FastqDecompressionConcurrencySlotTable'
+    environ[ACQUIRE_CONCURRENCY_SLOT_LAMBDA_FUNCTION_NAME_ENV_VAR] = 'acquireConcurrencySlot'
+    print(json.dumps(
+        handler(
+            {
+                "slotId": "slot-000",
+                "leaseId": "00000000-0000-0000-0000-000000000000",
+                "dispatchMode": "TASK",
+            },
+            None
+        ),
+        indent=4
+    ))
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+Send a heartbeat to the task token of every request still waiting on a job
+
+Rather than listing the PENDING and RUNNING jobs from the API,
+then looking up the task tokens of each job one at a time, we
+  * scan the task token table once, for the task tokens of the jobs that have not yet completed
+    (completed jobs hold a completion record rather than task tokens)
+  * look up the status of those jobs in the jobs table with BatchGetItem (up to 100 jobs per request)
+  * send the heartbeats of the jobs that are still PENDING or RUNNING concurrently
+
+Task tokens that no longer exist (the requesting execution timed out or was stopped) are removed from their job.
+The status of each job is kept up to date by the job execution itself (and by its execution status change events),
+so the heartbeats no longer check on the execution of each job.
+
+Returns the number of jobs still waited on, the heartbeat monitor turns off its scheduler once there are none.
+"""
+
+# Standard imports
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from os import environ
+from typing import Dict, List, Literal, Optional, Self
+
+# Boto3 imports
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Type hints
+HeartbeatResult = Literal['SENT', 'EXPIRED', 'ERROR']
+
+# Globals
+TASK_TOKEN_TABLE_NAME_ENV_VAR = "TASK_TOKEN_TABLE_NAME"
+JOB_TABLE_NAME_ENV_VAR = "JOB_TABLE_NAME"
+JOB_ID_TYPE = "job_id"
+ACTIVE_JOB_STATUS_LIST = ['PENDING', 'RUNNING']
+BATCH_GET_ITEM_MAX_KEYS = 100
+BATCH_GET_ITEM_MAX_ATTEMPTS = 8
+MAX_HEARTBEAT_WORKERS = 32
+# The task token no longer exists, or has already completed
+EXPIRED_TASK_TOKEN_ERROR_CODES = ['TaskTimedOut', 'TaskDoesNotExist', 'InvalidToken']
+
+
+def get_dynamodb_client():
+    # One connection per worker (expired task tokens are removed concurrently)
+    return boto3.client("dynamodb", config=Config(max_pool_connections=MAX_HEARTBEAT_WORKERS))
+
+
+def get_sfn_client():
+    # One connection per heartbeat worker
+    return boto3.client("stepfunctions", config=Config(max_pool_connections=MAX_HEARTBEAT_WORKERS))
+
+
+@dataclass
+class WaitingJob:
+    """
+    The task tokens of the requests attached to a job that has not yet completed
+    """
+    job_id: str
+    task_token_list: List[str] = field(default_factory=list)
+    # The single task token of items saved before the task token list
+    legacy_task_token: Optional[str] = None
+
+    def get_all_task_tokens(self) -> List[str]:
+        return self.task_token_list + ([self.legacy_task_token] if self.legacy_task_token is not None else [])
+
+    @classmethod
+    def from_item(cls, item: Dict) -> Self:
+        return cls(
+            job_id=item['id']['S'],
+            task_token_list=list(map(
+                lambda task_token_iter_: task_token_iter_['S'],
+                item['task_token_list']['L']
+            )) if 'task_token_list' in item else [],
+            legacy_task_token=item['task_token']['S'] if 'task_token' in item else None,
+        )
+
+
+def get_waiting_job_list(dynamodb_client, table_name: str) -> List[WaitingJob]:
+    """
+    Scan the task token table for the task tokens of every job that has not yet completed
+    """
+    waiting_job_list: List[WaitingJob] = []
+    for page in dynamodb_client.get_paginator("scan").paginate(
+        TableName=table_name,
+        ProjectionExpression="id, id_type, job_status, task_token_list, task_token",
+    ):
+        for item in page['Items']:
+            if item['id_type']['S'] != JOB_ID_TYPE or 'job_status' in item:
+                continue
+            waiting_job = WaitingJob.from_item(item)
+            if len(waiting_job.get_all_task_tokens()) > 0:
+                waiting_job_list.append(waiting_job)
+    return waiting_job_list
+
+
+def get_job_status_by_job_id(dynamodb_client, table_name: str, job_id_list: List[str]) -> Dict[str, str]:
+    """
+    Get the status of each job from the jobs table, jobs that no longer exist are left out
+    """
+    job_status_by_job_id: Dict[str, str] = {}
+    for batch_start in range(0, len(job_id_list), BATCH_GET_ITEM_MAX_KEYS):
+        request_items = {
+            table_name: {
+                "Keys": list(map(
+                    lambda job_id_iter_: {"id": {"S": job_id_iter_}},
+                    job_id_list[batch_start:batch_start + BATCH_GET_ITEM_MAX_KEYS]
+                )),
+                "ProjectionExpression": "id, #status",
+                "ExpressionAttributeNames": {"#status": "status"},
+            }
+        }
+        # Retry the keys DynamoDB did not process (i.e. throttled) with an exponential backoff
+        for attempt in range(BATCH_GET_ITEM_MAX_ATTEMPTS):
+            response = dynamodb_client.batch_get_item(RequestItems=request_items)
+            for item in response['Responses'].get(table_name, []):
+                job_status_by_job_id[item['id']['S']] = item['status']['S']
+            request_items = response.get('UnprocessedKeys', {})
+            if not request_items:
+                break
+            time.sleep(min(0.05 * 2 ** attempt, 2))
+        else:
+            raise ValueError(f"Could not get the status of {len(request_items[table_name]['Keys'])} jobs")
+    return job_status_by_job_id
+
+
+def send_heartbeat(sfn_client, task_token: str) -> HeartbeatResult:
+    try:
+        sfn_client.send_task_heartbeat(taskToken=task_token)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in EXPIRED_TASK_TOKEN_ERROR_CODES:
+            return 'EXPIRED'
+        # Logged and retried at the next heartbeat
+        print(f"Warning! Could not send a heartbeat: {e}")
+        return 'ERROR'
+    return 'SENT'
+
+
+def remove_expired_task_tokens(
+        dynamodb_client,
+        table_name: str,
+        waiting_job: WaitingJob,
+        expired_task_token_list: List[str]
+):
+    """
+    Remove the expired task tokens from the job,
+    unless the job has since completed, or another request has since been attached to the job
+    """
+    expression_attribute_values = {
+        ":task_token_list": {"L": list(map(
+            lambda task_token_iter_: {"S": task_token_iter_},
+            filter(
+                lambda task_token_iter_: task_token_iter_ not in expired_task_token_list,
+                waiting_job.task_token_list
+            )
+        ))},
+    }
+    if len(waiting_job.task_token_list) > 0:
+        task_token_list_condition = "size(task_token_list) = :task_token_list_size"
+        expression_attribute_values[":task_token_list_size"] = {"N": str(len(waiting_job.task_token_list))}
+    else:
+        task_token_list_condition = "attribute_not_exists(task_token_list)"
+
+    try:
+        dynamodb_client.update_item(
+            TableName=table_name,
+            Key={"id": {"S": waiting_job.job_id}, "id_type": {"S": JOB_ID_TYPE}},
+            UpdateExpression="SET task_token_list = :task_token_list" + (
+                " REMOVE task_token" if waiting_job.legacy_task_token in expired_task_token_list else ""
+            ),
+            ConditionExpression=f"attribute_not_exists(job_status) AND {task_token_list_condition}",
+            ExpressionAttributeValues=expression_attribute_values,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+def handler(event, context) -> Dict[str, int]:
+    """
+    Lambda handler to send a heartbeat to the task tokens of every job still waited on
+    :param event:
+    :param context:
+    :return:
+    """
+    dynamodb_client = get_dynamodb_client()
+    sfn_client = get_sfn_client()
+    task_token_table_name = environ[TASK_TOKEN_TABLE_NAME_ENV_VAR]
+
+    # Get the jobs that are still waited on
+    waiting_job_list = get_waiting_job_list(dynamodb_client, task_token_table_name)
+    job_status_by_job_id = get_job_status_by_job_id(
+        dynamodb_client,
+        environ[JOB_TABLE_NAME_ENV_VAR],
+        list(map(lambda waiting_job_iter_: waiting_job_iter_.job_id, waiting_job_list))
+    )
+
+    # The task tokens of jobs that have completed are released by the state change event of the job,
+    # (and the tokens of jobs that no longer exist are left to time out)
+    active_waiting_job_list = list(filter(
+        lambda waiting_job_iter_: job_status_by_job_id.get(waiting_job_iter_.job_id) in ACTIVE_JOB_STATUS_LIST,
+        waiting_job_list
+    ))
+    task_token_list = [
+        task_token
+        for waiting_job in active_waiting_job_list
+        for task_token in waiting_job.get_all_task_tokens()
+    ]
+
+    with ThreadPoolExecutor(max_workers=MAX_HEARTBEAT_WORKERS) as executor:
+        # Send the heartbeats
+        heartbeat_result_by_task_token: Dict[str, HeartbeatResult] = dict(zip(
+            task_token_list,
+            executor.map(lambda task_token_iter_: send_heartbeat(sfn_client, task_token_iter_), task_token_list)
+        ))
+
+        # Remove the expired task tokens from their jobs
+        expired_task_token_list_by_job_id: Dict[str, List[str]] = {
+            waiting_job.job_id: list(filter(
+                lambda task_token_iter_: heartbeat_result_by_task_token[task_token_iter_] == 'EXPIRED',
+                waiting_job.get_all_task_tokens()
+            ))
+            for waiting_job in active_waiting_job_list
+        }
+        # Consume the results so that any errors are raised
+        list(executor.map(
+            lambda waiting_job_iter_: remove_expired_task_tokens(
+                dynamodb_client,
+                task_token_table_name,
+                waiting_job_iter_,
+                expired_task_token_list_by_job_id[waiting_job_iter_.job_id]
+            ),
+            filter(
+                lambda waiting_job_iter_: len(expired_task_token_list_by_job_id[waiting_job_iter_.job_id]) > 0,
+                active_waiting_job_list
+            )
+        ))
+
+    result_counts = Counter(heartbeat_result_by_task_token.values())
+    return {
+        "activeJobCount": len(active_waiting_job_list),
+        "heartbeatCount": result_counts['SENT'],
+        "expiredTaskTokenCount": result_counts['EXPIRED'],
+        "failedHeartbeatCount": result_counts['ERROR'],
+    }
+
+
+if __name__ == "__main__":
+    import json
+    environ['AWS_PROFILE'] = 'umccr-development'
+    environ[TASK_TOKEN_TABLE_NAME_ENV_VAR] = 'FastqDecompressionTaskTokenTable'
+    environ[JOB_TABLE_NAME_ENV_VAR] = 'FastqDecompressionJobsTable'
+    print(json.dumps(
+        handler({}, None),
+        indent=4
+    ))
@@ -21,7 +21,9 @@ JobType = Literal[
     'ORA_DECOMPRESSION',
     'GZIP_FILESIZE_CALCULATION',
     'RAW_MD5SUM_CALCULATION',
-    'READ_COUNT_CALCULATION'
+    'READ_COUNT_CALCULATION',
+    'MULTI_STATS_CALCULATION',
+    'FASTQ_STATS',
 ]
 
 
@@ -52,6 +54,8 @@ def handler(event, context):
     job_type: JobType = event.get("jobType", None)
     metadata_json_fastq_pair_dicts_list: List[Dict[str, str]] = event.get("metadataJsonFastqPairDictsList", None)
     fastq_id_list = event.get("fastqIdList", None)
+    # The failed pipeline stage(s) (and their stderr) if the decompression task failed
+    error_message = event.get("errorMessage", None)
 
     if not status:
         raise ValueError("Status is required")
@@ -60,7 +64,12 @@ def handler(event, context):
         update_status(
             job_id,
             status=status,
-            stepsExecutionArn=steps_execution_arn
+            stepsExecutionArn=steps_execution_arn,
+            **(
+                {"errorMessage": error_message}
+                if error_message is not None
+                else {}
+            )
         )
         ## FIXME - need to handle other statuses like FAILED, CANCELLED, etc.
         return
@@ -175,3 +184,48 @@ def handler(event, context):
                 )
             )
         )
+
+    elif job_type == 'MULTI_STATS_CALCULATION':
+        # Similarly, though each ingest id now has the raw md5sum, read count and gzip file size
+        # The multi stats output object is not (yet) part of the orcabus api tools models
+        # so we pass through the dictionary as is
+        update_status(
+            job_id,
+            status=status,
+            output={
+                "multiStatsList": list(map(
+                    lambda fastq_iter_: {
+                        "fastqId": fastq_iter_,
+                        "multiStatsByOraFileIngestIdList": next(filter(
+                            lambda metadata_json_fastq_pair_dicts_iter_: (
+                                    metadata_json_fastq_pair_dicts_iter_['fastqId'] == fastq_iter_
+                            ),
+                            metadata_json_fastq_pair_dicts_list
+                        ))['metadataJson']
+                    },
+                    fastq_id_list
+                ))
+            }
+        )
+
+    elif job_type == 'FASTQ_STATS':
+        # As above, each ingest id has the scalar read length, base composition, gc content and quality statistics
+        # (the histograms and per position summaries are only in the metadata json at its outputMetadataUri)
+        update_status(
+            job_id,
+            status=status,
+            output={
+                "fastqStatsList": list(map(
+                    lambda fastq_iter_: {
+                        "fastqId": fastq_iter_,
+                        "fastqStatsByOraFileIngestIdList": next(filter(
+                            lambda metadata_json_fastq_pair_dicts_iter_: (
+                                    metadata_json_fastq_pair_dicts_iter_['fastqId'] == fastq_iter_
+                            ),
+                            metadata_json_fastq_pair_dicts_list
+                        ))['metadataJson']
+                    },
+                    fastq_id_list
+                ))
+            }
+        )
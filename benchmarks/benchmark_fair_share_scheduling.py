@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+"""
+Simulate the queueing latency of each priority class under a mixed load, with and without the priority fair share
+scheduling of the concurrency slots (see the acquire concurrency slot lambda).
+
+The simulation is a discrete event simulation in simulated time (an eight hour load runs in seconds), of
+  * a bulk backfill job of --bulk-files fastqs, submitted at the start (with --bulk-priority, NORMAL by default
+    as a backfill submitted without a priority would be)
+  * NORMAL jobs of --normal-files fastqs, one every --normal-interval-minutes
+  * HIGH (synchronous) jobs of one or two fastqs, arriving at random with a mean of --high-interval-minutes
+each fastq holding one of --slots concurrency slots for a random --min-service-minutes to --max-service-minutes.
+New jobs arrive for --arrival-hours, the simulation then runs until every fastq has completed.
+
+We compare
+  * first free slot: every fastq that cannot acquire a slot retries with a jittered backoff, and every slot is taken
+    by whichever fastq happens to retry first once it is freed (the acquisition before the scheduler),
+    so a large job with many fastqs retrying takes most of the slots
+  * priority fair share: every fastq registers as a waiter and waits on its task token,
+    the waiters are ordered by order_waiters (the same function the lambda uses),
+    and a grant pass gives the free slots to the head of the order on every registration and release
+
+For each method we report the time each fastq waited on a slot (p50 / p95 / max) of each class,
+the time to complete the HIGH jobs (what an upstream workflow waits on), the share of the slots held by the bulk job
+while any other job was waiting, and the utilisation of the slots.
+
+Usage:
+  python3 benchmark_fair_share_scheduling.py --slots 20 --bulk-files 400
+"""
+
+# Standard library imports
+import argparse
+import heapq
+import random
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Globals
+APP_DIR = Path(__file__).absolute().parent.parent / "app"
+ECS_BENCHMARKS_DIR = APP_DIR / "ecs" / "ora_decompression" / "benchmarks"
+LAMBDAS_DIR = APP_DIR / "lambdas"
+
+sys.path.insert(0, str(ECS_BENCHMARKS_DIR))
+sys.path.insert(0, str(LAMBDAS_DIR / "acquire_concurrency_slot_py"))
+from acquire_concurrency_slot import Waiter, order_waiters  # noqa: E402
+from benchmark_bootstrap import print_table  # noqa: E402
+
+# The retry policy of the acquire concurrency slot states before the scheduler
+UNAVAILABLE_INTERVAL_SECONDS = 30
+UNAVAILABLE_BACKOFF_RATE = 1.5
+UNAVAILABLE_MAX_DELAY_SECONDS = 300
+
+METHODS = ["first free slot", "priority fair share"]
+WORKLOADS = ["HIGH", "NORMAL", "BULK"]
+DEFAULT_SEED = 42
+
+
+@dataclass
+class SimulatedJob:
+    id: str
+    workload: str
+    priority: str
+    arrival: float
+    fastq_list: List["SimulatedFastq"] = field(default_factory=list)
+
+
+@dataclass
+class SimulatedFastq:
+    id: str
+    job: SimulatedJob
+    arrival: float
+    service_seconds: float
+    acquired_at: Optional[float] = None
+    released_at: Optional[float] = None
+    unavailable_retry_count: int = 0
+    waiter: Optional[Waiter] = None
+
+
+def get_jobs(args: argparse.Namespace) -> List[SimulatedJob]:
+    """
+    The same jobs (and service times) for every method
+    """
+    rng = random.Random(args.seed)
+    arrival_seconds = args.arrival_hours * 3600
+
+    def get_job(job_id: str, workload: str, priority: str, arrival: float, file_count: int) -> SimulatedJob:
+        job = SimulatedJob(id=job_id, workload=workload, priority=priority, arrival=arrival)
+        job.fastq_list = [
+            SimulatedFastq(
+                id=f"{job_id}-{str(fastq_index).zfill(4)}",
+                job=job,
+                arrival=arrival,
+                service_seconds=rng.uniform(args.min_service_minutes, args.max_service_minutes) * 60,
+            )
+            for fastq_index in range(file_count)
+        ]
+        return job
+
+    job_list = [get_job("bulk", "BULK", args.bulk_priority, 0, args.bulk_files)]
+
+    normal_arrival = args.normal_interval_minutes * 60 / 2
+    while normal_arrival < arrival_seconds:
+        job_list.append(get_job(f"normal{len(job_list)}", "NORMAL", "NORMAL", normal_arrival, args.normal_files))
+        normal_arrival += args.normal_interval_minutes * 60
+
+    high_arrival = rng.expovariate(1 / (args.high_interval_minutes * 60))
+    while high_arrival < arrival_seconds:
+        job_list.append(get_job(f"high{len(job_list)}", "HIGH", "HIGH", high_arrival, rng.choice([1, 2])))
+        high_arrival += rng.expovariate(1 / (args.high_interval_minutes * 60))
+
+    return job_list
+
+
+def simulate(method: str, job_list: List[SimulatedJob], slots: int, seed: int) -> Dict[str, float]:
+    """
+    Run every fastq of the jobs through the acquisition, recording when each fastq acquired and released its slot
+    """
+    rng = random.Random(seed)
+    event_heap = []
+    event_count = 0
+
+    def push_event(event_time: float, event_type: str, fastq: SimulatedFastq):
+        nonlocal event_count
+        heapq.heappush(event_heap, (event_time, event_count, event_type, fastq))
+        event_count += 1
+
+    for job in job_list:
+        for fastq in job.fastq_list:
+            fastq.acquired_at = fastq.released_at = fastq.waiter = None
+            fastq.unavailable_retry_count = 0
+            push_event(fastq.arrival, "attempt", fastq)
+
+    held_fastq_list: List[SimulatedFastq] = []
+    waiter_fastq_by_id: Dict[str, SimulatedFastq] = {}
+    # The jobs (other than the bulk job) with a fastq waiting on a slot
+    waiting_job_ids = set()
+    attempt_count = 0
+
+    def acquire(acquired_fastq: SimulatedFastq, acquired_at: float):
+        acquired_fastq.acquired_at = acquired_at
+        held_fastq_list.append(acquired_fastq)
+        waiter_fastq_by_id.pop(acquired_fastq.id, None)
+        if all(fastq_iter_.acquired_at is not None for fastq_iter_ in acquired_fastq.job.fastq_list):
+            waiting_job_ids.discard(acquired_fastq.job.id)
+        push_event(acquired_at + acquired_fastq.service_seconds, "release", acquired_fastq)
+
+    def grant_free_slots(granted_at: float):
+        """
+        The grant pass of the acquire concurrency slot lambda
+        """
+        nonlocal attempt_count
+        attempt_count += 1
+        now = int(granted_at)
+        held_slot_count_by_job_id: Dict[str, int] = {}
+        for held_fastq in held_fastq_list:
+            held_slot_count_by_job_id[held_fastq.job.id] = held_slot_count_by_job_id.get(held_fastq.job.id, 0) + 1
+        ordered_waiter_list = order_waiters(
+            list(map(lambda waiter_fastq_iter_: waiter_fastq_iter_.waiter, waiter_fastq_by_id.values())),
+            held_slot_count_by_job_id,
+            now
+        )
+        for waiter in ordered_waiter_list[:slots - len(held_fastq_list)]:
+            acquire(waiter_fastq_by_id[waiter.id], granted_at)
+    busy_slot_seconds = 0.0
+    contended_seconds = 0.0
+    bulk_contended_slot_seconds = 0.0
+    last_event_time = 0.0
+
+    while event_heap:
+        event_time, _, event_type, fastq = heapq.heappop(event_heap)
+
+        # Integrate the slot usage since the last event
+        interval_seconds = event_time - last_event_time
+        busy_slot_seconds += interval_seconds * len(held_fastq_list)
+        if waiting_job_ids:
+            contended_seconds += interval_seconds
+            bulk_contended_slot_seconds += interval_seconds * sum(
+                held_fastq_iter_.job.workload == "BULK" for held_fastq_iter_ in held_fastq_list
+            )
+        last_event_time = event_time
+
+        if event_type == "release":
+            held_fastq_list.remove(fastq)
+            fastq.released_at = event_time
+            # The release concurrency slot lambda gives the freed slot to the next waiter
+            if method != "first free slot":
+                grant_free_slots(event_time)
+            continue
+
+        if fastq.job.workload != "BULK":
+            waiting_job_ids.add(fastq.job.id)
+
+        if method != "first free slot":
+            # Register the waiter, then wait on the task token for a slot to be granted
+            fastq.waiter = Waiter(
+                id=fastq.id, job_id=fastq.job.id, priority=fastq.job.priority, enqueued_at=int(event_time)
+            )
+            waiter_fastq_by_id[fastq.id] = fastq
+            grant_free_slots(event_time)
+            continue
+
+        attempt_count += 1
+        if len(held_fastq_list) < slots:
+            acquire(fastq, event_time)
+            continue
+
+        # Retry on the retry policy of the step function
+        retry_seconds = rng.uniform(0, min(
+            UNAVAILABLE_INTERVAL_SECONDS * UNAVAILABLE_BACKOFF_RATE ** fastq.unavailable_retry_count,
+            UNAVAILABLE_MAX_DELAY_SECONDS
+        ))
+        fastq.unavailable_retry_count += 1
+        push_event(event_time + retry_seconds, "attempt", fastq)
+
+    return {
+        "attemptCount": attempt_count,
+        "makespanSeconds": last_event_time,
+        "utilisation": busy_slot_seconds / (slots * last_event_time),
+        "bulkShareWhileContended": (
+            bulk_contended_slot_seconds / (slots * contended_seconds) if contended_seconds else 0.0
+        ),
+    }
+
+
+def get_percentile(value_list: List[float], percentile: float) -> float:
+    sorted_value_list = sorted(value_list)
+    return sorted_value_list[min(int(len(sorted_value_list) * percentile / 100), len(sorted_value_list) - 1)]
+
+
+def format_minutes(seconds: float) -> str:
+    return f"{seconds / 60:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=20)
+    parser.add_argument("--bulk-files", type=int, default=400)
+    parser.add_argument("--bulk-priority", choices=["HIGH", "NORMAL", "LOW"], default="NORMAL")
+    parser.add_argument("--normal-files", type=int, default=8)
+    parser.add_argument("--normal-interval-minutes", type=float, default=30)
+    parser.add_argument("--high-interval-minutes", type=float, default=10)
+    parser.add_argument("--min-service-minutes", type=float, default=10)
+    parser.add_argument("--max-service-minutes", type=float, default=30)
+    parser.add_argument("--arrival-hours", type=float, default=8)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    job_list = get_jobs(args)
+    print(
+        f"{len(job_list)} jobs ({sum(len(job_iter_.fastq_list) for job_iter_ in job_list)} fastqs) "
+        f"on {args.slots} slots, bulk job of {args.bulk_files} fastqs at {args.bulk_priority} priority\n"
+    )
+
+    wait_rows = []
+    summary_rows = []
+    for method in METHODS:
+        summary = simulate(method, job_list, args.slots, args.seed)
+
+        for workload in WORKLOADS:
+            wait_list = [
+                fastq.acquired_at - fastq.arrival
+                for job in job_list if job.workload == workload
+                for fastq in job.fastq_list
+            ]
+            wait_rows.append({
+                "method": method,
+                "class": workload,
+                "fastqs": str(len(wait_list)),
+                "p50 wait (min)": format_minutes(get_percentile(wait_list, 50)),
+                "p95 wait (min)": format_minutes(get_percentile(wait_list, 95)),
+                "max wait (min)": format_minutes(max(wait_list)),
+            })
+
+        high_job_completion_list = [
+            max(fastq.released_at for fastq in job.fastq_list) - job.arrival
+            for job in job_list if job.workload == "HIGH"
+        ]
+        summary_rows.append({
+            "method": method,
+            "HIGH job p50 (min)": format_minutes(get_percentile(high_job_completion_list, 50)),
+            "HIGH job p95 (min)": format_minutes(get_percentile(high_job_completion_list, 95)),
+            "bulk share while others wait": f"{summary['bulkShareWhileContended']:.0%}",
+            "utilisation": f"{summary['utilisation']:.0%}",
+            "makespan (h)": f"{summary['makespanSeconds'] / 3600:.1f}",
+            "acquire invocations": str(summary["attemptCount"]),
+        })
+
+    print_table(wait_rows)
+    print()
+    print_table(summary_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark resolving the fastq objects of a job (the get fastq object lambda of the run decompression job step function)
+against a local stand-in of the fastq API.
+
+We compare
+  * per fastq invocation: one lambda invocation per fastq (as the step function used to),
+    each requesting its fastq on a new connection, --map-concurrency invocations at a time
+  * batched: one lambda invocation per batch of --batch-size fastqs,
+    requesting the fastqs of the batch concurrently (--max-workers at a time), each on a new connection
+  * batched, pooled: as batched, but each worker keeps its connection alive for the rest of the batch
+
+Every request to the stand-in is delayed by --latency seconds, every new connection by --connect-latency seconds,
+and every lambda invocation by --invoke-overhead seconds (the state transition and the invocation of the lambda).
+
+For each method we report the wall clock time, the number of lambda invocations, requests and connections made,
+and whether every fastq was resolved to its own fastq object.
+
+Usage:
+  python3 benchmark_fastq_metadata_batching.py --num-fastqs 500 --latency 0.05 --connect-latency 0.03
+"""
+
+# Standard library imports
+import argparse
+import http.client
+import json
+import threading
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Local imports
+from local_fastq_api_server import (
+    FASTQ_ENDPOINT_PREFIX, LocalFastqApiStore, get_synthetic_fastq, start_local_fastq_api_server
+)
+
+# Globals
+ECS_BENCHMARKS_DIR = Path(__file__).absolute().parent.parent / "app" / "ecs" / "ora_decompression" / "benchmarks"
+
+sys.path.insert(0, str(ECS_BENCHMARKS_DIR))
+from benchmark_bootstrap import print_table  # noqa: E402
+
+# As in the run decompression job step function and the get fastq object lambda
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_WORKERS = 16
+# The max concurrency of an inline map state
+DEFAULT_MAP_CONCURRENCY = 40
+METHODS = ["per fastq invocation", "batched", "batched, pooled"]
+
+
+def get_fastq_obj(connection: http.client.HTTPConnection, fastq_id: str) -> Dict:
+    connection.request("GET", f"{FASTQ_ENDPOINT_PREFIX}{fastq_id}?includeS3Details=true")
+    response = connection.getresponse()
+    body = response.read()
+    if response.status != 200:
+        raise ValueError(f"Could not get fastq {fastq_id}: {response.status}")
+    return json.loads(body)
+
+
+def get_fastq_obj_new_connection(port: int, fastq_id: str) -> Dict:
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    try:
+        return get_fastq_obj(connection, fastq_id)
+    finally:
+        connection.close()
+
+
+def invoke_per_fastq(port: int, fastq_id_list: List[str], invoke_overhead: float) -> Dict[str, Dict]:
+    time.sleep(invoke_overhead)
+    return {fastq_id_list[0]: get_fastq_obj_new_connection(port, fastq_id_list[0])}
+
+
+def invoke_batched(port: int, fastq_id_list: List[str], invoke_overhead: float, max_workers: int) -> Dict[str, Dict]:
+    time.sleep(invoke_overhead)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(fastq_id_list))) as executor:
+        return dict(zip(
+            fastq_id_list,
+            executor.map(lambda fastq_id_iter_: get_fastq_obj_new_connection(port, fastq_id_iter_), fastq_id_list)
+        ))
+
+
+def invoke_batched_pooled(
+        port: int, fastq_id_list: List[str], invoke_overhead: float, max_workers: int
+) -> Dict[str, Dict]:
+    time.sleep(invoke_overhead)
+    connection_by_thread = threading.local()
+    connection_list = []
+    connection_list_lock = threading.Lock()
+
+    def get_fastq_obj_pooled(fastq_id: str) -> Dict:
+        if getattr(connection_by_thread, "connection", None) is None:
+            connection_by_thread.connection = http.client.HTTPConnection("127.0.0.1", port)
+            with connection_list_lock:
+                connection_list.append(connection_by_thread.connection)
+        return get_fastq_obj(connection_by_thread.connection, fastq_id)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(fastq_id_list))) as executor:
+            return dict(zip(fastq_id_list, executor.map(get_fastq_obj_pooled, fastq_id_list)))
+    finally:
+        for connection in connection_list:
+            connection.close()
+
+
+def run_method(
+        method: str,
+        port: int,
+        fastq_id_list: List[str],
+        args: argparse.Namespace
+) -> Dict[str, Dict]:
+    """
+    Run the invocations of the method, --map-concurrency at a time (as the map state of the step function would)
+    """
+    invoke: Callable[[List[str]], Dict[str, Dict]]
+    if method == "per fastq invocation":
+        batch_size = 1
+        invoke = lambda batch_iter_: invoke_per_fastq(port, batch_iter_, args.invoke_overhead)  # noqa: E731
+    elif method == "batched":
+        batch_size = args.batch_size
+        invoke = lambda batch_iter_: invoke_batched(  # noqa: E731
+            port, batch_iter_, args.invoke_overhead, args.max_workers
+        )
+    else:
+        batch_size = args.batch_size
+        invoke = lambda batch_iter_: invoke_batched_pooled(  # noqa: E731
+            port, batch_iter_, args.invoke_overhead, args.max_workers
+        )
+
+    batch_list = [fastq_id_list[i:i + batch_size] for i in range(0, len(fastq_id_list), batch_size)]
+    fastq_obj_by_fastq_id: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=args.map_concurrency) as executor:
+        for batch_result in executor.map(invoke, batch_list):
+            fastq_obj_by_fastq_id.update(batch_result)
+    return fastq_obj_by_fastq_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-fastqs", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--map-concurrency", type=int, default=DEFAULT_MAP_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.03)
+    parser.add_argument("--invoke-overhead", type=float, default=0.03)
+    args = parser.parse_args()
+
+    store = LocalFastqApiStore()
+    fastq_id_list = [f"fqr.{str(fastq_index).zfill(26)}" for fastq_index in range(args.num_fastqs)]
+    for fastq_index, fastq_id in enumerate(fastq_id_list):
+        store.add_fastq(get_synthetic_fastq(fastq_id, fastq_index))
+    server = start_local_fastq_api_server(store, latency=args.latency, connect_latency=args.connect_latency)
+
+    rows = []
+    try:
+        for method in METHODS:
+            with store.lock:
+                store.request_count = 0
+                store.connection_count = 0
+
+            start_time = time.perf_counter()
+            fastq_obj_by_fastq_id = run_method(method, server.server_port, fastq_id_list, args)
+            wall_seconds = time.perf_counter() - start_time
+
+            batch_size = 1 if method == "per fastq invocation" else args.batch_size
+            rows.append({
+                "method": method,
+                "wall (s)": f"{wall_seconds:.2f}",
+                "invocations": str(-(-len(fastq_id_list) // batch_size)),
+                "requests": str(store.request_count),
+                "connections": str(store.connection_count),
+                "checksOk": str(
+                    list(fastq_obj_by_fastq_id.keys()) == fastq_id_list and
+                    all(
+                        fastq_obj_by_fastq_id[fastq_id]["id"] == fastq_id
+                        for fastq_id in fastq_id_list
+                    )
+                ),
+            })
+    finally:
+        server.shutdown()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+"""
+Load test the send task token heartbeats lambda (of the heartbeat monitor step function)
+against local stand-ins of DynamoDB and Step Functions, with --num-jobs synthetic jobs.
+
+Of the synthetic jobs
+  * --completed-fraction have completed (the task token table holds their completion record)
+  * the rest are PENDING or RUNNING, with one task token each, a second task token for --shared-fraction of them
+    (a repeat request attached to the job), and a legacy single task token for --legacy-fraction of them
+  * the first task token of --expired-fraction of the active jobs has expired (the requesting execution timed out)
+
+We compare
+  * per job: the jobs still active are listed, then for each job its task tokens are looked up (GetItem)
+    and a heartbeat sent to each, --map-concurrency jobs at a time (as the heartbeat monitor used to, in a map state)
+  * batched: the send task token heartbeats lambda, one scan of the task token table,
+    BatchGetItem lookups of the job statuses and concurrent heartbeats
+
+Every request to each stand-in is delayed by --latency seconds.
+Each method runs in its own process (the stand-ins run in this one), so the client and the stand-ins
+do not compete for the interpreter.
+
+For each method we report the wall clock time, the number of requests made to each stand-in,
+and whether every live task token of an active job received exactly one heartbeat (and no other task token did).
+The batched method must also have removed the expired task tokens from their jobs.
+
+Usage:
+  python3 benchmark_task_token_heartbeats.py --num-jobs 5000 --latency 0.01
+"""
+
+# Standard library imports
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+# Local imports
+from local_dynamodb_server import LocalDynamoDbStore, start_local_dynamodb_server
+
+# Globals
+APP_DIR = Path(__file__).absolute().parent.parent / "app"
+ECS_BENCHMARKS_DIR = APP_DIR / "ecs" / "ora_decompression" / "benchmarks"
+LAMBDAS_DIR = APP_DIR / "lambdas"
+
+sys.path.insert(0, str(ECS_BENCHMARKS_DIR))
+from benchmark_bootstrap import print_table  # noqa: E402
+from local_work_queue_server import LocalWorkQueueStore, start_local_work_queue_server  # noqa: E402
+
+SEND_TASK_TOKEN_HEARTBEATS_LAMBDA_DIR = LAMBDAS_DIR / "send_task_token_heartbeats_py"
+TASK_TOKEN_TABLE_NAME = "FastqDecompressionTaskTokenTable"
+JOB_TABLE_NAME = "FastqDecompressionJobsTable"
+# The max concurrency of an inline map state
+DEFAULT_MAP_CONCURRENCY = 40
+METHODS = ["per job", "batched"]
+
+
+def seed_stores(
+        dynamodb_store: LocalDynamoDbStore,
+        sfn_store: LocalWorkQueueStore,
+        args: argparse.Namespace
+) -> Dict[str, List[str]]:
+    """
+    Create the synthetic jobs, returns the live and expired task tokens of the active jobs,
+    and the task tokens of the completed jobs (that are no longer stored against their job)
+    """
+    dynamodb_store.add_table(TASK_TOKEN_TABLE_NAME, ["id", "id_type"])
+    dynamodb_store.add_table(JOB_TABLE_NAME, ["id"])
+
+    task_tokens: Dict[str, List[str]] = {"live": [], "expired": [], "completed": []}
+    num_completed = int(args.num_jobs * args.completed_fraction)
+    for job_index in range(args.num_jobs):
+        job_id = f"dcmp.{str(job_index).zfill(26)}"
+        job_key = {"id": {"S": job_id}, "id_type": {"S": "job_id"}}
+
+        if job_index < num_completed:
+            task_tokens["completed"].append(sfn_store.add_task_token())
+            dynamodb_store.put_item(JOB_TABLE_NAME, {"id": {"S": job_id}, "status": {"S": "SUCCEEDED"}})
+            dynamodb_store.put_item(TASK_TOKEN_TABLE_NAME, {
+                **job_key,
+                "job_status": {"S": "SUCCEEDED"},
+                "job_output": {"S": "{}"},
+                "ttl": {"N": str(int(time.time()) + 86400)},
+            })
+            continue
+
+        active_index = job_index - num_completed
+        job_task_token_list = [sfn_store.add_task_token()]
+        if active_index % round(1 / args.shared_fraction) == 0:
+            job_task_token_list.append(sfn_store.add_task_token())
+        legacy_task_token = (
+            sfn_store.add_task_token()
+            if active_index % round(1 / args.legacy_fraction) == 1
+            else None
+        )
+        if active_index % round(1 / args.expired_fraction) == 2:
+            sfn_store.expire_task_token(job_task_token_list[0])
+            task_tokens["expired"].append(job_task_token_list[0])
+            task_tokens["live"].extend(job_task_token_list[1:])
+        else:
+            task_tokens["live"].extend(job_task_token_list)
+        if legacy_task_token is not None:
+            task_tokens["live"].append(legacy_task_token)
+
+        dynamodb_store.put_item(
+            JOB_TABLE_NAME,
+            {"id": {"S": job_id}, "status": {"S": "RUNNING" if active_index % 2 == 0 else "PENDING"}}
+        )
+        dynamodb_store.put_item(TASK_TOKEN_TABLE_NAME, {
+            **job_key,
+            "task_token_list": {"L": [{"S": task_token} for task_token in job_task_token_list]},
+            **({"task_token": {"S": legacy_task_token}} if legacy_task_token is not None else {}),
+        })
+    return task_tokens
+
+
+def run_per_job(args: argparse.Namespace):
+    """
+    List the active jobs, then look up the task tokens of each job and send its heartbeats
+    """
+    import boto3
+    dynamodb_client = boto3.client("dynamodb")
+    sfn_client = boto3.client("stepfunctions")
+
+    # The jobs API list of the PENDING and RUNNING jobs
+    active_job_id_list = [
+        item["id"]["S"]
+        for page in dynamodb_client.get_paginator("scan").paginate(TableName=JOB_TABLE_NAME)
+        for item in page["Items"]
+        if item["status"]["S"] in ["PENDING", "RUNNING"]
+    ]
+
+    def heartbeat_job(job_id: str):
+        item = dynamodb_client.get_item(
+            TableName=TASK_TOKEN_TABLE_NAME,
+            Key={"id": {"S": job_id}, "id_type": {"S": "job_id"}},
+        )["Item"]
+        for task_token in (
+                [task_token_iter_["S"] for task_token_iter_ in item.get("task_token_list", {}).get("L", [])] +
+                ([item["task_token"]["S"]] if "task_token" in item else [])
+        ):
+            try:
+                sfn_client.send_task_heartbeat(taskToken=task_token)
+            except sfn_client.exceptions.TaskTimedOut:
+                pass
+
+    with ThreadPoolExecutor(max_workers=args.map_concurrency) as executor:
+        list(executor.map(heartbeat_job, active_job_id_list))
+
+
+def run_batched(args: argparse.Namespace) -> Dict[str, int]:
+    sys.path.insert(0, str(SEND_TASK_TOKEN_HEARTBEATS_LAMBDA_DIR))
+    try:
+        send_task_token_heartbeats = importlib.import_module("send_task_token_heartbeats")
+    finally:
+        sys.path.pop(0)
+    return send_task_token_heartbeats.handler({}, None)
+
+
+def get_remaining_expired_task_token_count(dynamodb_store: LocalDynamoDbStore, expired_task_token_list: List[str]):
+    expired_task_token_set = set(expired_task_token_list)
+    with dynamodb_store.lock:
+        return sum(
+            1
+            for item in dynamodb_store.tables[TASK_TOKEN_TABLE_NAME].items.values()
+            for task_token_iter_ in item.get("task_token_list", {}).get("L", [])
+            if task_token_iter_["S"] in expired_task_token_set
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-jobs", type=int, default=5000)
+    parser.add_argument("--completed-fraction", type=float, default=0.2)
+    parser.add_argument("--shared-fraction", type=float, default=0.25)
+    parser.add_argument("--legacy-fraction", type=float, default=0.05)
+    parser.add_argument("--expired-fraction", type=float, default=0.05)
+    parser.add_argument("--map-concurrency", type=int, default=DEFAULT_MAP_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    dynamodb_store = LocalDynamoDbStore()
+    sfn_store = LocalWorkQueueStore()
+    task_tokens = seed_stores(dynamodb_store, sfn_store, args)
+    dynamodb_server = start_local_dynamodb_server(dynamodb_store, latency=args.latency)
+    sfn_server = start_local_work_queue_server(sfn_store, latency=args.latency)
+
+    os.environ.update({
+        "AWS_ENDPOINT_URL_DYNAMODB": f"http://127.0.0.1:{dynamodb_server.server_port}",
+        "AWS_ENDPOINT_URL_SFN": f"http://127.0.0.1:{sfn_server.server_port}",
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_DEFAULT_REGION": "ap-southeast-2",
+        "TASK_TOKEN_TABLE_NAME": TASK_TOKEN_TABLE_NAME,
+        "JOB_TABLE_NAME": JOB_TABLE_NAME,
+    })
+
+    rows = []
+    try:
+        for method in METHODS:
+            with dynamodb_store.lock:
+                dynamodb_store.request_count = 0
+                dynamodb_store.request_count_by_operation = {}
+            with sfn_store.condition:
+                sfn_store.request_count = 0
+                for task in sfn_store.tasks.values():
+                    task.heartbeat_count = 0
+
+            start_time = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result = executor.submit(run_per_job if method == "per job" else run_batched, args).result()
+            if method == "per job":
+                checks_ok = True
+            else:
+                checks_ok = (
+                    result["heartbeatCount"] == len(task_tokens["live"]) and
+                    result["expiredTaskTokenCount"] == len(task_tokens["expired"]) and
+                    result["failedHeartbeatCount"] == 0 and
+                    get_remaining_expired_task_token_count(dynamodb_store, task_tokens["expired"]) == 0
+                )
+            wall_seconds = time.perf_counter() - start_time
+
+            with sfn_store.condition:
+                checks_ok = checks_ok and all(
+                    sfn_store.tasks[task_token].heartbeat_count == 1 for task_token in task_tokens["live"]
+                ) and all(
+                    sfn_store.tasks[task_token].heartbeat_count == 0
+                    for task_token in task_tokens["expired"] + task_tokens["completed"]
+                )
+
+            rows.append({
+                "method": method,
+                "wall (s)": f"{wall_seconds:.2f}",
+                "dynamodb requests": str(dynamodb_store.request_count),
+                "heartbeat requests": str(sfn_store.request_count),
+                "checksOk": str(checks_ok),
+            })
+    finally:
+        dynamodb_server.shutdown()
+        sfn_server.shutdown()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
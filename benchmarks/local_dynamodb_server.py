@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""
+A minimal in-memory stand-in for the DynamoDB operations of the send task token heartbeats lambda.
+
+Supports
+  * Scan (paginated, --page-size items per page, with ProjectionExpression)
+  * BatchGetItem (with ProjectionExpression, up to 100 keys per request)
+  * GetItem
+  * UpdateItem (SET <attribute> = <value> and REMOVE <attribute> clauses only)
+
+This is the AWS JSON protocol (a POST with an X-Amz-Target header), so point boto3 at the server with AWS_ENDPOINT_URL
+(or AWS_ENDPOINT_URL_DYNAMODB).
+
+Tables are created with add_table, and items (in DynamoDB JSON) with put_item.
+Condition expressions are not checked.
+
+Every request is delayed by --latency seconds to emulate the round trip to DynamoDB.
+
+Authentication is not checked.
+
+Usage:
+  python3 local_dynamodb_server.py --port 9500 --latency 0.01
+"""
+
+# Standard library imports
+import argparse
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Globals
+DEFAULT_PAGE_SIZE = 1000
+BATCH_GET_ITEM_MAX_KEYS = 100
+
+
+@dataclass
+class LocalTable:
+    key_names: List[str]
+    items: Dict[Tuple[str, ...], Dict] = field(default_factory=dict)
+
+    def get_key(self, item: Dict) -> Tuple[str, ...]:
+        return tuple(json.dumps(item[key_name], sort_keys=True) for key_name in self.key_names)
+
+
+@dataclass
+class LocalDynamoDbStore:
+    tables: Dict[str, LocalTable] = field(default_factory=dict)
+    request_count: int = 0
+    request_count_by_operation: Dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_table(self, table_name: str, key_names: List[str]):
+        with self.lock:
+            self.tables[table_name] = LocalTable(key_names=key_names)
+
+    def put_item(self, table_name: str, item: Dict):
+        with self.lock:
+            table = self.tables[table_name]
+            table.items[table.get_key(item)] = item
+
+    def get_item(self, table_name: str, key: Dict) -> Optional[Dict]:
+        with self.lock:
+            table = self.tables[table_name]
+            return table.items.get(table.get_key(key))
+
+
+def get_attribute_name(attribute_name: str, expression_attribute_names: Dict[str, str]) -> str:
+    return expression_attribute_names.get(attribute_name, attribute_name)
+
+
+def project_item(item: Dict, projection_expression: Optional[str], expression_attribute_names: Dict[str, str]) -> Dict:
+    if not projection_expression:
+        return item
+    attribute_name_list = [
+        get_attribute_name(attribute_name.strip(), expression_attribute_names)
+        for attribute_name in projection_expression.split(",")
+    ]
+    return {
+        attribute_name: item[attribute_name]
+        for attribute_name in attribute_name_list
+        if attribute_name in item
+    }
+
+
+def update_item(item: Dict, request: Dict):
+    """
+    Apply the SET and REMOVE clauses of an update expression to the item
+    """
+    expression_attribute_names = request.get("ExpressionAttributeNames", {})
+    expression_attribute_values = request.get("ExpressionAttributeValues", {})
+    for action, clause in re.findall(r"(SET|REMOVE)\s+(.*?)(?=\s+(?:SET|REMOVE)\s+|$)", request["UpdateExpression"]):
+        for action_item in clause.split(","):
+            if action == "SET":
+                attribute_name, value_name = map(str.strip, action_item.split("="))
+                item[get_attribute_name(attribute_name, expression_attribute_names)] = (
+                    expression_attribute_values[value_name]
+                )
+            else:
+                item.pop(get_attribute_name(action_item.strip(), expression_attribute_names), None)
+
+
+def get_request_handler(store: LocalDynamoDbStore, latency: float, page_size: int):
+    class LocalDynamoDbRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # The headers and body are written separately, don't hold the body back for the client's ack
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body):
+            body_bytes = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/x-amz-json-1.0")
+            self.send_header("Content-Length", str(len(body_bytes)))
+            self.end_headers()
+            self.wfile.write(body_bytes)
+
+        def _send_aws_error(self, error_type: str):
+            return self._send_json(400, {"__type": f"com.amazonaws.dynamodb.v20120810#{error_type}"})
+
+        def _scan(self, request: Dict):
+            with store.lock:
+                table = store.tables[request["TableName"]]
+                key_list = sorted(table.items.keys())
+                start_index = 0
+                if "ExclusiveStartKey" in request:
+                    start_index = key_list.index(table.get_key(request["ExclusiveStartKey"])) + 1
+                limit = min(request.get("Limit", page_size), page_size)
+                page_key_list = key_list[start_index:start_index + limit]
+                items = [
+                    project_item(
+                        table.items[key],
+                        request.get("ProjectionExpression"),
+                        request.get("ExpressionAttributeNames", {})
+                    )
+                    for key in page_key_list
+                ]
+                response = {"Items": items, "Count": len(items), "ScannedCount": len(items)}
+                if start_index + limit < len(key_list):
+                    last_item = table.items[page_key_list[-1]]
+                    response["LastEvaluatedKey"] = {key_name: last_item[key_name] for key_name in table.key_names}
+            return self._send_json(200, response)
+
+        def _batch_get_item(self, request: Dict):
+            if sum(len(request_item["Keys"]) for request_item in request["RequestItems"].values()) > (
+                    BATCH_GET_ITEM_MAX_KEYS
+            ):
+                return self._send_aws_error("ValidationException")
+            responses: Dict[str, List[Dict]] = {}
+            with store.lock:
+                for table_name, request_item in request["RequestItems"].items():
+                    table = store.tables[table_name]
+                    responses[table_name] = [
+                        project_item(
+                            table.items[table.get_key(key)],
+                            request_item.get("ProjectionExpression"),
+                            request_item.get("ExpressionAttributeNames", {})
+                        )
+                        for key in request_item["Keys"]
+                        if table.get_key(key) in table.items
+                    ]
+            return self._send_json(200, {"Responses": responses, "UnprocessedKeys": {}})
+
+        def do_POST(self):
+            time.sleep(latency)
+            operation = self.headers.get("X-Amz-Target", "").split(".")[-1]
+            with store.lock:
+                store.request_count += 1
+                store.request_count_by_operation[operation] = store.request_count_by_operation.get(operation, 0) + 1
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            if request.get("TableName", next(iter(request.get("RequestItems", {})), None)) not in store.tables:
+                return self._send_aws_error("ResourceNotFoundException")
+
+            if operation == "Scan":
+                return self._scan(request)
+
+            if operation == "BatchGetItem":
+                return self._batch_get_item(request)
+
+            if operation == "GetItem":
+                item = store.get_item(request["TableName"], request["Key"])
+                return self._send_json(200, {"Item": item} if item is not None else {})
+
+            if operation == "UpdateItem":
+                with store.lock:
+                    table = store.tables[request["TableName"]]
+                    item = table.items.setdefault(table.get_key(request["Key"]), dict(request["Key"]))
+                    update_item(item, request)
+                return self._send_json(200, {})
+
+            return self._send_aws_error("UnknownOperationException")
+
+    return LocalDynamoDbRequestHandler
+
+
+def start_local_dynamodb_server(
+        store: LocalDynamoDbStore,
+        port: int = 0,
+        latency: float = 0.0,
+        page_size: int = DEFAULT_PAGE_SIZE
+) -> ThreadingHTTPServer:
+    """
+    Start the server in a background thread
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), get_request_handler(store, latency, page_size))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument(
+        "--table", action="append", default=[],
+        help="A table to create, as <table name>:<key name>[,<key name>], may be given more than once"
+    )
+    args = parser.parse_args()
+
+    store = LocalDynamoDbStore()
+    for table in args.table:
+        table_name, key_names = table.split(":", 1)
+        store.add_table(table_name, key_names.split(","))
+    server = start_local_dynamodb_server(store, args.port, args.latency, args.page_size)
+    print(f"Serving a local DynamoDB stand-in at http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
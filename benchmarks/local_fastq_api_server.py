@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+"""
+A minimal in-memory stand-in for the fastq API (the GET /api/v1/fastq/<fastq id> endpoint),
+as used by the get fastq object lambda.
+
+Every request is delayed by --latency seconds to emulate the round trip to the API,
+and every new connection by a further --connect-latency seconds to emulate the TCP and TLS handshakes
+(connections are kept alive, so a client that reuses its connections only pays this once per connection).
+
+Fastq objects are created with add_fastq (or generated on first request when run standalone).
+
+Authentication is not checked.
+
+Usage:
+  python3 local_fastq_api_server.py --port 9400 --latency 0.05 --connect-latency 0.03
+"""
+
+# Standard library imports
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+# Globals
+FASTQ_ENDPOINT_PREFIX = "/api/v1/fastq/"
+
+
+def get_synthetic_fastq(fastq_id: str, fastq_index: int, paired: bool = True) -> Dict:
+    """
+    A fastq object with the fields read by the get fastq object lambda
+    """
+    library_id = f"L{str(2500000 + fastq_index).zfill(7)}"
+    lane = fastq_index % 4 + 1
+    read_set = {
+        read_num: {
+            "ingestId": f"{fastq_id}-{read_num}-ingest-id",
+            "s3Uri": (
+                f"s3://archive-bucket/primary/250101_A01052_0001_BHXXXXXXXX/"
+                f"{library_id}_S{fastq_index + 1}_L{str(lane).zfill(3)}_{read_num.upper()}_001.fastq.ora"
+            ),
+        }
+        for read_num in (["r1", "r2"] if paired else ["r1"])
+    }
+    return {
+        "id": fastq_id,
+        "instrumentRunId": "250101_A01052_0001_BHXXXXXXXX",
+        "lane": lane,
+        "library": {"libraryId": library_id},
+        "readCount": 400_000_000,
+        "readSet": read_set,
+    }
+
+
+@dataclass
+class LocalFastqApiStore:
+    fastqs: Dict[str, Dict] = field(default_factory=dict)
+    # Requests of unknown fastq ids create the fastq (rather than failing with a 404)
+    create_unknown_fastqs: bool = False
+    request_count: int = 0
+    connection_count: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_fastq(self, fastq_obj: Dict):
+        with self.lock:
+            self.fastqs[fastq_obj["id"]] = fastq_obj
+
+
+class LocalFastqApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept a burst of concurrent connections
+    request_queue_size = 256
+
+
+def get_request_handler(store: LocalFastqApiStore, latency: float, connect_latency: float):
+    class LocalFastqApiRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            time.sleep(connect_latency)
+            with store.lock:
+                store.connection_count += 1
+
+        def _send_json(self, status: int, body):
+            body_bytes = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body_bytes)))
+            self.end_headers()
+            self.wfile.write(body_bytes)
+
+        def do_GET(self):
+            time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            with store.lock:
+                store.request_count += 1
+                fastq_id = path[len(FASTQ_ENDPOINT_PREFIX):] if path.startswith(FASTQ_ENDPOINT_PREFIX) else None
+                if fastq_id and fastq_id not in store.fastqs and store.create_unknown_fastqs:
+                    store.fastqs[fastq_id] = get_synthetic_fastq(fastq_id, len(store.fastqs))
+                fastq_obj = store.fastqs.get(fastq_id) if fastq_id else None
+
+            if fastq_obj is None:
+                return self._send_json(404, {"detail": "Not found"})
+            return self._send_json(200, fastq_obj)
+
+    return LocalFastqApiRequestHandler
+
+
+def start_local_fastq_api_server(
+        store: LocalFastqApiStore,
+        port: int = 0,
+        latency: float = 0.0,
+        connect_latency: float = 0.0
+) -> ThreadingHTTPServer:
+    """
+    Start the server in a background thread
+    """
+    server = LocalFastqApiServer(("127.0.0.1", port), get_request_handler(store, latency, connect_latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9400)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    store = LocalFastqApiStore(create_unknown_fastqs=True)
+    server = start_local_fastq_api_server(store, args.port, args.latency, args.connect_latency)
+    print(f"Serving a local fastq API stand-in at http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import path from 'path';
 import {
   API_VERSION,
   DECOMPRESSION_JOB_STATE_CHANGE_DETAIL_TYPE,
+  DECOMPRESSION_WORKER_MAX_COUNT,
   FASTQ_DECOMPRESSION_SUBDOMAIN_NAME,
   INTERFACE_DIR,
   S3_DEFAULT_DECOMPRESSION_PREFIX,
@@ -78,6 +79,23 @@ export function buildApiInterfaceLambda(scope: Construct, props: LambdaApiProps)
     })
   );
 
+  // Add the concurrency slot table and the max concurrent tasks parameter in as environment variables
+  // And allow the lambda to read them, to report the concurrency slot usage
+  lambdaFunction.addEnvironment(
+    'DYNAMODB_CONCURRENCY_SLOT_TABLE_NAME',
+    props.concurrencySlotTable.tableName
+  );
+  props.concurrencySlotTable.grantReadData(lambdaFunction.currentVersion);
+  lambdaFunction.addEnvironment(
+    'MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME',
+    props.maxConcurrentTasksSsmParameter.parameterName
+  );
+  props.maxConcurrentTasksSsmParameter.grantRead(lambdaFunction.currentVersion);
+  lambdaFunction.addEnvironment(
+    'MAX_CONCURRENT_WORKER_JOBS',
+    DECOMPRESSION_WORKER_MAX_COUNT.toString()
+  );
+
   // Add the event bus in as an environment variable
   // And allow the lambda to put events to the event bus
   lambdaFunction.addEnvironment('EVENT_BUS_NAME', props.eventBus.eventBusName);
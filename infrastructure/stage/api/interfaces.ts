@@ -15,6 +15,10 @@ export interface LambdaApiProps {
   table: ITableV2;
   tableIndexNames: string[];
 
+  /* Concurrency slot usage */
+  concurrencySlotTable: ITableV2;
+  maxConcurrentTasksSsmParameter: IStringParameter;
+
   /* Step Functions */
   stepFunctions: SfnObject[];
 
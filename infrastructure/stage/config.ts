@@ -2,6 +2,8 @@ import { StageName } from '@orcabus/platform-cdk-constructs/shared-config/accoun
 import { StatefulApplicationStackConfig, StatelessApplicationStackConfig } from './interfaces';
 import {
   API_NAME,
+  CONCURRENCY_SLOT_TABLE_NAME,
+  DEFAULT_MAX_CONCURRENT_DECOMPRESSION_TASKS,
   EVENT_BUS_NAME,
   FASTQ_DECOMPRESSION_SUBDOMAIN_NAME,
   ICAV2_PROJECT_TO_STORAGE_CONFIGURATIONS_SSM_PARAMETER_PATH_PREFIX,
@@ -19,6 +21,7 @@ export const getStatefulStackProps = (stage: StageName): StatefulApplicationStac
     decompressionJobsTableName: JOB_API_TABLE_NAME,
     decompressionJobsTableIndexes: JOB_API_TABLE_INDEXES,
     taskTokenTableName: TASK_TOKEN_TABLE_NAME,
+    concurrencySlotTableName: CONCURRENCY_SLOT_TABLE_NAME,
     s3BucketName: S3_BUCKET_NAME[stage],
   };
 };
@@ -32,6 +35,10 @@ export const getStatelessStackProps = (stage: StageName): StatelessApplicationSt
     decompressionJobsTableName: JOB_API_TABLE_NAME,
     decompressionJobsTableIndexes: JOB_API_TABLE_INDEXES,
     taskTokenTableName: TASK_TOKEN_TABLE_NAME,
+    concurrencySlotTableName: CONCURRENCY_SLOT_TABLE_NAME,
+
+    // Concurrency Stuff
+    maxConcurrentDecompressionTasks: DEFAULT_MAX_CONCURRENT_DECOMPRESSION_TASKS,
 
     // Event Stuff
     eventBusName: EVENT_BUS_NAME,
@@ -29,7 +29,8 @@ export const TABLE_REMOVAL_POLICY = RemovalPolicy.RETAIN_ON_UPDATE_OR_DELETE; //
 export const TASK_TOKEN_TABLE_NAME = 'FastqDecompressionTaskTokenTable';
 export const TASK_TOKEN_JOB_SORT_KEY = 'job_id';
 export const JOB_API_TABLE_NAME = 'FastqDecompressionJobsTable';
-export const JOB_API_TABLE_INDEXES = ['status'];
+export const JOB_API_TABLE_INDEXES = ['status', 'cache_key'];
+export const CONCURRENCY_SLOT_TABLE_NAME = 'FastqDecompressionConcurrencySlotTable';
 
 // S3 constants
 export const S3_BUCKET_NAME: Record<StageName, string> = {
@@ -43,6 +44,18 @@ export const S3_DEFAULT_METADATA_PREFIX = `metadata/`;
 /* SSM Parameter Paths */
 export const SSM_PARAMETER_PATH_PREFIX = path.join(`/orcabus/services/${STACK_PREFIX}/`);
 
+// Concurrency slot constants
+// The number of decompression ECS tasks that may run at once, across every job
+// The value of the ssm parameter can be changed without a redeploy (it is re-read within a minute)
+export const MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME = path.join(
+  SSM_PARAMETER_PATH_PREFIX,
+  'max-concurrent-tasks'
+);
+export const DEFAULT_MAX_CONCURRENT_DECOMPRESSION_TASKS = 100;
+// The decompression worker pool scales from zero up to this many workers, each running one decompression at a time
+// Also the number of concurrency slots of the worker pool
+export const DECOMPRESSION_WORKER_MAX_COUNT = 8;
+
 // Event rule constants
 export const HEART_BEAT_SCHEDULER_RULE_NAME = 'heartbeatDecompressionJobsScheduler';
 export const DEFAULT_HEART_BEAT_INTERVAL = Duration.seconds(300); // 5 minutes in seconds
@@ -75,12 +88,5 @@ export const EVENT_DETAIL_TYPE_MAP: Record<string, string> = {
   READ_COUNT_CALCULATION_ASYNC: 'ReadCountCalculationRequest',
 };
 
-/* Miscellaneous constants */
-// Streaming errors from aws s3 cp only occur when the file is larger than 50 GB
-// Which we shouldn't get anywhere near that size for fastq files under 100 million reads
-// Which we estimate should be around 7 GB gzip compressed
-// https://docs.aws.amazon.com/cli/latest/reference/s3/cp.html#options
-export const MIN_READS_TO_REQUIRE_GZIP_STATS = 100_000_000; // 100 million reads
-
 /* External constants */
 export const FASTQ_SYNC_EVENT_DETAIL_TYPE_EXTERNAL = 'FastqSync';
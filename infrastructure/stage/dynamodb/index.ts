@@ -2,7 +2,12 @@ import { GlobalSecondaryIndexPropsV2 } from 'aws-cdk-lib/aws-dynamodb/lib/table-
 import { AttributeType } from 'aws-cdk-lib/aws-dynamodb';
 import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
 import { TABLE_REMOVAL_POLICY } from '../constants';
-import { BuildDecompressionDbProps, BuildDynamoDbProps, BuildTaskTokenDbProps } from './interfaces';
+import {
+  BuildConcurrencySlotDbProps,
+  BuildDecompressionDbProps,
+  BuildDynamoDbProps,
+  BuildTaskTokenDbProps,
+} from './interfaces';
 import { Construct } from 'constructs';
 
 function buildDecompressionDb(scope: Construct, props: BuildDecompressionDbProps) {
@@ -59,6 +64,24 @@ function buildTaskTokenDb(scope: Construct, props: BuildTaskTokenDbProps) {
   });
 }
 
+function buildConcurrencySlotDb(scope: Construct, props: BuildConcurrencySlotDbProps) {
+  /*
+    One item per held concurrency slot, the ttl of each item is the expiry of its lease
+    */
+  new dynamodb.TableV2(scope, props.tableName, {
+    partitionKey: {
+      name: 'id',
+      type: AttributeType.STRING,
+    },
+    tableName: props.tableName,
+    removalPolicy: TABLE_REMOVAL_POLICY,
+    pointInTimeRecoverySpecification: {
+      pointInTimeRecoveryEnabled: true,
+    },
+    timeToLiveAttribute: 'ttl',
+  });
+}
+
 export function buildDynamoDbTables(scope: Construct, props: BuildDynamoDbProps) {
   buildDecompressionDb(scope, {
     tableName: props.decompressionDbTableName,
@@ -67,4 +90,7 @@ export function buildDynamoDbTables(scope: Construct, props: BuildDynamoDbProps)
   buildTaskTokenDb(scope, {
     tableName: props.taskTokenTbTableName,
   });
+  buildConcurrencySlotDb(scope, {
+    tableName: props.concurrencySlotTableName,
+  });
 }
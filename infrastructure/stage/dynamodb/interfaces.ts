@@ -1,7 +1,8 @@
 /**
- * Two DynamoDB tables are used to store the data:
+ * Three DynamoDB tables are used to store the data:
  * The first one links with the FastAPI interface to store the job data
  * The second one is used to map task tokens to job IDs
+ * The third one holds the leases on the concurrency slots of the decompression tasks
  */
 
 export interface BuildDecompressionDbProps {
@@ -17,6 +18,11 @@ export interface BuildTaskTokenDbProps {
   tableName: string;
 }
 
+export interface BuildConcurrencySlotDbProps {
+  /* The name of the table */
+  tableName: string;
+}
+
 export interface BuildDynamoDbProps {
   // Decompression API table properties
   decompressionDbTableName: string;
@@ -25,4 +31,7 @@ export interface BuildDynamoDbProps {
 
   // Task token table properties
   taskTokenTbTableName: string;
+
+  // Concurrency slot table properties
+  concurrencySlotTableName: string;
 }
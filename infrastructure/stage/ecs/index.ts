@@ -9,12 +9,29 @@ import {
   FargateEcsTaskConstructProps,
 } from '@orcabus/platform-cdk-constructs/ecs';
 import * as path from 'path';
-import { ECS_DIR, S3_DEFAULT_DECOMPRESSION_PREFIX, S3_DEFAULT_METADATA_PREFIX } from '../constants';
-import { BuildDecompressionFargateEcsProps } from './interfaces';
+import {
+  DECOMPRESSION_WORKER_MAX_COUNT,
+  ECS_DIR,
+  S3_DEFAULT_DECOMPRESSION_PREFIX,
+  S3_DEFAULT_METADATA_PREFIX,
+} from '../constants';
+import { BuildDecompressionFargateEcsProps, DecompressionWorkerPoolObject } from './interfaces';
 import { NagSuppressions } from 'cdk-nag';
 import { ICAV2_BASE_URL } from '@orcabus/platform-cdk-constructs/shared-config/icav2';
 import * as iam from 'aws-cdk-lib/aws-iam';
 import * as cdk from 'aws-cdk-lib';
+import * as ecs from 'aws-cdk-lib/aws-ecs';
+import * as sqs from 'aws-cdk-lib/aws-sqs';
+import * as cloudwatch from 'aws-cdk-lib/aws-cloudwatch';
+import * as appscaling from 'aws-cdk-lib/aws-applicationautoscaling';
+
+// The number of cpus of the decompression task, also the thread budget the entrypoint splits between the pipeline stages
+const DECOMPRESSION_TASK_N_CPUS = 8;
+
+// Each worker heartbeats every minute, extending the visibility of its message by three minutes
+const DECOMPRESSION_WORK_QUEUE_VISIBILITY_TIMEOUT = cdk.Duration.minutes(3);
+// A message received this many times without completing (i.e. the worker kept dying) is moved to the dead letter queue
+const DECOMPRESSION_WORK_QUEUE_MAX_RECEIVE_COUNT = 3;
 
 function buildEcsFargateTask(scope: Construct, id: string, props: FargateEcsTaskConstructProps) {
   /*
@@ -38,12 +55,25 @@ export function buildDecompressionFargateTask(
   const ecsTask = buildEcsFargateTask(scope, 'DecompressionFargateTask', {
     containerName: 'ora-decompression-task',
     dockerPath: path.join(ECS_DIR, 'ora_decompression'),
-    nCpus: 8, // 8 CPUs
+    nCpus: DECOMPRESSION_TASK_N_CPUS, // 8 CPUs
     memoryLimitGiB: 16, // 16 GB of memory (minimum for 8 CPUs)
     architecture: 'ARM64',
     runtimePlatform: CPU_ARCHITECTURE_MAP['ARM64'],
   });
 
+  addDecompressionContainerRequirements(ecsTask, props);
+
+  return ecsTask;
+}
+
+function addDecompressionContainerRequirements(
+  ecsTask: EcsFargateTaskConstruct,
+  props: BuildDecompressionFargateEcsProps
+) {
+  /*
+    Grant the decompression container (as a task or as a worker) access to
+    the ssm parameters, secrets and S3 prefixes it needs, and add its constant environment variables
+    */
   // Also need the hostname ssm parameter name and the orcabus access token secret objects
   props.hostnameSsmParameterObj.grantRead(ecsTask.taskDefinition.taskRole);
   ecsTask.containerDefinition.addEnvironment(
@@ -103,6 +133,9 @@ export function buildDecompressionFargateTask(
     `${S3_DEFAULT_METADATA_PREFIX}*`
   );
 
+  // Let the entrypoint know how many threads it has to split between the stages of the pipeline
+  ecsTask.containerDefinition.addEnvironment('THREAD_BUDGET', DECOMPRESSION_TASK_N_CPUS.toString());
+
   // Add the S3 bucket name to the task environment variables
   // Add constant environment variables to the task
   ecsTask.containerDefinition.addEnvironment(
@@ -115,6 +148,15 @@ export function buildDecompressionFargateTask(
   );
   ecsTask.containerDefinition.addEnvironment('S3_METADATA_PREFIX', S3_DEFAULT_METADATA_PREFIX);
 
+  // Each decompression renews the lease on the concurrency slot it was launched with
+  // (see scripts/renew_concurrency_slot.py)
+  // The slot id and lease id are added to the environment (or the work queue message) by the step function
+  ecsTask.containerDefinition.addEnvironment(
+    'CONCURRENCY_SLOT_TABLE_NAME',
+    props.concurrencySlotTable.tableName
+  );
+  props.concurrencySlotTable.grantReadWriteData(ecsTask.taskDefinition.taskRole);
+
   // Add suppressions for the task role
   // Since the task role needs to access the S3 bucket prefix
   NagSuppressions.addResourceSuppressions(
@@ -138,6 +180,131 @@ export function buildDecompressionFargateTask(
     ],
     true
   );
+}
 
-  return ecsTask;
+export function buildDecompressionWorkerPool(
+  scope: Construct,
+  props: BuildDecompressionFargateEcsProps
+): DecompressionWorkerPoolObject {
+  /*
+    Build the Decompression worker pool.
+
+    The workers run the same container as the decompression task, with WORKER_MODE set,
+    pulling each decompression from the work queue (sent by the run decompression job step function
+    with a task token) rather than starting an ECS task per decompression.
+    The service scales from zero on the number of messages in the work queue (waiting and in progress).
+    */
+
+  // Messages the workers could not complete are moved to the dead letter queue
+  const deadLetterQueue = new sqs.Queue(scope, 'DecompressionWorkDeadLetterQueue', {
+    retentionPeriod: cdk.Duration.days(14),
+    enforceSSL: true,
+  });
+  const workQueue = new sqs.Queue(scope, 'DecompressionWorkQueue', {
+    visibilityTimeout: DECOMPRESSION_WORK_QUEUE_VISIBILITY_TIMEOUT,
+    enforceSSL: true,
+    deadLetterQueue: {
+      queue: deadLetterQueue,
+      maxReceiveCount: DECOMPRESSION_WORK_QUEUE_MAX_RECEIVE_COUNT,
+    },
+  });
+
+  const workerTask = buildEcsFargateTask(scope, 'DecompressionWorkerFargateTask', {
+    containerName: 'ora-decompression-worker',
+    dockerPath: path.join(ECS_DIR, 'ora_decompression'),
+    nCpus: DECOMPRESSION_TASK_N_CPUS, // 8 CPUs
+    memoryLimitGiB: 16, // 16 GB of memory (minimum for 8 CPUs)
+    architecture: 'ARM64',
+    runtimePlatform: CPU_ARCHITECTURE_MAP['ARM64'],
+  });
+
+  addDecompressionContainerRequirements(workerTask, props);
+
+  // Run the container as a worker, pulling from the work queue
+  workerTask.containerDefinition.addEnvironment('WORKER_MODE', 'true');
+  workerTask.containerDefinition.addEnvironment('WORK_QUEUE_URL', workQueue.queueUrl);
+  workQueue.grantConsumeMessages(workerTask.taskDefinition.taskRole);
+
+  // The worker sends the task result (and heartbeats) of each decompression to the waiting step function
+  // And protects itself from scale in while a decompression runs
+  workerTask.taskDefinition.taskRole.addToPrincipalPolicy(
+    new iam.PolicyStatement({
+      resources: [`arn:aws:states:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:stateMachine:*`],
+      actions: ['states:SendTaskSuccess', 'states:SendTaskFailure', 'states:SendTaskHeartbeat'],
+    })
+  );
+  workerTask.taskDefinition.taskRole.addToPrincipalPolicy(
+    new iam.PolicyStatement({
+      resources: [
+        `arn:aws:ecs:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:task/${workerTask.cluster.clusterName}/*`,
+      ],
+      actions: ['ecs:GetTaskProtection', 'ecs:UpdateTaskProtection'],
+    })
+  );
+
+  // Start with no workers, the service scales up as soon as there is work on the queue
+  const workerService = new ecs.FargateService(scope, 'DecompressionWorkerService', {
+    cluster: workerTask.cluster,
+    taskDefinition: workerTask.taskDefinition,
+    desiredCount: 0,
+    minHealthyPercent: 0,
+    securityGroups: [workerTask.securityGroup],
+    vpcSubnets: { subnets: workerTask.cluster.vpc.privateSubnets },
+  });
+
+  // Scale on the messages waiting on a worker and the messages being worked on,
+  // so a busy worker is not scaled in while its decompression runs
+  const workQueueDepthMetric = new cloudwatch.MathExpression({
+    expression: 'waiting + inProgress',
+    usingMetrics: {
+      waiting: workQueue.metricApproximateNumberOfMessagesVisible({
+        period: cdk.Duration.minutes(1),
+      }),
+      inProgress: workQueue.metricApproximateNumberOfMessagesNotVisible({
+        period: cdk.Duration.minutes(1),
+      }),
+    },
+    period: cdk.Duration.minutes(1),
+  });
+  workerService
+    .autoScaleTaskCount({
+      minCapacity: 0,
+      maxCapacity: DECOMPRESSION_WORKER_MAX_COUNT,
+    })
+    .scaleOnMetric('ScaleOnWorkQueueDepth', {
+      metric: workQueueDepthMetric,
+      adjustmentType: appscaling.AdjustmentType.EXACT_CAPACITY,
+      scalingSteps: [
+        { upper: 0, change: 0 },
+        { lower: 1, upper: 2, change: 1 },
+        { lower: 2, upper: 4, change: 2 },
+        { lower: 4, upper: 8, change: 4 },
+        { lower: 8, change: DECOMPRESSION_WORKER_MAX_COUNT },
+      ],
+      cooldown: cdk.Duration.minutes(1),
+    });
+
+  NagSuppressions.addResourceSuppressions(
+    workerTask.taskDefinition,
+    [
+      {
+        id: 'AwsSolutions-IAM5',
+        reason:
+          'The worker needs to send task results to the run decompression job step function, and protect its own task from scale in.',
+      },
+    ],
+    true
+  );
+  NagSuppressions.addResourceSuppressions(deadLetterQueue, [
+    {
+      id: 'AwsSolutions-SQS3',
+      reason: 'This is the dead letter queue of the decompression work queue.',
+    },
+  ]);
+
+  return {
+    workQueue: workQueue,
+    workerTask: workerTask,
+    workerService: workerService,
+  };
 }
@@ -5,6 +5,10 @@ Interfaces
 import { ISecret } from 'aws-cdk-lib/aws-secretsmanager';
 import { IStringParameter } from 'aws-cdk-lib/aws-ssm';
 import { IBucket } from 'aws-cdk-lib/aws-s3';
+import { IQueue } from 'aws-cdk-lib/aws-sqs';
+import { FargateService } from 'aws-cdk-lib/aws-ecs';
+import { EcsFargateTaskConstruct } from '@orcabus/platform-cdk-constructs/ecs';
+import { ITableV2 } from 'aws-cdk-lib/aws-dynamodb';
 
 export interface BuildDecompressionFargateEcsProps {
   icav2AccessTokenSecretObj: ISecret;
@@ -15,4 +19,12 @@ export interface BuildDecompressionFargateEcsProps {
   storageConfigurationSsmParameterPathPrefix: string;
   projectToStorageConfigurationsSsmParameterPathPrefix: string;
   storageCredentialsSsmParameterPathPrefix: string;
+  // The table of the concurrency slot leases, renewed by the decompression while it runs
+  concurrencySlotTable: ITableV2;
+}
+
+export interface DecompressionWorkerPoolObject {
+  workQueue: IQueue;
+  workerTask: EcsFargateTaskConstruct;
+  workerService: FargateService;
 }
@@ -3,6 +3,7 @@ Get the event rules
 newJobRequestEventRule
 heartbeatDecompressionJobsScheduler
 decompressionStateChangeEventRule
+runDecompressionJobExecutionStatusChangeEventRule
 */
 
 import { EventPattern } from 'aws-cdk-lib/aws-events';
@@ -11,6 +12,7 @@ import {
   DEFAULT_HEART_BEAT_INTERVAL,
   EVENT_DETAIL_TYPE_MAP,
   STACK_EVENT_SOURCE,
+  STACK_PREFIX,
 } from '../constants';
 import { Construct } from 'constructs';
 import {
@@ -113,6 +115,19 @@ function buildDecompressionJobStateChangeEventPattern(): EventPattern {
   };
 }
 
+/* Execution status change events of the run decompression job state machine (on the default event bus) */
+function buildRunDecompressionJobExecutionStatusChangeEventPattern(): EventPattern {
+  return {
+    source: ['aws.states'],
+    detailType: ['Step Functions Execution Status Change'],
+    detail: {
+      // Executions that succeed update their own job status
+      status: ['FAILED', 'TIMED_OUT', 'ABORTED'],
+      stateMachineArn: [{ suffix: `:stateMachine:${STACK_PREFIX}-runDecompressionJob` }],
+    },
+  };
+}
+
 export function buildEventBridgeRules(
   scope: Construct,
   props: EventBridgeRulesProps
@@ -229,6 +244,18 @@ export function buildEventBridgeRules(
             eventPattern: buildDecompressionJobStateChangeEventPattern(),
           }),
         });
+        break;
+      }
+      // Execution status change events (published by step functions to the default event bus)
+      case 'runDecompressionJobExecutionStatusChangeEventRule': {
+        eventBridgeObjects.push({
+          ruleName: eventBridgeName,
+          ruleObject: new events.Rule(scope, eventBridgeName, {
+            ruleName: eventBridgeName,
+            eventPattern: buildRunDecompressionJobExecutionStatusChangeEventPattern(),
+          }),
+        });
+        break;
       }
     }
   }
@@ -18,7 +18,9 @@ export type EventRuleName =
   // Internal Heartbeat
   | typeof HEART_BEAT_SCHEDULER_RULE_NAME
   // Decompression state change event rule (for sync monitor)
-  | 'decompressionStateChangeEventRule';
+  | 'decompressionStateChangeEventRule'
+  // Run decompression job execution status change event rule (for failed, timed out or aborted jobs)
+  | 'runDecompressionJobExecutionStatusChangeEventRule';
 
 export const eventRuleNamesList: EventRuleName[] = [
   'newDecompressionJobRequestEventRule',
@@ -31,6 +33,7 @@ export const eventRuleNamesList: EventRuleName[] = [
   'newReadCountCalculationJobRequestSyncEventRule',
   HEART_BEAT_SCHEDULER_RULE_NAME, // Constant so that the step functions can use the placeholder
   'decompressionStateChangeEventRule',
+  'runDecompressionJobExecutionStatusChangeEventRule',
 ];
 
 export interface EventBridgeRuleProps {
@@ -6,6 +6,7 @@ Generates the events targets, linking the events to (in most cases) AWS step fun
 import * as eventsTargets from 'aws-cdk-lib/aws-events-targets';
 import * as events from 'aws-cdk-lib/aws-events';
 import {
+  AddLambdaAsEventBridgeTargetProps,
   AddSfnAsEventBridgeTargetProps,
   EventBridgeTargetsProps,
   eventTargetsNameList,
@@ -32,6 +33,11 @@ function buildSfnEventBridgeTarget(props: AddSfnAsEventBridgeTargetProps): void
   }
 }
 
+function buildLambdaEventBridgeTarget(props: AddLambdaAsEventBridgeTargetProps): void {
+  // The lambda receives the full event
+  props.eventBridgeRuleObj.addTarget(new eventsTargets.LambdaFunction(props.lambdaFunction));
+}
+
 export function buildAllEventBridgeTargets(props: EventBridgeTargetsProps): void {
   /* Iterate over each event bridge rule and add the target */
   for (const eventTargetsName of eventTargetsNameList) {
@@ -164,6 +170,18 @@ export function buildAllEventBridgeTargets(props: EventBridgeTargetsProps): void
         });
         break;
       }
+      case 'runDecompressionJobExecutionStatusChangeToHandleExecutionStatusChange': {
+        buildLambdaEventBridgeTarget(<AddLambdaAsEventBridgeTargetProps>{
+          eventBridgeRuleObj: props.eventBridgeRuleObjects.find(
+            (eventBridgeObject) =>
+              eventBridgeObject.ruleName === 'runDecompressionJobExecutionStatusChangeEventRule'
+          )?.ruleObject,
+          lambdaFunction: props.lambdaObjects.find(
+            (lambdaObject) => lambdaObject.lambdaName === 'handleExecutionStatusChange'
+          )?.lambdaFunction.currentVersion,
+        });
+        break;
+      }
     }
   }
 }
@@ -2,6 +2,8 @@ import { StateMachine } from 'aws-cdk-lib/aws-stepfunctions';
 import { Rule } from 'aws-cdk-lib/aws-events';
 import { EventBridgeRuleObject } from '../event-rules/interfaces';
 import { SfnObject } from '../step-functions/interfaces';
+import { LambdaResponse } from '../lambdas/interfaces';
+import { IFunction } from 'aws-cdk-lib/aws-lambda';
 
 export type EventTargetsName =
   | 'newDecompressionJobRequestEventRuleToHandleJobRequest'
@@ -13,7 +15,8 @@ export type EventTargetsName =
   | 'newReadCountCalculationJobRequestEventRuleToHandleJobRequest'
   | 'newReadCountCalculationJobRequestSyncEventRuleToHandleJobRequest'
   | 'heartBeatMonitorSchedulerToMonitorDecompressionJobs'
-  | 'decompressionStateChangeToTaskTokenUnlock';
+  | 'decompressionStateChangeToTaskTokenUnlock'
+  | 'runDecompressionJobExecutionStatusChangeToHandleExecutionStatusChange';
 
 export const eventTargetsNameList: EventTargetsName[] = [
   'newDecompressionJobRequestEventRuleToHandleJobRequest',
@@ -26,13 +29,16 @@ export const eventTargetsNameList: EventTargetsName[] = [
   'newReadCountCalculationJobRequestSyncEventRuleToHandleJobRequest',
   'heartBeatMonitorSchedulerToMonitorDecompressionJobs',
   'decompressionStateChangeToTaskTokenUnlock',
+  'runDecompressionJobExecutionStatusChangeToHandleExecutionStatusChange',
 ];
 
 export type JobType =
   | 'ORA_DECOMPRESSION'
   | 'GZIP_FILESIZE_CALCULATION'
   | 'RAW_MD5SUM_CALCULATION'
-  | 'READ_COUNT_CALCULATION';
+  | 'READ_COUNT_CALCULATION'
+  | 'MULTI_STATS_CALCULATION'
+  | 'FASTQ_STATS';
 
 export interface AddSfnAsEventBridgeTargetProps {
   stateMachineObj: StateMachine;
@@ -40,7 +46,13 @@ export interface AddSfnAsEventBridgeTargetProps {
   jobType?: JobType;
 }
 
+export interface AddLambdaAsEventBridgeTargetProps {
+  lambdaFunction: IFunction;
+  eventBridgeRuleObj: Rule;
+}
+
 export interface EventBridgeTargetsProps {
   eventBridgeRuleObjects: EventBridgeRuleObject[];
   stepFunctionObjects: SfnObject[];
+  lambdaObjects: LambdaResponse[];
 }
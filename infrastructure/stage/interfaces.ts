@@ -13,6 +13,7 @@ export interface StatefulApplicationStackConfig {
   decompressionJobsTableName: string;
   decompressionJobsTableIndexes: string[];
   taskTokenTableName: string;
+  concurrencySlotTableName: string;
 
   // S3 stuff
   s3BucketName: string;
@@ -23,6 +24,10 @@ export interface StatelessApplicationStackConfig {
   decompressionJobsTableName: string;
   decompressionJobsTableIndexes: string[];
   taskTokenTableName: string;
+  concurrencySlotTableName: string;
+
+  // Concurrency stuff
+  maxConcurrentDecompressionTasks: number;
 
   // Event stuff
   eventBusName: string;
@@ -1,15 +1,23 @@
 /**
  * Use the PythonUvFunction script to build the lambda functions
  */
-import { lambdaNameList, LambdaProps, lambdaRequirementsMap, LambdaResponse } from './interfaces';
+import {
+  BuildLambdasProps,
+  lambdaNameList,
+  LambdaProps,
+  lambdaRequirementsMap,
+  LambdaResponse,
+} from './interfaces';
 import { PythonUvFunction } from '@orcabus/platform-cdk-constructs/lambda';
 import { Construct } from 'constructs';
 import { camelCaseToSnakeCase } from '../utils';
 import * as path from 'path';
 import { Duration } from 'aws-cdk-lib';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
-import { LAMBDA_DIR } from '../constants';
+import { DECOMPRESSION_WORKER_MAX_COUNT, LAMBDA_DIR } from '../constants';
 import { NagSuppressions } from 'cdk-nag';
+import * as iam from 'aws-cdk-lib/aws-iam';
+import * as cdk from 'aws-cdk-lib';
 
 function buildLambdaFunction(scope: Construct, props: LambdaProps): LambdaResponse {
   const lambdaNameToSnakeCase = camelCaseToSnakeCase(props.lambdaName);
@@ -24,22 +32,129 @@ function buildLambdaFunction(scope: Construct, props: LambdaProps): LambdaRespon
     includeOrcabusApiToolsLayer: lambdaRequirements.needsOrcabusApiTools,
   });
 
+  // Add the concurrency slot table as an environment variable
+  // And allow the lambda to lease and release slots
+  if (lambdaRequirements.needsConcurrencySlotTable) {
+    lambdaObject.addEnvironment(
+      'CONCURRENCY_SLOT_TABLE_NAME',
+      props.concurrencySlotTable.tableName
+    );
+    props.concurrencySlotTable.grantReadWriteData(lambdaObject.currentVersion);
+  }
+
+  // Add the max concurrent tasks parameter as an environment variable
+  // And allow the lambda to read it
+  if (lambdaRequirements.needsMaxConcurrentTasksSsmParameter) {
+    lambdaObject.addEnvironment(
+      'MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME',
+      props.maxConcurrentTasksSsmParameter.parameterName
+    );
+    props.maxConcurrentTasksSsmParameter.grantRead(lambdaObject.currentVersion);
+  }
+
+  // Add the number of concurrency slots of the worker pool (one per worker) as an environment variable
+  if (lambdaRequirements.needsMaxConcurrentWorkerJobs) {
+    lambdaObject.addEnvironment(
+      'MAX_CONCURRENT_WORKER_JOBS',
+      DECOMPRESSION_WORKER_MAX_COUNT.toString()
+    );
+  }
+
+  // Add the task token table as an environment variable
+  // And allow the lambda to read the task tokens, and remove expired task tokens
+  if (lambdaRequirements.needsTaskTokenTable) {
+    lambdaObject.addEnvironment('TASK_TOKEN_TABLE_NAME', props.taskTokenTable.tableName);
+    props.taskTokenTable.grantReadWriteData(lambdaObject.currentVersion);
+  }
+
+  // Add the jobs table as an environment variable
+  // And allow the lambda to read the status of each job
+  if (lambdaRequirements.needsJobTable) {
+    lambdaObject.addEnvironment('JOB_TABLE_NAME', props.jobTable.tableName);
+    props.jobTable.grantReadData(lambdaObject.currentVersion);
+  }
+
+  // Allow the lambda to send heartbeats to the task tokens of any state machine
+  if (lambdaRequirements.needsSendTaskTokenPermissions) {
+    lambdaObject.currentVersion.addToRolePolicy(
+      new iam.PolicyStatement({
+        resources: [`arn:aws:states:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:stateMachine:*`],
+        actions: ['states:SendTaskHeartbeat'],
+      })
+    );
+
+    // Will need cdk nag suppressions for this
+    // Because we are using a wildcard for an IAM Resource policy
+    NagSuppressions.addResourceSuppressions(
+      lambdaObject,
+      [
+        {
+          id: 'AwsSolutions-IAM5',
+          reason: 'Need ability to send task heartbeats to any state machine',
+        },
+      ],
+      true
+    );
+  }
+
+  // Allow the lambda to send the granted concurrency slots to the task tokens of any state machine
+  if (lambdaRequirements.needsSendTaskSuccessPermissions) {
+    lambdaObject.currentVersion.addToRolePolicy(
+      new iam.PolicyStatement({
+        resources: [`arn:aws:states:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:stateMachine:*`],
+        actions: ['states:SendTaskSuccess'],
+      })
+    );
+
+    // Will need cdk nag suppressions for this
+    // Because we are using a wildcard for an IAM Resource policy
+    NagSuppressions.addResourceSuppressions(
+      lambdaObject,
+      [
+        {
+          id: 'AwsSolutions-IAM5',
+          reason: 'Need ability to send task success to any state machine',
+        },
+      ],
+      true
+    );
+  }
+
   return {
     lambdaName: props.lambdaName,
     lambdaFunction: lambdaObject,
   };
 }
 
-export function buildLambdaFunctions(scope: Construct): LambdaResponse[] {
+export function buildLambdaFunctions(scope: Construct, props: BuildLambdasProps): LambdaResponse[] {
   const lambdaList: LambdaResponse[] = [];
   for (const lambdaName of lambdaNameList) {
     lambdaList.push(
       buildLambdaFunction(scope, {
         lambdaName: lambdaName,
+        ...props,
       })
     );
   }
 
+  // Add the acquire concurrency slot lambda as an environment variable
+  // And allow the lambda to invoke it (to give out a released slot)
+  const acquireConcurrencySlotLambda = lambdaList.find(
+    (lambdaResponse) => lambdaResponse.lambdaName === 'acquireConcurrencySlot'
+  )!.lambdaFunction;
+  for (const lambdaResponse of lambdaList) {
+    if (!lambdaRequirementsMap[lambdaResponse.lambdaName].needsAcquireConcurrencySlotLambda) {
+      continue;
+    }
+    lambdaResponse.lambdaFunction.addEnvironment(
+      'ACQUIRE_CONCURRENCY_SLOT_LAMBDA_FUNCTION_NAME',
+      acquireConcurrencySlotLambda.currentVersion.functionArn
+    );
+    acquireConcurrencySlotLambda.currentVersion.grantInvoke(
+      lambdaResponse.lambdaFunction.currentVersion
+    );
+  }
+
   // Add cdk nag stack suppressions
   NagSuppressions.addResourceSuppressions(
     lambdaList.map((lambdaResponse) => lambdaResponse.lambdaFunction),
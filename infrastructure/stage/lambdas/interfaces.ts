@@ -2,46 +2,88 @@
  * Lambda interfaces
  */
 import { PythonFunction } from '@aws-cdk/aws-lambda-python-alpha';
+import { ITableV2 } from 'aws-cdk-lib/aws-dynamodb';
+import { IStringParameter } from 'aws-cdk-lib/aws-ssm';
 
 export type LambdaNameList =
   // Event Handler
   | 'launchDecompressionJob'
-  // List running jobs
-  | 'listRunningJobs'
+  // Heartbeat monitor
+  | 'sendTaskTokenHeartbeats'
+  // Execution status change events
+  | 'handleExecutionStatusChange'
   // Run Decompression Job lambdas
   | 'updateFastqDecompressionServiceStatus'
-  | 'getFastqObject';
+  | 'getFastqObject'
+  | 'acquireConcurrencySlot'
+  | 'releaseConcurrencySlot';
 
 export const lambdaNameList: LambdaNameList[] = [
   // Event Handler
   'launchDecompressionJob',
-  // List running jobs
-  'listRunningJobs',
+  // Heartbeat monitor
+  'sendTaskTokenHeartbeats',
+  // Execution status change events
+  'handleExecutionStatusChange',
   // Run Decompression Job lambdas
   'updateFastqDecompressionServiceStatus',
   'getFastqObject',
+  'acquireConcurrencySlot',
+  'releaseConcurrencySlot',
 ];
 
 export interface LambdaRequirementsProps {
   needsOrcabusApiTools?: boolean;
+  needsConcurrencySlotTable?: boolean;
+  needsMaxConcurrentTasksSsmParameter?: boolean;
+  needsMaxConcurrentWorkerJobs?: boolean;
+  needsTaskTokenTable?: boolean;
+  needsJobTable?: boolean;
+  needsSendTaskTokenPermissions?: boolean;
+  needsSendTaskSuccessPermissions?: boolean;
+  needsAcquireConcurrencySlotLambda?: boolean;
 }
 
 export const lambdaRequirementsMap: Record<LambdaNameList, LambdaRequirementsProps> = {
+  acquireConcurrencySlot: {
+    needsConcurrencySlotTable: true,
+    needsMaxConcurrentTasksSsmParameter: true,
+    needsMaxConcurrentWorkerJobs: true,
+    needsSendTaskSuccessPermissions: true,
+  },
   getFastqObject: {
     needsOrcabusApiTools: true,
   },
   launchDecompressionJob: {
     needsOrcabusApiTools: true,
   },
-  listRunningJobs: {
+  handleExecutionStatusChange: {
     needsOrcabusApiTools: true,
   },
+  releaseConcurrencySlot: {
+    needsConcurrencySlotTable: true,
+    needsAcquireConcurrencySlotLambda: true,
+  },
+  sendTaskTokenHeartbeats: {
+    needsTaskTokenTable: true,
+    needsJobTable: true,
+    needsSendTaskTokenPermissions: true,
+  },
   updateFastqDecompressionServiceStatus: {
     needsOrcabusApiTools: true,
   },
 };
 
-export interface LambdaProps {
+export interface BuildLambdasProps {
+  /* The concurrency slot table, and the max concurrent tasks parameter */
+  concurrencySlotTable: ITableV2;
+  maxConcurrentTasksSsmParameter: IStringParameter;
+  /* The task token table, and the jobs table (for the heartbeats of the jobs still waited on) */
+  taskTokenTable: ITableV2;
+  jobTable: ITableV2;
+}
+
+export interface LambdaProps extends BuildLambdasProps {
   lambdaName: LambdaNameList;
 }
 
@@ -22,6 +22,7 @@ export class StatefulApplicationStack extends GitStack {
       decompressionDbTableName: props.decompressionJobsTableName,
       decompressionDbIndexNames: props.decompressionJobsTableIndexes,
       taskTokenTbTableName: props.taskTokenTableName,
+      concurrencySlotTableName: props.concurrencySlotTableName,
     });
 
     // Part 2 - Build S3 Bucket
@@ -8,7 +8,7 @@ import * as s3 from 'aws-cdk-lib/aws-s3';
 import * as events from 'aws-cdk-lib/aws-events';
 import * as secretsManager from 'aws-cdk-lib/aws-secretsmanager';
 import * as ssm from 'aws-cdk-lib/aws-ssm';
-import { buildDecompressionFargateTask } from './ecs';
+import { buildDecompressionFargateTask, buildDecompressionWorkerPool } from './ecs';
 import { buildAllStepFunctions } from './step-functions';
 import {
   addHttpRoutes,
@@ -22,6 +22,7 @@ import { ICAV2_ACCESS_TOKEN_SECRET_ID } from '@orcabus/platform-cdk-constructs/s
 import { HOSTED_ZONE_DOMAIN_PARAMETER_NAME } from '@orcabus/platform-cdk-constructs/api-gateway';
 import { DEFAULT_ORCABUS_TOKEN_SECRET_ID } from '@orcabus/platform-cdk-constructs/lambda/config';
 import { GitStack } from '@orcabus/platform-cdk-constructs/deployment-stack-pipeline';
+import { MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME } from './constants';
 
 type StatelessApplicationStackProps = StatelessApplicationStackConfig & cdk.StackProps;
 
@@ -45,6 +46,21 @@ export class StatelessApplicationStack extends GitStack {
       'taskTokenTable',
       props.taskTokenTableName
     );
+    const concurrencySlotTable = dynamodb.TableV2.fromTableName(
+      this,
+      'concurrencySlotTable',
+      props.concurrencySlotTableName
+    );
+
+    // The max concurrent decompression tasks, across every job
+    const maxConcurrentTasksSsmParameter = new ssm.StringParameter(
+      this,
+      'maxConcurrentTasksSsmParameter',
+      {
+        parameterName: MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME,
+        stringValue: props.maxConcurrentDecompressionTasks.toString(),
+      }
+    );
 
     // Get the S3 bucket
     const s3Bucket = s3.Bucket.fromBucketName(this, 's3Bucket', props.s3BucketName);
@@ -74,10 +90,15 @@ export class StatelessApplicationStack extends GitStack {
     );
 
     // Part 1 - Build Lambdas
-    const lambdaObjects = buildLambdaFunctions(this);
+    const lambdaObjects = buildLambdaFunctions(this, {
+      concurrencySlotTable: concurrencySlotTable,
+      maxConcurrentTasksSsmParameter: maxConcurrentTasksSsmParameter,
+      taskTokenTable: taskTokenTable,
+      jobTable: jobTableObject,
+    });
 
     // Part 2 - Build ECS Tasks / Fargate Clusters
-    const fargateDecompressionTaskObj = buildDecompressionFargateTask(this, {
+    const decompressionFargateEcsProps = {
       icav2AccessTokenSecretObj: icav2AccessTokenSecretObj,
       hostnameSsmParameterObj: hostedZoneNameSsmParameter,
       orcabusAccessTokenSecretObj: orcabusTokenSecretObj,
@@ -89,7 +110,19 @@ export class StatelessApplicationStack extends GitStack {
         props.ssmParameterPaths.projectToStorageConfigurationsSsmParameterPathPrefix,
       storageCredentialsSsmParameterPathPrefix:
         props.ssmParameterPaths.storageCredentialsSsmParameterPathPrefix,
-    });
+      // Concurrency slots
+      concurrencySlotTable: concurrencySlotTable,
+    };
+    const fargateDecompressionTaskObj = buildDecompressionFargateTask(
+      this,
+      decompressionFargateEcsProps
+    );
+
+    // The long-lived decompression workers, for jobs with the WORKER_POOL dispatch mode
+    const decompressionWorkerPoolObj = buildDecompressionWorkerPool(
+      this,
+      decompressionFargateEcsProps
+    );
 
     // Part 3 - Build Step Functions
     const sfnObjects = buildAllStepFunctions(this, {
@@ -97,6 +130,7 @@ export class StatelessApplicationStack extends GitStack {
       lambdaObjects: lambdaObjects,
       eventBus: eventBus,
       fargateDecompressionTask: fargateDecompressionTaskObj,
+      decompressionWorkQueue: decompressionWorkerPoolObj.workQueue,
       s3Bucket: s3Bucket,
     });
 
@@ -109,6 +143,8 @@ export class StatelessApplicationStack extends GitStack {
       /* Table props */
       table: jobTableObject,
       tableIndexNames: props.decompressionJobsTableIndexes,
+      concurrencySlotTable: concurrencySlotTable,
+      maxConcurrentTasksSsmParameter: maxConcurrentTasksSsmParameter,
 
       /* Step functions triggered by the API */
       stepFunctions: sfnObjects.filter((stepFunctionObject) =>
@@ -144,6 +180,7 @@ export class StatelessApplicationStack extends GitStack {
     buildAllEventBridgeTargets({
       eventBridgeRuleObjects: eventRuleObjects,
       stepFunctionObjects: sfnObjects,
+      lambdaObjects: lambdaObjects,
     });
   }
 }
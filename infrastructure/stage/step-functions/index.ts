@@ -24,7 +24,6 @@ import {
   STACK_PREFIX,
   FASTQ_SYNC_EVENT_DETAIL_TYPE_EXTERNAL,
   HEART_BEAT_SCHEDULER_RULE_NAME,
-  MIN_READS_TO_REQUIRE_GZIP_STATS,
   S3_DEFAULT_METADATA_PREFIX,
   STACK_EVENT_SOURCE,
   STEP_FUNCTIONS_DIR,
@@ -72,6 +71,10 @@ function createStateMachineDefinitionSubstitutions(props: SfnProps): {
       props.fargateDecompressionTask.containerDefinition.containerName;
   }
 
+  if (sfnRequirements.needsWorkerPoolPermissions) {
+    definitionSubstitutions['__work_queue_url__'] = props.decompressionWorkQueue.queueUrl;
+  }
+
   if (sfnRequirements.switchHeartBeatScheduler) {
     definitionSubstitutions['__heartbeat_scheduler_rule_name__'] = HEART_BEAT_SCHEDULER_RULE_NAME;
   }
@@ -82,12 +85,6 @@ function createStateMachineDefinitionSubstitutions(props: SfnProps): {
     definitionSubstitutions['__fastq_sync_detail_type__'] = FASTQ_SYNC_EVENT_DETAIL_TYPE_EXTERNAL;
   }
 
-  /* Special substitutions */
-  if (props.stateMachineName === 'runDecompressionJob') {
-    definitionSubstitutions['__min_reads_to_require_gzip_stats__'] =
-      MIN_READS_TO_REQUIRE_GZIP_STATS.toString();
-  }
-
   return definitionSubstitutions;
 }
 
@@ -167,6 +164,14 @@ function wireUpStateMachinePermissions(props: SfnObject): void {
     );
   }
 
+  if (sfnRequirements.needsWorkerPoolPermissions) {
+    /*
+    Grant permissions to send decompressions to the worker pool
+    The workers send the task results back to the state machine
+    */
+    props.decompressionWorkQueue.grantSendMessages(props.stateMachineObj);
+  }
+
   if (sfnRequirements.switchHeartBeatScheduler) {
     props.stateMachineObj.addToRolePolicy(
       new iam.PolicyStatement({
@@ -199,17 +204,6 @@ function wireUpStateMachinePermissions(props: SfnObject): void {
     );
   }
 
-  if (sfnRequirements.needsSfnMonitoringPermissions) {
-    props.stateMachineObj.addToRolePolicy(
-      new iam.PolicyStatement({
-        actions: ['states:DescribeExecution'],
-        resources: [
-          `arn:aws:states:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:execution:fastq-deora-*`,
-        ],
-      })
-    );
-  }
-
   /* Allow the state machine to invoke the lambda function */
   for (const lambdaObject of lambdaFunctions) {
     lambdaObject.lambdaFunction.currentVersion.grantInvoke(props.stateMachineObj);
@@ -8,6 +8,7 @@ import { EcsFargateTaskConstruct } from '@orcabus/platform-cdk-constructs/ecs';
 import { IEventBus } from 'aws-cdk-lib/aws-events';
 import { ITableV2 } from 'aws-cdk-lib/aws-dynamodb';
 import { IBucket } from 'aws-cdk-lib/aws-s3';
+import { IQueue } from 'aws-cdk-lib/aws-sqs';
 
 export type StepFunctionName =
   // Pre step
@@ -30,43 +31,40 @@ export interface StepFunctionRequirements {
   needsSendTaskTokenPermissions?: boolean;
   needsTaskTokenTablePermissions?: boolean;
   needsEcsPermissions?: boolean;
+  needsWorkerPoolPermissions?: boolean;
   switchHeartBeatScheduler?: boolean;
   needsPutEventPermissions?: boolean;
   needsS3Access?: boolean;
-  needsSfnMonitoringPermissions?: boolean;
 }
 
 export const stepFunctionRequirementsMap: Record<StepFunctionName, StepFunctionRequirements> = {
   handleNewJobRequestWithTaskToken: {
     // Calls API and then writes job id and task token to table
     needsTaskTokenTablePermissions: true,
+    // Needs to send the result of a job that has already completed (i.e. a result cache hit)
+    needsSendTaskTokenPermissions: true,
     // Needs to turn on the heartbeat scheduler
     switchHeartBeatScheduler: true,
   },
   runDecompressionJob: {
     // Needs to run ECS task
     needsEcsPermissions: true,
+    // Needs to send decompressions to the worker pool
+    needsWorkerPoolPermissions: true,
     // Needs to write job metadata to S3
     needsS3Access: true,
-    // Needs to turn on the heartbeat scheduler
-    switchHeartBeatScheduler: true,
     // Needs to put fastq-sync event
     needsPutEventPermissions: true,
   },
   heartbeatMonitor: {
-    // Needs to send task token heartbeat
-    needsSendTaskTokenPermissions: true,
-    // Needs to read /delete task token from DynamoDB
-    needsTaskTokenTablePermissions: true,
     // Needs to turn off the heartbeat scheduler
+    // (the heartbeats are sent by the send task token heartbeats lambda)
     switchHeartBeatScheduler: true,
-    // Needs to be able monitor status
-    needsSfnMonitoringPermissions: true,
   },
   handleDecompressionStateChangeEvent: {
     // Needs to release external step functions
     needsSendTaskTokenPermissions: true,
-    // Needs to delete task token from DynamoDB
+    // Needs to record the completion of the job in DynamoDB
     needsTaskTokenTablePermissions: true,
   },
 };
@@ -74,8 +72,13 @@ export const stepFunctionRequirementsMap: Record<StepFunctionName, StepFunctionR
 // Map the lambda functions to their step function names
 export const stepFunctionLambdaMap: Record<StepFunctionName, LambdaNameList[]> = {
   handleNewJobRequestWithTaskToken: ['launchDecompressionJob'],
-  runDecompressionJob: ['getFastqObject', 'updateFastqDecompressionServiceStatus'],
-  heartbeatMonitor: ['listRunningJobs', 'updateFastqDecompressionServiceStatus'],
+  runDecompressionJob: [
+    'getFastqObject',
+    'updateFastqDecompressionServiceStatus',
+    'acquireConcurrencySlot',
+    'releaseConcurrencySlot',
+  ],
+  heartbeatMonitor: ['sendTaskTokenHeartbeats'],
   handleDecompressionStateChangeEvent: [],
 };
 
@@ -84,6 +87,7 @@ export interface SfnProps {
   lambdaObjects: LambdaResponse[];
   eventBus: IEventBus;
   fargateDecompressionTask: EcsFargateTaskConstruct;
+  decompressionWorkQueue: IQueue;
   taskTokenTable: ITableV2;
   s3Bucket: IBucket;
 }
@@ -1,16 +1,54 @@
 import { App, Aspects, Stack } from 'aws-cdk-lib';
-import { Annotations, Match } from 'aws-cdk-lib/assertions';
+import { Annotations, Match, Template } from 'aws-cdk-lib/assertions';
 import { SynthesisMessage } from 'aws-cdk-lib/cx-api';
 import { AwsSolutionsChecks, NagSuppressions } from 'cdk-nag';
 import { StatelessApplicationStack } from '../infrastructure/stage/stateless-application-stack';
 import { getStatefulStackProps, getStatelessStackProps } from '../infrastructure/stage/config';
 import { StatefulApplicationStack } from '../infrastructure/stage/stateful-application-stack';
 import { PROD_ENVIRONMENT } from '@orcabus/platform-cdk-constructs/deployment-stack-pipeline';
+import {
+  CONCURRENCY_SLOT_TABLE_NAME,
+  DEFAULT_MAX_CONCURRENT_DECOMPRESSION_TASKS,
+  JOB_API_TABLE_NAME,
+  MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME,
+} from '../infrastructure/stage/constants';
 
 function synthesisMessageToString(sm: SynthesisMessage): string {
   return `${sm.entry.data} [${sm.id}]`;
 }
 
+interface PolicyStatementJson {
+  Action: string | string[];
+  Resource: unknown;
+}
+
+/**
+ * Get every policy statement with a resource that contains the resource substring
+ * @param template
+ * @param resourceSubstring
+ */
+function getPolicyStatementsForResource(
+  template: Template,
+  resourceSubstring: string
+): PolicyStatementJson[] {
+  return Object.values(template.findResources('AWS::IAM::Policy')).flatMap((policy) =>
+    (policy.Properties.PolicyDocument.Statement as PolicyStatementJson[]).filter((statement) =>
+      JSON.stringify(statement.Resource).includes(resourceSubstring)
+    )
+  );
+}
+
+/**
+ * Get the actions of every policy statement with a resource that contains the resource substring
+ * @param template
+ * @param resourceSubstring
+ */
+function getPolicyActionsForResource(template: Template, resourceSubstring: string): string[] {
+  return getPolicyStatementsForResource(template, resourceSubstring).flatMap((statement) =>
+    [statement.Action].flat()
+  );
+}
+
 describe('cdk-nag-stateless-toolchain-stack', () => {
   const app = new App();
 
@@ -75,6 +113,137 @@ describe('cdk-nag-stateful-toolchain-stack', () => {
   });
 });
 
+describe('stateful-application-stack-resources', () => {
+  const app = new App({});
+
+  const statefulApplicationStack = new StatefulApplicationStack(
+    app,
+    'StatefulApplicationStackTestResources',
+    {
+      ...getStatefulStackProps('PROD'),
+      env: PROD_ENVIRONMENT,
+    }
+  );
+  const template = Template.fromStack(statefulApplicationStack);
+
+  test('concurrency slot table', () => {
+    template.hasResourceProperties('AWS::DynamoDB::GlobalTable', {
+      TableName: CONCURRENCY_SLOT_TABLE_NAME,
+      KeySchema: [{ AttributeName: 'id', KeyType: 'HASH' }],
+      TimeToLiveSpecification: { AttributeName: 'ttl', Enabled: true },
+    });
+  });
+
+  test('jobs table cache key index', () => {
+    template.hasResourceProperties('AWS::DynamoDB::GlobalTable', {
+      TableName: JOB_API_TABLE_NAME,
+      GlobalSecondaryIndexes: Match.arrayWith([
+        Match.objectLike({
+          IndexName: 'cache_key-index',
+          KeySchema: [
+            { AttributeName: 'cache_key', KeyType: 'HASH' },
+            { AttributeName: 'id', KeyType: 'RANGE' },
+          ],
+        }),
+      ]),
+    });
+  });
+});
+
+describe('stateless-application-stack-resources', () => {
+  const app = new App();
+
+  const statelessApplicationStack = new StatelessApplicationStack(
+    app,
+    'StatelessApplicationStackTestResources',
+    {
+      ...getStatelessStackProps('PROD'),
+      env: PROD_ENVIRONMENT,
+    }
+  );
+  const template = Template.fromStack(statelessApplicationStack);
+
+  test('max concurrent tasks parameter', () => {
+    template.hasResourceProperties('AWS::SSM::Parameter', {
+      Name: MAX_CONCURRENT_TASKS_SSM_PARAMETER_NAME,
+      Value: DEFAULT_MAX_CONCURRENT_DECOMPRESSION_TASKS.toString(),
+    });
+  });
+
+  test('concurrency slot lambdas', () => {
+    // The acquire and release concurrency slot lambdas
+    const concurrencySlotLambdas = template.findResources('AWS::Lambda::Function', {
+      Properties: {
+        Environment: {
+          Variables: Match.objectLike({ CONCURRENCY_SLOT_TABLE_NAME: CONCURRENCY_SLOT_TABLE_NAME }),
+        },
+      },
+    });
+    expect(Object.keys(concurrencySlotLambdas)).toHaveLength(2);
+
+    // The release lambda invokes the acquire lambda to grant the slot it released
+    template.hasResourceProperties('AWS::Lambda::Function', {
+      Environment: {
+        Variables: Match.objectLike({
+          CONCURRENCY_SLOT_TABLE_NAME: CONCURRENCY_SLOT_TABLE_NAME,
+          ACQUIRE_CONCURRENCY_SLOT_LAMBDA_FUNCTION_NAME: Match.anyValue(),
+        }),
+      },
+    });
+
+    // The jobs api reports the concurrency slot usage
+    template.hasResourceProperties('AWS::Lambda::Function', {
+      Environment: {
+        Variables: Match.objectLike({
+          DYNAMODB_CONCURRENCY_SLOT_TABLE_NAME: CONCURRENCY_SLOT_TABLE_NAME,
+        }),
+      },
+    });
+  });
+
+  test('concurrency slot table grants', () => {
+    const actions = getPolicyActionsForResource(template, `table/${CONCURRENCY_SLOT_TABLE_NAME}`);
+    expect(actions).toEqual(
+      expect.arrayContaining(['dynamodb:GetItem', 'dynamodb:PutItem', 'dynamodb:DeleteItem'])
+    );
+  });
+
+  test('jobs table cache key index grants', () => {
+    const actions = getPolicyActionsForResource(
+      template,
+      `table/${JOB_API_TABLE_NAME}/index/cache_key-index`
+    );
+    expect(actions).toContain('dynamodb:Query');
+  });
+
+  test('send task success grants', () => {
+    // The acquire concurrency slot lambda sends the granted slots to the waiting executions
+    // (the statement of the decompression workers also sends task failures and heartbeats)
+    const statements = getPolicyStatementsForResource(template, ':stateMachine:*');
+    expect(statements.map((statement) => statement.Action)).toContain('states:SendTaskSuccess');
+  });
+
+  test('decompression work queue', () => {
+    // The work queue, and its dead letter queue
+    template.hasResourceProperties('AWS::SQS::Queue', {
+      VisibilityTimeout: 180,
+      RedrivePolicy: Match.objectLike({ maxReceiveCount: 3 }),
+    });
+    template.hasResourceProperties('AWS::SQS::Queue', {
+      MessageRetentionPeriod: 1209600,
+    });
+  });
+
+  test('execution status change event rule', () => {
+    template.hasResourceProperties('AWS::Events::Rule', {
+      EventPattern: Match.objectLike({
+        source: ['aws.states'],
+        'detail-type': ['Step Functions Execution Status Change'],
+      }),
+    });
+  });
+});
+
 /**
  * apply nag suppression
  * @param stack